@@ -0,0 +1,249 @@
+"""
+Helpers shared by the `benchmark_*` management commands.
+
+Every benchmark seeds its own data inside a transaction which is rolled back at the
+end, so it can be pointed at a development database without leaving rows behind.
+"""
+
+import logging
+import math
+import statistics
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from properties.models import Property, Room
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def rollback():
+    """
+    Run the wrapped block in a transaction that is always rolled back.
+    """
+
+    logging.disable(logging.INFO)  # per call logging would skew the timings
+
+    try:
+        with transaction.atomic():
+            yield
+            transaction.set_rollback(True)
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def percentile(timings, pct):
+    """
+    Nearest rank percentile of an already sorted list.
+    """
+
+    rank = max(math.ceil(pct / 100 * len(timings)) - 1, 0)
+    return timings[rank]
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts the queries run while it is installed.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, repeat=10):
+    """
+    Call `func` `repeat` times and return the queries it made and its latency in ms.
+
+    The first call is used to count queries and warm up caches, it is not timed.
+    """
+
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        timings.append((timer() - start) * 1000)
+
+    timings.sort()
+
+    return {
+        "queries": counter.count,
+        "mean": statistics.fmean(timings),
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+    }
+
+
+def report(stdout, title, rows):
+    """
+    Write a list of `(label, measure())` rows as an aligned table.
+    """
+
+    stdout.write(title)
+    stdout.write(
+        f"{'case':<40} {'queries':>8} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}"
+    )
+    for label, m in rows:
+        stdout.write(
+            f"{label:<40} {m['queries']:>8} {m['mean']:>10.2f} "
+            f"{m['p50']:>10.2f} {m['p95']:>10.2f}"
+        )
+
+
+def seed_properties(count, batch_size=5000, **fields):
+    """
+    Bulk create `count` bare bones properties.
+    """
+
+    properties = []
+    for i in range(count):
+        slug = f"benchmark-{uuid.uuid4().hex}"
+        defaults = {
+            "name": f"Benchmark property {i}",
+            "slug": slug,
+            "property_type": Property.HOSTEL,
+            "city": "Mendoza",
+            "postal_code": "5500",
+            "country": "AR",
+            "phone": "+5426112345",
+            "email": f"{slug}@email.com",
+            "latitude": -32.889458,
+            "longitude": -68.845839,
+        }
+        properties.append(Property(**(defaults | fields)))
+
+    return Property.objects.bulk_create(properties, batch_size=batch_size)
+
+
+def seed_rooms(properties, per_property, batch_size=5000, **fields):
+    """
+    Bulk create `per_property` rooms for each of the given properties.
+    """
+
+    rooms = []
+    for prop in properties:
+        for i in range(per_property):
+            defaults = {
+                "property": prop,
+                "name": f"Room {i}",
+                "num_of_guests": 2,
+                "room_type": Room.PRIVATE_ROOM,
+                "weekday_price": 100,
+                "weekend_price": 120,
+            }
+            rooms.append(Room(**(defaults | fields)))
+
+    return Room.objects.bulk_create(rooms, batch_size=batch_size)
+
+
+def seed_occurrences(room_ids, nights, start=None, availability=1):
+    """
+    Insert one occurrence per room per night starting `start` using a single
+    set based statement. Weekends (fri, sat) get the room's weekend price.
+    """
+
+    start = start or timezone.localdate()
+    end = start + timedelta(days=nights - 1)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO properties_occurrence (room_id, for_date, rate, availability)
+            SELECT r.id, d::date,
+                   CASE WHEN extract(isodow FROM d) IN (5, 6)
+                        THEN r.weekend_price ELSE r.weekday_price END,
+                   %s
+              FROM properties_room r
+             CROSS JOIN generate_series(%s::date, %s::date, interval '1 day') d
+             WHERE r.id = ANY(%s)
+                ON CONFLICT DO NOTHING
+            """,
+            [availability, start, end, list(room_ids)],
+        )
+        return cursor.rowcount
+
+
+def seed_bookings(room_ids, count, days_back=400, seed=0.5):
+    """
+    Insert `count` single item bookings on random rooms with two set based
+    statements. Nine in ten are paid and confirmed when they were made, up to
+    `days_back` days ago, for a 1 to 7 nights stay starting within 120 days.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT setseed(%s)", [seed])
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE benchmark_booking AS
+            SELECT gen_random_uuid() AS id, g %% 10 <> 0 AS paid,
+                   now() - random() * %s * interval '1 day' AS made
+              FROM generate_series(1, %s) g
+            """,
+            [days_back, count],
+        )
+        cursor.execute(
+            """
+            INSERT INTO bookings_booking
+                   (id, first_name, last_name, email, whatsapp, residence, paid,
+                    payment_id, discount, created, updated, confirmed)
+            SELECT id, 'Bench', 'Mark', 'benchmark@email.com', '+5426112345', 'AR',
+                   paid, '', 0, made, made, CASE WHEN paid THEN made END
+              FROM benchmark_booking
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO bookings_bookingitem
+                   (booking_id, product_id, price, quantity, check_in, check_out)
+            SELECT id, room_id, nights * 100, 1, check_in, check_in + nights
+              FROM (
+                  SELECT id,
+                         (%(room_ids)s::bigint[])[1 + floor(random() * %(rooms)s)::int]
+                             AS room_id,
+                         made::date + floor(random() * 120)::int AS check_in,
+                         1 + floor(random() * 7)::int AS nights
+                    FROM benchmark_booking
+              ) s
+            """,
+            {"room_ids": list(room_ids), "rooms": len(room_ids)},
+        )
+        cursor.execute("DROP TABLE benchmark_booking")
+        return count
+
+
+def analyze(*models):
+    """
+    Refresh planner statistics for freshly seeded tables.
+    """
+
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+
+def table_sizes(*models):
+    """
+    Map each model's table to its heap and index sizes in bytes.
+    """
+
+    sizes = {}
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            cursor.execute(
+                "SELECT pg_table_size(%s), pg_indexes_size(%s)", [table, table]
+            )
+            sizes[table] = cursor.fetchone()
+    return sizes
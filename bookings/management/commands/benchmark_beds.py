@@ -0,0 +1,73 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.benchmarks import measure, report
+from bookings.beds import Stay, fit, pack
+
+
+def seed_stays(rng, beds, days, start, occupancy):
+    """
+    Stays of 1 to 7 nights with 1 to 3 guests filling about `occupancy` of the
+    bed nights, planned as they come so only stays with a free bed are kept.
+    """
+
+    stays = []
+    target = beds * days * occupancy
+    booked = 0
+    while booked < target:
+        check_in = start + timedelta(days=rng.randrange(days))
+        nights, units = rng.randint(1, 7), rng.choice((1, 1, 1, 2, 3))
+        stay = Stay(len(stays), check_in, check_in + timedelta(days=nights), units, [])
+
+        placement = fit(beds, [*stays, stay])
+        if placement is None:
+            booked += nights  # no room for it, still count it so the loop ends
+            continue
+
+        stays.append(stay._replace(beds=placement[stay.item]))
+        booked += nights * stay.units
+
+    return stays
+
+
+class Command(BaseCommand):
+    help = "Measure the dorm bed planning of bookings.beds without the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--beds", type=int, default=20)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--occupancy", type=float, default=0.85)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        beds, start = options["beds"], timezone.localdate()
+
+        stays = seed_stays(rng, beds, options["days"], start, options["occupancy"])
+        unassigned = [stay._replace(beds=[]) for stay in stays]
+        # a tenth of the stays are new, the rest keep their beds
+        mixed = [
+            stay._replace(beds=[]) if i % 10 == 0 else stay
+            for i, stay in enumerate(stays)
+        ]
+
+        self.stdout.write(
+            f"{len(stays)} stays, {sum(s.units for s in stays)} guests on {beds} "
+            f"beds over {options['days']} days"
+        )
+
+        rows = [
+            (
+                "fit a tenth of new stays",
+                measure(lambda: fit(beds, mixed), options["repeat"]),
+            ),
+            (
+                "pack everything from scratch",
+                measure(lambda: pack(beds, unassigned, start), options["repeat"]),
+            ),
+        ]
+        report(self.stdout, "Dorm bed planning", rows)
@@ -0,0 +1,173 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_bookings,
+    seed_properties,
+    seed_rooms,
+    table_sizes,
+)
+from bookings.models import Booking, BookingItem, DailyStat
+from bookings.stats import property_kpis, rebuild_daily_stats, record_booking
+from properties.models import Night, RatePeriod, Room
+from properties.services import fill_rate_periods
+
+
+def live_kpis(property_id, today):
+    """
+    The dashboard numbers computed from the bookings and the inventory on every
+    call, what the page would do without the rollup.
+    """
+
+    start, end = today - timedelta(days=90), today + timedelta(days=89)
+    units = defaultdict(int)
+    sold = defaultdict(int)
+    revenue = defaultdict(Decimal)
+    booked = defaultdict(int)
+
+    nights = (
+        Night.objects.filter(
+            room__property_id=property_id,
+            for_date__range=(start, end),
+            span_start__lte=end,
+            span_end__gte=start,
+        )
+        .values_list("for_date")
+        .annotate(available=Sum("availability"))
+    )
+    for night, available in nights:
+        units[night] += available
+
+    items = BookingItem.objects.filter(
+        product__property_id=property_id, check_in__lte=end, check_out__gt=start
+    ).values_list("check_in", "check_out", "quantity", "price", "booking__paid")
+    for check_in, check_out, quantity, price, paid in items:
+        per_night = price * quantity / (check_out - check_in).days
+        night = max(check_in, start)
+        while night < check_out and night <= end:
+            units[night] += quantity
+            if paid:
+                sold[night] += quantity
+                revenue[night] += per_night
+            night += timedelta(days=1)
+
+    confirmed = BookingItem.objects.filter(
+        product__property_id=property_id,
+        booking__paid=True,
+        booking__confirmed__date__range=(start, today),
+    ).values_list("booking__confirmed__date", "quantity", "check_in", "check_out")
+    for day, quantity, check_in, check_out in confirmed:
+        booked[day] += quantity * (check_out - check_in).days
+
+    kpis = []
+    for first, last in (
+        (today - timedelta(days=90), today - timedelta(days=1)),
+        (today - timedelta(days=30), today - timedelta(days=1)),
+        (today, today + timedelta(days=29)),
+        (today, today + timedelta(days=89)),
+    ):
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        total_units = sum(units[day] for day in days)
+        total_sold = sum(sold[day] for day in days)
+        total_revenue = sum(revenue[day] for day in days)
+        kpis.append(
+            (
+                total_sold / total_units if total_units else None,
+                total_revenue / total_sold if total_sold else None,
+                total_revenue,
+                sum(booked[day] for day in days),
+            )
+        )
+    return kpis
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a million bookings and compare the owner dashboard read from the "
+        "daily stats against computing it from the bookings, plus the cost of "
+        "keeping the stats up to date"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=1_000_000)
+        parser.add_argument("--properties", type=int, default=1000)
+        parser.add_argument("--days-back", type=int, default=400)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        today = timezone.localdate()
+        repeat = options["repeat"]
+
+        with rollback():
+            begin = timer()
+            properties = seed_properties(options["properties"])
+            property_ids = [p.id for p in properties]
+            room_ids = [room.id for room in seed_rooms(properties, per_property=10)]
+            fill_rate_periods(
+                room_ids,
+                today - timedelta(days=options["days_back"]),
+                today + timedelta(days=365),
+            )
+            seed_bookings(
+                room_ids,
+                options["bookings"],
+                days_back=options["days_back"],
+                seed=options["seed"] / 2**31,
+            )
+            analyze(Booking, BookingItem, Room, RatePeriod)
+            self.stdout.write(
+                f"Seeded {options['bookings']} bookings on {len(room_ids)} rooms "
+                f"in {timer() - begin:.1f}s"
+            )
+
+            begin = timer()
+            rows = rebuild_daily_stats(
+                today - timedelta(days=90), today + timedelta(days=364)
+            )
+            analyze(DailyStat)
+            self.stdout.write(
+                f"rebuild_daily_stats: {rows} rows in {timer() - begin:.2f}s"
+            )
+            heap, index = table_sizes(DailyStat)[DailyStat._meta.db_table]
+            self.stdout.write(
+                f"daily stats: {heap / 2**20:.1f} MB heap, {index / 2**20:.1f} MB index"
+            )
+
+            # unpaid bookings stand in for the ones being confirmed
+            pending = list(
+                Booking.objects.filter(paid=False).values_list("id", flat=True)[
+                    : repeat + 1
+                ]
+            )
+
+            def dashboard():
+                property_kpis(rng.choice(property_ids), today)
+
+            def live():
+                live_kpis(rng.choice(property_ids), today)
+
+            def confirm():
+                record_booking(pending.pop(), today)
+
+            report(
+                self.stdout,
+                "Dashboard",
+                [
+                    ("daily stats: 4 periods", measure(dashboard, repeat)),
+                    ("from the bookings: 4 periods", measure(live, repeat)),
+                    ("record_booking on confirmation", measure(confirm, repeat)),
+                ],
+            )
@@ -0,0 +1,44 @@
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+
+from bookings.beds import plan_rooms
+from properties.models import Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Place the upcoming stays of every dorm on beds, moving future stays only "
+        "when a new one does not fit, meant to run nightly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="Rooms planned per transaction"
+        )
+
+    def handle(self, **options):
+        batch_size = options["batch_size"]
+        room_ids = list(
+            Room.objects.filter(room_type__in=Room.DORM_ROOM_TYPES)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        begin = timer()
+        moved = unplaced = 0
+        for i in range(0, len(room_ids), batch_size):
+            batch_moved, batch_unplaced = plan_rooms(room_ids[i : i + batch_size])
+            moved += batch_moved
+            unplaced += batch_unplaced
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(room_ids)} dorms planned in {timer() - begin:.2f}s, "
+                f"{moved} stays placed or moved"
+            )
+        )
+        if unplaced:
+            self.stdout.write(
+                self.style.WARNING(f"{unplaced} stays have no bed, dorms overbooked")
+            )
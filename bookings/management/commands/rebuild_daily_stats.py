@@ -0,0 +1,43 @@
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bookings.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily stats of every property around today from the "
+        "bookings and the inventory, meant to run nightly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days-back",
+            type=int,
+            default=90,
+            help="Past days rebuilt, the dashboard shows up to 90",
+        )
+        parser.add_argument(
+            "--days-ahead",
+            type=int,
+            default=365,
+            help="Days rebuilt from today on",
+        )
+
+    def handle(self, **options):
+        today = timezone.localdate()
+        start = today - timedelta(days=options["days_back"])
+        end = today + timedelta(days=options["days_ahead"] - 1)
+
+        begin = timer()
+        rows = rebuild_daily_stats(start, end)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{rows} daily stats rebuilt from {start} till {end} "
+                f"in {timer() - begin:.2f}s"
+            )
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookingitem",
+            name="check_in",
+            field=models.DateField(blank=True, null=True, verbose_name="Check In"),
+        ),
+        migrations.AddField(
+            model_name="bookingitem",
+            name="check_out",
+            field=models.DateField(blank=True, null=True, verbose_name="Check Out"),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0002_booking_item_stay"),
+        ("properties", "0019_partition_occurrences"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="confirmed",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="DailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                (
+                    "units",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Units for sale"
+                    ),
+                ),
+                (
+                    "units_sold",
+                    models.PositiveIntegerField(default=0, verbose_name="Units sold"),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Revenue",
+                    ),
+                ),
+                (
+                    "bookings",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Bookings confirmed"
+                    ),
+                ),
+                (
+                    "units_booked",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Nights booked"
+                    ),
+                ),
+                (
+                    "revenue_booked",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Revenue booked",
+                    ),
+                ),
+                (
+                    "property",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Stat",
+                "verbose_name_plural": "Daily Stats",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailystat",
+            constraint=models.UniqueConstraint(
+                fields=("property", "date"), name="unique_daily_stat"
+            ),
+        ),
+    ]
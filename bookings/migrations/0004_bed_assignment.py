@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0003_daily_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BedAssignment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bed", models.PositiveSmallIntegerField(verbose_name="Bed")),
+                (
+                    "item",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="beds",
+                        to="bookings.bookingitem",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bed Assignment",
+                "verbose_name_plural": "Bed Assignments",
+                "ordering": ("item", "bed"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="bedassignment",
+            constraint=models.UniqueConstraint(
+                fields=("item", "bed"), name="unique_bed_assignment"
+            ),
+        ),
+    ]
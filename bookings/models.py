@@ -3,11 +3,17 @@ import uuid
 
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from django_countries.fields import CountryField
 
+from properties.versions import bump_rooms
+
+from .beds import plan_rooms
+from .stats import record_booking
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,6 +40,7 @@ class Booking(models.Model):
     discount = models.IntegerField(
         default=0, validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    confirmed = models.DateTimeField(null=True, blank=True, editable=False)
 
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
@@ -70,9 +77,28 @@ class Booking(models.Model):
 
         logger.info("confirming {obj}", extra={"obj": self})
 
-        self.paid = True
-        self.payment_id = payment_id
-        self.save()
+        now = timezone.now()
+        with transaction.atomic():
+            # only the first confirmation is added to the daily stats, the update
+            # is conditional so two concurrent confirmations cannot both count
+            first = Booking.objects.filter(pk=self.pk, confirmed__isnull=True).update(
+                confirmed=now
+            )
+            if first:
+                self.confirmed = now
+            else:
+                self.refresh_from_db(fields=["confirmed"])
+
+            self.paid = True
+            self.payment_id = payment_id
+            self.save()
+
+            if first:
+                record_booking(self.pk, timezone.localdate(now))
+                # the rooms' calendars count the units of confirmed bookings
+                room_ids = list(self.items.values_list("product_id", flat=True))
+                plan_rooms(room_ids)
+                transaction.on_commit(lambda: bump_rooms(room_ids))
 
         return self
 
@@ -93,6 +119,8 @@ class BookingItem(models.Model):
         default=1,
         validators=[MinValueValidator(1), MaxValueValidator(10)],
     )
+    check_in = models.DateField(_("Check In"), null=True, blank=True)
+    check_out = models.DateField(_("Check Out"), null=True, blank=True)
 
     class Meta:
         verbose_name = "Booking Item"
@@ -103,3 +131,73 @@ class BookingItem(models.Model):
 
     def get_cost(self):
         return self.price * self.quantity
+
+
+class BedAssignment(models.Model):
+    """
+    The bed one unit of a dorm booking item sleeps in for the whole stay. Placed
+    by `bookings.beds`, which keeps the beds of a room from overlapping.
+    """
+
+    item = models.ForeignKey(
+        "BookingItem",
+        related_name="beds",
+        on_delete=models.CASCADE,
+        db_index=False,  # unique_bed_assignment leads with the item
+    )
+    bed = models.PositiveSmallIntegerField(_("Bed"))
+
+    class Meta:
+        verbose_name = "Bed Assignment"
+        verbose_name_plural = "Bed Assignments"
+        ordering = ("item", "bed")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("item", "bed"), name="unique_bed_assignment"
+            ),
+        )
+
+    def __str__(self):
+        return f"Bed {self.bed} for {self.item_id}"
+
+
+class DailyStat(models.Model):
+    """
+    Rollup of a property's bookings for one day, so the owner dashboard reads a
+    row per day instead of every booking.
+
+    `units`, `units_sold` and `revenue` are about the guests staying that night,
+    the `booked` columns about the bookings confirmed that day. Kept up to date by
+    `Booking.confirm()` and rebuilt by the `rebuild_daily_stats` command, see
+    `bookings.stats`.
+    """
+
+    property = models.ForeignKey(
+        "properties.Property",
+        related_name="daily_stats",
+        on_delete=models.CASCADE,
+        db_index=False,  # unique_daily_stat leads with the property
+    )
+    date = models.DateField(_("Date"))
+    units = models.PositiveIntegerField(_("Units for sale"), default=0)
+    units_sold = models.PositiveIntegerField(_("Units sold"), default=0)
+    revenue = models.DecimalField(
+        _("Revenue"), max_digits=14, decimal_places=2, default=0
+    )
+    bookings = models.PositiveIntegerField(_("Bookings confirmed"), default=0)
+    units_booked = models.PositiveIntegerField(_("Nights booked"), default=0)
+    revenue_booked = models.DecimalField(
+        _("Revenue booked"), max_digits=14, decimal_places=2, default=0
+    )
+
+    class Meta:
+        verbose_name = "Daily Stat"
+        verbose_name_plural = "Daily Stats"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("property", "date"), name="unique_daily_stat"
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.property_id} {self.date}"
@@ -0,0 +1,250 @@
+"""
+Per property per day rollup of the bookings, read by the owner dashboard.
+
+`bookings_dailystat` holds one row per property and day. The stay columns count
+the units sold on that night and the revenue spread evenly over the nights of each
+stay, plus the units for sale: what is still available on the night view and what
+any booking holds. The booked columns count the bookings confirmed on that day.
+
+`record_booking()` adds a booking to it when it is confirmed, and
+`rebuild_daily_stats()` recomputes a range of days from scratch. The incremental
+update takes the units for sale of a new row from the night view at that moment,
+so the nightly rebuild is what keeps them exact. Both are written as single
+statements on the tables, the module does not import the models so
+`bookings.models` can use it.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RECORD_SQL = """
+WITH items AS (
+    SELECT r.property_id, i.quantity, i.price * i.quantity AS cost,
+           i.check_in, i.check_out
+      FROM bookings_bookingitem i
+      JOIN properties_room r ON r.id = i.product_id
+     WHERE i.booking_id = %(booking_id)s AND i.check_out > i.check_in
+), stays AS (
+    SELECT property_id, d::date AS date, sum(quantity) AS units_sold,
+           sum(cost / (check_out - check_in)) AS revenue
+      FROM items
+     CROSS JOIN generate_series(check_in, check_out - 1, interval '1 day') d
+     GROUP BY 1, 2
+), booked AS (
+    SELECT property_id, %(booked_on)s::date AS date, 1 AS bookings,
+           sum(quantity * (check_out - check_in)) AS units_booked,
+           sum(cost) AS revenue_booked
+      FROM items
+     GROUP BY 1
+), supply AS (
+    -- scalar subqueries are planned as parameters, so the night view is read
+    -- through the room indexes instead of expanding every room's periods
+    SELECT r.property_id, n.for_date AS date, sum(n.availability) AS available
+      FROM properties_night n
+      JOIN properties_room r ON r.id = n.room_id
+     WHERE n.room_id = ANY(ARRAY(
+               SELECT id FROM properties_room
+                WHERE property_id IN (SELECT property_id FROM items)
+           ))
+       AND n.for_date >= (SELECT min(check_in) FROM items)
+       AND n.for_date < (SELECT max(check_out) FROM items)
+       AND n.span_start < (SELECT max(check_out) FROM items)
+       AND n.span_end >= (SELECT min(check_in) FROM items)
+     GROUP BY 1, 2
+)
+INSERT INTO bookings_dailystat
+       (property_id, date, units, units_sold, revenue,
+        bookings, units_booked, revenue_booked)
+SELECT property_id, date,
+       coalesce(units_sold, 0) + coalesce(available, 0),
+       coalesce(units_sold, 0),
+       coalesce(revenue, 0),
+       coalesce(bookings, 0),
+       coalesce(units_booked, 0),
+       coalesce(revenue_booked, 0)
+  FROM stays
+  FULL JOIN booked USING (property_id, date)
+  LEFT JOIN supply USING (property_id, date)
+    ON CONFLICT (property_id, date) DO UPDATE
+   SET units = greatest(
+           bookings_dailystat.units,
+           bookings_dailystat.units_sold + EXCLUDED.units_sold
+       ),
+       units_sold = bookings_dailystat.units_sold + EXCLUDED.units_sold,
+       revenue = bookings_dailystat.revenue + EXCLUDED.revenue,
+       bookings = bookings_dailystat.bookings + EXCLUDED.bookings,
+       units_booked = bookings_dailystat.units_booked + EXCLUDED.units_booked,
+       revenue_booked = bookings_dailystat.revenue_booked + EXCLUDED.revenue_booked
+"""
+
+REBUILD_SQL = """
+WITH supply AS (
+    SELECT r.property_id, n.for_date AS date, sum(n.availability) AS available
+      FROM properties_night n
+      JOIN properties_room r ON r.id = n.room_id
+     WHERE n.for_date BETWEEN %(start)s AND %(end)s
+       AND n.span_start <= %(end)s AND n.span_end >= %(start)s
+     GROUP BY 1, 2
+), stays AS (
+    SELECT r.property_id, d::date AS date,
+           sum(i.quantity) AS held,
+           sum(i.quantity) FILTER (WHERE b.paid) AS units_sold,
+           sum(i.price * i.quantity / (i.check_out - i.check_in))
+               FILTER (WHERE b.paid) AS revenue
+      FROM bookings_bookingitem i
+      JOIN bookings_booking b ON b.id = i.booking_id
+      JOIN properties_room r ON r.id = i.product_id
+     CROSS JOIN generate_series(
+           greatest(i.check_in, %(start)s::date),
+           least(i.check_out - 1, %(end)s::date),
+           interval '1 day'
+     ) d
+     WHERE i.check_in <= %(end)s AND i.check_out > %(start)s
+     GROUP BY 1, 2
+), booked AS (
+    SELECT r.property_id,
+           (coalesce(b.confirmed, b.created) AT TIME ZONE %(tz)s)::date AS date,
+           count(DISTINCT b.id) AS bookings,
+           sum(i.quantity * (i.check_out - i.check_in)) AS units_booked,
+           sum(i.price * i.quantity) AS revenue_booked
+      FROM bookings_booking b
+      JOIN bookings_bookingitem i ON i.booking_id = b.id
+      JOIN properties_room r ON r.id = i.product_id
+     WHERE b.paid
+       AND i.check_out > i.check_in
+       AND coalesce(b.confirmed, b.created) >= %(start_at)s
+       AND coalesce(b.confirmed, b.created) < %(end_at)s
+     GROUP BY 1, 2
+)
+INSERT INTO bookings_dailystat
+       (property_id, date, units, units_sold, revenue,
+        bookings, units_booked, revenue_booked)
+SELECT property_id, date,
+       coalesce(available, 0) + coalesce(held, 0),
+       coalesce(units_sold, 0),
+       coalesce(revenue, 0),
+       coalesce(bookings, 0),
+       coalesce(units_booked, 0),
+       coalesce(revenue_booked, 0)
+  FROM supply
+  FULL JOIN stays USING (property_id, date)
+  FULL JOIN booked USING (property_id, date)
+"""
+
+
+def record_booking(booking_id, booked_on):
+    """
+    Add a booking confirmed on `booked_on` to the daily stats of the properties of
+    its rooms. Returns the number of rows written.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(RECORD_SQL, {"booking_id": booking_id, "booked_on": booked_on})
+        rows = cursor.rowcount
+
+    logger.info("recorded booking:%s in %s daily stats" % (booking_id, rows))
+
+    return rows
+
+
+def rebuild_daily_stats(start, end):
+    """
+    Replace the daily stats of every property between `start` and `end` (both
+    inclusive) with the ones computed from the bookings and the inventory. Returns
+    the number of rows written.
+    """
+
+    tz = timezone.get_current_timezone()
+    params = {
+        "start": start,
+        "end": end,
+        "tz": settings.TIME_ZONE,
+        # the confirmation timestamps of the local days in the range
+        "start_at": timezone.make_aware(datetime.combine(start, time.min), tz),
+        "end_at": timezone.make_aware(
+            datetime.combine(end + timedelta(days=1), time.min), tz
+        ),
+    }
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM bookings_dailystat WHERE date BETWEEN %(start)s AND %(end)s",
+            params,
+        )
+        cursor.execute(REBUILD_SQL, params)
+        rows = cursor.rowcount
+
+    logger.info("rebuilt %s daily stats from:%s till:%s" % (rows, start, end))
+
+    return rows
+
+
+def ratio(numerator, denominator):
+    if not denominator:
+        return None
+    return Decimal(numerator) / Decimal(denominator)
+
+
+def property_kpis(property_id, today=None, periods=(30, 90)):
+    """
+    Occupancy, ADR, RevPAR, revenue and pickup of a property for the last and the
+    next `periods` days, today being the first of the next ones.
+
+    One aggregate over at most `2 * max(periods)` rows of the daily stats, the
+    cost does not depend on the number of bookings. Pickup is the units booked by
+    the bookings confirmed during a past period, it is `None` for the next ones.
+    """
+
+    today = today or timezone.localdate()
+    windows = [
+        (f"Last {days} days", today - timedelta(days=days), today - timedelta(days=1))
+        for days in sorted(periods, reverse=True)
+    ] + [
+        (f"Next {days} days", today, today + timedelta(days=days - 1))
+        for days in sorted(periods)
+    ]
+
+    columns, params = [], []
+    for _, start, end in windows:
+        for column in ("units", "units_sold", "revenue", "units_booked"):
+            columns.append(
+                f"coalesce(sum({column}) FILTER (WHERE date BETWEEN %s AND %s), 0)"
+            )
+            params += [start, end]
+
+    first = min(start for _, start, _ in windows)
+    last = max(end for _, _, end in windows)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM bookings_dailystat "
+            "WHERE property_id = %s AND date BETWEEN %s AND %s",
+            [*params, property_id, first, last],
+        )
+        values = cursor.fetchone()
+
+    kpis = []
+    for index, (label, start, end) in enumerate(windows):
+        units, units_sold, revenue, units_booked = values[index * 4 : index * 4 + 4]
+        occupancy = ratio(units_sold, units)
+        kpis.append(
+            {
+                "label": label,
+                "start": start,
+                "end": end,
+                "units": units,
+                "units_sold": units_sold,
+                "occupancy": occupancy * 100 if occupancy is not None else None,
+                "adr": ratio(revenue, units_sold),
+                "revpar": ratio(revenue, units),
+                "revenue": revenue,
+                "pickup": units_booked if end < today else None,
+            }
+        )
+    return kpis
@@ -0,0 +1,227 @@
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from bookings.beds import Stay, fit, pack, plan, plan_rooms
+from bookings.factories import (
+    BookingConfirmedFactory,
+    BookingFactory,
+    BookingItemFactory,
+)
+from bookings.models import BedAssignment
+from properties.factories import PropertyFactory, RoomFactory
+from properties.models import Room
+
+START = date(2026, 3, 2)
+
+
+def stay(item, day, nights, units=1, beds=()):
+    check_in = START + timedelta(days=day)
+    return Stay(item, check_in, check_in + timedelta(days=nights), units, list(beds))
+
+
+def bed_nights(stays, placement):
+    """
+    Map every (bed, night) to the items sleeping there, one per night if valid.
+    """
+
+    nights = Counter()
+    for s in stays:
+        for bed in placement.get(s.item, []):
+            for i in range((s.check_out - s.check_in).days):
+                nights[bed, s.check_in + timedelta(days=i)] += 1
+    return nights
+
+
+def most_guests(stays):
+    guests = Counter()
+    for s in stays:
+        for i in range((s.check_out - s.check_in).days):
+            guests[s.check_in + timedelta(days=i)] += s.units
+    return max(guests.values(), default=0)
+
+
+class BedPlanningTests(SimpleTestCase):
+    """
+    Test suite for the placement of dorm stays on beds.
+    """
+
+    def test_pack_puts_back_to_back_stays_on_the_same_bed(self):
+        stays = [stay(1, 0, 2), stay(2, 0, 5), stay(3, 2, 3)]
+
+        placement, unplaced = pack(2, stays, START)
+
+        self.assertEqual(unplaced, [])
+        self.assertEqual(placement[1], placement[3])
+        self.assertNotEqual(placement[1], placement[2])
+
+    def test_pack_gives_every_unit_its_own_bed(self):
+        placement, _ = pack(4, [stay(1, 0, 3, units=3)], START)
+
+        self.assertEqual(len(set(placement[1])), 3)
+
+    def test_pack_reports_stays_short_of_beds(self):
+        stays = [stay(1, 0, 2, units=2), stay(2, 1, 2)]
+
+        placement, unplaced = pack(2, stays, START)
+
+        self.assertEqual(unplaced, [2])
+        self.assertEqual(placement[2], [])
+
+    def test_pack_keeps_the_beds_of_checked_in_stays(self):
+        stays = [stay(1, -2, 4, beds=[2]), stay(2, 0, 1), stay(3, 1, 5)]
+
+        placement, _ = pack(2, stays, START)
+
+        self.assertEqual(placement[1], [2])
+        self.assertEqual(placement[2], [1])
+
+    def test_fit_keeps_existing_beds_and_fills_the_tightest_gap(self):
+        stays = [
+            stay(1, 0, 2, beds=[1]),
+            stay(2, 4, 2, beds=[1]),
+            stay(3, 0, 1, beds=[2]),
+            stay(4, 2, 2),
+        ]
+
+        placement = fit(2, stays)
+
+        self.assertEqual(placement[1], [1])
+        self.assertEqual(placement[3], [2])
+        # nights 2 and 3 close the gap on bed 1 exactly
+        self.assertEqual(placement[4], [1])
+
+    def test_fit_gives_up_on_overlapping_beds(self):
+        stays = [stay(1, 0, 3, beds=[1]), stay(2, 2, 2, beds=[1])]
+
+        self.assertIsNone(fit(2, stays))
+
+    def test_plan_moves_future_stays_only_when_needed(self):
+        # bed 2 is free on night 1 only because stay 2 sits on bed 1
+        stays = [
+            stay(1, 0, 1, beds=[1]),
+            stay(2, 1, 2, beds=[2]),
+            stay(3, 0, 3),
+        ]
+
+        placement, unplaced = plan(2, stays, START)
+
+        self.assertEqual(unplaced, [])
+        self.assertEqual(placement[3], [2])
+        self.assertEqual(placement[2], [1])
+        self.assertEqual(placement[1], [1])
+
+    def test_random_plans_never_double_book_a_bed(self):
+        """
+        Property test over seeded random dorms: beds never hold two guests a
+        night, stays keep one bed per unit, checked in stays keep their beds and
+        nobody is left out while the dorm has a bed for everyone every night.
+        """
+
+        for seed in range(500):
+            rng = random.Random(seed)
+            beds = rng.randint(1, 8)
+            stays = [
+                stay(i, rng.randint(-5, 30), rng.randint(1, 6), rng.randint(1, 3))
+                for i in range(rng.randint(0, 30))
+            ]
+
+            placement, unplaced = pack(beds, stays, START)
+
+            with self.subTest(seed=seed, step="pack"):
+                self.assertLessEqual(
+                    max(bed_nights(stays, placement).values(), default=1), 1
+                )
+                for s in stays:
+                    self.assertTrue(set(placement[s.item]) <= set(range(1, beds + 1)))
+                    self.assertEqual(
+                        len(set(placement[s.item])), len(placement[s.item])
+                    )
+                if most_guests(stays) <= beds:
+                    self.assertEqual(unplaced, [])
+
+            # replan with the beds given and a new booking
+            booked = [
+                s._replace(beds=placement[s.item])
+                for s in stays
+                if s.item not in unplaced
+            ]
+            booked.append(stay(99, rng.randint(0, 30), rng.randint(1, 5)))
+
+            placement, unplaced = plan(beds, booked, START)
+
+            with self.subTest(seed=seed, step="plan"):
+                self.assertLessEqual(
+                    max(bed_nights(booked, placement).values(), default=1), 1
+                )
+                for s in booked:
+                    if s.beds and s.check_in < START:
+                        self.assertEqual(placement[s.item], s.beds)
+                if most_guests(booked) <= beds:
+                    self.assertEqual(unplaced, [])
+
+
+class PlanRoomsTests(TestCase):
+    """
+    Test suite for the bed assignments of confirmed dorm bookings.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=3)
+        cls.check_out = cls.check_in + timedelta(days=2)
+
+        prop = PropertyFactory()
+        cls.dorm = RoomFactory(
+            property=prop, room_type=Room.MIXED_DORM, num_of_guests=4
+        )
+        cls.private = RoomFactory(property=prop, room_type=Room.PRIVATE_ROOM)
+
+    def book(self, room, quantity, paid=True, days=0):
+        factory = BookingConfirmedFactory if paid else BookingFactory
+        return BookingItemFactory(
+            booking=factory(),
+            product=room,
+            quantity=quantity,
+            check_in=self.check_in + timedelta(days=days),
+            check_out=self.check_out + timedelta(days=days),
+        )
+
+    def beds(self, item):
+        return list(item.beds.values_list("bed", flat=True))
+
+    def test_confirming_a_booking_assigns_its_dorm_beds(self):
+        item = self.book(self.dorm, quantity=2, paid=False)
+        private = BookingItemFactory(
+            booking=item.booking,
+            product=self.private,
+            quantity=1,
+            check_in=self.check_in,
+            check_out=self.check_out,
+        )
+
+        item.booking.confirm(payment_id="mp-123")
+
+        self.assertEqual(len(set(self.beds(item))), 2)
+        self.assertEqual(self.beds(private), [])
+
+    def test_planning_again_moves_nothing(self):
+        self.book(self.dorm, quantity=3)
+        self.book(self.dorm, quantity=1, days=1)
+
+        self.assertEqual(plan_rooms([self.dorm.id]), (2, 0))
+        self.assertEqual(plan_rooms([self.dorm.id]), (0, 0))
+        self.assertEqual(BedAssignment.objects.count(), 4)
+
+    def test_unpaid_and_overbooked_stays_are_left_out(self):
+        self.book(self.dorm, quantity=4)
+        self.book(self.dorm, quantity=1, paid=False)
+        self.book(self.dorm, quantity=1, days=1)
+
+        moved, unplaced = plan_rooms([self.dorm.id, self.private.id])
+
+        self.assertEqual((moved, unplaced), (1, 1))
+        self.assertEqual(BedAssignment.objects.count(), 4)
@@ -0,0 +1,180 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from bookings.factories import BookingFactory, BookingItemFactory
+from bookings.models import DailyStat
+from bookings.stats import property_kpis, rebuild_daily_stats
+from properties.factories import PropertyFactory, RatePeriodFactory, RoomFactory
+from properties.models import Room
+from properties.services import reserve_room
+
+
+class DailyStatsTests(TestCase):
+    """
+    Test suite for the daily stats rollup of the bookings.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        cls.monday = cls.today + timedelta(days=7 - cls.today.weekday())
+        cls.sunday = cls.monday + timedelta(days=6)
+
+        cls.property = PropertyFactory()
+        cls.room = RoomFactory(
+            property=cls.property, room_type=Room.PRIVATE_ROOM, weekday_price=100
+        )
+        cls.dorm = RoomFactory(
+            property=cls.property, room_type=Room.MIXED_DORM, num_of_guests=6
+        )
+        for room, availability in ((cls.room, 1), (cls.dorm, 6)):
+            RatePeriodFactory(
+                room=room,
+                start_date=cls.monday,
+                end_date=cls.sunday,
+                availability=availability,
+            )
+
+    def book(self, room, check_in, check_out, price, quantity=1):
+        """
+        Create a booking for a stay taking its units off sale, as checkout does.
+        """
+
+        booking = BookingFactory()
+        reserve_room(room.id, check_in, check_out, quantity)
+        BookingItemFactory(
+            booking=booking,
+            product=room,
+            price=price,
+            quantity=quantity,
+            check_in=check_in,
+            check_out=check_out,
+        )
+        return booking
+
+    def stats(self):
+        return list(
+            DailyStat.objects.filter(property=self.property)
+            .order_by("date")
+            .values_list(
+                "date",
+                "units",
+                "units_sold",
+                "revenue",
+                "bookings",
+                "units_booked",
+                "revenue_booked",
+            )
+        )
+
+    def test_confirming_a_booking_adds_it_to_the_stats(self):
+        tuesday = self.monday + timedelta(days=1)
+        booking = self.book(self.room, self.monday, tuesday + timedelta(days=1), 200)
+
+        booking.confirm(payment_id="123")
+
+        self.assertIsNotNone(booking.confirmed)
+        self.assertEqual(
+            self.stats(),
+            [
+                (self.today, 0, 0, Decimal(0), 1, 2, Decimal(200)),
+                (self.monday, 7, 1, Decimal(100), 0, 0, Decimal(0)),
+                (tuesday, 7, 1, Decimal(100), 0, 0, Decimal(0)),
+            ],
+        )
+
+    def test_stays_on_the_same_night_add_up(self):
+        wednesday = self.monday + timedelta(days=2)
+        self.book(self.dorm, self.monday, wednesday, 30, quantity=2).confirm("1")
+        self.book(self.dorm, self.monday, self.monday + timedelta(days=1), 45).confirm(
+            "2"
+        )
+
+        monday = DailyStat.objects.get(property=self.property, date=self.monday)
+
+        self.assertEqual((monday.units, monday.units_sold), (7, 3))
+        self.assertEqual(monday.revenue, Decimal(75))
+
+    def test_a_booking_is_only_counted_once(self):
+        booking = self.book(self.room, self.monday, self.monday + timedelta(days=1), 90)
+        booking.confirm(payment_id="123")
+        stats = self.stats()
+
+        booking.confirm(payment_id="456")
+
+        self.assertEqual(self.stats(), stats)
+
+    def test_rebuild_matches_the_incremental_stats(self):
+        wednesday = self.monday + timedelta(days=2)
+        self.book(self.room, self.monday, wednesday, 200).confirm("1")
+        self.book(self.dorm, self.monday, self.sunday, 60, quantity=3).confirm("2")
+        incremental = self.stats()
+        DailyStat.objects.all().delete()
+
+        rebuild_daily_stats(self.today, self.monday + timedelta(days=2))
+
+        rebuilt = [row for row in self.stats() if row[0] <= wednesday]
+        self.assertEqual(rebuilt, [row for row in incremental if row[0] <= wednesday])
+
+    def test_rebuild_counts_unpaid_bookings_as_for_sale(self):
+        self.book(self.dorm, self.monday, self.monday + timedelta(days=1), 30, 4)
+
+        rebuild_daily_stats(self.monday, self.monday)
+
+        self.assertEqual(
+            self.stats(), [(self.monday, 7, 0, Decimal(0), 0, 0, Decimal(0))]
+        )
+
+    def test_command_rebuilds_around_today(self):
+        DailyStat.objects.create(
+            property=self.property, date=self.today, units=99, units_sold=99
+        )
+        out = StringIO()
+
+        call_command("rebuild_daily_stats", "--days-ahead", "30", stdout=out)
+
+        self.assertFalse(DailyStat.objects.filter(units=99).exists())
+        self.assertTrue(
+            DailyStat.objects.filter(property=self.property, date=self.monday).exists()
+        )
+        self.assertIn("daily stats rebuilt", out.getvalue())
+
+    def test_kpis_aggregate_the_daily_stats(self):
+        for days in range(1, 31):
+            DailyStat.objects.create(
+                property=self.property,
+                date=self.today - timedelta(days=days),
+                units=10,
+                units_sold=5,
+                revenue=250,
+                units_booked=1,
+            )
+        DailyStat.objects.create(
+            property=self.property, date=self.today, units=10, units_sold=2, revenue=80
+        )
+
+        with self.assertNumQueries(1):
+            kpis = {kpi["label"]: kpi for kpi in property_kpis(self.property.id)}
+
+        last_30 = kpis["Last 30 days"]
+        self.assertEqual(last_30["occupancy"], 50)
+        self.assertEqual(last_30["adr"], 50)
+        self.assertEqual(last_30["revpar"], 25)
+        self.assertEqual(last_30["revenue"], 7500)
+        self.assertEqual(last_30["pickup"], 30)
+        self.assertEqual(kpis["Last 90 days"]["revenue"], 7500)
+        self.assertEqual(kpis["Next 30 days"]["occupancy"], 20)
+        self.assertIsNone(kpis["Next 30 days"]["pickup"])
+
+    def test_kpis_without_stats_are_empty(self):
+        kpis = property_kpis(self.property.id)
+
+        self.assertEqual(len(kpis), 4)
+        self.assertIsNone(kpis[0]["occupancy"])
+        self.assertIsNone(kpis[0]["adr"])
+        self.assertEqual(kpis[0]["revenue"], 0)
@@ -1,13 +1,21 @@
+from datetime import timedelta
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.messages import get_messages
 from django.test import TestCase
 from django.urls import resolve, reverse_lazy
+from django.utils import timezone
 
+from bookings.factories import booking_dict
 from bookings.forms import BookingForm
+from bookings.models import Booking
 from bookings.views import BookingCreateView
 from cart.cart import Cart
-from properties.factories import PropertyFactory, RoomFactory
+from cart.models import Hold
+from cart.services import hold_room
+from properties.factories import OccurrenceFactory, PropertyFactory, RoomFactory
+from properties.models import Room
 
 
 class BookingCreateTests(TestCase):
@@ -27,7 +35,13 @@ class BookingCreateTests(TestCase):
 
         cls.url = reverse_lazy("bookings:booking-create")
         cls.template_name = "bookings/booking_form.html"
-        cls.search_query = {}  # <-- fill this later
+        check_in = timezone.localdate() + timedelta(days=1)
+        cls.search_query = {
+            "city": cls.property.city,
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+            "guests": 1,
+        }
 
     def setUp(self) -> None:
         session = self.client.session
@@ -72,3 +86,104 @@ class BookingCreateTests(TestCase):
 
         self.assertEqual(len(messages), 1)
         self.assertEqual(str(messages[0]), BookingCreateView.redirect_message)
+
+
+class BookingReservationTests(TestCase):
+    """
+    Creating a booking takes its rooms off sale for the searched nights, or
+    saves nothing at all.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+
+        cls.dorm = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=8)
+        cls.private = RoomFactory(property=cls.dorm.property)
+        for i in range(2):
+            night = cls.check_in + timedelta(days=i)
+            OccurrenceFactory(room=cls.dorm, for_date=night, availability=3)
+            OccurrenceFactory(room=cls.private, for_date=night, availability=1)
+
+        cls.url = reverse_lazy("bookings:booking-create")
+        cls.data = booking_dict() | {"whatsapp": "+5426112345", "residence": "AR"}
+
+    def setUp(self) -> None:
+        session = self.client.session
+        session["q"] = {
+            "check_in": self.check_in.isoformat(),
+            "check_out": self.check_out.isoformat(),
+            "guests": 2,
+        }
+        session[settings.CART_SESSION_ID] = {
+            str(self.dorm.id): {"quantity": 2, "price": "10"},
+            str(self.private.id): {"quantity": 1, "price": "50"},
+        }
+        session.save()
+
+    def availability(self, room):
+        return list(room.occurrences.values_list("availability", flat=True))
+
+    def test_booking_reserves_every_night_of_every_item(self):
+        response = self.client.post(self.url, self.data)
+
+        self.assertRedirects(
+            response, reverse_lazy("payments:home"), fetch_redirect_response=False
+        )
+        booking = Booking.objects.get()
+        self.assertEqual(
+            set(booking.items.values_list("product", "check_in", "check_out")),
+            {
+                (self.dorm.id, self.check_in, self.check_out),
+                (self.private.id, self.check_in, self.check_out),
+            },
+        )
+        self.assertEqual(self.availability(self.dorm), [1, 1])
+        self.assertEqual(self.availability(self.private), [0, 0])
+
+    def test_items_kept_without_a_stay_are_charged_for_every_night(self):
+        self.client.post(self.url, self.data)
+
+        item = Booking.objects.get().items.get(product=self.dorm)
+        nights = self.dorm.occurrences.values_list("rate", flat=True)
+        self.assertEqual(item.price, sum(nights))
+
+    def test_held_items_are_converted_instead_of_reserved_again(self):
+        hold = hold_room("token", self.dorm.id, self.check_in, self.check_out, 2)
+        session = self.client.session
+        session[settings.CART_TOKEN_SESSION_ID] = "token"
+        session.save()
+
+        self.client.post(self.url, self.data)
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.CONVERTED)
+        self.assertEqual(self.availability(self.dorm), [1, 1])
+        self.assertEqual(self.availability(self.private), [0, 0])
+
+    def test_short_night_rolls_back_the_whole_booking(self):
+        self.private.occurrences.filter(for_date=self.check_in).update(availability=0)
+
+        response = self.client.post(self.url, self.data)
+        messages = list(get_messages(response.wsgi_request))
+
+        self.assertRedirects(
+            response,
+            reverse_lazy("cart:cart-detail"),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(str(messages[0]), BookingCreateView.unavailable_message)
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.availability(self.dorm), [3, 3])
+        self.assertEqual(self.availability(self.private), [0, 1])
+        self.assertIn(settings.CART_SESSION_ID, self.client.session)
+
+    def test_booking_page_redirects_to_home_without_search_query(self):
+        session = self.client.session
+        del session["q"]
+        session.save()
+
+        response = self.client.get(self.url)
+
+        self.assertRedirects(response, reverse_lazy("pages:home"))
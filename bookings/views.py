@@ -2,12 +2,16 @@ import logging
 from typing import Any
 
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http import HttpRequest
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views.generic.edit import FormView
 
 from cart.cart import Cart
+from cart.services import convert_hold
+from properties.services import reserve_room
 
 from .forms import BookingForm
 from .models import BookingItem
@@ -20,19 +24,24 @@ class BookingCreateView(FormView):
     template_name = "bookings/booking_form.html"
     success_url = reverse_lazy("payments:home")
     redirect_message = "Your session has expired. Please search again 🙏"
+    unavailable_message = "Sorry, your room was just booked. Please search again 🙏"
 
     def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any):
         """
-        If session or cart is empty then redirect user to home
-        # TODO: check for search query in session
+        If the search query or the cart is missing from the session then redirect
+        user to home
         """
 
-        # q = request.session.get("q")
-        cart = request.session.get("cart")
+        q = request.session.get("q") or {}
+        cart = Cart(request)
 
-        if not cart:
+        if not cart.cart or not {"check_in", "check_out"} <= q.keys():
             messages.info(request, self.redirect_message)
             return redirect("pages:home")
+
+        # lines kept before the stay was known book the query's, priced for it
+        cart.date_lines()
+
         return super().dispatch(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
@@ -41,22 +50,43 @@ class BookingCreateView(FormView):
         return context
 
     def form_valid(self, form):
+        """
+        Create the booking and take its rooms off sale in one transaction, so
+        either every night of every item is reserved or nothing is saved.
+        """
+
         logger.info("booking form is valid...")
 
         cart = Cart(self.request)
-        booking = form.save()
-        booking_id = str(booking.id)
 
-        for item in cart:
-            logger.info("creating BookingItem:{item}", extra={"item": item})
-
-            _ = BookingItem.objects.create(
-                booking=booking,
-                product=item["product"],
-                price=item["price"],
-                quantity=item["quantity"],
-            )
+        try:
+            with transaction.atomic():
+                booking = form.save()
+
+                # lock rooms in the same order in every booking so two carts
+                # sharing rooms cannot deadlock
+                for item in sorted(cart, key=lambda item: item["product"].id):
+                    logger.info("creating BookingItem:{item}", extra={"item": item})
+
+                    check_in, check_out = item["check_in"], item["check_out"]
+                    stay = (item["product"].id, check_in, check_out, item["quantity"])
+                    # units held by the cart are already off sale
+                    if not convert_hold(cart.token, *stay):
+                        reserve_room(*stay)
+                    _ = BookingItem.objects.create(
+                        booking=booking,
+                        product=item["product"],
+                        price=item["price"],
+                        quantity=item["quantity"],
+                        check_in=check_in,
+                        check_out=check_out,
+                    )
+        except ValidationError as exc:
+            logger.warning("⚠️ booking rolled back: %s" % exc)
+            messages.error(self.request, self.unavailable_message)
+            return redirect("cart:cart-detail")
 
+        booking_id = str(booking.id)
         cart.clear()
 
         # form.send_mail(booking_id=booking_id)
@@ -0,0 +1,35 @@
+from django.contrib import admin
+
+from .models import Hold, StoredCart, StoredLine
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = (
+        "room",
+        "check_in",
+        "check_out",
+        "quantity",
+        "status",
+        "created",
+        "expires",
+    )
+    list_filter = ("status", "created")
+    search_fields = ("cart",)
+    raw_id_fields = ("room",)
+
+
+class StoredLineInline(admin.TabularInline):
+    model = StoredLine
+    fields = ("key", "room", "data")
+    readonly_fields = fields
+    extra = 0
+
+
+@admin.register(StoredCart)
+class StoredCartAdmin(admin.ModelAdmin):
+    list_display = ("token", "user", "created", "updated")
+    list_filter = ("updated",)
+    search_fields = ("token", "user__email")
+    raw_id_fields = ("user",)
+    inlines = (StoredLineInline,)
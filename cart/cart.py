@@ -1,14 +1,48 @@
 import logging
+import uuid
+from datetime import date
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 
 from properties.models import Room
+from properties.versions import get_room_versions
+
+from .services import (
+    drop_cart,
+    hold_room,
+    load_cart,
+    quote_stays,
+    release_holds,
+    store_cart,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class Cart:
+    """
+    Rooms in the session, one line per room and stay.
+
+    A line added with the stay of the search query is keyed by the room, check in,
+    check out and guests, and keeps a snapshot of the quote: the rate of every
+    night, their sum as the price of a unit and the room's inventory version from
+    `properties.versions`. Quotes are only fetched again, all stale lines in one
+    query, once the version of their room moved. Without a stay a line is keyed by
+    the room alone and priced at its weekday price.
+
+    The rooms of the lines are fetched once, with their property, and the items
+    and total are kept for the life of the cart, so a page can iterate it as many
+    times as it needs.
+
+    The session holds a copy of the lines, every change is stored in a
+    `StoredCart` as well, the user's once logged in. The stored lines replace the
+    session's the first time a request reads the cart, so the cart follows its
+    user across devices and logins, see `cart.signals`.
+    """
+
     def __init__(self, request):
         """
         Initialize a cart.
@@ -16,21 +50,62 @@ class Cart:
 
         logger.info("initializing cart...")
 
+        self.request = request
         self.session = request.session
-        self.cart = self.session.setdefault(settings.CART_SESSION_ID, {})
+        self.session.setdefault(settings.CART_SESSION_ID, {})
+        self._items = None
+        self._refreshed = False
+
+    @property
+    def user(self):
+        user = getattr(self.request, "user", None)
+        return user if user is not None and user.is_authenticated else None
+
+    @property
+    def cart(self):
+        """
+        The lines of the cart by key, loaded from the stored cart once per request.
+        """
+
+        if not getattr(self.request, "_cart_loaded", False):
+            self.request._cart_loaded = True
+            self.load()
+
+        return self.session.setdefault(settings.CART_SESSION_ID, {})
+
+    def load(self):
+        """
+        Replace the lines in session with the stored ones, when there are any.
+        """
+
+        stored = load_cart(self.session.get(settings.CART_TOKEN_SESSION_ID), self.user)
+        if stored is None:
+            return
+
+        token, lines = stored
+        self.session[settings.CART_TOKEN_SESSION_ID] = token
+        self.session[settings.CART_SESSION_ID] = lines
+        self._items = None
+        self.session.modified = True
 
     def get_total_price(self):
         """
-        Calculate the total price across of the cart.
+        Calculate the total price across of the cart, from the quotes in session.
         """
 
+        self.refresh()
         return sum(
-            Decimal(item["price"]) * item["quantity"] for item in self.cart.values()
+            (Decimal(line["price"]) * line["quantity"] for line in self.cart.values()),
+            Decimal(0),
         )
 
     def add(self, product, quantity=1, override_quantity=False):
         """
         Add a product to the cart or update its quantity.
+
+        When the stay is known from the search query the new quantity is held for
+        it first, so a `ValidationError` leaves the cart unchanged. The room's
+        lines for other stays go, its hold was replaced.
         """
 
         logger.info(
@@ -38,68 +113,298 @@ class Cart:
             extra={"product": product, "quantity": quantity},
         )
 
-        product_id = str(product.id)
+        stay = self.get_stay()
+        guests = self.get_guests()
+        key = self.line_key(product.id, stay, guests)
+        line = self.cart.get(key, {"quantity": 0})
 
-        if product_id not in self.cart:
-            self.cart[product_id] = {"quantity": 0, "price": str(product.weekday_price)}
+        if not override_quantity:
+            quantity += line["quantity"]
 
-        if override_quantity:
-            self.cart[product_id]["quantity"] = quantity
-        else:
-            self.cart[product_id]["quantity"] += quantity
+        if stay:
+            hold_room(self.token, product.id, *stay, quantity)
+
+        for other in self.line_keys(product.id):
+            if other != key:
+                del self.cart[other]
+
+        if stay and "nights" not in line:
+            line = {"room": product.id, **self.stay_fields(stay), "guests": guests}
+            line = self.quote({key: line})[key]
+        elif not stay:
+            line = {"room": product.id, "price": str(product.weekday_price)}
+
+        self.cart[key] = line | {"quantity": quantity}
+
+        self.save()
+
+    def add_group(self, quantities):
+        """
+        Add every product of `quantities`, a mapping of products to quantities, or
+        none of them: a `ValidationError` on any product rolls back the holds of
+        the others and leaves the lines as they were.
+        """
+
+        lines = dict(self.cart)
+        try:
+            with transaction.atomic():
+                for product, quantity in quantities.items():
+                    self.add(product, quantity, override_quantity=True)
+        except ValidationError:
+            self.session[settings.CART_SESSION_ID] = lines
+            self._items = None
+            raise
+
+    def update(self, key, quantity):
+        """
+        Set the quantity of the line under `key` in place, keeping its stay
+        whatever the search query is now. The new quantity is held for the stay
+        first, so a `ValidationError` leaves the line unchanged. Raises `KeyError`
+        for a line not in the cart.
+        """
+
+        logger.info(
+            "updating cart line:{key} quantity:{quantity}",
+            extra={"key": key, "quantity": quantity},
+        )
+
+        line = self.cart[key]
+
+        if "nights" in line:
+            stay = (
+                date.fromisoformat(line["check_in"]),
+                date.fromisoformat(line["check_out"]),
+            )
+            hold_room(self.token, line["room"], *stay, quantity)
+
+        self.cart[key] = line | {"quantity": quantity}
 
         self.save()
 
     def remove(self, product):
         """
-        Remove a product from the cart.
+        Remove a product, every stay of it, from the cart and release its hold.
         """
 
-        product_id = str(product.id)
+        keys = self.line_keys(product.id)
 
-        if product_id in self.cart:
-            del self.cart[product_id]
+        if keys:
+            for key in keys:
+                del self.cart[key]
             self.save()
 
+        if settings.CART_TOKEN_SESSION_ID in self.session:
+            release_holds(self.token, product.id)
+
+    @property
+    def token(self):
+        """
+        Identifies the cart's holds, it outlives the session key which changes on
+        login.
+        """
+
+        return self.session.setdefault(settings.CART_TOKEN_SESSION_ID, uuid.uuid4().hex)
+
+    def get_stay(self):
+        """
+        The check in and check out dates of the search query or `None`.
+        """
+
+        q = self.session.get("q") or {}
+
+        if not {"check_in", "check_out"} <= q.keys():
+            return None
+
+        return date.fromisoformat(q["check_in"]), date.fromisoformat(q["check_out"])
+
+    def get_guests(self):
+        """
+        The guests of the search query, one when it has none.
+        """
+
+        q = self.session.get("q") or {}
+        return int(q.get("guests") or 1)
+
+    @staticmethod
+    def line_key(room_id, stay, guests):
+        """
+        A room alone without a stay, else the room, the stay and the guests.
+        """
+
+        if not stay:
+            return str(room_id)
+
+        check_in, check_out = stay
+        return f"{room_id}:{check_in.isoformat()}:{check_out.isoformat()}:{guests}"
+
+    @staticmethod
+    def stay_fields(stay):
+        check_in, check_out = stay
+        return {"check_in": check_in.isoformat(), "check_out": check_out.isoformat()}
+
+    def line_keys(self, room_id):
+        """
+        Keys of every line of the room, lines kept before stays have no `room`.
+        """
+
+        return [
+            key
+            for key, line in self.cart.items()
+            if str(line.get("room", key)) == str(room_id)
+        ]
+
+    def quote(self, lines):
+        """
+        Snapshot the quote of the given lines, a map of keys to lines with a room
+        and a stay. The versions are read before the nights, a write in between
+        makes the snapshot stale rather than wrong.
+        """
+
+        room_ids = {line["room"] for line in lines.values()}
+        versions = get_room_versions(room_ids)
+
+        stays = {
+            key: (
+                line["room"],
+                date.fromisoformat(line["check_in"]),
+                date.fromisoformat(line["check_out"]),
+            )
+            for key, line in lines.items()
+        }
+        quotes = quote_stays(list(stays.values()))
+
+        quoted = {}
+        for key, line in lines.items():
+            nights = quotes[stays[key]]
+            quoted[key] = line | {
+                "nights": [[night.isoformat(), str(rate)] for night, rate in nights],
+                "price": str(sum((rate for _, rate in nights), Decimal(0))),
+                "version": versions[line["room"]],
+            }
+
+        return quoted
+
+    def date_lines(self):
+        """
+        Give the lines kept before the stay was known the stay of the search query,
+        quoted for it, so they are priced for every night they will book. Lines
+        without a stay are left alone while the query has none.
+        """
+
+        stay = self.get_stay()
+        undated = [key for key, line in self.cart.items() if "nights" not in line]
+        if not stay or not undated:
+            return
+
+        guests = self.get_guests()
+        lines = {}
+        for key in undated:
+            line = self.cart.pop(key)
+            room_id = int(line.get("room", key))
+            lines[self.line_key(room_id, stay, guests)] = {
+                "room": room_id,
+                **self.stay_fields(stay),
+                "guests": guests,
+                "quantity": line["quantity"],
+            }
+
+        logger.info("dating %s cart lines" % len(lines))
+        self.cart.update(self.quote(lines))
+        self.save()
+
+    def refresh(self):
+        """
+        Quote again the lines whose room's inventory version moved since they were
+        quoted, once per cart.
+        """
+
+        if self._refreshed:
+            return
+        self._refreshed = True
+
+        dated = {key: line for key, line in self.cart.items() if "nights" in line}
+        if not dated:
+            return
+
+        versions = get_room_versions({line["room"] for line in dated.values()})
+        stale = {
+            key: line
+            for key, line in dated.items()
+            if versions[line["room"]] != line["version"]
+        }
+        if not stale:
+            return
+
+        logger.info("quoting %s stale cart lines" % len(stale))
+        self.cart.update(self.quote(stale))
+        self._items = None
+        self.save()
+
     def save(self):
         """
-        Marks the session as `modified` to make sure it gets saved.
+        Marks the session as `modified` to make sure it gets saved and stores the
+        lines.
         """
 
         logger.info("saving the cart...")
+        self._items = None
         self.session.modified = True
+        store_cart(self.token, self.cart, self.user)
 
     def clear(self):
         """
-        Removes the cart from the session
+        Removes the cart from the session and drops the stored cart
         """
 
         logger.info("clearing the cart...")
 
         del self.session[settings.CART_SESSION_ID]
-        self.save()
+        drop_cart(self.session.get(settings.CART_TOKEN_SESSION_ID), self.user)
+        self._items = None
+        self.session.modified = True
 
-    def __iter__(self):
+    def get_items(self):
         """
-        Iterate over the items in the cart and get the products from the database.
+        The lines of the cart with their room, dates, nightly rates and totals.
         """
 
-        product_ids = self.cart.keys()
-
-        products = Room.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
+        self.refresh()
+        if self._items is not None:
+            return self._items
 
-        for product in products:
-            cart[str(product.id)]["product"] = product
+        room_ids = {line.get("room", key) for key, line in self.cart.items()}
+        rooms = Room.objects.select_related("property").in_bulk(room_ids)
 
-        for item in cart.values():
-            item["price"] = Decimal(item["price"])
+        items = []
+        # copy the lines, the session must keep only serializable values
+        for key, line in self.cart.items():
+            item = line.copy()
+            item["key"] = key
+            item["product"] = rooms.get(int(line.get("room", key)))
+            item["price"] = Decimal(line["price"])
             item["total_price"] = item["price"] * item["quantity"]
-            yield item
+            if "nights" in line:
+                item["check_in"] = date.fromisoformat(line["check_in"])
+                item["check_out"] = date.fromisoformat(line["check_out"])
+                item["nights"] = [
+                    (date.fromisoformat(night), Decimal(rate))
+                    for night, rate in line["nights"]
+                ]
+            items.append(item)
+
+        self._items = items
+        return items
+
+    def __iter__(self):
+        """
+        Iterate over the items in the cart, see `get_items()`.
+        """
+
+        return iter(self.get_items())
 
     def __len__(self):
         """
         Count all the items in the cart.
         """
 
-        return sum(item["quantity"] for item in self.cart.values())
+        return sum(line["quantity"] for line in self.cart.values())
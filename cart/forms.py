@@ -1,6 +1,8 @@
 from django import forms
+from django.core.exceptions import ValidationError
 
 PRODUCT_QUANTITY_CHOICES = [(i, str(i)) for i in range(1, 9)]
+GROUP_MAX_QUANTITY = 20
 
 
 class CartAddProductForm(forms.Form):
@@ -12,3 +14,43 @@ class CartAddProductForm(forms.Form):
     override = forms.BooleanField(
         required=False, initial=False, widget=forms.HiddenInput
     )
+
+
+class CartUpdateLineForm(forms.Form):
+    """
+    New quantity of the cart line under `key`, see `Cart.line_key()`.
+    """
+
+    key = forms.CharField(max_length=64, widget=forms.HiddenInput)
+    quantity = forms.TypedChoiceField(
+        choices=PRODUCT_QUANTITY_CHOICES,
+        coerce=int,
+        widget=forms.Select(attrs={"class": "form-select mb-1"}),
+    )
+
+
+class CartAddGroupForm(forms.Form):
+    """
+    Rooms of a group combination as `room_id:quantity` pairs separated by commas.
+    """
+
+    rooms = forms.CharField(widget=forms.HiddenInput)
+
+    def clean_rooms(self):
+        rooms = self.cleaned_data["rooms"]
+        error_msg = "Invalid rooms:%(rooms)s"
+
+        quantities = {}
+        try:
+            for pair in rooms.split(","):
+                room_id, quantity = pair.split(":")
+                quantities[int(room_id)] = int(quantity)
+        except ValueError as e:
+            raise ValidationError(
+                error_msg, params={"rooms": rooms}, code="invalid"
+            ) from e
+
+        if not all(1 <= q <= GROUP_MAX_QUANTITY for q in quantities.values()):
+            raise ValidationError(error_msg, params={"rooms": rooms}, code="invalid")
+
+        return quantities
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from cart.cart import Cart
+from properties.models import Occurrence, Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cart interactions through the JSON cart API against posting the "
+        "form and following its redirect to the cart page"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lines", type=int, default=5, help="Rooms already in the cart"
+        )
+        parser.add_argument("--nights", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, **options):
+        check_in = timezone.localdate() + timedelta(days=1)
+        check_out = check_in + timedelta(days=options["nights"])
+        repeat = options["repeat"]
+
+        # the test client's host, the requests never leave the process
+        with rollback(), override_settings(ALLOWED_HOSTS=["testserver"]):
+            properties = seed_properties(options["lines"] + 1)
+            rooms = seed_rooms(properties, per_property=1)
+            seed_occurrences(
+                [r.id for r in rooms], options["nights"] + 7, availability=50
+            )
+            analyze(Room, Occurrence)
+
+            client = Client()
+            session = client.session
+            session["q"] = {
+                "check_in": check_in.isoformat(),
+                "check_out": check_out.isoformat(),
+                "guests": 2,
+            }
+            session.save()
+
+            room, *others = rooms
+            for other in others:
+                client.post(
+                    reverse("cart:cart-api-add", args=[other.id]), {"quantity": 1}
+                )
+
+            add = {"quantity": 1, "override": True}
+            key = Cart.line_key(room.id, (check_in, check_out), 2)
+            update = {"key": key, "quantity": 2}
+            urls = {
+                "form": {
+                    "add": reverse("cart:cart-add", args=[room.id]),
+                    "update": reverse("cart:cart-update"),
+                    "remove": reverse("cart:cart-remove", args=[room.id]),
+                },
+                "api": {
+                    "add": reverse("cart:cart-api-add", args=[room.id]),
+                    "update": reverse("cart:cart-api-update"),
+                    "remove": reverse("cart:cart-api-remove", args=[room.id]),
+                },
+            }
+
+            def interaction(kind, steps):
+                # the form answers with a redirect the browser follows to the page
+                follow = kind == "form"
+
+                def run():
+                    for action, data in steps:
+                        client.post(urls[kind][action], data, follow=follow)
+
+                return run
+
+            cases = {
+                "add": [("add", add)],
+                "update quantity": [("update", update)],
+                "remove and add back": [("remove", {}), ("add", add)],
+            }
+
+            rows, saved = [], []
+            for label, steps in cases.items():
+                # every step of the form costs the post and the cart page
+                form = measure(interaction("form", steps), repeat)
+                api = measure(interaction("api", steps), repeat)
+                rows += [
+                    (f"{label}, form ({2 * len(steps)} requests)", form),
+                    (f"{label}, JSON ({len(steps)} requests)", api),
+                ]
+                queries = form["queries"] - api["queries"]
+                saved.append(
+                    f"{label:<40} {len(steps):>8} {queries:>8} "
+                    f"{form['mean'] - api['mean']:>10.2f}"
+                )
+
+            report(
+                self.stdout,
+                f"Cart of {len(rooms)} rooms, {options['nights']} nights per stay",
+                rows,
+            )
+            self.stdout.write("Saved per interaction")
+            self.stdout.write(f"{'case':<40} {'requests':>8} {'queries':>8} {'ms':>10}")
+            for line in saved:
+                self.stdout.write(line)
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    percentile,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from cart.models import Hold
+from cart.services import expire_holds, hold_churn
+from properties.models import Occurrence, Room
+
+
+class Command(BaseCommand):
+    help = "Time the hold sweeper expiring batches of holds of random stays"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=2000)
+        parser.add_argument("--active", type=int, default=50000)
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 5000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, **options):
+        with rollback():
+            properties = seed_properties(options["rooms"] // 10)
+            room_ids = [room.id for room in seed_rooms(properties, per_property=10)]
+            seed_occurrences(room_ids, nights=90, availability=20)
+
+            # live holds the sweeper has to skip over
+            self.seed_holds(room_ids, options["active"], expired=False)
+            analyze(Room, Occurrence, Hold)
+
+            self.stdout.write(
+                f"{'batch':>8} {'p50 ms':>10} {'p95 ms':>10} {'holds/s':>10}"
+            )
+            for size in options["sizes"]:
+                timings = []
+                for _ in range(options["repeat"]):
+                    self.seed_holds(room_ids, size, expired=True)
+                    start = timer()
+                    expired, _ = expire_holds(limit=size)
+                    timings.append((timer() - start) * 1000)
+
+                    if expired != size:
+                        error_msg = f"expired {expired} holds instead of {size}"
+                        raise CommandError(error_msg)
+
+                timings.sort()
+                self.stdout.write(
+                    f"{size:>8} {percentile(timings, 50):>10.2f} "
+                    f"{percentile(timings, 95):>10.2f} "
+                    f"{size / percentile(timings, 50) * 1000:>10.0f}"
+                )
+
+            since = timezone.now() - timedelta(hours=24)
+            report(
+                self.stdout,
+                f"Churn over {Hold.objects.count()} holds",
+                [("hold_churn last 24h", measure(lambda: hold_churn(since)))],
+            )
+
+    def seed_holds(self, room_ids, count, expired):
+        """
+        Insert `count` holds of one to seven nights within the seeded month, either
+        already expired or live for the default hold time.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO cart_hold (cart, room_id, check_in, check_out, quantity,
+                                       status, created, expires)
+                SELECT md5(i::text), room_id, check_in,
+                       check_in + 1 + (random() * 6)::integer, 1,
+                       %(active)s, now(), %(expires)s
+                  FROM (
+                       SELECT i, (%(room_ids)s::bigint[])[
+                                 1 + (random() * (%(rooms)s - 1))::integer
+                              ] AS room_id,
+                              current_date + (random() * 80)::integer AS check_in
+                         FROM generate_series(1, %(count)s) i
+                  ) AS stays
+                """,
+                {
+                    "active": Hold.ACTIVE,
+                    "expires": timezone.now()
+                    + timedelta(minutes=-1 if expired else 15),
+                    "room_ids": room_ids,
+                    "rooms": len(room_ids),
+                    "count": count,
+                },
+            )
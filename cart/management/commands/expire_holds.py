@@ -0,0 +1,71 @@
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cart.services import expire_holds, hold_churn, purge_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Put the units of expired cart holds back on sale, purge old closed holds "
+        "and report the hold churn"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Holds expired per statement"
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=30,
+            help="Closed holds older than this are deleted",
+        )
+        parser.add_argument(
+            "--stats-hours",
+            type=int,
+            default=24,
+            help="Report the churn of the holds placed in the last hours",
+        )
+
+    def handle(self, **options):
+        batch_size = options["batch_size"]
+
+        begin = timer()
+        expired = batches = 0
+        rooms = set()
+
+        while True:
+            count, room_ids = expire_holds(limit=batch_size)
+            expired += count
+            rooms.update(room_ids)
+            batches += 1
+
+            if count < batch_size:
+                break
+
+        self.stdout.write(
+            f"{expired} holds expired in {batches} batches, {len(rooms)} rooms "
+            f"back on sale in {timer() - begin:.2f}s"
+        )
+
+        now = timezone.now()
+        purged = purge_holds(before=now - timedelta(days=options["keep_days"]))
+        self.stdout.write(f"{purged} closed holds purged")
+
+        churn = hold_churn(since=now - timedelta(hours=options["stats_hours"]))
+        placed = churn["placed"]
+        self.stdout.write(
+            f"Last {options['stats_hours']}h: {placed} holds placed, "
+            f"{churn['converted']} converted, {churn['released']} released, "
+            f"{churn['expired']} expired"
+            + (f", {churn['converted'] / placed:.0%} conversion" if placed else "")
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{churn['active']} holds active keeping {churn['held']} units "
+                "off sale"
+            )
+        )
@@ -0,0 +1,51 @@
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cart.services import purge_carts
+
+
+class Command(BaseCommand):
+    help = "Delete the stored carts nobody updated for a while, with their lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Carts deleted per statement"
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=7,
+            help="Anonymous carts not updated for longer are deleted",
+        )
+        parser.add_argument(
+            "--keep-user-days",
+            type=int,
+            default=60,
+            help="Carts of users not updated for longer are deleted",
+        )
+
+    def handle(self, **options):
+        batch_size = options["batch_size"]
+        now = timezone.now()
+        before = now - timedelta(days=options["keep_days"])
+        users_before = now - timedelta(days=options["keep_user_days"])
+
+        begin = timer()
+        purged = batches = 0
+
+        while True:
+            count = purge_carts(before, users_before, limit=batch_size)
+            purged += count
+            batches += 1
+
+            if count < batch_size:
+                break
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{purged} carts purged in {batches} batches in {timer() - begin:.2f}s"
+            )
+        )
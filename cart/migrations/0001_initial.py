@@ -0,0 +1,88 @@
+# Generated by Django 5.0.14 on 2026-10-18 08:58
+
+import cart.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("properties", "0016_rate_periods"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Hold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cart",
+                    models.CharField(db_index=True, max_length=32, verbose_name="Cart"),
+                ),
+                ("check_in", models.DateField(verbose_name="Check In")),
+                ("check_out", models.DateField(verbose_name="Check Out")),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(default=1, verbose_name="Quantity"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("AC", "Active"),
+                            ("CV", "Converted"),
+                            ("RL", "Released"),
+                            ("EX", "Expired"),
+                        ],
+                        default="AC",
+                        max_length=2,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "expires",
+                    models.DateTimeField(
+                        default=cart.models.hold_expiry, verbose_name="Expires"
+                    ),
+                ),
+                (
+                    "closed",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Closed"),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="properties.room",
+                        verbose_name="Room",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Hold",
+                "verbose_name_plural": "Holds",
+                "ordering": ("-created",),
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "AC")),
+                        fields=["expires"],
+                        name="hold_active_expires_idx",
+                    ),
+                    models.Index(fields=["-created"], name="hold_created_idx"),
+                ],
+            },
+        ),
+    ]
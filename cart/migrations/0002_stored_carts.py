@@ -0,0 +1,97 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0001_initial"),
+        ("properties", "0021_stay_rules"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredCart",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(max_length=32, unique=True, verbose_name="Token"),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stored_cart",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stored Cart",
+                "verbose_name_plural": "Stored Carts",
+                "indexes": [
+                    models.Index(fields=["updated"], name="storedcart_updated_idx")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StoredLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=64, verbose_name="Key")),
+                ("data", models.JSONField(verbose_name="Data")),
+                (
+                    "cart",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="cart.storedcart",
+                        verbose_name="Cart",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="properties.room",
+                        verbose_name="Room",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stored Line",
+                "verbose_name_plural": "Stored Lines",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("cart", "key"), name="storedline_unique_cart_key"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def hold_expiry():
+    return timezone.now() + timedelta(minutes=settings.CART_HOLD_MINUTES)
+
+
+class Hold(models.Model):
+    """
+    Units of a room taken off sale for a stay while it sits in a cart.
+
+    The units are subtracted from the room's nights when the hold is placed, so
+    searches and quotes need no extra work to skip them. A hold ends converted into
+    a booking, released from the cart or expired by `expire_holds`, which puts the
+    units back on sale. Closed holds are kept for the churn stats until purged.
+    """
+
+    ACTIVE = "AC"
+    CONVERTED = "CV"
+    RELEASED = "RL"
+    EXPIRED = "EX"
+
+    STATUS_CHOICES = [  # noqa: RUF012
+        (ACTIVE, "Active"),
+        (CONVERTED, "Converted"),
+        (RELEASED, "Released"),
+        (EXPIRED, "Expired"),
+    ]
+
+    cart = models.CharField(_("Cart"), max_length=32, db_index=True)
+    room = models.ForeignKey(
+        "properties.Room",
+        verbose_name=_("Room"),
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    check_in = models.DateField(_("Check In"))
+    check_out = models.DateField(_("Check Out"))
+    quantity = models.PositiveIntegerField(_("Quantity"), default=1)
+    status = models.CharField(
+        _("Status"), max_length=2, choices=STATUS_CHOICES, default=ACTIVE
+    )
+
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(_("Expires"), default=hold_expiry)
+    closed = models.DateTimeField(_("Closed"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Hold")
+        verbose_name_plural = _("Holds")
+        ordering = ("-created",)
+        indexes = (
+            # the sweeper only ever scans the active holds, oldest expiry first
+            models.Index(
+                fields=["expires"],
+                condition=Q(status="AC"),
+                name="hold_active_expires_idx",
+            ),
+            models.Index(fields=["-created"], name="hold_created_idx"),
+        )
+
+    def __str__(self):
+        return f"Hold {self.id}"
+
+    @property
+    def is_active(self):
+        return self.status == self.ACTIVE and self.expires > timezone.now()
+
+
+class StoredCart(models.Model):
+    """
+    The lines of a cart kept in the database, so it outlives the session and
+    follows its user across devices, see `cart.cart.Cart`.
+
+    A cart is found by its user once logged in, else by the token of the anonymous
+    cart, which is also the token its holds are placed under. Carts not updated
+    for a while are dropped by `purge_carts`.
+    """
+
+    token = models.CharField(_("Token"), max_length=32, unique=True)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("User"),
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="stored_cart",
+    )
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Stored Cart")
+        verbose_name_plural = _("Stored Carts")
+        indexes = (models.Index(fields=["updated"], name="storedcart_updated_idx"),)
+
+    def __str__(self):
+        return f"Cart {self.token}"
+
+
+class StoredLine(models.Model):
+    """
+    One line of a stored cart, the line of the session cart as is under its key.
+    """
+
+    cart = models.ForeignKey(
+        StoredCart,
+        verbose_name=_("Cart"),
+        on_delete=models.CASCADE,
+        related_name="lines",
+    )
+    key = models.CharField(_("Key"), max_length=64)
+    room = models.ForeignKey(
+        "properties.Room",
+        verbose_name=_("Room"),
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    data = models.JSONField(_("Data"))
+
+    class Meta:
+        verbose_name = _("Stored Line")
+        verbose_name_plural = _("Stored Lines")
+        constraints = (
+            models.UniqueConstraint(
+                fields=["cart", "key"], name="storedline_unique_cart_key"
+            ),
+        )
+
+    def __str__(self):
+        return f"Line {self.key}"
@@ -0,0 +1,381 @@
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from properties.models import Night
+from properties.services import reserve_room
+from properties.versions import bump_rooms
+
+from .models import Hold, StoredCart, StoredLine
+
+logger = logging.getLogger(__name__)
+
+# Close the holds picked by `{selection}` and put their units back on every night
+# they covered, in one statement. Holds of the same room and night are summed so
+# each night is written once. `hold_room` took the units off occurrences, copying
+# period nights into them first, and compaction keeps the nights of active holds,
+# so the occurrences get back exactly what was taken off: the availability set in
+# the bulk editor meanwhile already left the held units out. A night served by a
+# rate period again never had the units taken off its allotment and is left
+# alone. Returns how many holds were closed and the rooms they belonged to.
+CLOSE_HOLDS_SQL = """
+    WITH closed AS (
+        UPDATE cart_hold h
+           SET status = %(status)s, closed = %(now)s
+         WHERE h.id IN ({selection})
+        RETURNING h.room_id, h.check_in, h.check_out, h.quantity
+    ), released AS (
+        SELECT room_id, d::date AS for_date, sum(quantity) AS quantity
+          FROM closed
+         CROSS JOIN generate_series(
+               check_in, check_out - 1, interval '1 day'
+         ) d
+         GROUP BY room_id, d
+    ), restored AS (
+        UPDATE properties_occurrence o
+           SET availability = o.availability + r.quantity
+          FROM released r
+         WHERE o.room_id = r.room_id AND o.for_date = r.for_date
+        RETURNING o.room_id
+    )
+    SELECT (SELECT count(*) FROM closed),
+           ARRAY(SELECT DISTINCT room_id FROM closed)
+"""
+
+# The literal status lets Postgres match the partial index on active expiries.
+EXPIRED_HOLDS_SQL = f"""
+    SELECT id FROM cart_hold
+     WHERE status = '{Hold.ACTIVE}' AND expires <= %(now)s
+     ORDER BY expires
+     LIMIT %(limit)s
+       FOR UPDATE SKIP LOCKED
+"""
+
+CART_HOLDS_SQL = f"""
+    SELECT id FROM cart_hold
+     WHERE status = '{Hold.ACTIVE}' AND cart = %(cart)s
+       AND (%(room_id)s::bigint IS NULL OR room_id = %(room_id)s)
+       FOR UPDATE
+"""
+
+ROOM_HOLDS_SQL = f"""
+    SELECT id FROM cart_hold
+     WHERE status = '{Hold.ACTIVE}' AND cart = %(cart)s
+       AND room_id = ANY(%(room_ids)s)
+       FOR UPDATE
+"""
+
+# Move every line of the `source` cart into the `target` cart in one statement.
+# A source line replaces the target's line under the same key as well as its
+# lines for other stays of the room, a cart keeps one stay per room. Returns the
+# rooms of the moved lines.
+MERGE_LINES_SQL = """
+    WITH moved AS (
+        DELETE FROM cart_storedline
+         WHERE cart_id = %(source)s
+        RETURNING key, room_id, data
+    ), replaced AS (
+        DELETE FROM cart_storedline l
+         USING moved m
+         WHERE l.cart_id = %(target)s AND l.room_id = m.room_id AND l.key <> m.key
+    ), merged AS (
+        INSERT INTO cart_storedline (cart_id, key, room_id, data)
+        SELECT %(target)s, key, room_id, data FROM moved
+            ON CONFLICT (cart_id, key) DO UPDATE SET data = EXCLUDED.data
+        RETURNING room_id
+    )
+    SELECT ARRAY(SELECT DISTINCT room_id FROM merged WHERE room_id IS NOT NULL)
+"""
+
+# Delete up to `limit` carts not updated since their cutoff, the one of anonymous
+# carts or the one of users' carts, along with their lines. The foreign key is
+# checked at commit so both go in one statement.
+PURGE_CARTS_SQL = """
+    WITH abandoned AS (
+        SELECT id FROM cart_storedcart
+         WHERE updated < CASE WHEN user_id IS NULL
+                              THEN %(before)s ELSE %(users_before)s END
+         ORDER BY updated
+         LIMIT %(limit)s
+           FOR UPDATE SKIP LOCKED
+    ), lines AS (
+        DELETE FROM cart_storedline
+         WHERE cart_id IN (SELECT id FROM abandoned)
+    )
+    DELETE FROM cart_storedcart
+     WHERE id IN (SELECT id FROM abandoned)
+"""
+
+
+def _close_holds(selection, status, params):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CLOSE_HOLDS_SQL.format(selection=selection),
+            params | {"status": status, "now": timezone.now()},
+        )
+        closed, room_ids = cursor.fetchone()
+
+    transaction.on_commit(lambda: bump_rooms(room_ids))
+    return closed, room_ids
+
+
+def hold_room(cart, room_id, check_in, check_out, quantity=1):
+    """
+    Take `quantity` units of a room off sale for the stay while it is in `cart`,
+    replacing the cart's previous hold on the room.
+
+    Raises `ValidationError` when the units are not available, the previous hold
+    is then kept.
+    """
+
+    with transaction.atomic():
+        release_holds(cart, room_id)
+        reserve_room(room_id, check_in, check_out, quantity)
+        hold = Hold.objects.create(
+            cart=cart,
+            room_id=room_id,
+            check_in=check_in,
+            check_out=check_out,
+            quantity=quantity,
+        )
+
+    logger.info("holding room:%s for cart:%s until %s" % (room_id, cart, hold.expires))
+
+    return hold
+
+
+def release_holds(cart, room_id=None):
+    """
+    Put the units held by `cart`, only for `room_id` when given, back on sale.
+    Returns the number of holds released.
+    """
+
+    released, _ = _close_holds(
+        CART_HOLDS_SQL, Hold.RELEASED, {"cart": cart, "room_id": room_id}
+    )
+    return released
+
+
+def convert_hold(cart, room_id, check_in, check_out, quantity):
+    """
+    Turn the cart's hold matching a booking item into part of the booking, its
+    units stay off sale. Returns `False` when there is no such hold and the item
+    has to be reserved.
+
+    A hold past its expiry which the sweeper has not closed yet still holds its
+    units, so it is converted as well.
+    """
+
+    converted = Hold.objects.filter(
+        cart=cart,
+        room_id=room_id,
+        check_in=check_in,
+        check_out=check_out,
+        quantity=quantity,
+        status=Hold.ACTIVE,
+    ).update(status=Hold.CONVERTED, closed=timezone.now())
+
+    return converted > 0
+
+
+def expire_holds(limit=5000):
+    """
+    Close up to `limit` holds past their expiry, oldest first, and put their units
+    back on sale. Holds locked by a checkout converting them are skipped.
+    Returns the number of holds expired and the rooms they belonged to.
+    """
+
+    return _close_holds(
+        EXPIRED_HOLDS_SQL, Hold.EXPIRED, {"now": timezone.now(), "limit": limit}
+    )
+
+
+def purge_holds(before):
+    """
+    Delete the holds closed before `before`. Returns the number deleted.
+    """
+
+    deleted, _ = (
+        Hold.objects.exclude(status=Hold.ACTIVE).filter(closed__lt=before).delete()
+    )
+    return deleted
+
+
+def hold_churn(since):
+    """
+    Count the holds placed since `since` by how they ended, along with the holds
+    and units currently off sale, in one query.
+    """
+
+    placed = Q(created__gte=since)
+    return Hold.objects.aggregate(
+        placed=Count("id", filter=placed),
+        converted=Count("id", filter=placed & Q(status=Hold.CONVERTED)),
+        released=Count("id", filter=placed & Q(status=Hold.RELEASED)),
+        expired=Count("id", filter=placed & Q(status=Hold.EXPIRED)),
+        active=Count("id", filter=Q(status=Hold.ACTIVE)),
+        held=Sum("quantity", filter=Q(status=Hold.ACTIVE), default=0),
+    )
+
+
+def quote_stays(stays):
+    """
+    The nights of each `(room_id, check_in, check_out)` stay, as `(for_date, rate)`
+    pairs by date, from one query on the night view over all of them.
+    """
+
+    if not stays:
+        return {}
+
+    first = min(check_in for _, check_in, _ in stays)
+    last = max(check_out for _, _, check_out in stays) - timedelta(days=1)
+    nights = Night.objects.filter(
+        room_id__in={room_id for room_id, _, _ in stays},
+        for_date__range=(first, last),
+        span_start__lte=last,
+        span_end__gte=first,
+    ).values_list("room_id", "for_date", "rate")
+
+    by_room = {}
+    for room_id, for_date, rate in nights:
+        by_room.setdefault(room_id, []).append((for_date, rate))
+
+    return {
+        (room_id, check_in, check_out): [
+            (for_date, rate)
+            for for_date, rate in by_room.get(room_id, [])
+            if check_in <= for_date < check_out
+        ]
+        for room_id, check_in, check_out in stays
+    }
+
+
+def _stored_carts(token, user):
+    if user is not None:
+        return StoredCart.objects.filter(user=user)
+    if token:
+        return StoredCart.objects.filter(token=token, user=None)
+    return None
+
+
+def load_cart(token, user=None):
+    """
+    The token and lines of the stored cart of `user`, else of the anonymous cart
+    `token`, in one query. `None` when there is no such cart.
+    """
+
+    carts = _stored_carts(token, user)
+    if carts is None:
+        return None
+
+    rows = list(carts.values_list("token", "lines__key", "lines__data"))
+    if not rows:
+        return None
+
+    return rows[0][0], {key: data for _, key, data in rows if key is not None}
+
+
+def store_cart(token, lines, user=None):
+    """
+    Replace the stored lines of the cart `token`, the cart of `user` when given,
+    with `lines`, the lines of the session cart by key.
+    """
+
+    with transaction.atomic():
+        if user is not None:
+            cart, created = StoredCart.objects.get_or_create(
+                user=user, defaults={"token": token}
+            )
+        else:
+            cart, created = StoredCart.objects.get_or_create(token=token)
+        if not created:
+            cart.save(update_fields=["updated"])
+
+        StoredLine.objects.bulk_create(
+            [
+                StoredLine(cart=cart, key=key, room_id=line.get("room"), data=line)
+                for key, line in lines.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["cart", "key"],
+            update_fields=["room", "data"],
+        )
+        cart.lines.exclude(key__in=list(lines)).delete()
+
+
+def drop_cart(token, user=None):
+    """
+    Delete the stored cart of `user`, else the anonymous cart `token`.
+    """
+
+    carts = _stored_carts(token, user)
+    if carts is not None:
+        carts.delete()
+
+
+def merge_carts(token, user):
+    """
+    Move the anonymous cart `token` into the cart of `user` when they log in,
+    its lines win over the user's for the same rooms. The anonymous cart becomes
+    the user's when they had none.
+
+    The lines move in one statement and the anonymous cart's holds are handed
+    over to the user's cart, replacing its holds on the same rooms. Returns the
+    token of the user's cart, `None` when there is none.
+    """
+
+    with transaction.atomic():
+        target = StoredCart.objects.select_for_update().filter(user=user).first()
+        source = None
+        if token:
+            source = (
+                StoredCart.objects.select_for_update()
+                .filter(token=token, user=None)
+                .first()
+            )
+
+        if source is None:
+            return target.token if target else None
+
+        if target is None:
+            source.user = user
+            source.save(update_fields=["user", "updated"])
+            return source.token
+
+        with connection.cursor() as cursor:
+            cursor.execute(MERGE_LINES_SQL, {"source": source.pk, "target": target.pk})
+            (room_ids,) = cursor.fetchone()
+
+        _close_holds(
+            ROOM_HOLDS_SQL,
+            Hold.RELEASED,
+            {"cart": target.token, "room_ids": room_ids},
+        )
+        Hold.objects.filter(cart=source.token, status=Hold.ACTIVE).update(
+            cart=target.token
+        )
+
+        source.delete()
+        target.save(update_fields=["updated"])
+
+    logger.info("merged cart:%s into cart:%s" % (source.token, target.token))
+
+    return target.token
+
+
+def purge_carts(before, users_before, limit=5000):
+    """
+    Delete up to `limit` stored carts, with their lines, not updated since
+    `before` or, for the carts of users, since `users_before`. Returns the number
+    of carts deleted.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            PURGE_CARTS_SQL,
+            {"before": before, "users_before": users_before, "limit": limit},
+        )
+        return cursor.rowcount
@@ -0,0 +1,32 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+
+from .services import merge_carts
+
+logger = logging.getLogger(__name__)
+
+
+def merge_cart_on_login(sender, request, user, **kwargs):  # noqa: ARG001
+    """
+    Merge the anonymous cart of the session into the user's stored cart, the
+    session then uses the user's cart and its lines are loaded on the next read.
+    """
+
+    token = request.session.get(settings.CART_TOKEN_SESSION_ID)
+    merged = merge_carts(token, user)
+    if merged is None:
+        return
+
+    logger.info("user:%s logged in to cart:%s" % (user.pk, merged))
+
+    request.session[settings.CART_TOKEN_SESSION_ID] = merged
+    request.session.pop(settings.CART_SESSION_ID, None)
+    request._cart_loaded = False
+
+
+user_logged_in.connect(
+    merge_cart_on_login,
+    dispatch_uid="merge_cart_on_login",
+)
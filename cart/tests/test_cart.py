@@ -1,10 +1,18 @@
+from datetime import timedelta
 from decimal import Decimal
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import RequestFactory, TestCase
 from django.urls import reverse_lazy
+from django.utils import timezone
 
 from cart.cart import Cart
-from properties.factories import RoomFactory
+from cart.models import Hold, StoredCart
+from properties.factories import OccurrenceFactory, RoomFactory
+from properties.models import Occurrence
+from users.factories import UserFactory
 
 
 class SessionDict(dict):
@@ -67,7 +75,8 @@ class CartTests(TestCase):
         cart.add(product=product, quantity=2)
 
         self.assertEqual(
-            cart.cart[product_id], {"quantity": 2, "price": str(product.weekday_price)}
+            cart.cart[product_id],
+            {"room": product.id, "quantity": 2, "price": str(product.weekday_price)},
         )
 
     def test_adding_a_product_to_cart_is_idempotent(self):
@@ -83,7 +92,8 @@ class CartTests(TestCase):
         cart.add(product=product, quantity=5, override_quantity=True)
 
         self.assertEqual(
-            cart.cart[product_id], {"quantity": 5, "price": str(product.weekday_price)}
+            cart.cart[product_id],
+            {"room": product.id, "quantity": 5, "price": str(product.weekday_price)},
         )
         self.assertEqual(len(cart), 5)
         self.assertEqual(len(cart.cart), 1)
@@ -168,3 +178,210 @@ class CartTests(TestCase):
 
         self.assertEqual(len(cart), 4)  # num of beds
         self.assertEqual(len(cart.cart), 2)  # num of rooms
+
+
+class CartHoldTests(TestCase):
+    """
+    With a search query in session the cart holds what it contains.
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get(reverse_lazy("cart:cart-detail"))
+        self.request.session = SessionDict()
+
+        check_in = timezone.localdate() + timedelta(days=1)
+        self.request.session["q"] = {
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+        }
+
+        self.product = RoomFactory()
+        for i in range(2):
+            OccurrenceFactory(
+                room=self.product,
+                for_date=check_in + timedelta(days=i),
+                availability=3,
+            )
+
+    def availability(self):
+        return list(self.product.occurrences.values_list("availability", flat=True))
+
+    def test_adding_a_product_holds_the_whole_quantity(self):
+        cart = Cart(self.request)
+        cart.add(product=self.product)
+        cart.add(product=self.product)
+
+        hold = Hold.objects.get(status=Hold.ACTIVE)
+        self.assertEqual(hold.cart, cart.token)
+        self.assertEqual(hold.quantity, 2)
+        self.assertEqual(self.availability(), [1, 1])
+
+    def test_product_which_cannot_be_held_is_not_added(self):
+        cart = Cart(self.request)
+
+        with self.assertRaises(ValidationError):
+            cart.add(product=self.product, quantity=4)
+
+        self.assertEqual(cart.cart, {})
+        self.assertEqual(self.availability(), [3, 3])
+
+    def test_removing_a_product_releases_its_hold(self):
+        cart = Cart(self.request)
+        cart.add(product=self.product, quantity=2)
+        cart.remove(product=self.product)
+
+        self.assertFalse(Hold.objects.filter(status=Hold.ACTIVE).exists())
+        self.assertEqual(self.availability(), [3, 3])
+
+
+class CartQuoteTests(TestCase):
+    """
+    Test suite for the quotes the cart keeps for the stay of each line.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+
+        cls.product = RoomFactory()
+        for i, rate in enumerate(["40.00", "60.00"]):
+            OccurrenceFactory(
+                room=cls.product,
+                for_date=cls.check_in + timedelta(days=i),
+                rate=Decimal(rate),
+                availability=3,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get(reverse_lazy("cart:cart-detail"))
+        self.request.session = SessionDict()
+        self.search(self.check_in, self.check_out)
+
+    def search(self, check_in, check_out, guests=2):
+        self.request.session["q"] = {
+            "check_in": check_in.isoformat(),
+            "check_out": check_out.isoformat(),
+            "guests": guests,
+        }
+
+    def test_adding_a_product_keeps_the_quote_of_its_stay(self):
+        cart = Cart(self.request)
+        cart.add(product=self.product, quantity=2)
+
+        key = f"{self.product.id}:{self.check_in}:{self.check_out}:2"
+        line = cart.cart[key]
+        self.assertEqual(
+            line["nights"],
+            [
+                [self.check_in.isoformat(), "40.00"],
+                [(self.check_in + timedelta(days=1)).isoformat(), "60.00"],
+            ],
+        )
+        self.assertEqual(line["price"], "100.00")
+        self.assertEqual(cart.get_total_price(), Decimal("200.00"))
+
+    def test_items_and_total_are_read_once(self):
+        Cart(self.request).add(product=self.product)
+        cart = Cart(self.request)
+
+        # the room tokens, then the rooms
+        with self.assertNumQueries(2):
+            items = list(cart)
+            list(cart)
+            total = cart.get_total_price()
+
+        self.assertEqual(items[0]["product"], self.product)
+        self.assertEqual(items[0]["check_in"], self.check_in)
+        self.assertEqual(items[0]["total_price"], total)
+
+    def test_quote_is_refreshed_when_the_inventory_version_moves(self):
+        Cart(self.request).add(product=self.product)
+
+        occurrence = self.product.occurrences.get(for_date=self.check_in)
+        occurrence.rate = Decimal("50.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            occurrence.save()
+
+        self.assertEqual(Cart(self.request).get_total_price(), Decimal("110.00"))
+
+    def test_quote_is_kept_while_the_inventory_version_holds(self):
+        Cart(self.request).add(product=self.product)
+
+        # a bulk write without a bump leaves the version, and so the quote, alone
+        Occurrence.objects.filter(room=self.product).update(rate=Decimal("10.00"))
+
+        cart = Cart(self.request)
+        # the room tokens only
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.get_total_price(), Decimal("100.00"))
+
+    def test_new_stay_replaces_the_line_of_the_product(self):
+        cart = Cart(self.request)
+        cart.add(product=self.product)
+
+        self.search(self.check_in, self.check_in + timedelta(days=1))
+        cart.add(product=self.product)
+
+        self.assertEqual(len(cart.cart), 1)
+        self.assertEqual(cart.get_total_price(), Decimal("40.00"))
+        self.assertEqual(Hold.objects.get(status=Hold.ACTIVE).quantity, 1)
+
+    def test_lines_without_a_stay_are_quoted_for_the_searched_one(self):
+        del self.request.session["q"]
+        cart = Cart(self.request)
+        cart.add(product=self.product, quantity=2)
+
+        self.search(self.check_in, self.check_out)
+        cart.date_lines()
+
+        key = f"{self.product.id}:{self.check_in}:{self.check_out}:2"
+        self.assertEqual(list(cart.cart), [key])
+        self.assertEqual(cart.cart[key]["price"], "100.00")
+        self.assertEqual(cart.cart[key]["quantity"], 2)
+        self.assertEqual(cart.get_total_price(), Decimal("200.00"))
+
+
+class CartStorageTests(TestCase):
+    """
+    Test suite for the carts kept in the database across sessions.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.product = RoomFactory()
+
+    def request(self, user=None):
+        request = RequestFactory().get(reverse_lazy("cart:cart-detail"))
+        request.session = SessionDict()
+        if user is not None:
+            request.user = user
+        return request
+
+    def test_adding_a_product_stores_the_cart(self):
+        cart = Cart(self.request())
+        cart.add(product=self.product, quantity=2)
+
+        stored = StoredCart.objects.get(token=cart.token)
+        self.assertEqual(
+            dict(stored.lines.values_list("key", "data")), dict(cart.cart.items())
+        )
+
+    def test_users_cart_follows_them_to_a_new_session(self):
+        Cart(self.request(self.user)).add(product=self.product, quantity=2)
+
+        cart = Cart(self.request(self.user))
+        with self.assertNumQueries(1):
+            self.assertEqual(len(cart), 2)
+            self.assertEqual(len(Cart(cart.request)), 2)
+
+        self.assertEqual(cart.session[settings.CART_SESSION_ID], cart.cart)
+
+    def test_clearing_a_cart_drops_the_stored_one(self):
+        cart = Cart(self.request(self.user))
+        cart.add(product=self.product)
+        cart.clear()
+
+        self.assertFalse(StoredCart.objects.exists())
@@ -0,0 +1,329 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from cart.models import Hold, StoredCart
+from cart.services import (
+    convert_hold,
+    drop_cart,
+    expire_holds,
+    hold_churn,
+    hold_room,
+    load_cart,
+    merge_carts,
+    purge_carts,
+    purge_holds,
+    release_holds,
+    store_cart,
+)
+from properties.factories import OccurrenceFactory, RatePeriodFactory, RoomFactory
+from properties.models import Night, Room
+from properties.services import compact_occurrences, update_nights
+from users.factories import UserFactory
+
+
+class HoldTestMixin:
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=3)
+
+        cls.dorm = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=8)
+        for i in range(3):
+            OccurrenceFactory(
+                room=cls.dorm, for_date=cls.check_in + timedelta(days=i), availability=4
+            )
+
+    def hold(self, cart="cart", quantity=1):
+        return hold_room(cart, self.dorm.id, self.check_in, self.check_out, quantity)
+
+    def expire(self, *holds):
+        past = timezone.now() - timedelta(minutes=1)
+        Hold.objects.filter(id__in=[hold.id for hold in holds]).update(expires=past)
+
+    def availability(self):
+        return list(self.dorm.occurrences.values_list("availability", flat=True))
+
+
+class HoldServicesTests(HoldTestMixin, TestCase):
+    """
+    Test suite for placing, releasing, converting and expiring cart holds.
+    """
+
+    def test_hold_takes_units_off_sale(self):
+        hold = self.hold(quantity=2)
+
+        self.assertTrue(hold.is_active)
+        self.assertEqual(self.availability(), [2, 2, 2])
+
+    def test_new_hold_replaces_the_carts_previous_one(self):
+        first = self.hold(quantity=2)
+        self.hold(quantity=3)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, Hold.RELEASED)
+        self.assertEqual(Hold.objects.filter(status=Hold.ACTIVE).count(), 1)
+        self.assertEqual(self.availability(), [1, 1, 1])
+
+    def test_failed_hold_keeps_the_previous_one(self):
+        first = self.hold(quantity=2)
+
+        with self.assertRaises(ValidationError):
+            self.hold(quantity=5)
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, Hold.ACTIVE)
+        self.assertEqual(self.availability(), [2, 2, 2])
+
+    def test_release_puts_units_back_on_sale(self):
+        self.hold(quantity=2)
+        self.hold(cart="other")
+
+        self.assertEqual(release_holds("cart"), 1)
+        self.assertEqual(self.availability(), [3, 3, 3])
+
+    def test_release_gives_back_units_above_the_periods_availability(self):
+        room = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=8)
+        RatePeriodFactory(
+            room=room, start_date=self.check_in, end_date=self.check_out, availability=4
+        )
+        hold_room("cart", room.id, self.check_in, self.check_out, 2)
+        update_nights(
+            [room.id], self.check_in, self.check_out, range(1, 8), availability=6
+        )
+
+        release_holds("cart")
+
+        nights = room.occurrences.values_list("availability", flat=True)
+        self.assertEqual(list(nights), [6, 6, 6, 6])
+
+    def test_release_leaves_nights_served_by_a_period_alone(self):
+        self.hold(quantity=2)
+        self.dorm.occurrences.all().delete()
+        RatePeriodFactory(
+            room=self.dorm,
+            start_date=self.check_in,
+            end_date=self.check_out - timedelta(days=1),
+            availability=2,
+        )
+
+        release_holds("cart")
+
+        nights = Night.objects.filter(room=self.dorm, span_end__gte=self.check_in)
+        self.assertEqual(self.availability(), [])
+        self.assertEqual(list(nights.values_list("availability", flat=True)), [2, 2, 2])
+
+    def test_compaction_keeps_held_nights(self):
+        self.hold()
+
+        self.assertEqual(compact_occurrences([self.dorm.id], self.check_in, 1), (0, 0))
+
+        release_holds("cart")
+        deleted, _ = compact_occurrences([self.dorm.id], self.check_in, 1)
+        self.assertEqual(deleted, 3)
+
+    def test_converted_hold_keeps_units_off_sale(self):
+        hold = self.hold(quantity=2)
+
+        stay = (self.dorm.id, self.check_in, self.check_out)
+        self.assertFalse(convert_hold("cart", *stay, quantity=1))
+        self.assertTrue(convert_hold("cart", *stay, quantity=2))
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.CONVERTED)
+        self.assertEqual(expire_holds(), (0, []))
+        self.assertEqual(self.availability(), [2, 2, 2])
+
+    def test_expire_only_closes_holds_past_their_expiry(self):
+        expired = self.hold(cart="gone", quantity=2)
+        self.hold(cart="here")
+        self.expire(expired)
+
+        self.assertEqual(expire_holds(), (1, [self.dorm.id]))
+
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, Hold.EXPIRED)
+        self.assertIsNotNone(expired.closed)
+        self.assertEqual(self.availability(), [3, 3, 3])
+
+    def test_expire_closes_oldest_holds_first_up_to_the_limit(self):
+        holds = [self.hold(cart=f"cart-{i}") for i in range(3)]
+        self.expire(*holds)
+
+        self.assertEqual(expire_holds(limit=2), (2, [self.dorm.id]))
+        self.assertEqual(self.availability(), [3, 3, 3])
+        self.assertEqual(expire_holds(limit=2), (1, [self.dorm.id]))
+        self.assertEqual(self.availability(), [4, 4, 4])
+
+    def test_purge_only_deletes_closed_holds(self):
+        self.hold(cart="gone")
+        self.hold(cart="here")
+        release_holds("gone")
+
+        self.assertEqual(purge_holds(before=timezone.now()), 1)
+        self.assertEqual(Hold.objects.get().cart, "here")
+
+    def test_hold_churn_counts_holds_by_outcome(self):
+        for cart in ("a", "b", "c", "d"):
+            self.hold(cart=cart)
+        release_holds("a")
+        convert_hold("b", self.dorm.id, self.check_in, self.check_out, 1)
+        self.expire(Hold.objects.get(cart="c"))
+        expire_holds()
+
+        churn = hold_churn(since=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(
+            churn,
+            {
+                "placed": 4,
+                "converted": 1,
+                "released": 1,
+                "expired": 1,
+                "active": 1,
+                "held": 1,
+            },
+        )
+
+
+class ExpireHoldsCommandTests(HoldTestMixin, TestCase):
+    """
+    Test suite for the hold sweeper command.
+    """
+
+    def test_command_expires_in_batches_and_reports_churn(self):
+        holds = [self.hold(cart=f"cart-{i}") for i in range(3)]
+        self.expire(*holds)
+
+        out = StringIO()
+        call_command("expire_holds", batch_size=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("3 holds expired in 2 batches, 1 rooms back on sale", output)
+        self.assertIn("3 holds placed, 0 converted, 0 released, 3 expired", output)
+        self.assertEqual(self.availability(), [4, 4, 4])
+
+
+class StoredCartTests(HoldTestMixin, TestCase):
+    """
+    Test suite for storing, loading, merging and purging carts.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        super().setUpTestData()
+        cls.user = UserFactory()
+        cls.other = RoomFactory(property=cls.dorm.property)
+
+    def line(self, room, quantity=1, check_in=None):
+        check_in = check_in or self.check_in
+        key = f"{room.id}:{check_in}:{self.check_out}:1"
+        return key, {"room": room.id, "quantity": quantity, "price": "10.00"}
+
+    def test_stored_lines_are_loaded_back(self):
+        key, line = self.line(self.dorm)
+        store_cart("anon", {key: line})
+
+        self.assertEqual(load_cart("anon"), ("anon", {key: line}))
+        self.assertIsNone(load_cart("other"))
+
+    def test_storing_replaces_the_previous_lines(self):
+        first, first_line = self.line(self.dorm)
+        second, second_line = self.line(self.other, quantity=2)
+        store_cart("anon", {first: first_line})
+        store_cart("anon", {second: second_line})
+
+        self.assertEqual(load_cart("anon"), ("anon", {second: second_line}))
+
+    def test_users_cart_is_found_by_user(self):
+        key, line = self.line(self.dorm)
+        store_cart("anon", {key: line}, user=self.user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(load_cart(None, self.user), ("anon", {key: line}))
+
+    def test_empty_stored_cart_is_loaded_empty(self):
+        store_cart("anon", {})
+
+        self.assertEqual(load_cart("anon"), ("anon", {}))
+
+    def test_dropped_cart_is_gone(self):
+        store_cart("anon", dict([self.line(self.dorm)]))
+        drop_cart("anon")
+
+        self.assertFalse(StoredCart.objects.exists())
+
+    def test_anonymous_cart_becomes_the_users_without_one(self):
+        store_cart("anon", dict([self.line(self.dorm)]))
+
+        self.assertEqual(merge_carts("anon", self.user), "anon")
+        self.assertEqual(StoredCart.objects.get().user, self.user)
+
+    def test_merge_keeps_the_anonymous_stay_of_a_room(self):
+        later = self.check_in + timedelta(days=1)
+        store_cart(
+            "user",
+            dict([self.line(self.dorm, check_in=later), self.line(self.other)]),
+            user=self.user,
+        )
+        key, line = self.line(self.dorm, quantity=2)
+        self.hold(cart="user")
+        anonymous = self.hold(cart="anon", quantity=2)
+        store_cart("anon", {key: line})
+
+        self.assertEqual(merge_carts("anon", self.user), "user")
+
+        token, lines = load_cart(None, self.user)
+        self.assertEqual(token, "user")
+        self.assertEqual(lines, dict([(key, line), self.line(self.other)]))
+        self.assertEqual(StoredCart.objects.count(), 1)
+
+        # the user's hold on the room was replaced by the anonymous one
+        anonymous.refresh_from_db()
+        self.assertEqual(anonymous.cart, "user")
+        self.assertEqual(Hold.objects.filter(status=Hold.ACTIVE).get(), anonymous)
+        self.assertEqual(self.availability(), [2, 2, 2])
+
+    def test_merge_without_carts_returns_none(self):
+        self.assertIsNone(merge_carts("anon", self.user))
+        self.assertIsNone(merge_carts(None, self.user))
+
+    def test_login_merges_the_session_cart(self):
+        store_cart("anon", dict([self.line(self.dorm)]))
+        store_cart("user", dict([self.line(self.other)]), user=self.user)
+        session = self.client.session
+        session[settings.CART_TOKEN_SESSION_ID] = "anon"
+        session.save()
+
+        self.client.force_login(self.user)
+
+        self.assertEqual(self.client.session[settings.CART_TOKEN_SESSION_ID], "user")
+        self.assertEqual(len(load_cart(None, self.user)[1]), 2)
+
+    def test_purge_drops_abandoned_carts_in_batches(self):
+        for token in ("a", "b", "c"):
+            store_cart(token, dict([self.line(self.dorm)]))
+        store_cart("user", dict([self.line(self.dorm)]), user=self.user)
+        past = timezone.now() - timedelta(days=10)
+        StoredCart.objects.exclude(token="c").update(updated=past)
+
+        out = StringIO()
+        call_command("purge_carts", batch_size=1, stdout=out)
+
+        self.assertIn("2 carts purged in 3 batches", out.getvalue())
+        self.assertEqual(
+            set(StoredCart.objects.values_list("token", flat=True)), {"c", "user"}
+        )
+
+    def test_purge_keeps_users_carts_longer(self):
+        store_cart("user", {}, user=self.user)
+        StoredCart.objects.update(updated=timezone.now() - timedelta(days=10))
+        now = timezone.now()
+
+        self.assertEqual(purge_carts(now, now - timedelta(days=30)), 0)
+        self.assertEqual(purge_carts(now, now), 1)
@@ -1,11 +1,15 @@
+from datetime import timedelta
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.messages import get_messages
 from django.test import TestCase
 from django.urls import resolve, reverse_lazy
+from django.utils import timezone
 
-from cart.views import cart_detail, cart_remove
-from properties.factories import RoomFactory
+from cart.models import Hold, StoredCart
+from cart.views import cart_add_group, cart_api_add, cart_detail, cart_remove
+from properties.factories import OccurrenceFactory, RatePeriodFactory, RoomFactory
 
 
 class CartDetailViewTests(TestCase):
@@ -110,6 +114,77 @@ class CartAddTests(TestCase):
         self.assertEqual(str(messages[0]), self.failure_msg)
 
 
+class CartAddGroupTests(TestCase):
+    """Test suite for adding the rooms of a group combination to the cart"""
+
+    url = reverse_lazy("cart:cart-add-group")
+
+    def setUp(self):
+        self.dorm = RoomFactory()
+        self.double = RoomFactory(property=self.dorm.property)
+
+    def test_add_group_url_resolves_cart_add_group_view(self):
+        view = resolve(self.url)
+        self.assertEqual(view.func.__name__, cart_add_group.__name__)
+
+    def test_add_group_adds_every_room(self):
+        rooms = f"{self.dorm.id}:3,{self.double.id}:1"
+        response = self.client.post(self.url, {"rooms": rooms})
+
+        self.assertRedirects(response, reverse_lazy("cart:cart-detail"))
+        cart = self.client.session[settings.CART_SESSION_ID]
+        self.assertEqual(cart[str(self.dorm.id)]["quantity"], 3)
+        self.assertEqual(cart[str(self.double.id)]["quantity"], 1)
+
+    def test_add_group_stops_at_rooms_no_longer_available(self):
+        check_in = timezone.localdate() + timedelta(days=1)
+        RatePeriodFactory(room=self.dorm, start_date=check_in, availability=1)
+        session = self.client.session
+        session["q"] = {
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=1)).isoformat(),
+            "guests": 2,
+        }
+        session.save()
+
+        response = self.client.post(self.url, {"rooms": f"{self.dorm.id}:2"})
+
+        messages = list(get_messages(response.wsgi_request))
+        self.assertEqual(len(messages), 1)
+        cart = self.client.session.get(settings.CART_SESSION_ID, {})
+        self.assertNotIn(str(self.dorm.id), cart)
+
+    def test_add_group_adds_no_room_when_one_is_unavailable(self):
+        check_in = timezone.localdate() + timedelta(days=1)
+        RatePeriodFactory(room=self.double, start_date=check_in, availability=1)
+        RatePeriodFactory(room=self.dorm, start_date=check_in, availability=1)
+        session = self.client.session
+        session["q"] = {
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=1)).isoformat(),
+            "guests": 2,
+        }
+        session.save()
+
+        rooms = f"{self.double.id}:1,{self.dorm.id}:2"
+        self.client.post(self.url, {"rooms": rooms})
+
+        self.assertEqual(self.client.session[settings.CART_SESSION_ID], {})
+        self.assertFalse(Hold.objects.exists())
+        self.assertFalse(StoredCart.objects.exists())
+
+    def test_add_group_ignores_invalid_rooms(self):
+        response = self.client.post(self.url, {"rooms": f"{self.dorm.id}:0"})
+
+        self.assertRedirects(response, reverse_lazy("cart:cart-detail"))
+        self.assertEqual(self.client.session[settings.CART_SESSION_ID], {})
+
+    def test_add_group_with_unknown_room_is_not_found(self):
+        response = self.client.post(self.url, {"rooms": "0:1"})
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
 class CartRemoveTests(TestCase):
     """Test suite for cart remove view"""
 
@@ -156,3 +231,112 @@ class CartRemoveTests(TestCase):
 
         self.assertEqual(len(messages), 1)
         self.assertEqual(str(messages[0]), self.success_msg)
+
+
+class CartApiTests(TestCase):
+    """Test suite for the JSON cart views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+
+        cls.product = RoomFactory()
+        for i in range(2):
+            OccurrenceFactory(
+                room=cls.product,
+                for_date=cls.check_in + timedelta(days=i),
+                rate=25,
+                availability=3,
+            )
+
+        cls.add_url = reverse_lazy("cart:cart-api-add", args=[cls.product.id])
+        cls.update_url = reverse_lazy("cart:cart-api-update")
+        cls.remove_url = reverse_lazy("cart:cart-api-remove", args=[cls.product.id])
+
+    def setUp(self):
+        session = self.client.session
+        session["q"] = {
+            "check_in": self.check_in.isoformat(),
+            "check_out": self.check_out.isoformat(),
+            "guests": 1,
+        }
+        session.save()
+
+    def test_add_url_resolves_cart_api_add_view(self):
+        view = resolve(self.add_url)
+        self.assertEqual(view.func.__name__, cart_api_add.__name__)
+
+    def test_add_answers_with_the_updated_cart(self):
+        response = self.client.post(self.add_url, {"quantity": 2})
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["total"], "100.00")
+        self.assertEqual(
+            [(i["product"], i["quantity"], i["price"]) for i in data["items"]],
+            [(self.product.id, 2, "50.00")],
+        )
+        self.assertEqual(data["items"][0]["check_in"], self.check_in.isoformat())
+
+    def test_update_sets_the_quantity(self):
+        key = self.client.post(self.add_url, {"quantity": 2}).json()["items"][0]["key"]
+        response = self.client.post(self.update_url, {"key": key, "quantity": 1})
+
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_update_keeps_the_stay_of_the_line(self):
+        key = self.client.post(self.add_url, {"quantity": 1}).json()["items"][0]["key"]
+        session = self.client.session
+        session["q"] = {"check_in": self.check_out.isoformat(), "guests": 3}
+        session.save()
+
+        response = self.client.post(self.update_url, {"key": key, "quantity": 2})
+
+        items = response.json()["items"]
+        self.assertEqual([(i["key"], i["quantity"]) for i in items], [(key, 2)])
+        self.assertEqual(
+            list(self.product.occurrences.values_list("availability", flat=True)),
+            [1, 1],
+        )
+
+    def test_update_of_a_line_not_in_the_cart_is_not_found(self):
+        response = self.client.post(self.update_url, {"key": "1", "quantity": 1})
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_remove_answers_with_the_updated_cart(self):
+        self.client.post(self.add_url, {"quantity": 2})
+        response = self.client.post(self.remove_url)
+
+        self.assertEqual(response.json(), {"items": [], "count": 0, "total": "0"})
+
+    def test_cart_page_forms_carry_the_csrf_token(self):
+        self.client.post(self.add_url, {"quantity": 1})
+        response = self.client.get(reverse_lazy("cart:cart-detail"))
+
+        # the quantity and the remove forms of the line
+        self.assertContains(response, 'name="csrfmiddlewaretoken"', count=2)
+
+    def test_summary_lists_the_cart(self):
+        self.client.post(self.add_url, {"quantity": 1})
+        response = self.client.get(reverse_lazy("cart:cart-api-detail"))
+
+        self.assertEqual(response.json()["total"], "50.00")
+
+    def test_invalid_quantity_is_a_bad_request(self):
+        response = self.client.post(self.add_url, {"quantity": 0})
+
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("quantity", response.json()["errors"])
+
+    def test_room_which_cannot_be_held_is_a_conflict(self):
+        response = self.client.post(self.add_url, {"quantity": 4})
+
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_add_only_accepts_post_request(self):
+        response = self.client.get(self.add_url)
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
@@ -6,6 +6,12 @@ app_name = "cart"
 
 urlpatterns = [
     path("add/<int:product_id>/", views.cart_add, name="cart-add"),
+    path("add-group/", views.cart_add_group, name="cart-add-group"),
+    path("update/", views.cart_update, name="cart-update"),
     path("remove/<int:product_id>/", views.cart_remove, name="cart-remove"),
     path("", views.cart_detail, name="cart-detail"),
+    path("api/", views.cart_api_detail, name="cart-api-detail"),
+    path("api/add/<int:product_id>/", views.cart_api_add, name="cart-api-add"),
+    path("api/update/", views.cart_api_update, name="cart-api-update"),
+    path("api/remove/<int:product_id>/", views.cart_api_remove, name="cart-api-remove"),
 ]
@@ -1,17 +1,21 @@
 import logging
 
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 
 from properties.models import Room
 
 from .cart import Cart
-from .forms import CartAddProductForm
+from .forms import CartAddGroupForm, CartAddProductForm, CartUpdateLineForm
 
 logger = logging.getLogger(__name__)
 
+unavailable_message = "Sorry, this room is no longer available for your dates 🙏"
+
 
 @require_POST
 @csrf_exempt
@@ -28,15 +32,81 @@ def cart_add(request, product_id):
     if form.is_valid():
         logger.info("cart form is valid...")
         cd = form.cleaned_data
-        cart.add(
-            product=product, quantity=cd["quantity"], override_quantity=cd["override"]
-        )
+        try:
+            cart.add(
+                product=product,
+                quantity=cd["quantity"],
+                override_quantity=cd["override"],
+            )
+        except ValidationError:
+            messages.error(request, unavailable_message)
 
     logger.warning("⚠️ cart form in invalid...")
 
     return redirect("cart:cart-detail")
 
 
+@require_POST
+def cart_add_group(request):
+    """
+    Add every room of a group combination to the cart, see `properties.groups`,
+    or none when one is no longer available. Does not render a template
+    """
+
+    cart = Cart(request)
+    form = CartAddGroupForm(request.POST)
+
+    if form.is_valid():
+        quantities = form.cleaned_data["rooms"]
+        products = Room.objects.in_bulk(quantities)
+        if len(products) != len(quantities):
+            raise Http404
+
+        try:
+            cart.add_group(
+                {
+                    products[product_id]: quantity
+                    for product_id, quantity in quantities.items()
+                }
+            )
+        except ValidationError:
+            messages.error(request, unavailable_message)
+
+    return redirect("cart:cart-detail")
+
+
+def update_line(cart, form):
+    """
+    Set the quantity of the form's cart line, `Http404` when it is not in the
+    cart.
+    """
+
+    cd = form.cleaned_data
+    try:
+        cart.update(cd["key"], cd["quantity"])
+    except KeyError as e:
+        raise Http404 from e
+
+
+@require_POST
+def cart_update(request):
+    """
+    Set the quantity of a cart line, its stay unchanged. Does not render a
+    template
+    """
+
+    cart = Cart(request)
+    form = CartUpdateLineForm(request.POST)
+
+    if form.is_valid():
+        try:
+            update_line(cart, form)
+        except ValidationError:
+            messages.error(request, unavailable_message)
+
+    return redirect("cart:cart-detail")
+
+
 @require_POST
 def cart_remove(request, product_id):
     """
@@ -59,7 +129,115 @@ def cart_detail(request):
     """
 
     cart = Cart(request)
+    for item in cart:
+        item["update_form"] = CartUpdateLineForm(
+            initial={"key": item["key"], "quantity": item["quantity"]}
+        )
+
     template_name = "cart/cart_detail.html"
     context = {"cart": cart}
 
     return render(request, template_name, context)
+
+
+def cart_summary(cart):
+    """
+    The cart as the JSON views answer with it: every line with its stay, nightly
+    rates and totals, the number of units and the total price.
+    """
+
+    items = [
+        {
+            "key": item["key"],
+            "product": item["product"].id,
+            "name": item["product"].name,
+            "quantity": item["quantity"],
+            "price": item["price"],
+            "total_price": item["total_price"],
+            "check_in": item.get("check_in"),
+            "check_out": item.get("check_out"),
+            "nights": item.get("nights", []),
+        }
+        for item in cart
+    ]
+    return {"items": items, "count": len(cart), "total": cart.get_total_price()}
+
+
+@require_GET
+def cart_api_detail(request):
+    """
+    JSON contents of the cart, see `cart_summary()`.
+    """
+
+    return JsonResponse(cart_summary(Cart(request)))
+
+
+@require_POST
+def cart_api_add(request, product_id):
+    """
+    Add a product to the cart for the stay of the search query, or set its
+    quantity when the form's `override` is given, and answer with the updated
+    cart in JSON.
+
+    Answers 400 with the form errors and 409 with the unchanged cart when the
+    room cannot be held for the stay.
+    """
+
+    cart = Cart(request)
+    product = get_object_or_404(Room, id=product_id)
+    form = CartAddProductForm(request.POST)
+
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    cd = form.cleaned_data
+    try:
+        cart.add(
+            product=product,
+            quantity=cd["quantity"],
+            override_quantity=cd["override"],
+        )
+    except ValidationError:
+        errors = {"errors": {"__all__": [unavailable_message]}}
+        return JsonResponse(errors | cart_summary(cart), status=409)
+
+    return JsonResponse(cart_summary(cart))
+
+
+@require_POST
+def cart_api_update(request):
+    """
+    Set the quantity of a cart line in place, its stay unchanged, and answer with
+    the updated cart in JSON.
+
+    Answers 400 with the form errors, 404 for a line not in the cart and 409 with
+    the unchanged cart when the room cannot be held for the new quantity.
+    """
+
+    cart = Cart(request)
+    form = CartUpdateLineForm(request.POST)
+
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    try:
+        update_line(cart, form)
+    except ValidationError:
+        errors = {"errors": {"__all__": [unavailable_message]}}
+        return JsonResponse(errors | cart_summary(cart), status=409)
+
+    return JsonResponse(cart_summary(cart))
+
+
+@require_POST
+def cart_api_remove(request, product_id):
+    """
+    Remove a product from the cart and answer with the updated cart in JSON.
+    """
+
+    product = get_object_or_404(Room, id=product_id)
+
+    cart = Cart(request)
+    cart.remove(product)
+
+    return JsonResponse(cart_summary(cart))
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sites",
     "django.contrib.sitemaps",
     "django.contrib.humanize",
+    "django.contrib.postgres",
     # Third party
     "allauth",
     "allauth.account",
@@ -81,6 +82,47 @@ SITE_ID = 1
 ROOT_URLCONF = "main.urls"
 
 CART_SESSION_ID = "cart"
+CART_TOKEN_SESSION_ID = "cart_token"
+# How long a room added to a cart is kept off sale, see cart/models.py
+CART_HOLD_MINUTES = int(os.getenv("CART_HOLD_MINUTES", default="15"))
+
+# Per worker numpy inventory cache, see properties/inventory.py
+INVENTORY_MATRIX_ENABLED = int(os.getenv("INVENTORY_MATRIX_ENABLED", default="0"))
+INVENTORY_MATRIX_DAYS = 365
+
+# How long a property's month grid is cached, see portal/grid.py. Writes change
+# its key, the timeout only bounds how long unused months stay around.
+CALENDAR_CACHE_SECONDS = int(os.getenv("CALENDAR_CACHE_SECONDS", default="3600"))
+
+# How long faceted property searches are cached, see properties/facets.py. Property
+# and room writes change their key.
+FACETS_CACHE_SECONDS = int(os.getenv("FACETS_CACHE_SECONDS", default="600"))
+
+# How long availability searches are cached, see properties/search_cache.py. Writes
+# to the properties searched make an entry stale, the timeout bounds unused ones.
+SEARCH_CACHE_SECONDS = int(os.getenv("SEARCH_CACHE_SECONDS", default="900"))
+
+# Each worker adds its search cache hits and misses to the shared counters once it
+# counted this many lookups, rather than writing them on every search.
+SEARCH_STATS_EVERY = int(os.getenv("SEARCH_STATS_EVERY", default="100"))
+
+# Multipliers the nightly repricing applies to base rates, see properties/pricing.py.
+# Steps are (threshold, multiplier): the highest occupancy reached and the fewest
+# days to arrival the night is within win. Weekdays are ISO (1 is monday), seasons
+# ("MM-DD", "MM-DD", multiplier) ranges. The product is kept within floor/ceiling.
+PRICING_RULES = {
+    "occupancy": [(0.5, 1.1), (0.75, 1.2), (0.9, 1.35)],
+    "days_to_arrival": [(2, 0.9), (14, 0.95)],
+    "weekdays": {},  # weekend prices already apply on fridays and saturdays
+    "seasons": [("12-20", "01-10", 1.25), ("07-01", "07-31", 1.15)],
+    "floor": 0.8,
+    "ceiling": 1.8,
+}
+
+# Where past occurrence partitions are archived to, see properties/partitions.py
+OCCURRENCE_ARCHIVE_DIR = Path(
+    os.getenv("OCCURRENCE_ARCHIVE_DIR", default=BASE_DIR / "archive")
+)
 
 AUTHENTICATION_BACKENDS = (
     # Needed to login by username in Django admin, regardless of `allauth`
@@ -183,6 +225,26 @@ DATABASES = {
     }
 }
 
+# Shared by every worker: searches, grids and facets cached here are keyed by the
+# inventory version tokens, see properties/versions.py, and must be seen by the
+# worker which bumps them. A process local backend is refused by properties.E001.
+# Create the table with `python manage.py createcachetable`.
+#
+# The tokens themselves have a table of their own, never culled, culling this cache
+# only drops entries, which are rebuilt on the next read.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": os.getenv("CACHE_TABLE", default="django_cache"),
+        # entries pass their own timeout, `incr()` keeps the search counters with
+        # the default one
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", default="20000")),
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from properties.models import Room
+
+
+class ScheduleWindowForm(forms.Form):
+    """
+    Dates of a room's schedule to show, both inclusive. Without them the four
+    weeks from today.
+    """
+
+    MAX_DAYS = 90
+    DEFAULT_DAYS = 28
+
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+
+        start = cleaned_data.get("start") or timezone.localdate()
+        end = cleaned_data.get("end") or start + timedelta(days=self.DEFAULT_DAYS - 1)
+
+        if end < start:
+            error_msg = "End cannot be before start."
+            raise ValidationError(error_msg, code="invalid")
+
+        if (end - start).days >= self.MAX_DAYS:
+            error_msg = "Ask for at most %(max_days)s days at a time."
+            raise ValidationError(
+                error_msg, params={"max_days": self.MAX_DAYS}, code="invalid"
+            )
+
+        cleaned_data.update(start=start, end=end)
+        return cleaned_data
+
+
+class CalendarMonthForm(forms.Form):
+    """
+    Month of the property calendar to show, the current one without it.
+    """
+
+    month = forms.DateField(input_formats=["%Y-%m"], required=False)
+
+    def clean_month(self):
+        month = self.cleaned_data["month"] or timezone.localdate()
+        return month.replace(day=1)
+
+
+class NightsUpdateForm(forms.Form):
+    """
+    Rate and/or availability to set on some rooms for the chosen weekdays of a
+    date range, both inclusive.
+    """
+
+    MAX_DAYS = 366
+    WEEKDAYS = (
+        (1, "Mon"),
+        (2, "Tue"),
+        (3, "Wed"),
+        (4, "Thu"),
+        (5, "Fri"),
+        (6, "Sat"),
+        (7, "Sun"),
+    )
+
+    rooms = forms.ModelMultipleChoiceField(
+        queryset=Room.objects.none(), widget=forms.CheckboxSelectMultiple
+    )
+    start = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    end = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=WEEKDAYS,
+        coerce=int,
+        initial=[day for day, _ in WEEKDAYS],
+        widget=forms.CheckboxSelectMultiple,
+    )
+    rate = forms.DecimalField(
+        max_digits=12, decimal_places=2, min_value=1, required=False
+    )
+    availability = forms.IntegerField(
+        min_value=0,
+        max_value=20,
+        required=False,
+        help_text="Units for sale in total, booked and held ones are taken off.",
+    )
+
+    def __init__(self, *args, rooms, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["rooms"].queryset = rooms
+
+    def clean_start(self):
+        start = self.cleaned_data["start"]
+
+        if start < timezone.localdate():
+            error_msg = "Past nights cannot be changed."
+            raise ValidationError(error_msg, code="invalid")
+
+        return start
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get("start")
+        end = cleaned_data.get("end")
+
+        if start and end and end < start:
+            error_msg = "End cannot be before start."
+            raise ValidationError(error_msg, code="invalid")
+
+        if start and end and (end - start).days >= self.MAX_DAYS:
+            error_msg = "Change at most %(max_days)s days at a time."
+            raise ValidationError(
+                error_msg, params={"max_days": self.MAX_DAYS}, code="invalid"
+            )
+
+        if (
+            cleaned_data.get("rate") is None
+            and cleaned_data.get("availability") is None
+        ):
+            error_msg = "Set a rate, an availability or both."
+            raise ValidationError(error_msg, code="required")
+
+        return cleaned_data
@@ -0,0 +1,106 @@
+"""
+Rooms x nights grid of a property for the portal calendar.
+
+`month_grid()` reads the availability and rate of every night of the month from
+the night view and the units of confirmed bookings staying that night, pivoted to
+one row per room with an array per column, in a single query whatever the number
+of rooms.
+
+`get_month_grid()` caches it per property and month. The key carries the rooms
+and their inventory tokens from `properties.versions`, which every inventory write
+and booking confirmation moves, so a write makes the next read miss instead of
+having to find and delete the months it touched.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from properties.partitions import add_months
+from properties.versions import get_room_versions
+
+logger = logging.getLogger(__name__)
+
+GRID_KEY = "portal:grid:%s:%s:%s"
+
+GRID_SQL = """
+WITH nights AS (
+    SELECT room_id, for_date, availability, rate
+      FROM properties_night
+     WHERE room_id = ANY(%(room_ids)s)
+       AND for_date BETWEEN %(start)s AND %(end)s
+       AND span_start <= %(end)s AND span_end >= %(start)s
+), booked AS (
+    SELECT i.product_id AS room_id, d::date AS for_date, sum(i.quantity) AS units
+      FROM bookings_bookingitem i
+      JOIN bookings_booking b ON b.id = i.booking_id
+     CROSS JOIN generate_series(
+           greatest(i.check_in, %(start)s::date),
+           least(i.check_out - 1, %(end)s::date),
+           interval '1 day'
+     ) d
+     WHERE i.product_id = ANY(%(room_ids)s)
+       AND i.check_out > %(start)s AND i.check_in <= %(end)s
+       AND b.paid
+     GROUP BY 1, 2
+)
+SELECT r.id,
+       array_agg(n.availability ORDER BY d),
+       array_agg(n.rate ORDER BY d),
+       array_agg(coalesce(b.units, 0) ORDER BY d)
+  FROM unnest(%(room_ids)s::bigint[]) AS r (id)
+ CROSS JOIN generate_series(%(start)s::date, %(end)s::date, interval '1 day') d
+  LEFT JOIN nights n ON n.room_id = r.id AND n.for_date = d::date
+  LEFT JOIN booked b ON b.room_id = r.id AND b.for_date = d::date
+ GROUP BY r.id
+"""
+
+
+def month_grid(rooms, month):
+    """
+    The nights of `rooms`, a list of `(id, name)`, for the month starting on
+    `month`. Nights without inventory have `None` availability and rate.
+    """
+
+    end = add_months(month, 1) - timedelta(days=1)
+    dates = [month + timedelta(days=i) for i in range(end.day)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            GRID_SQL,
+            {"room_ids": [room_id for room_id, _ in rooms], "start": month, "end": end},
+        )
+        columns = {room_id: columns for room_id, *columns in cursor.fetchall()}
+
+    return {
+        "month": month,
+        "dates": dates,
+        "rooms": [
+            {"id": room_id, "name": name, "nights": list(zip(*columns[room_id]))}
+            for room_id, name in rooms
+        ],
+    }
+
+
+def get_month_grid(prop, month):
+    """
+    `month_grid()` of every room of the property `prop`, from the cache unless one
+    of them changed since it was stored.
+    """
+
+    rooms = list(prop.rooms.order_by("name", "id").values_list("id", "name"))
+    versions = get_room_versions(room_id for room_id, _ in rooms)
+    digest = hashlib.md5(repr((rooms, sorted(versions.items()))).encode()).hexdigest()
+    key = GRID_KEY % (prop.id, f"{month:%Y%m}", digest)
+
+    grid = cache.get(key)
+    if grid is None:
+        logger.info("building grid of property:%s for %s" % (prop.id, month))
+        grid = month_grid(rooms, month)
+        cache.set(key, grid, settings.CALENDAR_CACHE_SECONDS)
+
+    return grid
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_bookings,
+    seed_properties,
+    seed_rooms,
+)
+from bookings.models import Booking, BookingItem
+from portal.grid import get_month_grid, month_grid
+from properties.models import Night, RatePeriod, Room
+from properties.partitions import add_months
+from properties.services import fill_rate_periods
+
+
+def grid_per_room(rooms, month):
+    """
+    The same grid as `month_grid()` with two queries per room.
+    """
+
+    end = add_months(month, 1) - timedelta(days=1)
+    grid = []
+    for room in rooms:
+        nights = {
+            night.for_date: night
+            for night in Night.objects.filter(
+                room=room,
+                for_date__range=(month, end),
+                span_start__lte=end,
+                span_end__gte=month,
+            )
+        }
+        booked = {}
+        items = BookingItem.objects.filter(
+            product=room, booking__paid=True, check_in__lte=end, check_out__gt=month
+        ).values_list("check_in", "check_out", "quantity")
+        for check_in, check_out, quantity in items:
+            night = max(check_in, month)
+            while night < check_out and night <= end:
+                booked[night] = booked.get(night, 0) + quantity
+                night += timedelta(days=1)
+        grid.append(
+            [
+                (
+                    nights[day].availability if day in nights else None,
+                    nights[day].rate if day in nights else None,
+                    booked.get(day, 0),
+                )
+                for day in (month + timedelta(days=i) for i in range(end.day))
+            ]
+        )
+    return grid
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the property calendar grid of a large hostel built by one pivoted "
+        "query, by queries per room and from the cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=60)
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=50_000,
+            help="Bookings on the hostel over the last 400 days",
+        )
+        parser.add_argument(
+            "--other-bookings",
+            type=int,
+            default=200_000,
+            help="Bookings on 1000 rooms of other properties",
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, **options):
+        month = timezone.localdate().replace(day=1)
+        repeat = options["repeat"]
+
+        with rollback():
+            hostel = seed_properties(1)[0]
+            rooms = seed_rooms([hostel], per_property=options["rooms"])
+            room_ids = [room.id for room in rooms]
+            others = [room.id for room in seed_rooms(seed_properties(100), 10)]
+            fill_rate_periods(
+                room_ids + others, month - timedelta(days=400), month + timedelta(365)
+            )
+            seed_bookings(room_ids, options["bookings"])
+            seed_bookings(others, options["other_bookings"], seed=0.25)
+            analyze(Booking, BookingItem, Room, RatePeriod)
+
+            booked = BookingItem.objects.filter(
+                product__in=room_ids,
+                booking__paid=True,
+                check_in__lt=add_months(month, 1),
+                check_out__gt=month,
+            ).aggregate(units=Sum("quantity"))["units"]
+            self.stdout.write(
+                f"{len(rooms)} rooms, {booked} units booked in {month:%B %Y}"
+            )
+
+            names = [(room.id, room.name) for room in rooms]
+            cache.clear()
+            get_month_grid(hostel, month)
+
+            report(
+                self.stdout,
+                f"Calendar grid, {len(rooms)} rooms",
+                [
+                    (
+                        "pivoted query",
+                        measure(lambda: month_grid(names, month), repeat),
+                    ),
+                    (
+                        "queries per room",
+                        measure(lambda: grid_per_room(rooms, month), repeat),
+                    ),
+                    (
+                        "cached",
+                        measure(lambda: get_month_grid(hostel, month), repeat),
+                    ),
+                ],
+            )
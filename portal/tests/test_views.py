@@ -1,10 +1,28 @@
+from datetime import timedelta
+from decimal import Decimal
 from http import HTTPStatus
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import resolve, reverse
-
+from django.utils import timezone
+
+from bookings.factories import (
+    BookingConfirmedFactory,
+    BookingFactory,
+    BookingItemFactory,
+)
+from bookings.models import DailyStat
+from portal.grid import get_month_grid
 from portal.views import CalendarView, DashboardView, ScheduleView
-from properties.factories import PropertyFactory
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.models import Occurrence, Room
+from properties.partitions import add_months
 from users.factories import PropertyOwnerFactory, UserFactory
 
 
@@ -64,6 +82,25 @@ class DashboardPageTests(TestCase):
         self.assertNotContains(response, "Hi I should not be on this page.")
         self.assertEqual(response.context["property"], self.property)
 
+    def test_dashboard_shows_the_kpis_of_the_daily_stats(self):
+        DailyStat.objects.create(
+            property=self.property,
+            date=timezone.localdate() - timedelta(days=1),
+            units=4,
+            units_sold=3,
+            revenue=360,
+            units_booked=5,
+        )
+        self.client.force_login(self.owner)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.context["kpis"]), 4)
+        self.assertContains(response, "75.0%", count=2)
+        self.assertContains(response, "$120.00", count=2)
+        self.assertContains(response, "$90.00", count=2)
+        self.assertContains(response, "5 nights", count=2)
+
 
 class CalendarPageTests(TestCase):
     """
@@ -124,6 +161,127 @@ class CalendarPageTests(TestCase):
         self.assertEqual(response.context["property"], self.property)
 
 
+class CalendarGridTests(TestCase):
+    """
+    Test suite for the rooms x nights grid of the calendar page.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.owner = PropertyOwnerFactory()
+        cls.property = PropertyFactory(owner=cls.owner)
+        cls.url = reverse("portal:calendar", kwargs={"slug": cls.property.slug})
+        cls.month = add_months(timezone.localdate().replace(day=1), 1)
+        cls.third = cls.month + timedelta(days=2)
+
+        cls.dorm = RoomFactory(
+            property=cls.property,
+            room_type=Room.MIXED_DORM,
+            weekday_price=20,
+            weekend_price=20,
+        )
+        cls.private = RoomFactory(property=cls.property)
+        # room factory names are keys of its samples
+        Room.objects.filter(id=cls.dorm.id).update(name="A dorm")
+        Room.objects.filter(id=cls.private.id).update(name="B private")
+        RatePeriodFactory(
+            room=cls.dorm,
+            start_date=cls.month,
+            end_date=add_months(cls.month, 1) - timedelta(days=1),
+            availability=6,
+        )
+        OccurrenceFactory(room=cls.dorm, for_date=cls.third, rate=25, availability=2)
+
+        for booking, quantity in (
+            (BookingConfirmedFactory(), 2),
+            (BookingFactory(), 3),
+        ):
+            BookingItemFactory(
+                booking=booking,
+                product=cls.dorm,
+                quantity=quantity,
+                check_in=cls.third,
+                check_out=cls.third + timedelta(days=2),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+
+    def test_grid_has_a_row_per_room_and_a_column_per_night(self):
+        response = self.client.get(self.url, {"month": f"{self.month:%Y-%m}"})
+
+        grid = response.context["grid"]
+        self.assertEqual(grid["month"], self.month)
+        self.assertEqual(grid["dates"][0], self.month)
+        self.assertEqual(grid["dates"][-1].month, self.month.month)
+        dorm, private = grid["rooms"]
+        self.assertEqual(dorm["name"], "A dorm")
+        self.assertEqual(dorm["nights"][0], (6, Decimal(20), 0))
+        self.assertEqual(dorm["nights"][2], (2, Decimal(25), 2))
+        self.assertEqual(dorm["nights"][3], (6, Decimal(20), 2))
+        self.assertEqual(dorm["nights"][4], (6, Decimal(20), 0))
+        self.assertEqual(set(private["nights"]), {(None, None, 0)})
+        self.assertContains(response, "2 / 2")
+
+    def test_grid_is_one_query_whatever_the_rooms(self):
+        RoomFactory.create_batch(60, property=self.property)
+
+        # rooms, their tokens, the cached grid, the grid, then storing it in the
+        # database cache (5)
+        with self.assertNumQueries(9):
+            grid = get_month_grid(self.property, self.month)
+
+        self.assertEqual(len(grid["rooms"]), 62)
+
+    def test_grid_is_cached_until_a_room_changes(self):
+        get_month_grid(self.property, self.month)
+
+        # rooms, their tokens, then the cached grid
+        with self.assertNumQueries(3):
+            get_month_grid(self.property, self.month)
+
+        occurrence = Occurrence.objects.get(room=self.dorm)
+        occurrence.availability = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            occurrence.save()
+
+        dorm = get_month_grid(self.property, self.month)["rooms"][0]
+        self.assertEqual(dorm["nights"][2][0], 1)
+
+    def test_confirming_a_booking_refreshes_the_grid(self):
+        get_month_grid(self.property, self.month)
+        booking = BookingFactory()
+        BookingItemFactory(
+            booking=booking,
+            product=self.dorm,
+            quantity=1,
+            check_in=self.month,
+            check_out=self.month + timedelta(days=1),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.confirm(payment_id="123")
+
+        dorm = get_month_grid(self.property, self.month)["rooms"][0]
+        self.assertEqual(dorm["nights"][0][2], 1)
+
+    def test_renamed_rooms_are_not_served_from_the_cache(self):
+        get_month_grid(self.property, self.month)
+        Room.objects.filter(id=self.private.id).update(name="C private")
+
+        rooms = get_month_grid(self.property, self.month)["rooms"]
+
+        self.assertEqual(rooms[1]["name"], "C private")
+
+    def test_invalid_month_shows_the_current_one(self):
+        response = self.client.get(self.url, {"month": "soon"})
+
+        self.assertEqual(
+            response.context["grid"]["month"], timezone.localdate().replace(day=1)
+        )
+
+
 class SchedulePageTests(TestCase):
     """
     Test suite for the schedule page
@@ -179,3 +337,260 @@ class SchedulePageTests(TestCase):
         self.assertContains(response, "Schedule")
         self.assertNotContains(response, "Hi I should not be on this page.")
         self.assertEqual(response.context["property"], self.property)
+
+
+class ScheduleDetailPageTests(TestCase):
+    """
+    Test suite for the schedule of a single room.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.template_name = "portal/schedule_detail.html"
+        cls.owner = PropertyOwnerFactory()
+        cls.property = PropertyFactory(owner=cls.owner)
+        cls.room = RoomFactory(
+            property=cls.property, weekday_price=40, weekend_price=60
+        )
+        cls.url = cls.room.get_schedule_url()
+        cls.data_url = reverse(
+            "portal:schedule-data",
+            kwargs={"slug": cls.property.slug, "room_id": cls.room.id},
+        )
+
+        # Monday to Wednesday next week with an override on Tuesday
+        today = timezone.localdate()
+        cls.monday = today + timedelta(days=7 - today.weekday())
+        RatePeriodFactory(
+            room=cls.room,
+            start_date=cls.monday,
+            end_date=cls.monday + timedelta(days=2),
+            availability=2,
+        )
+        OccurrenceFactory(
+            room=cls.room,
+            for_date=cls.monday + timedelta(days=1),
+            rate=55,
+            availability=1,
+        )
+
+    def test_schedule_page_fetches_the_nights(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, self.template_name)
+        self.assertContains(response, self.data_url)
+        self.assertNotIn("rates", response.context)
+
+
+class ScheduleDataTests(TestCase):
+    """
+    Test suite for the JSON nights of a room shown by its schedule.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.owner = PropertyOwnerFactory()
+        cls.property = PropertyFactory(owner=cls.owner)
+        cls.room = RoomFactory(
+            property=cls.property, weekday_price=40, weekend_price=60
+        )
+        cls.url = reverse(
+            "portal:schedule-data",
+            kwargs={"slug": cls.property.slug, "room_id": cls.room.id},
+        )
+
+        # Monday to Wednesday next week with an override on Tuesday
+        today = timezone.localdate()
+        cls.monday = today + timedelta(days=7 - today.weekday())
+        cls.nights = [cls.monday + timedelta(days=i) for i in range(3)]
+        RatePeriodFactory(
+            room=cls.room,
+            start_date=cls.monday,
+            end_date=cls.nights[-1],
+            availability=2,
+        )
+        OccurrenceFactory(room=cls.room, for_date=cls.nights[1], rate=55)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def get(self, start, end, **headers):
+        return self.client.get(
+            self.url, {"start": start, "end": end}, headers=headers or None
+        )
+
+    def test_nights_are_returned_as_columns(self):
+        # session, user, permissions, property and room, then one for the nights
+        with self.assertNumQueries(7):
+            response = self.get(self.monday, self.monday + timedelta(days=13))
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "start": self.monday.isoformat(),
+                "end": (self.monday + timedelta(days=13)).isoformat(),
+                "dates": [night.isoformat() for night in self.nights],
+                "availability": [2, 1, 2],
+                "rates": ["40.00", "55.00", "40.00"],
+            },
+        )
+
+    def test_only_the_window_is_returned(self):
+        response = self.get(self.nights[1], self.nights[1])
+
+        self.assertEqual(response.json()["dates"], [self.nights[1].isoformat()])
+
+    def test_window_defaults_to_four_weeks_from_today(self):
+        response = self.client.get(self.url)
+
+        today = timezone.localdate()
+        self.assertEqual(response.json()["start"], today.isoformat())
+        self.assertEqual(
+            response.json()["end"], (today + timedelta(days=27)).isoformat()
+        )
+
+    def test_window_is_capped(self):
+        response = self.get(self.monday, self.monday + timedelta(days=90))
+
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("at most 90 days", response.json()["errors"]["__all__"][0])
+
+        response = self.get(self.monday, self.monday - timedelta(days=1))
+
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_unchanged_nights_are_not_sent_again(self):
+        response = self.get(self.monday, self.nights[-1])
+        etag = response.headers["ETag"]
+
+        response = self.get(self.monday, self.nights[-1], if_none_match=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        Occurrence.objects.filter(room=self.room).update(availability=0)
+        response = self.get(self.monday, self.nights[-1], if_none_match=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json()["availability"], [2, 0, 2])
+
+    def test_other_owners_cannot_read_the_nights(self):
+        self.client.force_login(PropertyOwnerFactory())
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_rooms_of_other_properties_are_not_found(self):
+        other = RoomFactory(property=PropertyFactory(owner=self.owner))
+
+        response = self.client.get(
+            reverse(
+                "portal:schedule-data",
+                kwargs={"slug": self.property.slug, "room_id": other.id},
+            )
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class NightsUpdatePageTests(TestCase):
+    """
+    Test suite for the bulk rate and availability editor.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.owner = PropertyOwnerFactory()
+        cls.property = PropertyFactory(owner=cls.owner)
+        cls.rooms = RoomFactory.create_batch(
+            2,
+            property=cls.property,
+            room_type=Room.PRIVATE_ROOM,
+            weekday_price=40,
+            weekend_price=60,
+        )
+        cls.url = reverse("portal:nights-update", kwargs={"slug": cls.property.slug})
+        cls.start = timezone.localdate() + timedelta(days=1)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def post(self, **data):
+        return self.client.post(
+            self.url,
+            {
+                "rooms": [room.id for room in self.rooms],
+                "start": self.start,
+                "end": self.start + timedelta(days=13),
+                "weekdays": range(1, 8),
+            }
+            | data,
+            follow=True,
+        )
+
+    def test_page_lists_the_property_rooms(self):
+        RoomFactory(property=PropertyFactory(owner=self.owner))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, "portal/nights_update.html")
+        self.assertQuerySetEqual(
+            response.context["form"].fields["rooms"].queryset,
+            self.rooms,
+            ordered=False,
+        )
+
+    def test_nights_are_set_and_counted(self):
+        response = self.post(rate="75", availability="3")
+
+        self.assertRedirects(response, self.url)
+        self.assertContains(response, "28 nights changed, 28 of them opened.")
+        self.assertEqual(
+            set(Occurrence.objects.values_list("rate", "availability")), {(75, 3)}
+        )
+
+    def test_rate_or_availability_is_required(self):
+        response = self.post()
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFormError(
+            response.context["form"], None, "Set a rate, an availability or both."
+        )
+        self.assertFalse(Occurrence.objects.exists())
+
+    def test_past_nights_cannot_be_changed(self):
+        response = self.post(start=self.start - timedelta(days=2), rate="75")
+
+        self.assertFormError(
+            response.context["form"], "start", "Past nights cannot be changed."
+        )
+
+    def test_range_is_limited(self):
+        response = self.post(end=self.start + timedelta(days=366), rate="75")
+
+        self.assertFormError(
+            response.context["form"], None, "Change at most 366 days at a time."
+        )
+
+    def test_rooms_of_other_properties_are_rejected(self):
+        other = RoomFactory(property=PropertyFactory(owner=self.owner))
+
+        response = self.post(rooms=[other.id], rate="75")
+
+        self.assertIn("rooms", response.context["form"].errors)
+        self.assertFalse(Occurrence.objects.exists())
+
+    def test_other_owners_cannot_edit_the_nights(self):
+        self.client.force_login(PropertyOwnerFactory())
+
+        response = self.post(rate="75")
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(Occurrence.objects.exists())
@@ -4,9 +4,11 @@ from .views import (
     CalendarView,
     DashboardView,
     ManagePropertyListView,
+    NightsUpdateView,
     PropertyCreateView,
     PropertyDeleteView,
     PropertyUpdateView,
+    ScheduleDataView,
     ScheduleDetailView,
     ScheduleView,
 )
@@ -24,6 +26,12 @@ portal_patterns = [
         ScheduleDetailView.as_view(),
         name="schedule-detail",
     ),
+    path(
+        "schedule/rooms/<int:room_id>/nights/",
+        ScheduleDataView.as_view(),
+        name="schedule-data",
+    ),
+    path("nights/", NightsUpdateView.as_view(), name="nights-update"),
     path("", DashboardView.as_view(), name="dashboard"),
 ]
 
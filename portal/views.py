@@ -1,11 +1,26 @@
 import logging
 from typing import Any
 
-from django.db.models import CharField, F, Func, Value
+from django.contrib import messages
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    set_response_etag,
+)
 from django.views.generic import DetailView, ListView
-from django.views.generic.edit import CreateView, DeleteView, UpdateView
+from django.views.generic.detail import BaseDetailView, SingleObjectMixin
+from django.views.generic.edit import CreateView, DeleteView, FormView, UpdateView
 
+from bookings.stats import property_kpis
+from properties.partitions import add_months
+from properties.services import update_nights
+
+from .forms import CalendarMonthForm, NightsUpdateForm, ScheduleWindowForm
+from .grid import get_month_grid
 from .mixins import OwnerPropertyEditMixin, OwnerPropertyMixin
 
 logger = logging.getLogger(__name__)
@@ -20,11 +35,33 @@ class DashboardView(OwnerPropertyMixin, DetailView):
     template_name = "portal/dashboard.html"
     permission_required = "properties.view_property"
 
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["kpis"] = property_kpis(self.object.id)
+        return context
+
 
 class CalendarView(OwnerPropertyMixin, DetailView):
+    """
+    Availability, rate and units booked of every room of the property for a month.
+    """
+
     template_name = "portal/calendar.html"
     permission_required = "properties.view_property"
 
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+
+        month = timezone.localdate().replace(day=1)
+        form = CalendarMonthForm(self.request.GET)
+        if form.is_valid():
+            month = form.cleaned_data["month"]
+
+        context["grid"] = get_month_grid(self.object, month)
+        context["previous_month"] = add_months(month, -1)
+        context["next_month"] = add_months(month, 1)
+        return context
+
 
 class ScheduleView(OwnerPropertyMixin, DetailView):
     """
@@ -37,36 +74,111 @@ class ScheduleView(OwnerPropertyMixin, DetailView):
 
 class ScheduleDetailView(OwnerPropertyMixin, DetailView):
     """
-    Show the schedule calendar for one single room.
+    Show the schedule calendar for one single room, the nights are fetched from
+    `ScheduleDataView` a few weeks at a time.
     """
 
     template_name = "portal/schedule_detail.html"
     permission_required = "properties.view_property"
 
-    def get_schedule_data(self, room):
-        qs = room.occurrences.annotate(
-            formatted_date=Func(
-                F("for_date"),
-                Value("yyyy-MM-dd hh:mm:ss"),
-                function="to_char",
-                output_field=CharField(),
-            )
-        )
-        qs = qs.values_list("formatted_date", "availability")
-        return list(qs)
-
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
 
         qs = self.object.rooms.all()
         room_id = self.kwargs.get("room_id")
 
-        context["room"] = room = get_object_or_404(qs, id=room_id)
-        context["rates"] = self.get_schedule_data(room)
+        context["room"] = get_object_or_404(qs, id=room_id)
+        context["max_days"] = ScheduleWindowForm.MAX_DAYS
 
         return context
 
 
+class ScheduleDataView(OwnerPropertyMixin, BaseDetailView):
+    """
+    The nights of one room between `start` and `end` as parallel lists of dates,
+    availability and rates, at most `ScheduleWindowForm.MAX_DAYS` at a time.
+
+    The ETag is a hash of the payload, unchanged nights answer 304 without a body.
+    """
+
+    permission_required = "properties.view_property"
+
+    def get(self, request, *args, **kwargs):  # noqa: ARG002
+        self.object = self.get_object()
+        room = get_object_or_404(self.object.rooms.all(), id=self.kwargs["room_id"])
+
+        form = ScheduleWindowForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+
+        start, end = form.cleaned_data["start"], form.cleaned_data["end"]
+        nights = room.nights.filter(
+            for_date__range=(start, end),
+            span_start__lte=end,
+            span_end__gte=start,
+        )
+        rows = list(nights.values_list("for_date", "availability", "rate"))
+        dates, availability, rates = zip(*rows) if rows else ((), (), ())
+
+        response = JsonResponse(
+            {
+                "start": start,
+                "end": end,
+                "dates": dates,
+                "availability": availability,
+                "rates": rates,
+            }
+        )
+        patch_cache_control(response, private=True, no_cache=True)
+        set_response_etag(response)
+
+        return get_conditional_response(
+            request, etag=response.headers["ETag"], response=response
+        )
+
+
+class NightsUpdateView(OwnerPropertyMixin, SingleObjectMixin, FormView):
+    """
+    Change the rate and/or availability of several rooms over a date range at
+    once, limited to some weekdays.
+    """
+
+    template_name = "portal/nights_update.html"
+    permission_required = "properties.change_room"
+    form_class = NightsUpdateForm
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super().post(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        return super().get_form_kwargs() | {"rooms": self.object.rooms.all()}
+
+    def form_valid(self, form):
+        cd = form.cleaned_data
+        created, updated = update_nights(
+            [room.id for room in cd["rooms"]],
+            cd["start"],
+            cd["end"],
+            cd["weekdays"],
+            rate=cd["rate"],
+            availability=cd["availability"],
+        )
+
+        messages.success(
+            self.request,
+            f"{created + updated} nights changed, {created} of them opened.",
+        )
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse("portal:nights-update", kwargs={"slug": self.object.slug})
+
+
 class PropertyCreateView(OwnerPropertyEditMixin, CreateView):
     permission_required = "properties.add_property"
     template_name = "portal/property_create.html"
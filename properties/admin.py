@@ -2,7 +2,7 @@ from typing import ClassVar
 
 from django.contrib import admin
 
-from properties.models import Addon, Occurrence, Property, Room
+from properties.models import Addon, Occurrence, Property, RatePeriod, Room
 
 admin.site.site_header = "Indie Cactus 🌵🏜️"
 admin.site.site_title = "Indie Cactus Portal 🌵🏜️"
@@ -33,8 +33,35 @@ class PropertyAdmin(admin.ModelAdmin):
         )
 
 
+class HandSetRateMixin:
+    """
+    A rate set by hand becomes the base repricing starts from, see
+    `properties.pricing`.
+    """
+
+    def save_model(self, request, obj, form, change):
+        if "rate" in form.changed_data and "base_rate" not in form.changed_data:
+            obj.base_rate = obj.rate
+        super().save_model(request, obj, form, change)
+
+
 @admin.register(Occurrence)
-class OccurrenceAdmin(admin.ModelAdmin):
-    list_display = ("room", "for_date", "rate", "availability")
+class OccurrenceAdmin(HandSetRateMixin, admin.ModelAdmin):
+    list_display = ("room", "for_date", "rate", "availability", "min_stay")
     list_filter = ("for_date",)
     ordering = ("room", "for_date")
+
+
+@admin.register(RatePeriod)
+class RatePeriodAdmin(HandSetRateMixin, admin.ModelAdmin):
+    list_display = (
+        "room",
+        "start_date",
+        "end_date",
+        "rate",
+        "availability",
+        "min_stay",
+    )
+    list_filter = ("start_date",)
+    ordering = ("room", "start_date")
+    raw_id_fields = ("room",)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends each worker keeps to itself: the entries are checked against the shared
+# version tokens, see properties/versions.py, but every worker would fill its own
+# and count its own search hits, see properties/search_cache.py.
+PROCESS_LOCAL_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):  # noqa: ARG001
+    """
+    Searches, grids and facets are cached once for all workers, in a shared cache.
+    """
+
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [
+        Error(
+            "The default cache %s is local to each process." % backend,
+            hint=(
+                "Configure a shared cache in CACHES, e.g. the database or Redis "
+                "backend, so what one worker caches serves the others."
+            ),
+            obj="CACHES",
+            id="properties.E001",
+        )
+    ]
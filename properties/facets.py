@@ -0,0 +1,173 @@
+"""
+Faceted filtering of properties by property type, country, room type, grade and
+ensuite.
+
+A property matches when it is active and has an active room passing the room
+facets. Every facet value is counted with the other facets applied but not its
+own, so picking a hostel still shows how many hotels there are.
+
+`facet_counts()` gets every count in one grouped query: each property and room
+pair is unpivoted into one row per facet, its value and whether it passes the
+other facets, then counted per facet and value with a conditional aggregate. The
+work is one pass over the rooms whatever the number of facet values.
+
+`get_facets()` caches the counts and the matching properties by the normalized
+filters and the catalog token from `properties.versions`, which every property
+and room write moves.
+"""
+
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Exists, OuterRef
+
+from django_countries import countries
+
+from .models import Property, Room
+from .versions import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+FACETS_KEY = "properties:facets:%s:%s"
+
+PROPERTY_FACETS = ("property_type", "country")
+ROOM_FACETS = ("room_type", "grade", "ensuite")
+FACETS = PROPERTY_FACETS + ROOM_FACETS
+
+ENSUITE_CHOICES = (("true", "Ensuite"), ("false", "Shared bathroom"))
+
+FACETS_SQL = """
+WITH rooms AS (
+    SELECT p.id, p.property_type, p.country, r.room_type, r.grade, r.ensuite
+      FROM properties_property p
+      JOIN properties_room r ON r.property_id = p.id
+     WHERE p.active AND r.active
+)
+SELECT f.facet,
+       f.value,
+       count(DISTINCT m.id) FILTER (WHERE f.others),
+       count(DISTINCT m.id) FILTER (WHERE {matched})
+  FROM rooms m
+ CROSS JOIN LATERAL (VALUES {facets}) AS f (facet, value, others)
+ GROUP BY GROUPING SETS ((f.facet, f.value), ())
+HAVING GROUPING(f.facet) = 1 OR count(DISTINCT m.id) FILTER (WHERE f.others) > 0
+"""
+
+
+def normalize(filters):
+    """
+    The selected values of every facet in `filters`, sorted and without the
+    facets nothing is selected in, so equal selections give equal keys.
+    """
+
+    return {name: sorted(set(filters[name])) for name in FACETS if filters.get(name)}
+
+
+def labels(name):
+    if name == "country":
+        return dict(countries)
+    if name == "ensuite":
+        return dict(ENSUITE_CHOICES)
+
+    model = Property if name in PROPERTY_FACETS else Room
+    return dict(model._meta.get_field(name).choices)
+
+
+def facet_counts(filters):
+    """
+    Count the matching properties and, per facet, the properties each of its
+    values would match. Returns `(count, facets)` where `facets` maps a facet to
+    a list of `{"value", "label", "count"}`, biggest count first.
+    """
+
+    filters = normalize(filters)
+    logger.info("counting facets filters:%s" % filters)
+
+    conditions = {
+        name: f"m.{name} = ANY(%({name})s)" if name in filters else "TRUE"
+        for name in FACETS
+    }
+
+    def others(facet):
+        return " AND ".join(conditions[name] for name in FACETS if name != facet)
+
+    sql = FACETS_SQL.format(
+        matched=" AND ".join(conditions.values()),
+        facets=", ".join(
+            f"('{name}', m.{name}::text, {others(name)})" for name in FACETS
+        ),
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, filters)
+        rows = cursor.fetchall()
+
+    count = 0
+    facets = {name: [] for name in FACETS}
+    names = {name: labels(name) for name in FACETS}
+    for facet, value, facet_count, matched in rows:
+        if facet is None:
+            count = matched
+            continue
+
+        label = str(names[facet].get(value, value))
+        facets[facet].append({"value": value, "label": label, "count": facet_count})
+
+    for values in facets.values():
+        values.sort(key=lambda v: (-v["count"], v["value"]))
+
+    return count, facets
+
+
+def filter_properties(filters):
+    """
+    The active properties matching `filters`, see the module docstring.
+    """
+
+    filters = normalize(filters)
+
+    rooms = Room.objects.filter(property=OuterRef("pk"), active=True)
+    rooms = rooms.filter(
+        **{f"{name}__in": filters[name] for name in ROOM_FACETS if name in filters}
+    )
+
+    qs = Property.objects.filter(active=True).filter(Exists(rooms))
+    return qs.filter(
+        **{f"{name}__in": filters[name] for name in PROPERTY_FACETS if name in filters}
+    )
+
+
+def get_facets(filters, limit):
+    """
+    The first `limit` properties matching `filters` with `facet_counts()`, from the
+    cache unless a property or room changed since they were stored.
+    """
+
+    filters = normalize(filters)
+    digest = hashlib.md5(repr((sorted(filters.items()), limit)).encode()).hexdigest()
+    key = FACETS_KEY % (get_catalog_version(), digest)
+
+    result = cache.get(key)
+    if result is None:
+        count, facets = facet_counts(filters)
+        properties = filter_properties(filters)[:limit]
+        result = {
+            "count": count,
+            "results": [
+                {
+                    "name": prop.name,
+                    "url": str(prop.get_absolute_url()),
+                    "city": prop.city,
+                    "country": prop.country.code,
+                    "property_type": prop.property_type,
+                }
+                for prop in properties
+            ],
+            "facets": facets,
+        }
+        cache.set(key, result, settings.FACETS_CACHE_SECONDS)
+
+    return result
@@ -9,7 +9,7 @@ from factory import fuzzy
 
 from users.factories import PropertyOwnerFactory
 
-from .models import Addon, Occurrence, Property, Room
+from .models import Addon, Occurrence, Property, RatePeriod, Room
 from .samples import ROOM_SAMPLES
 
 
@@ -94,6 +94,21 @@ class OccurrenceFactory(factory.django.DjangoModelFactory):
     )
 
 
+class RatePeriodFactory(factory.django.DjangoModelFactory):
+    """
+    Opens a room for a few nights at its default prices unless a rate is given.
+    """
+
+    class Meta:
+        model = RatePeriod
+
+    room = factory.SubFactory(RoomFactory)
+    start_date = factory.LazyFunction(timezone.localdate)
+    end_date = factory.LazyAttribute(lambda o: o.start_date + timedelta(days=6))
+    rate = None
+    availability = 1
+
+
 ADDON_CHOICES = [
     "towel",
     "lock",
@@ -0,0 +1,151 @@
+import uuid
+from datetime import datetime
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from django_countries import countries
+
+from .facets import ENSUITE_CHOICES
+from .models import Property, Room
+
+
+class SearchForm(forms.Form):
+    city = forms.CharField(
+        max_length=64,
+        required=False,
+        widget=forms.TextInput(attrs={"placeholder": "City", "class": "form-control"}),
+    )
+    check_in = forms.DateField(
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"})
+    )
+    check_out = forms.DateField(
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control"})
+    )
+    guests = forms.IntegerField(
+        min_value=1,
+        max_value=20,
+        initial=1,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+
+    def clean_check_in(self):
+        check_in = self.cleaned_data["check_in"]
+
+        if check_in < timezone.localdate():
+            error_msg = "Check in cannot be in the past."
+            raise ValidationError(error_msg, code="invalid")
+
+        return check_in
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in = cleaned_data.get("check_in")
+        check_out = cleaned_data.get("check_out")
+
+        if check_in and check_out and check_out <= check_in:
+            error_msg = "Check out must be after check in."
+            raise ValidationError(error_msg, code="invalid")
+
+        return cleaned_data
+
+
+class StayForm(SearchForm):
+    """
+    Dates and guests of a stay at one property.
+    """
+
+    city = None
+
+
+class NearbyForm(SearchForm):
+    """
+    Point and radius of a nearby search, optionally narrowed to a stay.
+    """
+
+    city = None
+    latitude = forms.FloatField(min_value=-90, max_value=90)
+    longitude = forms.FloatField(min_value=-180, max_value=180)
+    radius_km = forms.FloatField(min_value=0.1, max_value=200, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=100, required=False)
+    check_in = forms.DateField(required=False)
+    check_out = forms.DateField(required=False)
+    guests = forms.IntegerField(min_value=1, max_value=20, required=False)
+
+    def clean_check_in(self):
+        if self.cleaned_data["check_in"] is None:
+            return None
+
+        return super().clean_check_in()
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        if bool(cleaned_data.get("check_in")) != bool(cleaned_data.get("check_out")):
+            error_msg = "Check in and check out go together."
+            raise ValidationError(error_msg, code="invalid")
+
+        if not cleaned_data.get("check_in"):
+            cleaned_data.pop("guests", None)
+
+        # drop the empty optional fields so the search defaults apply
+        return {key: value for key, value in cleaned_data.items() if value is not None}
+
+
+class FacetForm(forms.Form):
+    """
+    Values picked in each facet of the property filter, see `properties.facets`.
+    """
+
+    property_type = forms.MultipleChoiceField(
+        choices=Property.PROPERTY_TYPE_CHOICES, required=False
+    )
+    country = forms.MultipleChoiceField(choices=countries, required=False)
+    room_type = forms.MultipleChoiceField(
+        choices=Room.ROOM_TYPE_CHOICES, required=False
+    )
+    grade = forms.MultipleChoiceField(choices=Room.GRADE_CHOICES, required=False)
+    ensuite = forms.TypedMultipleChoiceField(
+        choices=ENSUITE_CHOICES, coerce=lambda value: value == "true", required=False
+    )
+    limit = forms.IntegerField(min_value=1, max_value=100, required=False)
+
+
+class KeysetForm(forms.Form):
+    """
+    Position in the property list, the `(created, id)` of the property the page
+    starts after or ends before. See `cursor()` for the format.
+    """
+
+    after = forms.CharField(required=False)
+    before = forms.CharField(required=False)
+
+    @staticmethod
+    def cursor(prop):
+        return f"{prop.created.isoformat()}~{prop.id}"
+
+    @staticmethod
+    def parse(cursor):
+        if not cursor:
+            return None
+
+        error_msg = "Invalid page:%(cursor)s"
+        try:
+            created, pk = cursor.split("~")
+            created, pk = datetime.fromisoformat(created), uuid.UUID(pk)
+        except ValueError as e:
+            raise ValidationError(
+                error_msg, params={"cursor": cursor}, code="invalid"
+            ) from e
+
+        if timezone.is_naive(created):
+            raise ValidationError(error_msg, params={"cursor": cursor}, code="invalid")
+
+        return created, pk
+
+    def clean_after(self):
+        return self.parse(self.cleaned_data["after"])
+
+    def clean_before(self):
+        return self.parse(self.cleaned_data["before"])
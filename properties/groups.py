@@ -0,0 +1,119 @@
+"""
+Cheapest combinations of rooms for a group.
+
+A party too big for one room has to be split: dorm beds hold a guest each and a
+private room holds up to its `num_of_guests`, several of the same room when more
+than one is for sale. `combine()` finds the cheapest sets of rooms and quantities
+that sleep the whole party, from the units every room has free on all the nights
+of the stay and the price of one unit for the stay.
+
+It is a bounded knapsack solved by dynamic programming over the rooms. The state
+is the number of guests placed so far, capped at the party size, and holds the
+`limit` cheapest partial combinations reaching it. Rooms are taken biggest first
+and only add units while guests are left, so no combination holds a unit it could
+do without. The work is rooms x guests x units x `limit`, a few milliseconds for a
+40 room property, see the `benchmark_groups` command.
+"""
+
+import heapq
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# a room offered to the group: `units` for sale at `price` each, for `capacity`
+Option = namedtuple("Option", ["room", "capacity", "units", "price"])
+
+# `rooms` is a list of (room, quantity), `guests` the beds they add up to
+Combination = namedtuple("Combination", ["total", "rooms", "guests"])
+
+
+def combine(options, guests, limit=5):
+    """
+    The `limit` cheapest combinations of `options` for `guests` travellers,
+    cheapest first and fewer units first on equal totals.
+    """
+
+    options = sorted(options, key=lambda o: (-o.capacity, o.price))
+
+    # guests placed -> [(total, units, ((option, quantity), ...))]
+    best = {0: [(Decimal(0), 0, ())]}
+
+    for option in options:
+        step = {placed: list(partials) for placed, partials in best.items()}
+
+        for placed, partials in best.items():
+            most = min(option.units, -(-(guests - placed) // option.capacity))
+            for quantity in range(1, most + 1):
+                reached = min(guests, placed + quantity * option.capacity)
+                cost = option.price * quantity
+                step.setdefault(reached, []).extend(
+                    (total + cost, units + quantity, (*picked, (option, quantity)))
+                    for total, units, picked in partials
+                )
+
+        best = {
+            placed: heapq.nsmallest(limit, partials, key=lambda p: p[:2])
+            for placed, partials in step.items()
+        }
+
+    return [
+        Combination(
+            total,
+            [(option.room, quantity) for option, quantity in picked],
+            sum(option.capacity * quantity for option, quantity in picked),
+        )
+        for total, _, picked in best.get(guests, [])
+    ]
+
+
+def capacity(room):
+    return 1 if room.is_dorm() else room.num_of_guests
+
+
+def stay_options(rooms, check_in, check_out):
+    """
+    Options of rooms fetched by `quote_rooms()` for the same stay.
+    """
+
+    num_of_nights = (check_out - check_in).days
+
+    return [
+        Option(
+            room,
+            capacity(room),
+            room.stay_availability,
+            sum(night.rate for night in room.stay_nights),
+        )
+        for room in rooms
+        if room.active
+        and len(room.stay_nights) == num_of_nights
+        and not room.stay_restricted
+        and room.stay_availability > 0
+    ]
+
+
+def cheapest_combinations(prop, check_in, check_out, guests, limit=5):
+    """
+    The `limit` cheapest combinations of the rooms of `prop` for a stay of
+    `guests` travellers from `check_in` up to (but excluding) `check_out`, all
+    rooms quoted in one query by `RoomQuerySet.with_quote()`.
+    """
+
+    logger.info(
+        "combining rooms of property:%s from:%s till:%s guests:%s"
+        % (prop.id, check_in, check_out, guests)
+    )
+
+    rooms = prop.rooms.active().with_quote(check_in, check_out - timedelta(days=1))
+    options = [
+        Option(room, capacity(room), room.quote_availability, room.quote_total)
+        for room in rooms
+        if room.quote_covered
+        and not room.quote_restricted
+        and room.quote_availability > 0
+    ]
+
+    return combine(options, guests, limit)
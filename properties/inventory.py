@@ -0,0 +1,305 @@
+"""
+Optional per worker inventory cache for hot availability reads.
+
+`InventoryMatrix` keeps dense rooms x days arrays, availability, rate and the stay
+rules, for the next `INVENTORY_MATRIX_DAYS` days so range quotes become vectorized
+slices instead of aggregates in Postgres. Stale rooms are reloaded using the tokens
+in `properties.versions`, shared by all workers.
+
+The property page quotes its rooms from it, see `services.quote_rooms()`. With
+`INVENTORY_MATRIX_ENABLED` off every quote goes through SQL.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from timeit import default_timer as timer
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils import timezone
+
+import numpy as np
+
+from .models import Room
+from .versions import get_inventory_version, get_room_versions
+
+logger = logging.getLogger(__name__)
+
+MISSING = -1  # availability of a night without inventory
+
+Quote = namedtuple(
+    "Quote", ["availability", "total", "nights", "covered", "restricted"]
+)
+
+# a night of a room held by the matrix, the fields of `Night` quotes read
+MatrixNight = namedtuple("MatrixNight", ["for_date", "rate", "availability"])
+
+
+class InventoryMatrix:
+    """
+    Availability, rates (in cents) and stay rules of every active room for `days`
+    days from today. Nights without inventory hold `MISSING` availability, a zero
+    rate and no rules.
+    """
+
+    def __init__(self, days=365):
+        self.days = days
+        self.start = None
+        self.version = None
+        self.room_versions = {}
+        self.index = {}
+        self.availability = None
+        self.rates = None
+        self.min_stay = None
+        self.closed_to_arrival = None
+        self.closed_to_departure = None
+
+    def __repr__(self):
+        return f"InventoryMatrix rooms:{len(self.index)} days:{self.days} bytes:{self.nbytes}"
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=self.days - 1)
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the arrays and the room index.
+        """
+
+        if self.availability is None:
+            return 0
+
+        index_bytes = sum(
+            key.__sizeof__() + row.__sizeof__() for key, row in self.index.items()
+        )
+        arrays = (
+            self.availability,
+            self.rates,
+            self.min_stay,
+            self.closed_to_arrival,
+            self.closed_to_departure,
+        )
+        return (
+            sum(array.nbytes for array in arrays)
+            + self.index.__sizeof__()
+            + index_bytes
+        )
+
+    def covers(self, start, end):
+        return self.start is not None and self.start <= start and end <= self.end
+
+    def load(self):
+        """
+        Load the whole window for every active room.
+        """
+
+        start_time = timer()
+
+        self.start = timezone.localdate()
+        self.version = get_inventory_version()
+
+        room_ids = list(
+            Room.objects.active().order_by("id").values_list("id", flat=True)
+        )
+        self.index = {room_id: row for row, room_id in enumerate(room_ids)}
+        self.room_versions = get_room_versions(room_ids)
+
+        shape = (len(room_ids), self.days)
+        self.availability = np.full(shape, MISSING, dtype=np.int32)
+        self.rates = np.zeros(shape, dtype=np.int64)
+        self.min_stay = np.zeros(shape, dtype=np.int16)
+        self.closed_to_arrival = np.zeros(shape, dtype=np.bool_)
+        self.closed_to_departure = np.zeros(shape, dtype=np.bool_)
+
+        self._fill(room_ids)
+
+        logger.info(
+            "loaded %r in %.2f seconds" % (self, timer() - start_time),
+        )
+
+    def refresh(self):
+        """
+        Reload the rooms whose version changed since they were loaded and return
+        how many were reloaded. The whole matrix is reloaded once the day rolls over.
+        """
+
+        if self.start != timezone.localdate():
+            self.load()
+            return len(self.index)
+
+        version = get_inventory_version()
+        if version == self.version:
+            return 0
+
+        current = get_room_versions(self.index)
+        stale = [
+            room_id
+            for room_id, token in current.items()
+            if token != self.room_versions.get(room_id)
+        ]
+
+        self.version = version
+        self.room_versions = current
+
+        if stale:
+            rows = [self.index[room_id] for room_id in stale]
+            self.availability[rows] = MISSING
+            self.rates[rows] = 0
+            self.min_stay[rows] = 0
+            self.closed_to_arrival[rows] = False
+            self.closed_to_departure[rows] = False
+            self._fill(stale)
+
+        logger.info("reloaded %s stale rooms" % len(stale))
+
+        return len(stale)
+
+    def _fill(self, room_ids):
+        """
+        Copy the nights of the given rooms into the arrays. Offsets and cents are
+        computed by Postgres so the rows arrive as plain integers.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT room_id, for_date - %(start)s, availability,
+                       (rate * 100)::bigint, min_stay, closed_to_arrival::int,
+                       closed_to_departure::int
+                  FROM properties_night
+                 WHERE room_id = ANY(%(room_ids)s)
+                   AND for_date BETWEEN %(start)s AND %(end)s
+                   AND span_end >= %(start)s AND span_start <= %(end)s
+                """,
+                {"start": self.start, "end": self.end, "room_ids": list(room_ids)},
+            )
+            rows = np.array(cursor.fetchall(), dtype=np.int64)
+
+        if not len(rows):
+            return
+
+        index = np.fromiter(
+            (self.index[room_id] for room_id in rows[:, 0]),
+            dtype=np.intp,
+            count=len(rows),
+        )
+        self.availability[index, rows[:, 1]] = rows[:, 2]
+        self.rates[index, rows[:, 1]] = rows[:, 3]
+        self.min_stay[index, rows[:, 1]] = rows[:, 4]
+        self.closed_to_arrival[index, rows[:, 1]] = rows[:, 5]
+        self.closed_to_departure[index, rows[:, 1]] = rows[:, 6]
+
+    def quote_many(self, room_ids, start, end):
+        """
+        Quote the nights between `start` and `end` (both inclusive) for all the given
+        rooms at once. Same semantics as `RoomQuerySet.with_quote()`, the departure
+        night after `end` is read for its rules while the window holds it.
+        """
+
+        rows = np.fromiter((self.index[room_id] for room_id in room_ids), dtype=np.intp)
+        s, e = (start - self.start).days, (end - self.start).days + 1
+
+        restricted = (self.min_stay[rows, s] > e - s) | self.closed_to_arrival[rows, s]
+        if e < self.days:
+            restricted |= self.closed_to_departure[rows, e]
+
+        availability = self.availability[rows, s:e]
+        present = availability != MISSING
+        nights = present.sum(axis=1)
+
+        lowest = np.where(present, availability, np.iinfo(np.int32).max).min(axis=1)
+        lowest = np.where(nights > 0, lowest, 0)
+        totals = self.rates[rows, s:e].sum(axis=1)
+
+        return {
+            room_id: Quote(
+                availability=int(lowest[i]),
+                total=Decimal(int(totals[i])).scaleb(-2),
+                nights=int(nights[i]),
+                covered=bool(nights[i] == e - s),
+                restricted=bool(restricted[i]),
+            )
+            for i, room_id in enumerate(room_ids)
+        }
+
+    def stay_nights(self, room_id, start, end):
+        """
+        The nights with inventory of a room between `start` and `end` (both
+        inclusive), by date.
+        """
+
+        row = self.index[room_id]
+        s, e = (start - self.start).days, (end - self.start).days + 1
+
+        return [
+            MatrixNight(
+                for_date=self.start + timedelta(days=int(day)),
+                rate=Decimal(int(self.rates[row, day])).scaleb(-2),
+                availability=int(self.availability[row, day]),
+            )
+            for day in np.flatnonzero(self.availability[row, s:e] != MISSING) + s
+        ]
+
+
+_matrix = None
+
+
+def get_matrix():
+    """
+    Return the worker's matrix, loading it on first use and refreshing stale rooms
+    afterwards. Returns `None` when the matrix is disabled.
+    """
+
+    global _matrix  # noqa: PLW0603
+
+    if not settings.INVENTORY_MATRIX_ENABLED:
+        return None
+
+    if _matrix is None:
+        _matrix = InventoryMatrix(days=settings.INVENTORY_MATRIX_DAYS)
+        _matrix.load()
+    else:
+        _matrix.refresh()
+
+    return _matrix
+
+
+def quote_rooms(room_ids, start, end):
+    """
+    Quote several rooms for the nights between `start` and `end` (both inclusive)
+    from the worker's matrix, falling back to SQL for anything it does not hold.
+    """
+
+    if end < start:
+        error_msg = "End date:%(end)s cannot be less than Start date:%(start)s"
+        raise ValidationError(
+            error_msg,
+            params={"start": start, "end": end},
+            code="invalid",
+        )
+
+    room_ids = list(room_ids)
+    quotes = {}
+
+    matrix = get_matrix()
+    if matrix is not None and matrix.covers(start, end + timedelta(days=1)):
+        known = [room_id for room_id in room_ids if room_id in matrix.index]
+        quotes = matrix.quote_many(known, start, end)
+
+    missing = [room_id for room_id in room_ids if room_id not in quotes]
+    if missing:
+        qs = Room.objects.filter(id__in=missing).with_quote(start, end).order_by()
+        for room in qs:
+            quotes[room.id] = Quote(
+                availability=room.quote_availability,
+                total=room.quote_total,
+                nights=room.quote_nights,
+                covered=room.quote_covered,
+                restricted=room.quote_restricted,
+            )
+
+    return quotes
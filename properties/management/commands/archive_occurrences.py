@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from properties.partitions import add_months, archive_partitions, month_start
+
+
+class Command(BaseCommand):
+    help = (
+        "Detach the occurrence partitions of past months, archive them to gzipped "
+        "CSV files and drop them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=1,
+            help="Past months kept in the database besides the current one",
+        )
+        parser.add_argument(
+            "--directory",
+            type=Path,
+            default=settings.OCCURRENCE_ARCHIVE_DIR,
+            help="Where the archives are written",
+        )
+
+    def handle(self, **options):
+        before = add_months(month_start(timezone.localdate()), -options["keep_months"])
+        archived = archive_partitions(before, Path(options["directory"]))
+
+        total = 0
+        for month, path, rows in archived:
+            total += rows
+            self.stdout.write(f"  {month:%Y-%m}: {rows} nights to {path}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(archived)} partitions archived, {total} nights")
+        )
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Room
+from properties.services import fill_rate_periods, update_nights
+
+WEEKDAYS = range(1, 8)
+
+
+def undone(func):
+    """
+    Wrap `func` in a savepoint rolled back after every call, so each call finds
+    the same rows.
+    """
+
+    def wrapper():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the bulk rate editor's single upsert against a per night ORM loop "
+        "for a few rooms over a year"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=30)
+        parser.add_argument("--nights", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument(
+            "--loop-repeat",
+            type=int,
+            default=2,
+            help="Repetitions of the much slower ORM loop",
+        )
+
+    def handle(self, **options):
+        start = timezone.localdate()
+        end = start + timedelta(days=options["nights"] - 1)
+        repeat = options["repeat"]
+
+        with rollback():
+            properties = seed_properties(options["rooms"] // 10 or 1)
+            rooms = seed_rooms(properties, per_property=10)[: options["rooms"]]
+            room_ids = [room.id for room in rooms]
+
+            def upsert():
+                update_nights(room_ids, start, end, WEEKDAYS, rate=90, availability=3)
+
+            def upsert_rate():
+                update_nights(room_ids, start, end, WEEKDAYS, rate=90)
+
+            def orm_loop():
+                for room in rooms:
+                    night = start
+                    while night <= end:
+                        Occurrence.objects.update_or_create(
+                            room=room,
+                            for_date=night,
+                            defaults={"rate": 90, "availability": 3},
+                        )
+                        night += timedelta(days=1)
+
+            rows = [
+                ("upsert: no nights yet", measure(undone(upsert), repeat)),
+                (
+                    "orm loop: no nights yet",
+                    measure(undone(orm_loop), options["loop_repeat"]),
+                ),
+            ]
+
+            fill_rate_periods(room_ids, start, end)
+            analyze(Room, Occurrence)
+            rows.append(("upsert: rate periods", measure(undone(upsert), repeat)))
+            rows.append(
+                (
+                    "upsert: rate only, rate periods",
+                    measure(undone(upsert_rate), repeat),
+                )
+            )
+
+            seed_occurrences(room_ids, nights=options["nights"], start=start)
+            analyze(Occurrence)
+            rows.append(("upsert: every night exists", measure(undone(upsert), repeat)))
+            rows.append(
+                (
+                    "orm loop: every night exists",
+                    measure(undone(orm_loop), options["loop_repeat"]),
+                )
+            )
+
+            report(
+                self.stdout,
+                f"{len(room_ids)} rooms x {options['nights']} nights "
+                f"({len(room_ids) * options['nights']} nights per call)",
+                rows,
+            )
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.groups import cheapest_combinations
+from properties.models import Occurrence, Room
+
+
+class Command(BaseCommand):
+    help = "Measure cheapest_combinations() for groups on a property with many rooms"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dorms", type=int, default=10)
+        parser.add_argument("--privates", type=int, default=30)
+        parser.add_argument("--guests", nargs="+", type=int, default=[2, 9, 20])
+        parser.add_argument("--nights", type=int, default=5)
+        parser.add_argument("--limit", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, **options):
+        check_in = timezone.localdate() + timedelta(days=7)
+        check_out = check_in + timedelta(days=options["nights"])
+
+        with rollback():
+            (prop,) = seed_properties(1)
+            dorms = seed_rooms(
+                [prop],
+                per_property=options["dorms"],
+                room_type=Room.MIXED_DORM,
+                num_of_guests=8,
+                weekday_price=20,
+                weekend_price=25,
+            )
+            privates = []
+            for num_of_guests, price in ((2, 60), (3, 80), (4, 95), (6, 130)):
+                privates += seed_rooms(
+                    [prop],
+                    per_property=options["privates"] // 4,
+                    num_of_guests=num_of_guests,
+                    weekday_price=price,
+                    weekend_price=price + 20,
+                )
+            seed_occurrences([r.id for r in dorms], nights=30, availability=8)
+            seed_occurrences([r.id for r in privates], nights=30, availability=2)
+            analyze(Room, Occurrence)
+
+            self.stdout.write(
+                f"Property with {len(dorms)} dorms and {len(privates)} private rooms"
+            )
+
+            rows = [
+                (
+                    f"{guests} guests, top {options['limit']}",
+                    measure(
+                        lambda guests=guests: cheapest_combinations(
+                            prop, check_in, check_out, guests, options["limit"]
+                        ),
+                        options["repeat"],
+                    ),
+                )
+                for guests in options["guests"]
+            ]
+            report(self.stdout, "Group room combinations", rows)
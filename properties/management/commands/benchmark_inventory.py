@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.inventory import InventoryMatrix
+from properties.models import Occurrence, Room
+from properties.versions import bump_rooms
+
+
+class Command(BaseCommand):
+    help = "Compare the numpy inventory matrix with Room.get_availability()"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=2000)
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1, 50, 500])
+        parser.add_argument("--nights", type=int, default=7)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, **options):
+        sizes, nights = options["sizes"], options["nights"]
+        start = timezone.localdate() + timedelta(days=30)
+        end = start + timedelta(days=nights - 1)
+
+        with rollback():
+            properties = seed_properties(options["rooms"] // 20)
+            rooms = seed_rooms(properties, per_property=20)
+            room_ids = [room.id for room in rooms]
+            seed_occurrences(room_ids, nights=365)
+            analyze(Room, Occurrence)
+
+            matrix = InventoryMatrix()
+            rows = [("load matrix", measure(matrix.load, repeat=3))]
+            self.stdout.write(
+                f"Matrix holds {len(matrix.index)} rooms x {matrix.days} days "
+                f"in {matrix.nbytes / 1024 / 1024:.1f} MiB"
+            )
+
+            for size in sizes:
+                qs = Room.objects.filter(id__in=room_ids[:size])
+                ids = room_ids[:size]
+
+                def per_room(qs=qs):
+                    for room in qs:
+                        room.get_availability(start, end)
+
+                def batched(qs=qs):
+                    list(qs.with_quote(start, end))
+
+                def vectorized(ids=ids):
+                    matrix.quote_many(ids, start, end)
+
+                repeat = options["repeat"]
+                rows += [
+                    (f"{size} rooms: get_availability", measure(per_room, repeat)),
+                    (f"{size} rooms: with_quote", measure(batched, repeat)),
+                    (f"{size} rooms: matrix", measure(vectorized, repeat)),
+                ]
+
+            def refresh():
+                bump_rooms(room_ids[:10])
+                matrix.refresh()
+
+            rows.append(("refresh 10 stale rooms", measure(refresh, repeat)))
+            report(self.stdout, f"Availability for {nights} nights", rows)
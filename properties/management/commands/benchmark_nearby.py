@@ -0,0 +1,114 @@
+import math
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Property, Room
+from properties.services import EARTH_RADIUS_KM, nearby_properties
+
+# roughly the mainland of Argentina
+SOUTH, NORTH, WEST, EAST = -55.0, -22.0, -73.0, -54.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure nearby_properties() latency against a Python haversine over every "
+        "property"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=50000)
+        parser.add_argument("--radius", type=float, default=25)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        radius, limit = options["radius"], options["limit"]
+        check_in = timezone.localdate() + timedelta(days=1)
+        check_out = check_in + timedelta(days=2)
+
+        with rollback():
+            properties = seed_properties(options["properties"])
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE properties_property
+                       SET latitude = %s + random() * %s,
+                           longitude = %s + random() * %s
+                     WHERE id = ANY(%s)
+                    """,
+                    [
+                        SOUTH,
+                        NORTH - SOUTH,
+                        WEST,
+                        EAST - WEST,
+                        [prop.id for prop in properties],
+                    ],
+                )
+            rooms = seed_rooms(properties, per_property=1)
+            # only half the rooms are open for the stay
+            seed_occurrences([room.id for room in rooms[::2]], 2, start=check_in)
+            analyze(Property, Room, Occurrence)
+
+            def point():
+                return rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+
+            def nearest():
+                list(nearby_properties(*point(), radius_km=radius, limit=limit))
+
+            def nearest_available():
+                qs = nearby_properties(
+                    *point(),
+                    radius_km=radius,
+                    limit=limit,
+                    check_in=check_in,
+                    check_out=check_out,
+                )
+                list(qs)
+
+            def python_haversine():
+                latitude, longitude = point()
+                rows = Property.objects.filter(active=True).values_list(
+                    "id", "latitude", "longitude"
+                )
+                distances = sorted(
+                    (haversine(latitude, longitude, float(lat), float(lng)), pk)
+                    for pk, lat, lng in rows
+                )
+                [pk for distance, pk in distances[:limit] if distance <= radius]
+
+            repeat = options["repeat"]
+            rows = [
+                (f"nearest {limit} in {radius:g} km", measure(nearest, repeat)),
+                (
+                    f"nearest {limit} available in {radius:g} km",
+                    measure(nearest_available, repeat),
+                ),
+                ("python haversine full scan", measure(python_haversine, 5)),
+            ]
+            report(
+                self.stdout, f"Nearby search over {len(properties)} properties", rows
+            )
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
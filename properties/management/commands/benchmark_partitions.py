@@ -0,0 +1,162 @@
+import random
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Room
+from properties.partitions import (
+    add_months,
+    archive_partitions,
+    create_partitions,
+    month_start,
+    partition_name,
+)
+
+# The occurrences as they were before partitioning, read through a copy of the view
+CREATE_PLAIN_SQL = """
+    CREATE TABLE occurrence_plain AS SELECT * FROM properties_occurrence;
+    ALTER TABLE occurrence_plain ADD PRIMARY KEY (id);
+    CREATE UNIQUE INDEX occurrence_plain_room_date ON occurrence_plain (room_id, for_date);
+    CREATE INDEX occurrence_plain_room ON occurrence_plain (room_id);
+    ANALYZE occurrence_plain;
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare quotes, index sizes and the cleanup of past nights between the "
+        "monthly partitioned occurrences and a single table, on years of nights"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=1000)
+        parser.add_argument("--past-months", type=int, default=24)
+        parser.add_argument("--future-months", type=int, default=12)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        today = timezone.localdate()
+        first = add_months(month_start(today), -options["past_months"])
+        last = add_months(month_start(today), options["future_months"] + 1)
+
+        with rollback():
+            properties = seed_properties(options["rooms"])
+            room_ids = [room.id for room in seed_rooms(properties, per_property=1)]
+
+            create_partitions(first, options["past_months"] + options["future_months"])
+            nights = seed_occurrences(room_ids, (last - first).days, start=first)
+            analyze(Room, Occurrence)
+            # run the deferred foreign key checks now rather than in the cleanup
+            connection.check_constraints()
+            with connection.cursor() as cursor:
+                cursor.execute(CREATE_PLAIN_SQL)
+                cursor.execute("SELECT pg_get_viewdef('properties_night')")
+                (view,) = cursor.fetchone()
+                cursor.execute(
+                    "CREATE VIEW night_plain AS "
+                    + view.replace("properties_occurrence", "occurrence_plain")
+                )
+
+            def quote_sql():
+                check_in = today + timedelta(days=rng.randint(1, 300))
+                check_out = check_in + timedelta(days=rng.randint(1, 7))
+                qs = Room.objects.with_quote(check_in, check_out - timedelta(days=1))
+                qs = qs.order_by().filter(pk=rng.choice(room_ids))
+                return qs.query.sql_with_params()
+
+            def plain_sql():
+                sql, params = quote_sql()
+                return sql.replace('"properties_night"', "night_plain"), params
+
+            def run(make_sql):
+                with connection.cursor() as cursor:
+                    cursor.execute(*make_sql())
+                    cursor.fetchall()
+
+            def quotes():
+                repeat = options["repeat"]
+                return [
+                    ("get_cost single table", measure(lambda: run(plain_sql), repeat)),
+                    ("get_cost partitioned", measure(lambda: run(quote_sql), repeat)),
+                ]
+
+            rows = quotes()
+            report(
+                self.stdout,
+                f"Quotes over {nights} nights of {len(room_ids)} rooms, "
+                f"{first} to {last}",
+                rows,
+            )
+
+            before = add_months(month_start(today), -1)
+            self.cleanup(before)
+            report(
+                self.stdout, f"\nQuotes without the nights before {before}", quotes()
+            )
+
+            self.explain("Single table plan", plain_sql())
+            self.explain("Partitioned plan", quote_sql())
+            self.index_sizes(partition_name(month_start(today)))
+
+    def explain(self, title, query):
+        sql, params = query
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF, SUMMARY ON) {sql}", params
+            )
+            plan = [line for (line,) in cursor.fetchall()]
+
+        self.stdout.write(f"\n{title}")
+        for line in plan:
+            self.stdout.write(f"  {line}")
+
+    def index_sizes(self, partition):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT pg_relation_size('occurrence_plain_room_date'),
+                       pg_relation_size(%s::regclass)
+                """,
+                [f"{partition}_room_id_for_date_key"],
+            )
+            whole, month = cursor.fetchone()
+
+        self.stdout.write(
+            f"\n(room, for_date) index after the cleanup: {whole / 2**20:.1f} MB for the single table, "
+            f"{month / 2**20:.1f} MB for the partition of this month"
+        )
+
+    def cleanup(self, before):
+        with connection.cursor() as cursor:
+            begin = timer()
+            cursor.execute("DELETE FROM occurrence_plain WHERE for_date < %s", [before])
+            deleted = cursor.rowcount
+            delete_seconds = timer() - begin
+
+        with tempfile.TemporaryDirectory() as directory:
+            begin = timer()
+            archived = archive_partitions(before, Path(directory))
+            archive_seconds = timer() - begin
+            size = sum(path.stat().st_size for _, path, _ in archived)
+
+        self.stdout.write(
+            f"\nNights before {before}: DELETE {deleted} rows in {delete_seconds:.2f}s, "
+            f"archived {len(archived)} partitions ({size / 2**20:.1f} MB gzipped) "
+            f"and dropped them in {archive_seconds:.2f}s"
+        )
@@ -0,0 +1,51 @@
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_bookings,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Room
+from properties.pricing import reprice_properties
+
+
+class Command(BaseCommand):
+    help = "Time the nightly repricing of every room over a year"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--bookings", type=int, default=50000)
+
+    def handle(self, **options):
+        days = options["days"]
+
+        with rollback():
+            properties = seed_properties(options["rooms"] // 20)
+            rooms = seed_rooms(properties, per_property=20)
+            room_ids = [room.id for room in rooms]
+            seed_occurrences(room_ids, nights=days)
+            seed_bookings(room_ids, options["bookings"])
+            analyze(Room, Occurrence)
+
+            def dry_run():
+                list(reprice_properties(days, dry_run=True))
+
+            rows = [("dry run", measure(dry_run, repeat=3))]
+            report(
+                self.stdout,
+                f"Repricing {len(room_ids)} rooms x {days} days",
+                rows,
+            )
+
+            # a write only happens once, the next runs find the rates in place
+            begin = timer()
+            nights = sum(r.nights for r in reprice_properties(days))
+            self.stdout.write(f"Repriced {nights} nights in {timer() - begin:.1f}s")
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Min
+from django.test import RequestFactory
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_properties,
+    seed_rooms,
+)
+from properties.forms import KeysetForm
+from properties.models import Night, Property, RatePeriod, Room
+from properties.services import fill_rate_periods
+from properties.views import PropertyListView
+
+
+def cards_per_property(page, start, end):
+    """
+    The card figures of a page of properties with queries per property, what the
+    list would do reading them off `property.rooms`.
+    """
+
+    for prop in page:
+        prop.summary = prop.rooms.filter(active=True).aggregate(
+            num_of_rooms=Count("*"), max_guests=Max("num_of_guests")
+        )
+        prop.from_rate = Night.objects.filter(
+            room__property=prop,
+            room__active=True,
+            for_date__range=(start, end),
+            span_start__lte=end,
+            span_end__gte=start,
+            availability__gt=0,
+        ).aggregate(rate=Min("rate"))["rate"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the first and a deep page of the property list paged by keyset with "
+        "the card figures annotated, against paging by number"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=20_000)
+        parser.add_argument("--rooms", type=int, default=3, help="Rooms per property")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, **options):
+        today = timezone.localdate()
+        end = today + timedelta(days=PropertyListView.rate_days - 1)
+        repeat = options["repeat"]
+        # a page of the per card baseline takes seconds
+        slow_repeat = min(repeat, 3)
+
+        with rollback():
+            properties = seed_properties(options["properties"])
+            rooms = seed_rooms(properties, per_property=options["rooms"])
+            fill_rate_periods([room.id for room in rooms], today, end)
+            analyze(Property, Room, RatePeriod)
+
+            deep = len(properties) // 20
+            cursor = KeysetForm.cursor(Property.objects.all()[(deep - 1) * 20 - 1])
+
+            def offset(number):
+                page = Paginator(Property.objects.all(), 20).page(number)
+                cards_per_property(page, today, end)
+
+            def offset_summary(number):
+                qs = Property.objects.with_summary(today, end)
+                list(Paginator(qs, 20).page(number))
+
+            def keyset(params):
+                view = PropertyListView()
+                view.setup(RequestFactory().get("/", params))
+                view.paginate_queryset(view.get_queryset(), 20)
+
+            report(
+                self.stdout,
+                f"Property list of {len(properties)} properties, {len(rooms)} rooms",
+                [
+                    (
+                        "by number, per card: page 1",
+                        measure(lambda: offset(1), slow_repeat),
+                    ),
+                    (
+                        f"by number, per card: page {deep}",
+                        measure(lambda: offset(deep), slow_repeat),
+                    ),
+                    (
+                        "by number, annotated: page 1",
+                        measure(lambda: offset_summary(1), repeat),
+                    ),
+                    (
+                        f"by number, annotated: page {deep}",
+                        measure(lambda: offset_summary(deep), repeat),
+                    ),
+                    ("keyset, annotated: first", measure(lambda: keyset({}), repeat)),
+                    (
+                        f"keyset, annotated: page {deep}",
+                        measure(lambda: keyset({"after": cursor}), repeat),
+                    ),
+                ],
+            )
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.benchmarks import (
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Room
+
+
+class Command(BaseCommand):
+    help = "Compare per room quotes with the batched Room.objects.with_quote()"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1, 50, 500])
+        parser.add_argument("--nights", type=int, default=7)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, **options):
+        sizes, nights = options["sizes"], options["nights"]
+        start = timezone.localdate()
+        end = start + timedelta(days=nights - 1)
+
+        with rollback():
+            prop = seed_properties(1)[0]
+            rooms = seed_rooms([prop], per_property=max(sizes))
+            room_ids = [room.id for room in rooms]
+            seed_occurrences(room_ids, nights=nights, start=start)
+
+            rows = []
+            for size in sizes:
+                qs = Room.objects.filter(id__in=room_ids[:size])
+
+                def per_room(qs=qs):
+                    for room in qs:
+                        room.get_cost(start, end)
+                        room.get_availability(start, end)
+
+                def batched(qs=qs):
+                    list(qs.with_quote(start, end))
+
+                rows.append(
+                    (
+                        f"{size} rooms: get_cost + get_availability",
+                        measure(per_room, options["repeat"]),
+                    )
+                )
+                rows.append(
+                    (f"{size} rooms: with_quote", measure(batched, options["repeat"]))
+                )
+
+            report(self.stdout, f"Quotes for {nights} nights", rows)
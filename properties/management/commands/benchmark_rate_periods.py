@@ -0,0 +1,172 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_properties,
+    seed_rooms,
+    table_sizes,
+)
+from properties.models import Occurrence, RatePeriod, Room
+from properties.services import fill_rate_periods
+
+# Nights charged off the room's price, the same for both layouts: one in `every`
+# nights per room, spread by room id so runs do not line up across rooms.
+OVERRIDE_SQL = "(r.id + (d::date - %(start)s::date)) %% %(every)s = 0"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the size and read latency of one occurrence per night against "
+        "rate periods plus overrides for the same inventory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=5000)
+        parser.add_argument("--nights", type=int, default=365)
+        parser.add_argument(
+            "--override-every",
+            type=int,
+            default=20,
+            help="One night in this many is charged a custom rate",
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        start = timezone.localdate()
+        end = start + timedelta(days=options["nights"] - 1)
+        params = {"start": start, "end": end, "every": options["override_every"]}
+
+        with rollback():
+            sizes = [table_sizes(Occurrence, RatePeriod)]
+
+            nightly = self.seed_rooms(options["rooms"])
+            params["room_ids"] = nightly
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    INSERT INTO properties_occurrence
+                           (room_id, for_date, rate, availability)
+                    SELECT r.id, d::date,
+                           CASE WHEN extract(isodow FROM d) IN (5, 6)
+                                THEN r.weekend_price ELSE r.weekday_price END
+                           + CASE WHEN {OVERRIDE_SQL} THEN 7 ELSE 0 END,
+                           1
+                      FROM properties_room r
+                     CROSS JOIN generate_series(
+                           %(start)s::date, %(end)s::date, interval '1 day'
+                     ) d
+                     WHERE r.id = ANY(%(room_ids)s)
+                    """,
+                    params,
+                )
+            sizes.append(table_sizes(Occurrence, RatePeriod))
+
+            periods = self.seed_rooms(options["rooms"])
+            params["room_ids"] = periods
+            analyze(Room, Occurrence, RatePeriod)
+            for offset in range(0, len(periods), 500):
+                fill_rate_periods(periods[offset : offset + 500], start, end)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    INSERT INTO properties_occurrence
+                           (room_id, for_date, rate, availability)
+                    SELECT r.id, d::date,
+                           CASE WHEN extract(isodow FROM d) IN (5, 6)
+                                THEN r.weekend_price ELSE r.weekday_price END + 7,
+                           1
+                      FROM properties_room r
+                     CROSS JOIN generate_series(
+                           %(start)s::date, %(end)s::date, interval '1 day'
+                     ) d
+                     WHERE r.id = ANY(%(room_ids)s) AND {OVERRIDE_SQL}
+                    """,
+                    params,
+                )
+            sizes.append(table_sizes(Occurrence, RatePeriod))
+            analyze(Room, Occurrence, RatePeriod)
+
+            counts = [self.count_rows(nightly), self.count_rows(periods)]
+            self.report_sizes(sizes, counts)
+
+            rows, repeat = [], options["repeat"]
+            for label, room_ids in (("nightly", nightly), ("periods", periods)):
+                rows += self.measure_reads(label, room_ids, (start, end), rng, repeat)
+            report(self.stdout, "Reads", rows)
+
+    def seed_rooms(self, count):
+        properties = seed_properties(count // 10)
+        return [room.id for room in seed_rooms(properties, per_property=10)]
+
+    def report_sizes(self, sizes, counts):
+        """
+        Write the rows and the growth of each table for both layouts. The period
+        layout keeps its overrides in the occurrence table.
+        """
+
+        self.stdout.write("Storage")
+        self.stdout.write(
+            f"{'layout':<40} {'rows':>10} {'heap MB':>10} {'index MB':>10} "
+            f"{'total MB':>10}"
+        )
+        for label, previous, after, rows in (
+            ("nightly", sizes[0], sizes[1], counts[0]),
+            ("periods", sizes[1], sizes[2], counts[1]),
+        ):
+            for model in (Occurrence, RatePeriod):
+                table = model._meta.db_table
+                heap = after[table][0] - previous[table][0]
+                index = after[table][1] - previous[table][1]
+                name = f"{label}: {model._meta.verbose_name_plural}"
+                self.stdout.write(
+                    f"{name:<40} {rows[model]:>10} {heap / 2**20:>10.1f} "
+                    f"{index / 2**20:>10.1f} {(heap + index) / 2**20:>10.1f}"
+                )
+
+    def count_rows(self, room_ids):
+        return {
+            model: model.objects.filter(room__in=room_ids).count()
+            for model in (Occurrence, RatePeriod)
+        }
+
+    def measure_reads(self, label, room_ids, window, rng, repeat):
+        start, end = window
+        size = min(50, len(room_ids))
+
+        def stay():
+            check_in = start + timedelta(days=rng.randint(0, (end - start).days - 7))
+            return check_in, check_in + timedelta(days=6)
+
+        def quote_one():
+            Room.objects.get(id=rng.choice(room_ids)).get_cost(*stay())
+
+        def quote_many():
+            batch = rng.sample(room_ids, size)
+            list(Room.objects.filter(id__in=batch).with_quote(*stay()))
+
+        def bookable():
+            batch = rng.sample(room_ids, size)
+            check_in, last = stay()
+            qs = Room.objects.filter(id__in=batch)
+            list(qs.bookable(check_in, last + timedelta(days=1), guests=1))
+
+        def schedule():
+            room = Room.objects.get(id=rng.choice(room_ids))
+            list(room.nights.filter(for_date__range=(start, start + timedelta(30))))
+
+        return [
+            (f"{label}: get_cost 1 room 7 nights", measure(quote_one, repeat)),
+            (f"{label}: with_quote {size} rooms 7 nights", measure(quote_many, repeat)),
+            (f"{label}: bookable {size} rooms 7 nights", measure(bookable, repeat)),
+            (f"{label}: schedule 1 room 31 nights", measure(schedule, repeat)),
+        ]
@@ -0,0 +1,116 @@
+import logging
+import threading
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from base.benchmarks import percentile, seed_occurrences, seed_properties, seed_rooms
+from properties.models import Occurrence, Property, Room
+from properties.services import reserve_room
+
+
+class Command(BaseCommand):
+    help = (
+        "Race parallel checkouts through reserve_room(), for the last bed of one "
+        "room and for one room each, and report successes and throughput"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--nights", type=int, default=3)
+
+    def handle(self, **options):
+        workers, nights = options["workers"], options["nights"]
+        self.check_in = timezone.localdate() + timedelta(days=1)
+        self.check_out = self.check_in + timedelta(days=nights)
+
+        # every worker holds its own connection, so the rooms have to be committed
+        # and are deleted afterwards instead of rolled back
+        properties = seed_properties(workers // 10 + 1)
+        try:
+            rooms = seed_rooms(
+                properties,
+                per_property=10,
+                room_type=Room.MIXED_DORM,
+                num_of_guests=8,
+            )
+            room_ids = [room.id for room in rooms]
+            seed_occurrences(room_ids, nights=nights, start=self.check_in)
+
+            logging.disable(logging.INFO)  # per call logging would skew the timings
+
+            self.stdout.write(
+                f"{'case':<32} {'ok/round':>9} {'oversold':>9} {'checkouts/s':>12} "
+                f"{'p50 ms':>8} {'p95 ms':>8}"
+            )
+            for label, targets in (
+                ("last bed, one room", [room_ids[0]] * workers),
+                ("one room each", room_ids[:workers]),
+            ):
+                self.race(label, targets, options["rounds"])
+        finally:
+            logging.disable(logging.NOTSET)
+            Property.objects.filter(id__in=[p.id for p in properties]).delete()
+
+    def race(self, label, targets, rounds):
+        """
+        Start one checkout per target at the same time, `rounds` times, putting a
+        single bed back on every night of the targets before each round.
+        """
+
+        barrier = threading.Barrier(len(targets) + 1)
+        results = [[] for _ in targets]
+
+        def worker(index):
+            try:
+                for _ in range(rounds):
+                    barrier.wait()
+                    start = timer()
+                    try:
+                        with transaction.atomic():
+                            reserve_room(targets[index], self.check_in, self.check_out)
+                        ok = True
+                    except ValidationError:
+                        ok = False
+                    results[index].append((ok, (timer() - start) * 1000))
+                    barrier.wait()
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(len(targets))
+        ]
+        for thread in threads:
+            thread.start()
+
+        elapsed = 0
+        for _ in range(rounds):
+            Occurrence.objects.filter(room__in=set(targets)).update(availability=1)
+            barrier.wait()
+            start = timer()
+            barrier.wait()
+            elapsed += timer() - start
+
+        for thread in threads:
+            thread.join()
+
+        oversold = Occurrence.objects.filter(
+            room__in=set(targets), availability__lt=0
+        ).count()
+        successes = sum(ok for worker in results for ok, _ in worker)
+        expected = len(set(targets)) * rounds
+        if successes != expected or oversold:
+            error_msg = f"{label}: {successes} checkouts succeeded, expected {expected}"
+            raise CommandError(error_msg)
+
+        timings = sorted(ms for worker in results for _, ms in worker)
+        self.stdout.write(
+            f"{label:<32} {successes / rounds:>9.1f} {oversold:>9} "
+            f"{len(timings) / elapsed:>12.0f} {percentile(timings, 50):>8.2f} "
+            f"{percentile(timings, 95):>8.2f}"
+        )
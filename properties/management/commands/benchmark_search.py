@@ -0,0 +1,81 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Property, Room
+from properties.services import search_properties
+
+
+class Command(BaseCommand):
+    help = "Measure search_properties() latency over a seeded inventory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=5000)
+        parser.add_argument("--cities", type=int, default=50)
+        parser.add_argument("--occurrences", type=int, default=2_000_000)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        today = timezone.localdate()
+        cities = [f"City {i}" for i in range(options["cities"])]
+
+        with rollback():
+            properties = []
+            for city in cities:
+                count = options["properties"] // len(cities)
+                properties += seed_properties(count, city=city)
+
+            dorms = seed_rooms(
+                properties,
+                per_property=1,
+                room_type=Room.MIXED_DORM,
+                num_of_guests=8,
+                weekday_price=20,
+                weekend_price=25,
+            )
+            privates = seed_rooms(properties, per_property=2)
+
+            nights = max(options["occurrences"] // (len(dorms) + len(privates)), 14)
+            rows = seed_occurrences([r.id for r in dorms], nights, availability=8)
+            rows += seed_occurrences([r.id for r in privates], nights)
+            analyze(Property, Room, Occurrence)
+
+            self.stdout.write(
+                f"Seeded {len(properties)} properties, "
+                f"{len(dorms) + len(privates)} rooms and {rows} occurrences"
+            )
+
+            def search(city=True):
+                check_in = today + timedelta(days=rng.randint(0, nights - 8))
+                check_out = check_in + timedelta(days=rng.randint(1, 7))
+                qs = search_properties(
+                    check_in,
+                    check_out,
+                    guests=rng.randint(1, 4),
+                    city=rng.choice(cities) if city else None,
+                )
+                list(qs[:20])
+
+            rows = [
+                ("search by city", measure(search, options["repeat"])),
+                (
+                    "search everywhere (first 20)",
+                    measure(
+                        lambda: search(city=False), max(1, options["repeat"] // 10)
+                    ),
+                ),
+            ]
+            report(self.stdout, "Availability search", rows)
@@ -0,0 +1,86 @@
+import random
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Property, Room
+from properties.search_cache import cached_search, get_stats, reset_stats
+from properties.services import search_properties
+from properties.versions import bump_rooms
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the availability search with and without the search cache, "
+        "under a stream of inventory writes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=2000)
+        parser.add_argument("--cities", type=int, default=20)
+        parser.add_argument("--queries", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--write-every",
+            type=int,
+            default=20,
+            help="Bump the inventory of a random room every so many requests",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        rng = random.Random(options["seed"])
+        today = timezone.localdate()
+        cities = [f"City {i}" for i in range(options["cities"])]
+
+        with rollback():
+            properties = []
+            for city in cities:
+                count = options["properties"] // len(cities)
+                properties += seed_properties(count, city=city)
+
+            rooms = seed_rooms(properties, per_property=3)
+            room_ids = [room.id for room in rooms]
+            seed_occurrences(room_ids, nights=60)
+            analyze(Property, Room, Occurrence)
+
+            # travellers repeat a limited set of searches, like a real audience
+            queries = []
+            for _ in range(options["queries"]):
+                check_in = today + timedelta(days=rng.randint(0, 45))
+                check_out = check_in + timedelta(days=rng.randint(1, 7))
+                queries.append((check_in, check_out, rng.randint(1, 2)))
+
+            def load(search):
+                start = timer()
+                for i in range(options["requests"]):
+                    if i % options["write_every"] == 0:
+                        bump_rooms([rng.choice(room_ids)])
+                    check_in, check_out, guests = rng.choice(queries)
+                    list(search(check_in, check_out, guests, rng.choice(cities))[:20])
+                return options["requests"] / (timer() - start)
+
+            cache.clear()
+            reset_stats()
+            uncached = load(search_properties)
+            cached = load(cached_search)
+            stats = get_stats()
+
+        self.stdout.write(f"{'case':<40} {'req/s':>10}")
+        self.stdout.write(f"{'search_properties()':<40} {uncached:>10.1f}")
+        self.stdout.write(f"{'cached_search()':<40} {cached:>10.1f}")
+        self.stdout.write(
+            f"{stats['hits']} hits, {stats['misses']} misses, {stats['stale']} "
+            f"stale entries, hit ratio {stats['hit_ratio']:.1%}, "
+            f"throughput x{cached / uncached:.1f}"
+        )
@@ -0,0 +1,124 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from base.benchmarks import (
+    analyze,
+    measure,
+    report,
+    rollback,
+    seed_occurrences,
+    seed_properties,
+    seed_rooms,
+)
+from properties.models import Occurrence, Property, Room
+from properties.services import search_properties
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare search_properties() and room quotes with and without the stay "
+        "rules over a seeded inventory where some nights have rules"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=5000)
+        parser.add_argument("--cities", type=int, default=50)
+        parser.add_argument("--nights", type=int, default=120)
+        parser.add_argument(
+            "--restricted",
+            type=float,
+            default=0.2,
+            help="Share of the nights given a minimum stay or a closed arrival",
+        )
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, **options):
+        today = timezone.localdate()
+        cities = [f"City {i}" for i in range(options["cities"])]
+        nights = options["nights"]
+
+        with rollback():
+            properties = []
+            for city in cities:
+                count = options["properties"] // len(cities)
+                properties += seed_properties(count, city=city)
+
+            dorms = seed_rooms(
+                properties,
+                per_property=1,
+                room_type=Room.MIXED_DORM,
+                num_of_guests=8,
+                weekday_price=20,
+                weekend_price=25,
+            )
+            privates = seed_rooms(properties, per_property=2)
+            room_ids = [r.id for r in dorms + privates]
+
+            rows = seed_occurrences([r.id for r in dorms], nights, availability=8)
+            rows += seed_occurrences([r.id for r in privates], nights)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT setseed(%s)", [1 / options["seed"]])
+                cursor.execute(
+                    """
+                    UPDATE properties_occurrence
+                       SET min_stay = 1 + (random() * 4)::integer,
+                           closed_to_arrival = random() < 0.2
+                     WHERE room_id = ANY(%s) AND random() < %s
+                    """,
+                    [room_ids, options["restricted"]],
+                )
+                restricted = cursor.rowcount
+            analyze(Property, Room, Occurrence)
+
+            self.stdout.write(
+                f"Seeded {len(properties)} properties, {len(room_ids)} rooms and "
+                f"{rows} occurrences, {restricted} with stay rules"
+            )
+
+            def stays(rng):
+                check_in = today + timedelta(days=rng.randint(0, nights - 9))
+                check_out = check_in + timedelta(days=rng.randint(1, 7))
+                return check_in, check_out
+
+            # every case draws the same stays
+            def search(stay_rules):
+                rng = random.Random(options["seed"])
+
+                def run():
+                    check_in, check_out = stays(rng)
+                    qs = search_properties(
+                        check_in,
+                        check_out,
+                        guests=rng.randint(1, 4),
+                        city=rng.choice(cities),
+                        stay_rules=stay_rules,
+                    )
+                    list(qs[:20])
+
+                return run
+
+            def quote(stay_rules):
+                rng = random.Random(options["seed"])
+
+                def run():
+                    check_in, check_out = stays(rng)
+                    qs = Room.objects.filter(id__in=rng.sample(room_ids, 20))
+                    if stay_rules:
+                        qs = qs.with_stay_rules(check_in, check_out)
+                    list(qs)
+
+                return run
+
+            repeat = options["repeat"]
+            rows = [
+                ("search by city, no stay rules", measure(search(False), repeat)),
+                ("search by city, stay rules", measure(search(True), repeat)),
+                ("20 rooms, no stay rules", measure(quote(False), repeat)),
+                ("20 rooms, with_stay_rules()", measure(quote(True), repeat)),
+            ]
+            report(self.stdout, "Stay rules", rows)
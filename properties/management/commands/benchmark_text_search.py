@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+
+from base.benchmarks import analyze, measure, report, rollback, seed_properties
+from properties.models import Property
+from properties.search import search_text, update_search_vectors
+
+CITIES = ["Córdoba", "São Paulo", "Mendoza", "Florianópolis", "Bariloche", "Salta"]
+# the first words show up in most descriptions, the last ones in a few
+WORDS = [
+    "hostel", "centro", "piscina", "café", "desayuno", "wifi", "terraza",
+    "jardín", "montaña", "praia", "cozinha", "quarto", "balcón", "vinícola",
+    "glaciar", "kayak", "asado", "hamaca", "biblioteca", "observatorio",
+]  # fmt: skip
+
+
+class Command(BaseCommand):
+    help = "Compare the full text search with a naive icontains search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--properties", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, **options):
+        with rollback():
+            properties = seed_properties(options["properties"])
+            self.describe([prop.id for prop in properties])
+            update_search_vectors([prop.id for prop in properties])
+            analyze(Property)
+
+            rows = []
+            for text in ("hostel", "cordoba piscina", "observatorio kayak"):
+                rows += [
+                    (f"icontains '{text}'", self.measure(self.naive, text, options)),
+                    (
+                        f"full text '{text}'",
+                        self.measure(self.full_text, text, options),
+                    ),
+                ]
+            report(self.stdout, f"First page of {len(properties)} properties", rows)
+
+    def describe(self, property_ids):
+        """
+        Give the seeded properties a city and a description of words picked with
+        a skewed distribution.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE properties_property
+                   SET city = (%(cities)s::text[])[1 + (random() * 5)::integer],
+                       description = (
+                           SELECT string_agg(
+                                  (%(words)s::text[])[
+                                      1 + (power(random(), 3) * 19)::integer
+                                  ], ' ')
+                             FROM generate_series(1, 12)
+                            WHERE id IS NOT NULL
+                       )
+                 WHERE id = ANY(%(property_ids)s)
+                """,
+                {"cities": CITIES, "words": WORDS, "property_ids": property_ids},
+            )
+
+    def naive(self, text):
+        match = Q()
+        for word in text.split():
+            match &= (
+                Q(name__icontains=word)
+                | Q(city__icontains=word)
+                | Q(description__icontains=word)
+            )
+        return Property.objects.filter(match, active=True).order_by("name")
+
+    def full_text(self, text):
+        return search_text(Property.objects.filter(active=True), text)
+
+    def measure(self, search, text, options):
+        def first_page():
+            list(Paginator(search(text), 20).page(1))
+
+        return measure(first_page, options["repeat"])
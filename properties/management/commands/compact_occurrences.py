@@ -0,0 +1,55 @@
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from properties.models import Room
+from properties.services import compact_occurrences
+from properties.versions import bump_rooms
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold runs of upcoming occurrences sharing rate and availability into rate "
+        "periods, keeping only the one off nights as occurrences"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-nights",
+            type=int,
+            default=2,
+            help="Shortest run of nights turned into a period",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rooms written per statement"
+        )
+
+    def handle(self, **options):
+        today = timezone.localdate()
+        batch_size = options["batch_size"]
+
+        room_ids = list(Room.objects.order_by("id").values_list("id", flat=True))
+        total_rooms = len(room_ids)
+
+        begin = timer()
+        deleted = created = 0
+
+        for offset in range(0, total_rooms, batch_size):
+            batch = room_ids[offset : offset + batch_size]
+
+            counts = compact_occurrences(batch, today, options["min_nights"])
+            bump_rooms(batch)
+
+            deleted += counts[0]
+            created += counts[1]
+
+            done = min(offset + batch_size, total_rooms)
+            self.stdout.write(
+                f"  {done}/{total_rooms} rooms, {deleted} occurrences into "
+                f"{created} periods in {timer() - begin:.1f}s"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} occurrences folded into {created} periods")
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from properties.partitions import (
+    create_partitions,
+    default_partition_rows,
+    partition_name,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the monthly occurrence partitions ahead of time, moving their nights "
+        "out of the default partition"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=13,
+            help="Months from the current one which must have a partition",
+        )
+
+    def handle(self, **options):
+        created = create_partitions(timezone.localdate(), options["months"])
+
+        for month in created:
+            self.stdout.write(f"  {partition_name(month)}")
+
+        leftover = default_partition_rows()
+        if leftover:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{leftover} nights are in the default partition, create their "
+                    "months to move them"
+                )
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created"))
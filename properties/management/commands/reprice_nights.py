@@ -0,0 +1,75 @@
+from decimal import Decimal
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.models import Property
+from properties.pricing import reprice_properties
+
+
+def dollars(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprice the coming nights of every active property from PRICING_RULES, "
+        "writing the rates which moved"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=365, help="How many days ahead to reprice"
+        )
+        parser.add_argument(
+            "--property",
+            action="append",
+            dest="slugs",
+            metavar="SLUG",
+            help="Only reprice this property, can be repeated",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the rates that would change",
+        )
+
+    def handle(self, **options):
+        property_ids = None
+        if options["slugs"]:
+            property_ids = list(
+                Property.objects.filter(slug__in=options["slugs"]).values_list(
+                    "pk", flat=True
+                )
+            )
+            if len(property_ids) != len(set(options["slugs"])):
+                error_msg = "Unknown property in %s" % ", ".join(options["slugs"])
+                raise CommandError(error_msg)
+
+        dry_run = options["dry_run"]
+        begin = timer()
+        properties = nights = before = after = 0
+
+        for repricing in reprice_properties(options["days"], property_ids, dry_run):
+            properties += 1
+            if not repricing.nights:
+                continue
+
+            nights += repricing.nights
+            before += repricing.before
+            after += repricing.after
+            self.stdout.write(
+                f"  property:{repricing.property_id} {repricing.nights} nights, "
+                f"${dollars(repricing.before)} -> ${dollars(repricing.after)} "
+                f"({(repricing.after - repricing.before) / repricing.before:+.1%})"
+            )
+
+        verb = "would be repriced" if dry_run else "repriced"
+        change = f" ({(after - before) / before:+.1%})" if before else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{nights} nights of {properties} properties {verb}, "
+                f"${dollars(before)} -> ${dollars(after)}{change} "
+                f"in {timer() - begin:.1f}s"
+            )
+        )
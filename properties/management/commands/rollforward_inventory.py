@@ -0,0 +1,75 @@
+import calendar
+from datetime import timedelta
+from timeit import default_timer as timer
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from properties.models import Room
+from properties.services import count_missing_nights, fill_rate_periods
+from properties.versions import bump_rooms
+
+
+class Command(BaseCommand):
+    help = (
+        "Open every active room at its weekday and weekend prices for the nights "
+        "without inventory in the coming days, as rate periods"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="How many days ahead to fill, rounded up to the end of the month",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Rooms written per statement"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the nights that would be opened",
+        )
+
+    def handle(self, **options):
+        start = timezone.localdate()
+        end = start + timedelta(days=options["days"] - 1)
+        # whole months keep the daily runs from creating a period per night
+        end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+        batch_size = options["batch_size"]
+
+        room_ids = list(
+            Room.objects.active().order_by("id").values_list("id", flat=True)
+        )
+        total_rooms = len(room_ids)
+
+        self.stdout.write(
+            f"Rolling forward {total_rooms} rooms from {start} till {end}"
+        )
+
+        begin = timer()
+        nights = periods = 0
+
+        for offset in range(0, total_rooms, batch_size):
+            batch = room_ids[offset : offset + batch_size]
+
+            if options["dry_run"]:
+                created = count_missing_nights(batch, start, end)
+            else:
+                created = fill_rate_periods(batch, start, end)
+                bump_rooms(batch)
+
+            nights += created[0]
+            periods += created[1]
+
+            done = min(offset + batch_size, total_rooms)
+            self.stdout.write(
+                f"  {done}/{total_rooms} rooms, {nights} nights in {periods} periods "
+                f"in {timer() - begin:.1f}s"
+            )
+
+        verb = "would be opened" if options["dry_run"] else "opened"
+        self.stdout.write(
+            self.style.SUCCESS(f"{nights} nights in {periods} periods {verb}")
+        )
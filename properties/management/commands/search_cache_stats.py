@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from properties.search_cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Report the hits, misses and stale entries of the availability search cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Start counting again afterwards"
+        )
+
+    def handle(self, **options):
+        stats = get_stats()
+        self.stdout.write(
+            f"{stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['stale']} stale entries, hit ratio {stats['hit_ratio']:.1%}"
+        )
+
+        if options["reset"]:
+            reset_stats()
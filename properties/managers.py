@@ -1,7 +1,26 @@
 import logging
 from datetime import timedelta
+from decimal import Decimal
 
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -20,3 +39,211 @@ class FutureManager(models.Manager):
 
     def __repr__(self):
         return "Occurrence Future Manager 🔮"
+
+
+class RoomQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(active=True)
+
+    def _nights(self, start, end):
+        """
+        Nights of the outer room between `start` and `end` (both inclusive), grouped
+        by room so they can be aggregated inside a subquery.
+
+        Nights come from the `properties_night` view, occurrences and expanded rate
+        periods. Postgres cannot push a join into the view but it does push a
+        filter on the room, so correlated subqueries turn into index lookups on
+        both tables. The range is applied to the night and to the span it came
+        from so only the periods overlapping it are expanded.
+        """
+
+        if end < start:
+            error_msg = "End date:%(end)s cannot be less than Start date:%(start)s"
+            raise ValidationError(
+                error_msg,
+                params={"start": start, "end": end},
+                code="invalid",
+            )
+
+        night_model = self.model._meta.get_field("nights").related_model
+        nights = night_model.objects.filter(
+            room=OuterRef("pk"),
+            for_date__range=(start, end),
+            span_start__lte=end,
+            span_end__gte=start,
+        )
+        return nights.order_by().values("room")
+
+    @staticmethod
+    def _broken_rules(check_in, check_out):
+        """
+        Count, over the nights of a stay and its departure night, the stay rules a
+        stay from `check_in` up to `check_out` breaks: the arrival night's minimum
+        stay and closed to arrival, and the departure night's closed to departure.
+        """
+
+        num_of_nights = (check_out - check_in).days
+        arrival = Q(for_date=check_in) & (
+            Q(min_stay__gt=num_of_nights) | Q(closed_to_arrival=True)
+        )
+        departure = Q(for_date=check_out, closed_to_departure=True)
+        return Count("for_date", filter=arrival | departure)
+
+    def with_stay_rules(self, check_in, check_out):
+        """
+        Annotate every room with `stay_restricted`, True if a stay from `check_in`
+        up to (but excluding) `check_out` breaks one of the stay rules of its
+        arrival or departure night. Nights without inventory have no rules.
+
+        The rules are evaluated by one correlated subquery reading those two
+        nights, not night by night in Python.
+        """
+
+        nights = self._nights(check_in, check_out).filter(
+            for_date__in=(check_in, check_out)
+        )
+        broken = nights.annotate(value=self._broken_rules(check_in, check_out))
+
+        qs = self.alias(stay_broken_rules=Coalesce(Subquery(broken.values("value")), 0))
+        return qs.annotate(
+            stay_restricted=ExpressionWrapper(
+                Q(stay_broken_rules__gt=0), output_field=BooleanField()
+            )
+        )
+
+    def with_quote(self, start, end):
+        """
+        Annotate every room with its quote for the nights between `start` and `end`
+        (both inclusive) in a single query.
+
+            quote_availability  min availability over the nights found
+            quote_total         sum of the rates over the nights found
+            quote_nights        number of nights with inventory
+            quote_covered       True if every night in the range has inventory
+            quote_restricted    True if a stay over the range breaks a stay rule,
+                                see `with_stay_rules()`
+        """
+
+        nights = self._nights(start, end)
+        num_of_nights = (end - start).days + 1
+
+        def aggregate(expression, default):
+            return Coalesce(
+                Subquery(nights.annotate(value=expression).values("value")),
+                default,
+            )
+
+        qs = self.with_stay_rules(start, end + timedelta(days=1))
+        qs = qs.annotate(
+            quote_availability=aggregate(Min("availability"), 0),
+            quote_total=aggregate(
+                Sum("rate"),
+                Value(
+                    Decimal(0),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ),
+            ),
+            quote_nights=aggregate(Count("*"), 0),
+            quote_restricted=F("stay_restricted"),
+        )
+        return qs.annotate(
+            quote_covered=ExpressionWrapper(
+                Q(quote_nights=num_of_nights), output_field=BooleanField()
+            )
+        )
+
+    def bookable(self, check_in, check_out, guests, stay_rules=True):
+        """
+        Active rooms that can host the whole party for every night from `check_in`
+        up to (but excluding) `check_out`, annotated with the `stay_total`.
+
+        Dorms need a free bed per guest and are charged per bed while private
+        rooms must fit the party on their own and are charged per room. Stays
+        breaking a stay rule are left out unless `stay_rules` is False.
+
+        Coverage, availability, the stay rules and the total are checked by one
+        subquery which returns NULL when the room cannot host the party, instead
+        of filtering on the separate `with_quote()` figures. It reads the
+        departure night too, for its rules, and leaves it out of the rest.
+        """
+
+        dorm_types = self.model.DORM_ROOM_TYPES
+        num_of_nights = (check_out - check_in).days
+
+        qs = self.active().filter(
+            Q(room_type__in=dorm_types) | Q(num_of_guests__gte=guests)
+        )
+        qs = qs.alias(
+            units=Case(
+                When(room_type__in=dorm_types, then=Value(guests)),
+                default=Value(1),
+            )
+        )
+
+        stay = Q(for_date__lt=check_out)
+        stays = self._nights(check_in, check_out)
+        stays = stays.annotate(
+            num_of_nights=Count("for_date", filter=stay),
+            lowest=Min("availability", filter=stay),
+            total=ExpressionWrapper(
+                Sum("rate", filter=stay) * OuterRef("units"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        stays = stays.filter(num_of_nights=num_of_nights, lowest__gte=OuterRef("units"))
+        if stay_rules:
+            stays = stays.alias(
+                broken_rules=self._broken_rules(check_in, check_out)
+            ).filter(broken_rules=0)
+
+        qs = qs.annotate(stay_total=Subquery(stays.values("total")))
+        return qs.filter(stay_total__isnull=False)
+
+
+class PropertyQuerySet(models.QuerySet):
+    def with_rooms(self):
+        """
+        Annotate every property with the `num_of_rooms` of its active rooms and the
+        `max_guests` one of them hosts, as correlated subqueries.
+        """
+
+        room_model = self.model._meta.get_field("rooms").related_model
+        rooms = room_model.objects.active().filter(property=OuterRef("pk"))
+        rooms = rooms.order_by().values("property")
+
+        return self.annotate(
+            num_of_rooms=Coalesce(
+                Subquery(rooms.annotate(value=Count("*")).values("value")), 0
+            ),
+            max_guests=Coalesce(
+                Subquery(rooms.annotate(value=Max("num_of_guests")).values("value")),
+                0,
+            ),
+        )
+
+    def with_summary(self, start, end):
+        """
+        Annotate every property with what its card on the list shows, in the same
+        query as the properties:
+
+            from_rate       lowest rate of a night with availability between `start`
+                            and `end` (both inclusive) over its active rooms
+            num_of_rooms    number of active rooms, see `with_rooms()`
+            max_guests      most guests one of its active rooms hosts
+
+        Each one is a correlated subquery so Postgres only computes them for the
+        rows of the page. The lowest rate is looked up room by room, a filter on
+        the room is the only one the night view can use its indexes for.
+        """
+
+        room_model = self.model._meta.get_field("rooms").related_model
+        rooms = room_model.objects.active().filter(property=OuterRef("pk"))
+
+        nights = room_model.objects.all()._nights(start, end).filter(availability__gt=0)
+        lowest = rooms.annotate(
+            value=Subquery(nights.annotate(value=Min("rate")).values("value"))
+        ).order_by(F("value").asc(nulls_last=True))
+
+        return self.with_rooms().annotate(
+            from_rate=Subquery(lowest.values("value")[:1])
+        )
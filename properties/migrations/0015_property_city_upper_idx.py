@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-18 08:09
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("properties", "0014_alter_room_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                django.db.models.functions.text.Upper("city"),
+                name="property_city_upper_idx",
+            ),
+        ),
+    ]
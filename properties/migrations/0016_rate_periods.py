@@ -0,0 +1,149 @@
+# Generated by Django 5.0.14 on 2026-10-18 08:28
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Occurrences are nights on their own, rate periods expand to every night without
+# an occurrence. The id packs the room and the date so it is stable and unique.
+# Both branches must yield the exact same column types, typmods included, for
+# Postgres to flatten the union and push a join on room_id into each of them.
+CREATE_NIGHT_VIEW = """
+CREATE VIEW properties_night AS
+SELECT o.room_id::bigint * 100000 + (o.for_date - date '2000-01-01') AS id,
+       o.room_id,
+       o.for_date,
+       o.rate,
+       o.availability,
+       o.id AS occurrence_id,
+       NULL::bigint AS period_id,
+       o.for_date AS span_start,
+       o.for_date AS span_end
+  FROM properties_occurrence o
+ UNION ALL
+SELECT p.room_id::bigint * 100000 + (d::date - date '2000-01-01'),
+       p.room_id,
+       d::date,
+       COALESCE(
+           p.rate,
+           CASE WHEN extract(isodow FROM d) IN (5, 6)
+                THEN r.weekend_price ELSE r.weekday_price END
+       )::numeric(12, 2),
+       p.availability,
+       NULL::bigint,
+       p.id,
+       p.start_date,
+       p.end_date
+  FROM properties_rateperiod p
+  JOIN properties_room r ON r.id = p.room_id
+ CROSS JOIN LATERAL generate_series(
+       p.start_date::timestamp, p.end_date::timestamp, interval '1 day'
+ ) d
+ WHERE NOT EXISTS (
+       SELECT 1 FROM properties_occurrence o
+        WHERE o.room_id = p.room_id AND o.for_date = d::date
+ )
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("properties", "0015_property_city_upper_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Night",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("for_date", models.DateField(verbose_name="For Date")),
+                (
+                    "rate",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=12, verbose_name="Rate"
+                    ),
+                ),
+                (
+                    "availability",
+                    models.PositiveIntegerField(verbose_name="Availability"),
+                ),
+                ("span_start", models.DateField()),
+                ("span_end", models.DateField()),
+            ],
+            options={
+                "verbose_name": "Night",
+                "verbose_name_plural": "Nights",
+                "db_table": "properties_night",
+                "ordering": ("for_date",),
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="RatePeriod",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start_date", models.DateField(verbose_name="Start Date")),
+                ("end_date", models.DateField(verbose_name="End Date")),
+                (
+                    "rate",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Leave empty to charge the room's weekday and weekend prices",
+                        max_digits=12,
+                        null=True,
+                        validators=[django.core.validators.MinValueValidator(1)],
+                        verbose_name="Rate",
+                    ),
+                ),
+                (
+                    "availability",
+                    models.PositiveIntegerField(
+                        default=1,
+                        validators=[django.core.validators.MaxValueValidator(20)],
+                        verbose_name="Availability",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rate_periods",
+                        to="properties.room",
+                        verbose_name="Room",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rate Period",
+                "verbose_name_plural": "Rate Periods",
+                "ordering": ("start_date",),
+                "indexes": [
+                    models.Index(
+                        fields=["room", "end_date", "start_date"],
+                        name="rate_period_room_end_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="rateperiod",
+            constraint=models.CheckConstraint(
+                check=models.Q(("end_date__gte", models.F("start_date"))),
+                name="rate_period_end_after_start",
+            ),
+        ),
+        migrations.RunSQL(
+            CREATE_NIGHT_VIEW,
+            reverse_sql="DROP VIEW properties_night",
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0016_rate_periods"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                condition=models.Q(("active", True)),
+                fields=["latitude", "longitude"],
+                name="property_active_lat_lng_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Accent folding for the site's languages without the unaccent extension, which
+# is not available on every server. It is IMMUTABLE so indexes and generated
+# values may use it.
+CREATE_UNACCENT = """
+CREATE FUNCTION properties_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$ SELECT translate($1, 'ÁÀÂÃÄÅáàâãäåÉÈÊËéèêëÍÌÎÏíìîïÓÒÔÕÖóòôõöÚÙÛÜúùûüÇçÑñÝýÿ', 'AAAAAAaaaaaaEEEEeeeeIIIIiiiiOOOOOoooooUUUUuuuuCcNnYyy') $$
+"""
+
+BACKFILL_SEARCH_VECTORS = """
+UPDATE properties_property p
+   SET search_vector =
+       setweight(to_tsvector('simple', properties_unaccent(p.name)), 'A')
+       || setweight(to_tsvector('simple', properties_unaccent(p.city)), 'B')
+       || setweight(to_tsvector('simple', properties_unaccent(p.description)), 'C')
+       || setweight(to_tsvector('simple', properties_unaccent(coalesce((
+              SELECT string_agg(r.description, ' ')
+                FROM properties_room r
+               WHERE r.property_id = p.id
+          ), ''))), 'D')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0017_property_lat_lng_index"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            CREATE_UNACCENT, reverse_sql="DROP FUNCTION properties_unaccent(text)"
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="property_search_vector_idx"
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTORS, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,126 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CREATE_NIGHT_VIEW = import_module(
+    "properties.migrations.0016_rate_periods"
+).CREATE_NIGHT_VIEW
+
+# Move the current table out of the way, index and sequence names are global.
+RENAME_OCCURRENCES = """
+DROP VIEW properties_night;
+ALTER TABLE properties_occurrence RENAME TO properties_occurrence_old;
+ALTER SEQUENCE properties_occurrence_id_seq RENAME TO properties_occurrence_old_id_seq;
+ALTER INDEX properties_occurrence_pkey RENAME TO properties_occurrence_old_pkey;
+ALTER INDEX unique_occurrence RENAME TO unique_occurrence_old;
+ALTER INDEX IF EXISTS properties_occurrence_room_id_29ce10be
+      RENAME TO properties_occurrence_old_room_id;
+"""
+
+# Same columns and constraint names Django created, the primary key has to include
+# the partition key. The index on the room alone is dropped, unique_occurrence
+# serves the same lookups and every partition would carry a copy.
+CREATE_OCCURRENCES = """
+CREATE TABLE properties_occurrence (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    rate numeric(12, 2) NOT NULL,
+    availability integer NOT NULL
+        CONSTRAINT properties_occurrence_availability_check
+        CHECK (availability >= 0),
+    for_date date NOT NULL,
+    room_id bigint NOT NULL
+        CONSTRAINT properties_occurrence_room_id_29ce10be_fk_properties_room_id
+        REFERENCES properties_room (id) DEFERRABLE INITIALLY DEFERRED,
+    CONSTRAINT properties_occurrence_pkey PRIMARY KEY ({primary_key}),
+    CONSTRAINT unique_occurrence UNIQUE (room_id, for_date)
+) {partitioning};
+"""
+
+CREATE_ROOM_INDEX = """
+CREATE INDEX properties_occurrence_room_id_29ce10be
+    ON properties_occurrence (room_id);
+"""
+
+# One partition per month holding data up to a year ahead, anything outside them
+# lands in the default partition until `partition_occurrences` creates its month.
+CREATE_PARTITIONS = """
+CREATE TABLE properties_occurrence_default
+    PARTITION OF properties_occurrence DEFAULT;
+
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+                   date_trunc('month', least(min(for_date), current_date)),
+                   date_trunc(
+                       'month',
+                       greatest(max(for_date), current_date + interval '1 year')
+                   ),
+                   interval '1 month'
+               )::date
+          FROM properties_occurrence_old
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF properties_occurrence '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'properties_occurrence_p' || to_char(month, 'YYYYMM'),
+            month,
+            (month + interval '1 month')::date
+        );
+    END LOOP;
+END
+$$;
+"""
+
+COPY_OCCURRENCES = f"""
+INSERT INTO properties_occurrence (id, rate, availability, for_date, room_id)
+SELECT id, rate, availability, for_date, room_id FROM properties_occurrence_old;
+
+SELECT setval(
+    pg_get_serial_sequence('properties_occurrence', 'id'),
+    coalesce(max(id), 0) + 1,
+    false
+) FROM properties_occurrence;
+
+DROP TABLE properties_occurrence_old;
+{CREATE_NIGHT_VIEW};
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("properties", "0018_property_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            RENAME_OCCURRENCES
+            + CREATE_OCCURRENCES.format(
+                primary_key="id, for_date", partitioning="PARTITION BY RANGE (for_date)"
+            )
+            + CREATE_PARTITIONS
+            + COPY_OCCURRENCES,
+            reverse_sql=RENAME_OCCURRENCES
+            + CREATE_OCCURRENCES.format(primary_key="id", partitioning="")
+            + CREATE_ROOM_INDEX
+            + COPY_OCCURRENCES,
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="occurrence",
+                    name="room",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrences",
+                        to="properties.room",
+                        verbose_name="Room",
+                    ),
+                ),
+            ],
+        ),
+    ]
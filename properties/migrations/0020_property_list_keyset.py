@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0019_partition_occurrences"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="property",
+            options={
+                "ordering": ["-created", "-id"],
+                "verbose_name": "Property",
+                "verbose_name_plural": "Properties",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                fields=["-created", "-id"], name="property_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,137 @@
+from importlib import import_module
+
+import django.core.validators
+from django.db import migrations, models
+
+OLD_NIGHT_VIEW = import_module(
+    "properties.migrations.0016_rate_periods"
+).CREATE_NIGHT_VIEW
+
+# Same view with the stay rules of the row each night came from appended, see
+# 0016_rate_periods for why both branches must yield the exact same types.
+CREATE_NIGHT_VIEW = """
+CREATE VIEW properties_night AS
+SELECT o.room_id::bigint * 100000 + (o.for_date - date '2000-01-01') AS id,
+       o.room_id,
+       o.for_date,
+       o.rate,
+       o.availability,
+       o.id AS occurrence_id,
+       NULL::bigint AS period_id,
+       o.for_date AS span_start,
+       o.for_date AS span_end,
+       o.min_stay,
+       o.closed_to_arrival,
+       o.closed_to_departure
+  FROM properties_occurrence o
+ UNION ALL
+SELECT p.room_id::bigint * 100000 + (d::date - date '2000-01-01'),
+       p.room_id,
+       d::date,
+       COALESCE(
+           p.rate,
+           CASE WHEN extract(isodow FROM d) IN (5, 6)
+                THEN r.weekend_price ELSE r.weekday_price END
+       )::numeric(12, 2),
+       p.availability,
+       NULL::bigint,
+       p.id,
+       p.start_date,
+       p.end_date,
+       p.min_stay,
+       p.closed_to_arrival,
+       p.closed_to_departure
+  FROM properties_rateperiod p
+  JOIN properties_room r ON r.id = p.room_id
+ CROSS JOIN LATERAL generate_series(
+       p.start_date::timestamp, p.end_date::timestamp, interval '1 day'
+ ) d
+ WHERE NOT EXISTS (
+       SELECT 1 FROM properties_occurrence o
+        WHERE o.room_id = p.room_id AND o.for_date = d::date
+ )
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("properties", "0020_property_list_keyset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="occurrence",
+            name="min_stay",
+            field=models.PositiveSmallIntegerField(
+                db_default=1,
+                default=1,
+                help_text="Fewest nights of a stay arriving on this night",
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="Minimum Stay",
+            ),
+        ),
+        migrations.AddField(
+            model_name="occurrence",
+            name="closed_to_arrival",
+            field=models.BooleanField(
+                db_default=False, default=False, verbose_name="Closed to Arrival"
+            ),
+        ),
+        migrations.AddField(
+            model_name="occurrence",
+            name="closed_to_departure",
+            field=models.BooleanField(
+                db_default=False,
+                default=False,
+                help_text="Guests cannot check out on this date",
+                verbose_name="Closed to Departure",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rateperiod",
+            name="min_stay",
+            field=models.PositiveSmallIntegerField(
+                db_default=1,
+                default=1,
+                help_text="Fewest nights of a stay arriving on this night",
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="Minimum Stay",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rateperiod",
+            name="closed_to_arrival",
+            field=models.BooleanField(
+                db_default=False, default=False, verbose_name="Closed to Arrival"
+            ),
+        ),
+        migrations.AddField(
+            model_name="rateperiod",
+            name="closed_to_departure",
+            field=models.BooleanField(
+                db_default=False,
+                default=False,
+                help_text="Guests cannot check out on this date",
+                verbose_name="Closed to Departure",
+            ),
+        ),
+        migrations.AddField(
+            model_name="night",
+            name="min_stay",
+            field=models.PositiveSmallIntegerField(verbose_name="Minimum Stay"),
+        ),
+        migrations.AddField(
+            model_name="night",
+            name="closed_to_arrival",
+            field=models.BooleanField(verbose_name="Closed to Arrival"),
+        ),
+        migrations.AddField(
+            model_name="night",
+            name="closed_to_departure",
+            field=models.BooleanField(verbose_name="Closed to Departure"),
+        ),
+        migrations.RunSQL(
+            "DROP VIEW properties_night;" + CREATE_NIGHT_VIEW,
+            reverse_sql="DROP VIEW properties_night;" + OLD_NIGHT_VIEW,
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0021_stay_rules"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="occurrence",
+            name="base_rate",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="The rate before repricing, see `properties.pricing`",
+                max_digits=12,
+                null=True,
+                verbose_name="Base Rate",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rateperiod",
+            name="base_rate",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="The rate before repricing, see `properties.pricing`",
+                max_digits=12,
+                null=True,
+                verbose_name="Base Rate",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0022_base_rate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Version",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=255,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Key",
+                    ),
+                ),
+                ("token", models.CharField(max_length=32, verbose_name="Token")),
+            ],
+            options={
+                "verbose_name": "Version",
+                "verbose_name_plural": "Versions",
+            },
+        ),
+    ]
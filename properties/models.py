@@ -3,10 +3,13 @@ import uuid
 from decimal import Decimal
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from django.db import models
-from django.db.models import Min, Sum
+from django.db.models import F, Q
+from django.db.models.functions import Upper
 from django.urls import reverse_lazy
 from django.utils import timezone
 from django.utils.text import slugify
@@ -14,7 +17,7 @@ from django.utils.translation import gettext_lazy as _
 
 from django_countries.fields import CountryField
 
-from .managers import FutureManager
+from .managers import FutureManager, PropertyQuerySet, RoomQuerySet
 
 logger = logging.getLogger(__name__)
 
@@ -79,16 +82,30 @@ class Property(models.Model):
 
     active = models.BooleanField(_("Active"), default=True)
 
+    # kept up to date by properties.signals, see properties/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
-    objects = models.Manager()
+    objects = PropertyQuerySet.as_manager()
     hostels = HostelManager()
 
     class Meta:
-        ordering = ["-created"]  # noqa: RUF012
+        # id breaks ties between properties created together, the keyset of the list
+        ordering = ["-created", "-id"]  # noqa: RUF012
         verbose_name = "Property"
         verbose_name_plural = "Properties"
+        indexes = (
+            models.Index(Upper("city"), name="property_city_upper_idx"),
+            models.Index(
+                fields=["latitude", "longitude"],
+                condition=Q(active=True),
+                name="property_active_lat_lng_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="property_search_vector_idx"),
+            models.Index(fields=["-created", "-id"], name="property_created_id_idx"),
+        )
 
     def __str__(self):
         return self.name
@@ -143,6 +160,8 @@ class Room(models.Model):
         (SHARED_TENT, "Shared Tent"),
     ]
 
+    DORM_ROOM_TYPES = (MIXED_DORM, MALE_DORM, FEMALE_DORM)
+
     property = models.ForeignKey(
         "properties.Property", related_name="rooms", on_delete=models.CASCADE
     )
@@ -180,6 +199,8 @@ class Room(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    objects = RoomQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Room"
         verbose_name_plural = "Rooms"
@@ -197,22 +218,21 @@ class Room(models.Model):
             kwargs={"slug": self.property.slug, "room_id": self.id},
         )
 
+    def get_quote(self, start, end):
+        """
+        Fetch this room annotated with its quote for the given dates.
+
+        See `RoomQuerySet.with_quote()` for the annotations available.
+        """
+
+        return Room.objects.with_quote(start, end).order_by().get(pk=self.pk)
+
     def get_cost(self, start, end) -> Decimal:
         """
         Find the total cost of a room within specified dates.
         """
 
-        if end < start:
-            error_msg = "End date:%(end)s cannot be less than Start date:%(start)s"
-            raise ValidationError(
-                error_msg,
-                params={"start": start, "end": end},
-                code="invalid",
-            )
-
-        qs = self.occurrences.filter(for_date__range=(start, end))
-        cost = qs.aggregate(total=Sum("rate")).get("total", 0)
-        cost = cost or Decimal(0)
+        cost = self.get_quote(start, end).quote_total
         logger.info("Room:%s, from:%s till:%s Cost:$%s" % (self, start, end, cost))
 
         return cost
@@ -223,20 +243,12 @@ class Room(models.Model):
 
         For shared rooms like dorms if availability today=3, tomorrow=4, day_after=5 -> return 3
         For private rooms availability is either 1 (available) or 0 (not available)
+        A stay arriving on `start` and leaving the day after `end` which breaks a
+        stay rule has no availability, see `RoomQuerySet.with_stay_rules()`.
         """
 
-        if end < start:
-            error_msg = "End date:%(end)s cannot be less than Start date:%(start)s"
-            raise ValidationError(
-                error_msg,
-                params={"start": start, "end": end},
-                code="invalid",
-            )
-
-        qs = self.occurrences.filter(for_date__range=(start, end))
-        availability = qs.aggregate(available=Min("availability")).get("available", 0)
-
-        availability = availability or 0
+        quote = self.get_quote(start, end)
+        availability = 0 if quote.quote_restricted else quote.quote_availability
 
         logger.info(
             "Room:%s, from:%s till:%s Availability:%s"
@@ -246,7 +258,7 @@ class Room(models.Model):
         return availability
 
     def is_dorm(self):
-        return self.room_type in {self.MIXED_DORM, self.FEMALE_DORM, self.MALE_DORM}
+        return self.room_type in self.DORM_ROOM_TYPES
 
     def is_private(self):
         return not self.is_dorm()
@@ -255,19 +267,48 @@ class Room(models.Model):
 class Occurrence(models.Model):
     """
     Holds the rates and availability data for each room across each day.
+
+    The stay rules apply to stays arriving on the night (`min_stay`,
+    `closed_to_arrival`) or leaving on its date (`closed_to_departure`), see
+    `RoomQuerySet.with_stay_rules()`.
     """
 
     rate = models.DecimalField(
         _("Rate"), max_digits=12, decimal_places=2, validators=[MinValueValidator(1)]
     )
+    base_rate = models.DecimalField(
+        _("Base Rate"),
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("The rate before repricing, see `properties.pricing`"),
+    )
     availability = models.PositiveIntegerField(
         _("Availability"), default=1, validators=[MaxValueValidator(20)]
     )
+    min_stay = models.PositiveSmallIntegerField(
+        _("Minimum Stay"),
+        default=1,
+        db_default=1,
+        validators=[MinValueValidator(1)],
+        help_text=_("Fewest nights of a stay arriving on this night"),
+    )
+    closed_to_arrival = models.BooleanField(
+        _("Closed to Arrival"), default=False, db_default=False
+    )
+    closed_to_departure = models.BooleanField(
+        _("Closed to Departure"),
+        default=False,
+        db_default=False,
+        help_text=_("Guests cannot check out on this date"),
+    )
     room = models.ForeignKey(
         "Room",
         verbose_name=_("Room"),
         on_delete=models.CASCADE,
         related_name="occurrences",
+        db_index=False,  # unique_occurrence leads with the room
     )
     for_date = models.DateField(
         _("For Date"),
@@ -296,6 +337,181 @@ class Occurrence(models.Model):
         return self.for_date < other.for_date
 
 
+class RatePeriod(models.Model):
+    """
+    Run length encoded inventory: the same availability and stay rules for every
+    night of a date range within one month, charged `rate` or, when it is empty,
+    the room's weekday and weekend prices.
+
+    Occurrences inside a period override its nights one at a time. Read the
+    expanded nights through `Night`.
+    """
+
+    room = models.ForeignKey(
+        "Room",
+        verbose_name=_("Room"),
+        on_delete=models.CASCADE,
+        related_name="rate_periods",
+    )
+    start_date = models.DateField(_("Start Date"))
+    end_date = models.DateField(_("End Date"))
+    rate = models.DecimalField(
+        _("Rate"),
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text=_("Leave empty to charge the room's weekday and weekend prices"),
+    )
+    base_rate = models.DecimalField(
+        _("Base Rate"),
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text=_("The rate before repricing, see `properties.pricing`"),
+    )
+    availability = models.PositiveIntegerField(
+        _("Availability"), default=1, validators=[MaxValueValidator(20)]
+    )
+    min_stay = models.PositiveSmallIntegerField(
+        _("Minimum Stay"),
+        default=1,
+        db_default=1,
+        validators=[MinValueValidator(1)],
+        help_text=_("Fewest nights of a stay arriving on this night"),
+    )
+    closed_to_arrival = models.BooleanField(
+        _("Closed to Arrival"), default=False, db_default=False
+    )
+    closed_to_departure = models.BooleanField(
+        _("Closed to Departure"),
+        default=False,
+        db_default=False,
+        help_text=_("Guests cannot check out on this date"),
+    )
+
+    class Meta:
+        verbose_name = _("Rate Period")
+        verbose_name_plural = _("Rate Periods")
+        ordering = ("start_date",)
+        indexes = (
+            models.Index(
+                fields=["room", "end_date", "start_date"],
+                name="rate_period_room_end_idx",
+            ),
+        )
+        constraints = [  # noqa: RUF012
+            models.CheckConstraint(
+                check=Q(end_date__gte=F("start_date")),
+                name="rate_period_end_after_start",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Period: {self.start_date} - {self.end_date}"
+
+    def clean(self):
+        super().clean()
+
+        if not (self.start_date and self.end_date):
+            return
+
+        if self.end_date < self.start_date:
+            error_msg = "End date cannot be before the start date."
+            raise ValidationError(error_msg, code="invalid")
+
+        if (self.start_date.year, self.start_date.month) != (
+            self.end_date.year,
+            self.end_date.month,
+        ):
+            error_msg = "A rate period cannot span more than one month."
+            raise ValidationError(error_msg, code="invalid")
+
+        overlapping = RatePeriod.objects.filter(
+            room_id=self.room_id,
+            start_date__lte=self.end_date,
+            end_date__gte=self.start_date,
+        ).exclude(pk=self.pk)
+        if overlapping.exists():
+            error_msg = "The room already has a rate period for some of these dates."
+            raise ValidationError(error_msg, code="invalid")
+
+    @property
+    def nights(self):
+        return (self.end_date - self.start_date).days + 1
+
+
+class Night(models.Model):
+    """
+    Read only per night inventory of a room backed by the `properties_night` view.
+
+    Every occurrence is a night and every rate period expands to the nights which
+    do not have an occurrence. `span_start` and `span_end` are the dates of the row
+    the night came from, filter on them next to `for_date` so Postgres only expands
+    the periods that overlap the requested range.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    room = models.ForeignKey(
+        "Room",
+        on_delete=models.DO_NOTHING,
+        related_name="nights",
+        db_constraint=False,
+    )
+    for_date = models.DateField(_("For Date"))
+    rate = models.DecimalField(_("Rate"), max_digits=12, decimal_places=2)
+    availability = models.PositiveIntegerField(_("Availability"))
+    min_stay = models.PositiveSmallIntegerField(_("Minimum Stay"))
+    closed_to_arrival = models.BooleanField(_("Closed to Arrival"))
+    closed_to_departure = models.BooleanField(_("Closed to Departure"))
+    occurrence = models.ForeignKey(
+        "Occurrence",
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+        null=True,
+    )
+    period = models.ForeignKey(
+        "RatePeriod",
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+        null=True,
+    )
+    span_start = models.DateField()
+    span_end = models.DateField()
+
+    class Meta:
+        managed = False
+        db_table = "properties_night"
+        verbose_name = _("Night")
+        verbose_name_plural = _("Nights")
+        ordering = ("for_date",)
+
+    def __str__(self):
+        return f"Night: {self.for_date}"
+
+
+class Version(models.Model):
+    """
+    A version token from `properties.versions`, of a room, a property, a city or
+    the whole inventory or catalog. Never deleted: a missing token reads as "never
+    bumped".
+    """
+
+    key = models.CharField(_("Key"), max_length=255, primary_key=True)
+    token = models.CharField(_("Token"), max_length=32)
+
+    class Meta:
+        verbose_name = _("Version")
+        verbose_name_plural = _("Versions")
+
+    def __str__(self):
+        return f"{self.key}: {self.token}"
+
+
 class Addon(models.Model):
     """
     An additional item that a property can bill to a traveller.
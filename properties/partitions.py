@@ -0,0 +1,180 @@
+"""
+Monthly range partitions of the occurrences table.
+
+`properties_occurrence` is partitioned on `for_date` with one partition per month,
+`properties_occurrence_pYYYYMM`, and a default partition catching the nights of
+months without one, see migration 0019. Quotes filter on the night so Postgres
+only visits the partitions of the stay, and months in the past are detached,
+archived to a gzipped CSV file and dropped as a whole instead of deleting rows.
+"""
+
+import gzip
+import logging
+import re
+from datetime import date
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = "properties_occurrence"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+PARTITIONS_SQL = """
+    SELECT c.relname
+      FROM pg_inherits i
+      JOIN pg_class c ON c.oid = i.inhrelid
+     WHERE i.inhparent = %s::regclass
+"""
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, months):
+    year, index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, index + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def list_partitions():
+    """
+    The first day of the month of every monthly partition, in order.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(PARTITIONS_SQL, [TABLE])
+        names = [name for (name,) in cursor.fetchall()]
+
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match[1]), int(match[2]), 1))
+    return sorted(months)
+
+
+def create_partition(month):
+    """
+    Create the partition of `month` moving its nights out of the default
+    partition. Returns `False` when it already exists.
+
+    The table is filled and checked before it is attached, so attaching it only
+    scans the default partition and does not block reads on the others.
+    """
+
+    month = month_start(month)
+    if month in list_partitions():
+        return False
+
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        connection.check_constraints()  # see archive_partition()
+        cursor.execute(
+            f"CREATE TABLE {name} "
+            f"(LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds "
+            "CHECK (for_date >= %(start)s AND for_date < %(end)s)",
+            bounds,
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                 WHERE for_date >= %(start)s AND for_date < %(end)s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            bounds,
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+            "FOR VALUES FROM (%(start)s) TO (%(end)s)",
+            bounds,
+        )
+        cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds")
+
+    logger.info("created partition:%s moving %s nights" % (name, moved))
+
+    return True
+
+
+def create_partitions(start, months):
+    """
+    Make sure there is a partition for `months` months from the month of `start`.
+    Returns the months created.
+    """
+
+    start = month_start(start)
+    created = []
+    for offset in range(months):
+        month = add_months(start, offset)
+        if create_partition(month):
+            created.append(month)
+    return created
+
+
+def archive_partition(month, directory):
+    """
+    Detach the partition of `month`, copy its rows to a gzipped CSV file in
+    `directory` and drop it. Returns the path written and the number of rows.
+
+    It all happens in one transaction, the partition is back in place if the copy
+    fails.
+    """
+
+    name = partition_name(month)
+    path = directory / f"{name}.csv.gz"
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # rows written earlier in the transaction have their foreign key checks
+        # deferred, tables with pending checks cannot be altered or dropped
+        connection.check_constraints()
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+        cursor.execute(f"SELECT count(*) FROM {name}")
+        (rows,) = cursor.fetchone()
+        with gzip.open(path, "wb") as archive:
+            cursor.copy_expert(
+                f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive
+            )
+        cursor.execute(f"DROP TABLE {name}")
+
+    logger.info("archived partition:%s with %s nights to %s" % (name, rows, path))
+
+    return path, rows
+
+
+def archive_partitions(before, directory):
+    """
+    Archive every monthly partition entirely before the month of `before`. Returns
+    the `(month, path, rows)` archived.
+    """
+
+    before = month_start(before)
+    return [
+        (month, *archive_partition(month, directory))
+        for month in list_partitions()
+        if month < before
+    ]
+
+
+def default_partition_rows():
+    """
+    Number of nights no monthly partition covers yet.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,303 @@
+"""
+Occupancy driven repricing of future nights.
+
+Every night with inventory in the next `days` days gets the rate its rules give,
+`PRICING_RULES` in the settings:
+
+    occupancy        share of the property's units sold that night, sold being the
+                     units of bookings, paid or not, and of active cart holds,
+                     and unsold the nights' availability
+    days_to_arrival  how far the night is from today
+    weekdays         ISO day of the week of the night
+    seasons          "MM-DD" ranges of the year, which may wrap around new year
+
+Each rule gives a multiplier, their product is clamped to `floor` and `ceiling`
+and applied to the night's base rate: its rate period's rate or, without one, the
+room's weekday or weekend price. Repriced nights keep that base in `base_rate`,
+which compaction carries into their rate period, and the base of a night is read
+from there first, so running the pricing again does not compound. A rate set by
+hand, in the portal's bulk editor or the admin, becomes the base of its nights.
+
+A property is loaded as rooms x days arrays in one query, priced with numpy and
+the nights whose rate moved are written back with one upsert of occurrences, so
+only their rate and base change. 10000 rooms over 365 days reprice in well under a minute,
+see the `benchmark_pricing` command.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+import numpy as np
+
+from cart.models import Hold
+
+from .models import Property
+from .versions import bump_rooms
+
+logger = logging.getLogger(__name__)
+
+MISSING = -1  # availability of a night without inventory
+MIN_RATE = 100  # cents, rates are at least 1
+
+# the nights of a property whose rate moved, rates in cents
+Repricing = namedtuple("Repricing", ["property_id", "nights", "before", "after"])
+
+NIGHTS_SQL = """
+WITH rooms AS (
+    SELECT id, weekday_price, weekend_price
+      FROM properties_room
+     WHERE property_id = %(property_id)s AND active
+), nights AS (
+    SELECT room_id, for_date, availability, rate
+      FROM properties_night
+     WHERE room_id = ANY(ARRAY(SELECT id FROM rooms))
+       AND for_date BETWEEN %(start)s AND %(end)s
+       AND span_start <= %(end)s AND span_end >= %(start)s
+), sold AS (
+    SELECT product_id AS room_id, check_in, check_out, quantity
+      FROM bookings_bookingitem
+     WHERE product_id = ANY(ARRAY(SELECT id FROM rooms))
+       AND check_out > %(start)s AND check_in <= %(end)s
+     UNION ALL
+    SELECT room_id, check_in, check_out, quantity
+      FROM cart_hold
+     WHERE room_id = ANY(ARRAY(SELECT id FROM rooms))
+       AND check_out > %(start)s AND check_in <= %(end)s
+       AND status = %(held)s
+), booked AS (
+    SELECT s.room_id, d::date AS for_date, sum(s.quantity) AS units
+      FROM sold s
+     CROSS JOIN generate_series(
+           greatest(s.check_in, %(start)s::date),
+           least(s.check_out - 1, %(end)s::date),
+           interval '1 day'
+     ) d
+     GROUP BY 1, 2
+)
+SELECT r.id,
+       array_agg(coalesce(n.availability, %(missing)s) ORDER BY d),
+       array_agg(coalesce((n.rate * 100)::bigint, 0) ORDER BY d),
+       array_agg(
+           (coalesce(
+               o.base_rate, p.base_rate, p.rate,
+               CASE WHEN extract(isodow FROM d) IN (5, 6)
+                    THEN r.weekend_price ELSE r.weekday_price END
+           ) * 100)::bigint
+           ORDER BY d
+       ),
+       array_agg(coalesce(b.units, 0) ORDER BY d)
+  FROM rooms r
+ CROSS JOIN generate_series(%(start)s::date, %(end)s::date, interval '1 day') d
+  LEFT JOIN nights n ON n.room_id = r.id AND n.for_date = d::date
+  LEFT JOIN properties_occurrence o ON o.room_id = r.id AND o.for_date = d::date
+  LEFT JOIN properties_rateperiod p
+         ON p.room_id = r.id AND d::date BETWEEN p.start_date AND p.end_date
+  LEFT JOIN booked b ON b.room_id = r.id AND b.for_date = d::date
+ GROUP BY r.id
+ ORDER BY r.id
+"""
+
+UPSERT_SQL = """
+INSERT INTO properties_occurrence
+       (room_id, for_date, rate, base_rate, availability, min_stay,
+        closed_to_arrival, closed_to_departure)
+SELECT n.room_id, %(start)s::date + n.day, n.cents::numeric / 100,
+       n.base::numeric / 100, n.availability, coalesce(p.min_stay, 1),
+       coalesce(p.closed_to_arrival, false), coalesce(p.closed_to_departure, false)
+  FROM unnest(
+       %(room_ids)s::bigint[], %(days)s::integer[], %(cents)s::bigint[],
+       %(base)s::bigint[], %(availability)s::integer[]
+  ) AS n (room_id, day, cents, base, availability)
+  LEFT JOIN properties_rateperiod p
+         ON p.room_id = n.room_id
+        AND %(start)s::date + n.day BETWEEN p.start_date AND p.end_date
+    ON CONFLICT (room_id, for_date) DO UPDATE
+   SET rate = EXCLUDED.rate, base_rate = EXCLUDED.base_rate
+"""
+
+
+def get_rules():
+    return settings.PRICING_RULES
+
+
+def step_multipliers(values, steps, default=1.0):
+    """
+    Multiplier of the last `(threshold, multiplier)` step each value reaches,
+    `default` below the first. Steps are sorted here.
+    """
+
+    steps = sorted(steps)
+    thresholds = np.array([threshold for threshold, _ in steps], dtype=np.float64)
+    multipliers = np.array([default] + [m for _, m in steps], dtype=np.float64)
+    return multipliers[np.searchsorted(thresholds, values, side="right")]
+
+
+def in_season(day, first, last):
+    key = day.strftime("%m-%d")
+    if first <= last:
+        return first <= key <= last
+    return key >= first or key <= last
+
+
+def calendar_multipliers(start, days, rules, today=None):
+    """
+    The multiplier of every night from `start` for `days` days from the rules
+    which do not depend on the property: days to arrival, weekday and season.
+    """
+
+    today = today or timezone.localdate()
+    dates = [start + timedelta(days=i) for i in range(days)]
+
+    # a night is in the tightest bracket whose most days to arrival it is within
+    lead = np.arange(days) + (start - today).days
+    brackets = sorted(rules.get("days_to_arrival", []))
+    most = np.array([limit for limit, _ in brackets], dtype=np.float64)
+    multipliers = np.array([m for _, m in brackets] + [1.0], dtype=np.float64)
+    result = multipliers[np.searchsorted(most, lead, side="left")]
+
+    weekdays = np.ones(8)
+    for weekday, multiplier in rules.get("weekdays", {}).items():
+        weekdays[int(weekday)] = multiplier
+    result *= weekdays[[day.isoweekday() for day in dates]]
+
+    for first, last, multiplier in rules.get("seasons", []):
+        result *= np.where(
+            [in_season(day, first, last) for day in dates], multiplier, 1.0
+        )
+
+    return result
+
+
+def reprice(base, availability, booked, calendar, rules):
+    """
+    New rates in cents for rooms x days arrays of base rates (cents), availability
+    (`MISSING` without inventory) and booked units, given the property independent
+    `calendar_multipliers()`. Nights without inventory get a zero rate.
+    """
+
+    present = availability != MISSING
+    sold = booked.sum(axis=0)
+    units = sold + np.where(present, availability, 0).sum(axis=0)
+    occupancy = np.divide(
+        sold, units, out=np.zeros(sold.shape, dtype=np.float64), where=units > 0
+    )
+
+    multipliers = step_multipliers(occupancy, rules.get("occupancy", [])) * calendar
+    multipliers = np.clip(
+        multipliers, rules.get("floor", 0.0), rules.get("ceiling", np.inf)
+    )
+
+    rates = np.maximum(np.rint(base * multipliers).astype(np.int64), MIN_RATE)
+    return np.where(present, rates, 0)
+
+
+def load_nights(property_id, start, end):
+    """
+    The active room ids of a property and its rooms x days arrays of availability,
+    current rates, base rates and booked units.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            NIGHTS_SQL,
+            {
+                "property_id": property_id,
+                "start": start,
+                "end": end,
+                "missing": MISSING,
+                "held": Hold.ACTIVE,
+            },
+        )
+        rows = cursor.fetchall()
+
+    days = (end - start).days + 1
+    if not rows:
+        empty = np.zeros((0, days), dtype=np.int64)
+        return [], empty, empty, empty, empty
+
+    room_ids, availability, rates, base, booked = zip(*rows)
+    return (
+        list(room_ids),
+        np.array(availability, dtype=np.int64),
+        np.array(rates, dtype=np.int64),
+        np.array(base, dtype=np.int64),
+        np.array(booked, dtype=np.int64),
+    )
+
+
+def reprice_property(  # noqa: PLR0913
+    property_id, start, end, calendar, rules, dry_run=False
+):
+    """
+    Reprice the nights of a property between `start` and `end` (both inclusive)
+    and write the ones which moved, unless `dry_run`. Returns a `Repricing`.
+    """
+
+    room_ids, availability, rates, base, booked = load_nights(property_id, start, end)
+    if not room_ids:
+        return Repricing(property_id, 0, 0, 0)
+
+    new_rates = reprice(base, availability, booked, calendar, rules)
+    rows, days = np.nonzero((availability != MISSING) & (new_rates != rates))
+    repricing = Repricing(
+        property_id,
+        len(rows),
+        int(rates[rows, days].sum()),
+        int(new_rates[rows, days].sum()),
+    )
+
+    if dry_run or not len(rows):
+        return repricing
+
+    ids = np.array(room_ids, dtype=np.int64)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_SQL,
+            {
+                "start": start,
+                "room_ids": ids[rows].tolist(),
+                "days": days.tolist(),
+                "cents": new_rates[rows, days].tolist(),
+                "base": base[rows, days].tolist(),
+                "availability": availability[rows, days].tolist(),
+            },
+        )
+
+    moved = sorted(set(ids[rows].tolist()))
+    transaction.on_commit(lambda: bump_rooms(moved))
+
+    return repricing
+
+
+def reprice_properties(days=365, property_ids=None, dry_run=False):
+    """
+    Reprice the next `days` nights of every active property, or of the given
+    ones, each in its own transaction. Yields a `Repricing` per property.
+    """
+
+    rules = get_rules()
+    start = timezone.localdate()
+    end = start + timedelta(days=days - 1)
+    calendar = calendar_multipliers(start, days, rules, today=start)
+
+    qs = Property.objects.filter(active=True)
+    if property_ids is not None:
+        qs = qs.filter(pk__in=property_ids)
+
+    for property_id in list(qs.order_by("pk").values_list("pk", flat=True)):
+        with transaction.atomic():
+            repricing = reprice_property(
+                property_id, start, end, calendar, rules, dry_run=dry_run
+            )
+
+        if repricing.nights:
+            logger.info(
+                "repriced %s nights of property:%s%s"
+                % (repricing.nights, property_id, " (dry run)" if dry_run else "")
+            )
+        yield repricing
@@ -0,0 +1,90 @@
+"""
+Full text search over properties.
+
+Every property keeps a weighted `search_vector` of its name (A), city (B),
+description (C) and the descriptions of its rooms (D), refreshed by the signals in
+`properties.signals`. Travellers write in English, Spanish and Portuguese, so the
+text is accent folded by `properties_unaccent()` and indexed with the `simple`
+configuration: no stemming, but one GIN index serves every language and a query
+matches with or without accents.
+"""
+
+import logging
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Func, Value
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "simple"
+
+UPDATE_SEARCH_VECTORS_SQL = """
+    UPDATE properties_property p
+       SET search_vector =
+           setweight(to_tsvector('simple', properties_unaccent(p.name)), 'A')
+           || setweight(to_tsvector('simple', properties_unaccent(p.city)), 'B')
+           || setweight(
+                  to_tsvector('simple', properties_unaccent(p.description)), 'C'
+              )
+           || setweight(to_tsvector('simple', properties_unaccent(coalesce((
+                  SELECT string_agg(r.description, ' ')
+                    FROM properties_room r
+                   WHERE r.property_id = p.id
+              ), ''))), 'D')
+     WHERE p.id = ANY(%(property_ids)s)
+"""
+
+
+class Unaccent(Func):
+    """
+    Fold the accents the site's languages use, see migration 0018.
+    """
+
+    function = "properties_unaccent"
+
+
+def update_search_vectors(property_ids):
+    """
+    Rebuild the search vector of the given properties in one statement. Returns
+    the number of properties updated.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(UPDATE_SEARCH_VECTORS_SQL, {"property_ids": list(property_ids)})
+        return cursor.rowcount
+
+
+def parse_query(text):
+    """
+    Turn what a traveller typed into a `tsquery` matching every word, the last one
+    as a prefix so results show up while typing. Returns `None` without words.
+    """
+
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+
+    terms = [*words[:-1], f"{words[-1]}:*"]
+    return SearchQuery(
+        Unaccent(Value(" & ".join(terms))), search_type="raw", config=SEARCH_CONFIG
+    )
+
+
+def search_text(qs, text):
+    """
+    Narrow a property queryset to the ones matching `text`, annotated with their
+    `rank` and best first. Returns `qs.none()` when `text` has no words.
+    """
+
+    logger.info("searching text:%s" % text)
+
+    query = parse_query(text)
+    if query is None:
+        return qs.none()
+
+    qs = qs.filter(search_vector=query)
+    qs = qs.annotate(rank=SearchRank(F("search_vector"), query))
+
+    return qs.order_by("-rank", "name", "pk")
@@ -0,0 +1,171 @@
+"""
+Cache of availability searches.
+
+`search_results()` stores what `search_properties()` finds, one row per property in
+its order with the fields its card on the list shows and its cheapest stay, under
+the normalized city, dates and guests. The entry also keeps the token from
+`properties.versions` of every property the search looked at, the active ones in
+the city. A read fetches the current tokens of those properties in one round trip
+and only uses the entry if none of them moved, so an inventory write drops the
+searches its property took part in and nothing has to find or delete keys.
+
+A property joining the searched set, a new one or one moved to the city, is in no
+entry yet, so the key also carries the token of the city, which only writes to
+its properties move.
+
+A hit costs the city token, the entry and the property tokens, the page is built
+from the entry alone, see `cached_search()`.
+
+Hits, misses and stale entries are counted in each worker and added to the
+counters in the cache every `SEARCH_STATS_EVERY` lookups, see `get_stats()`.
+"""
+
+import hashlib
+import logging
+from collections import Counter
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Property
+from .services import search_properties
+from .versions import get_city_version, get_property_versions
+
+logger = logging.getLogger(__name__)
+
+SEARCH_KEY = "search:%s:%s"
+STATS_KEY = "search:stats:%s"
+STATS = ("hits", "misses", "stale")
+
+# the fields of a result row, the property's card on the list, in the order of the
+# model's fields as `Model.from_db()` takes them
+FIELDS = ("id", "name", "slug", "description")
+ANNOTATIONS = ("cheapest", "num_of_rooms", "max_guests")
+
+pending = Counter()
+
+
+def count(stat):
+    pending[stat] += 1
+    if pending.total() >= settings.SEARCH_STATS_EVERY:
+        flush_stats()
+
+
+def flush_stats():
+    """
+    Add the lookups this worker counted since its last flush to the cache.
+    """
+
+    counted = dict(pending)
+    pending.clear()
+    for stat, value in counted.items():
+        key = STATS_KEY % stat
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, value)
+
+
+def get_stats():
+    """
+    The search cache counters since the last `reset_stats()` and the share of
+    lookups served from the cache. Lookups other workers have not flushed yet are
+    left out.
+    """
+
+    flush_stats()
+
+    keys = {STATS_KEY % stat: stat for stat in STATS}
+    found = cache.get_many(keys)
+    stats = {stat: found.get(key, 0) for key, stat in keys.items()}
+
+    lookups = sum(stats.values())
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_stats():
+    pending.clear()
+    cache.delete_many([STATS_KEY % stat for stat in STATS])
+
+
+def search_key(check_in, check_out, guests, city=None):
+    """
+    Cache key of a search. The city is compared case insensitively, as the
+    search does.
+    """
+
+    query = ((city or "").upper(), check_in.isoformat(), check_out.isoformat(), guests)
+    digest = hashlib.md5(repr(query).encode()).hexdigest()
+    return SEARCH_KEY % (get_city_version(city), digest)
+
+
+def search_results(check_in, check_out, guests, city=None):
+    """
+    The rows `search_properties()` finds, in its order, from the cache unless one of
+    the properties searched changed since they were stored. Each row holds the
+    `FIELDS` of a property then its `ANNOTATIONS`.
+    """
+
+    key = search_key(check_in, check_out, guests, city)
+
+    entry = cache.get(key)
+    if entry is not None:
+        if get_property_versions(entry["versions"]) == entry["versions"]:
+            count("hits")
+            return entry["results"]
+        count("stale")
+    else:
+        count("misses")
+
+    # tokens first, a write while searching makes the entry stale, not wrong
+    candidates = Property.objects.filter(active=True)
+    candidates = candidates.filter(city__iexact=city) if city else candidates
+    versions = get_property_versions(candidates.values_list("id", flat=True))
+
+    qs = search_properties(check_in, check_out, guests, city).with_rooms()
+    results = list(qs.values_list(*FIELDS, *ANNOTATIONS))
+
+    cache.set(
+        key,
+        {"results": results, "versions": versions},
+        settings.SEARCH_CACHE_SECONDS,
+    )
+    return results
+
+
+class SearchResults(Sequence):
+    """
+    The properties of a cached search, cheapest first. Only the properties of the
+    slice read are built, from their rows and without a query, holding the
+    `FIELDS` and annotated with the `ANNOTATIONS`.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.build(row) for row in self.rows[index]]
+        return self.build(self.rows[index])
+
+    @staticmethod
+    def build(row):
+        fields, annotations = row[: len(FIELDS)], row[len(FIELDS) :]
+        instance = Property.from_db(DEFAULT_DB_ALIAS, FIELDS, fields)
+        for name, value in zip(ANNOTATIONS, annotations, strict=True):
+            setattr(instance, name, value)
+        return instance
+
+
+def cached_search(check_in, check_out, guests, city=None):
+    """
+    `search_properties()` served from `search_results()`: the properties found,
+    annotated with their `cheapest` stay total, `num_of_rooms` and `max_guests`,
+    cheapest first.
+    """
+
+    return SearchResults(search_results(check_in, check_out, guests, city))
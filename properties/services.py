@@ -0,0 +1,629 @@
+import logging
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import (
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Value,
+    prefetch_related_objects,
+)
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+from cart.models import Hold
+
+from .inventory import get_matrix
+from .models import Night, Property, Room
+from .versions import bump_rooms
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_LATITUDE = 90
+MAX_LONGITUDE = 180
+
+
+def search_properties(check_in, check_out, guests, city=None, stay_rules=True):
+    """
+    Find the active properties with a room for `guests` travellers for every night
+    from `check_in` up to `check_out`, cheapest first. Rooms whose stay rules the
+    stay breaks are left out unless `stay_rules` is False.
+
+    Each property is annotated with the `cheapest` stay total among its bookable
+    rooms. The rooms are quoted inside a correlated subquery so the whole search
+    runs as one SQL statement.
+    """
+
+    logger.info(
+        "searching city:%s from:%s till:%s guests:%s"
+        % (city, check_in, check_out, guests)
+    )
+
+    rooms = Room.objects.bookable(check_in, check_out, guests, stay_rules)
+    rooms = rooms.filter(property=OuterRef("pk")).order_by("stay_total")
+
+    qs = Property.objects.filter(active=True)
+    qs = qs.filter(city__iexact=city) if city else qs
+    qs = qs.annotate(cheapest=Subquery(rooms.values("stay_total")[:1]))
+
+    return qs.filter(cheapest__isnull=False).order_by("cheapest", "name")
+
+
+def quote_rooms(rooms, check_in, check_out, guests):
+    """
+    Fetch `rooms`, a room queryset, with the quote of a stay of `guests` travellers
+    from `check_in` up to (but excluding) `check_out` attached to each room:
+
+        stay_nights        the nights of the stay with inventory, by date
+        stay_availability  min availability over them, 0 without inventory
+        stay_total         price of the stay for the party, as `bookable()` does
+        stay_unit_total    price of the stay for one unit, a bed in a dorm, the
+                           price a cart line is charged per unit
+        stay_restricted    True if the stay breaks a stay rule of the room
+        stay_bookable      True if the room can host the party every night
+
+    With the worker's inventory matrix enabled the nights and rules of the rooms
+    it holds are read from it, see `properties.inventory`. The others get theirs
+    from one prefetch query on the night view, the stay rules evaluated by
+    `RoomQuerySet.with_stay_rules()` in the query of the rooms, so the quotes cost
+    two queries however many rooms there are.
+    """
+
+    logger.info(
+        "quoting rooms from:%s till:%s guests:%s" % (check_in, check_out, guests)
+    )
+
+    last = check_out - timedelta(days=1)
+    nights = Prefetch("nights", stay_nights(check_in, check_out), to_attr="stay_nights")
+    matrix = get_matrix()
+
+    if matrix is None or not matrix.covers(check_in, check_out):
+        rooms = rooms.with_stay_rules(check_in, check_out)
+        rooms = list(rooms.prefetch_related(nights))
+    else:
+        rooms = list(rooms)
+        held = [room for room in rooms if room.pk in matrix.index]
+        others = {room.pk: room for room in rooms if room.pk not in matrix.index}
+
+        quotes = matrix.quote_many([room.pk for room in held], check_in, last)
+        for room in held:
+            room.stay_nights = matrix.stay_nights(room.pk, check_in, last)
+            room.stay_restricted = quotes[room.pk].restricted
+
+        # rooms added since the matrix was loaded, or inactive ones
+        if others:
+            prefetch_related_objects(list(others.values()), nights)
+            restricted = Room.objects.filter(pk__in=others).with_stay_rules(
+                check_in, check_out
+            )
+            for pk, stay_restricted in restricted.values_list("pk", "stay_restricted"):
+                others[pk].stay_restricted = stay_restricted
+
+    for room in rooms:
+        units = guests if room.is_dorm() else 1
+        room.stay_availability = min(
+            (night.availability for night in room.stay_nights), default=0
+        )
+        room.stay_unit_total = sum(
+            (night.rate for night in room.stay_nights), Decimal(0)
+        )
+        room.stay_total = room.stay_unit_total * units
+        room.stay_bookable = (
+            room.active
+            and (room.is_dorm() or room.num_of_guests >= guests)
+            and len(room.stay_nights) == (check_out - check_in).days
+            and not room.stay_restricted
+            and room.stay_availability >= units
+        )
+
+    return rooms
+
+
+def stay_nights(check_in, check_out):
+    """
+    The nights of a stay from `check_in` up to (but excluding) `check_out`.
+    """
+
+    last = check_out - timedelta(days=1)
+    return Night.objects.filter(
+        for_date__range=(check_in, last), span_start__lte=last, span_end__gte=check_in
+    )
+
+
+def distance_km(latitude, longitude):
+    """
+    Great circle distance from a point to each property, haversine in SQL.
+    """
+
+    lat = Radians(Cast("latitude", FloatField()))
+    lng = Radians(Cast("longitude", FloatField()))
+    origin_lat = math.radians(latitude)
+
+    a = Power(Sin((lat - Value(origin_lat)) / 2), 2) + Value(
+        math.cos(origin_lat)
+    ) * Cos(lat) * Power(Sin((lng - Value(math.radians(longitude))) / 2), 2)
+
+    # rounding can push `a` a hair over 1 for antipodal points
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Lookup matching the properties inside the smallest latitude and longitude box
+    around a circle, so the (latitude, longitude) index can prefilter it.
+    """
+
+    delta = radius_km / KM_PER_DEGREE
+    box = Q(latitude__range=(latitude - delta, latitude + delta))
+
+    # a circle around a pole spans every longitude
+    if abs(latitude) + delta >= MAX_LATITUDE:
+        return box
+
+    delta = math.degrees(
+        math.asin(
+            min(math.sin(math.radians(delta)) / math.cos(math.radians(latitude)), 1)
+        )
+    )
+    west, east = longitude - delta, longitude + delta
+
+    # split the box where it crosses the antimeridian
+    if west < -MAX_LONGITUDE:
+        west += 2 * MAX_LONGITUDE
+        return box & (Q(longitude__gte=west) | Q(longitude__lte=east))
+    if east > MAX_LONGITUDE:
+        east -= 2 * MAX_LONGITUDE
+        return box & (Q(longitude__gte=west) | Q(longitude__lte=east))
+
+    return box & Q(longitude__range=(west, east))
+
+
+def nearby_properties(latitude, longitude, radius_km=25, limit=20, **stay):
+    """
+    The `limit` active properties closest to a point within `radius_km`, nearest
+    first and annotated with their `distance` in km.
+
+    Candidates are prefiltered with the bounding box of the circle, the exact
+    distance is only computed for them. Given a stay (`check_in`, `check_out` and
+    optionally `guests`) only the properties `search_properties()` finds are
+    returned, annotated with their `cheapest` total.
+    """
+
+    logger.info(
+        "searching near lat:%s lng:%s radius:%s stay:%s"
+        % (latitude, longitude, radius_km, stay)
+    )
+
+    qs = Property.objects.filter(active=True)
+    if stay:
+        qs = search_properties(**({"guests": 1} | stay))
+
+    qs = qs.filter(bounding_box(latitude, longitude, radius_km))
+    qs = qs.annotate(distance=distance_km(latitude, longitude))
+
+    return qs.filter(distance__lte=radius_km).order_by("distance", "name")[:limit]
+
+
+# Rate periods covering the nights of a list of rooms which have neither an
+# occurrence nor a period between two dates. The range is cut into months, the
+# unit a period never crosses, and only the months whose nights are not all
+# accounted for are expanded; after the first run that is just the month the
+# window moves into. Missing nights are grouped into runs of consecutive dates,
+# charged the room's default prices (empty rate) with one unit per dorm bed.
+# `OFFSET 0` keeps the anti joins as index probes per generated night, otherwise
+# the planner, which assumes a thousand rows per generate_series, hashes whole
+# tables.
+MISSING_PERIODS_SQL = """
+    WITH chunks AS (
+        SELECT r.id AS room_id,
+               CASE WHEN r.room_type = ANY(%(dorms)s)
+                    THEN r.num_of_guests ELSE 1 END AS availability,
+               greatest(m::date, %(start)s::date) AS first,
+               least((m + interval '1 month - 1 day')::date, %(end)s::date) AS last
+          FROM properties_room r
+         CROSS JOIN generate_series(
+               date_trunc('month', %(start)s::date), %(end)s::date, interval '1 month'
+         ) m
+         WHERE r.id = ANY(%(room_ids)s)
+    ), periods AS (
+        SELECT c.room_id, c.first,
+               sum(least(p.end_date, c.last) - greatest(p.start_date, c.first) + 1)
+               AS nights
+          FROM chunks c
+          JOIN properties_rateperiod p
+            ON p.room_id = c.room_id
+           AND p.end_date >= c.first AND p.start_date <= c.last
+         GROUP BY c.room_id, c.first
+    ), overrides AS (
+        SELECT c.room_id, c.first, count(*) AS nights
+          FROM chunks c
+          JOIN properties_occurrence o
+            ON o.room_id = c.room_id AND o.for_date BETWEEN c.first AND c.last
+         WHERE NOT EXISTS (
+               SELECT 1 FROM properties_rateperiod p
+                WHERE p.room_id = o.room_id
+                  AND o.for_date BETWEEN p.start_date AND p.end_date
+         )
+         GROUP BY c.room_id, c.first
+    ), pending AS (
+        SELECT c.*
+          FROM chunks c
+          LEFT JOIN periods p USING (room_id, first)
+          LEFT JOIN overrides o USING (room_id, first)
+         WHERE coalesce(p.nights, 0) + coalesce(o.nights, 0) < c.last - c.first + 1
+    ), missing AS (
+        SELECT c.room_id, c.availability, d::date AS for_date,
+               d::date - (row_number() OVER (
+                   PARTITION BY c.room_id ORDER BY d
+               ))::integer AS island
+          FROM pending c
+         CROSS JOIN generate_series(c.first, c.last, interval '1 day') d
+         WHERE NOT EXISTS (
+               SELECT 1 FROM properties_occurrence o
+                WHERE o.room_id = c.room_id AND o.for_date = d::date
+               OFFSET 0
+         )
+           AND NOT EXISTS (
+               SELECT 1 FROM properties_rateperiod p
+                WHERE p.room_id = c.room_id
+                  AND d::date BETWEEN p.start_date AND p.end_date
+               OFFSET 0
+         )
+    )
+    SELECT room_id, min(for_date) AS start_date, max(for_date) AS end_date,
+           availability
+      FROM missing
+     GROUP BY room_id, date_trunc('month', for_date), island, availability
+"""
+
+
+def _missing_periods_params(room_ids, start, end):
+    return {
+        "dorms": list(Room.DORM_ROOM_TYPES),
+        "start": start,
+        "end": end,
+        "room_ids": list(room_ids),
+    }
+
+
+def fill_rate_periods(room_ids, start, end):
+    """
+    Open the given rooms at their default prices for every night between `start`
+    and `end` (both inclusive) that has no inventory yet, with a single
+    INSERT ... SELECT of rate periods.
+
+    Existing occurrences and periods are left untouched so the operation is
+    incremental. Returns the number of nights and periods created.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH created AS (
+                INSERT INTO properties_rateperiod
+                       (room_id, start_date, end_date, rate, availability)
+                SELECT room_id, start_date, end_date, NULL, availability
+                  FROM ({MISSING_PERIODS_SQL}) AS missing
+                RETURNING end_date - start_date + 1 AS nights
+            )
+            SELECT coalesce(sum(nights), 0), count(*) FROM created
+            """,
+            _missing_periods_params(room_ids, start, end),
+        )
+        return cursor.fetchone()
+
+
+def count_missing_nights(room_ids, start, end):
+    """
+    Count the nights and periods `fill_rate_periods()` would create.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT coalesce(sum(end_date - start_date + 1), 0), count(*)
+              FROM ({MISSING_PERIODS_SQL}) AS missing
+            """,
+            _missing_periods_params(room_ids, start, end),
+        )
+        return cursor.fetchone()
+
+
+def compact_occurrences(room_ids, since, min_nights=2):
+    """
+    Fold runs of at least `min_nights` consecutive occurrences of the given rooms,
+    from `since` onwards, into rate periods and delete them.
+
+    A run stays within a month and shares its availability, rate, base rate and
+    stay rules. Nights charged the room's weekday or weekend price become a period
+    with an empty rate, so they follow later price changes. Occurrences inside an
+    existing period are overrides and are kept, and so are the nights of active
+    cart holds, which give their units back to the occurrence. Returns the number
+    of occurrences deleted and periods created.
+
+    The delete re-checks each occurrence against the values folded, so one that a
+    concurrent `reserve_room()` changed in the meantime is kept and overrides its
+    night of the new period. A reservation which waited on the delete finds the
+    night gone and fails rather than oversells.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH nights AS (
+                SELECT o.id, o.room_id, o.for_date, o.base_rate, o.availability,
+                       o.min_stay, o.closed_to_arrival, o.closed_to_departure,
+                       o.rate AS snapshot_rate,
+                       nullif(
+                           o.rate,
+                           CASE WHEN extract(isodow FROM o.for_date) IN (5, 6)
+                                THEN r.weekend_price ELSE r.weekday_price END
+                       ) AS rate
+                  FROM properties_occurrence o
+                  JOIN properties_room r ON r.id = o.room_id
+                 WHERE o.room_id = ANY(%(room_ids)s) AND o.for_date >= %(since)s
+                   AND NOT EXISTS (
+                       SELECT 1 FROM properties_rateperiod p
+                        WHERE p.room_id = o.room_id
+                          AND o.for_date BETWEEN p.start_date AND p.end_date
+                   )
+                   AND NOT EXISTS (
+                       SELECT 1 FROM cart_hold h
+                        WHERE h.room_id = o.room_id AND h.status = %(held)s
+                          AND o.for_date >= h.check_in AND o.for_date < h.check_out
+                   )
+            ), islands AS (
+                SELECT *,
+                       date_trunc('month', for_date) AS month,
+                       for_date - (row_number() OVER (
+                           PARTITION BY room_id, date_trunc('month', for_date),
+                                        availability, rate, base_rate, min_stay,
+                                        closed_to_arrival, closed_to_departure
+                           ORDER BY for_date
+                       ))::integer AS island
+                  FROM nights
+            ), runs AS (
+                SELECT room_id, min(for_date) AS start_date, max(for_date) AS end_date,
+                       rate, base_rate, availability, min_stay, closed_to_arrival,
+                       closed_to_departure, array_agg(id) AS ids
+                  FROM islands
+                 GROUP BY room_id, month, availability, rate, base_rate, min_stay,
+                          closed_to_arrival, closed_to_departure, island
+                HAVING count(*) >= %(min_nights)s
+            ), created AS (
+                INSERT INTO properties_rateperiod
+                       (room_id, start_date, end_date, rate, base_rate, availability,
+                        min_stay, closed_to_arrival, closed_to_departure)
+                SELECT room_id, start_date, end_date, rate, base_rate, availability,
+                       min_stay, closed_to_arrival, closed_to_departure
+                  FROM runs
+                RETURNING id
+            ), deleted AS (
+                DELETE FROM properties_occurrence o
+                 USING nights n
+                 WHERE o.room_id = n.room_id AND o.for_date = n.for_date
+                   AND n.id IN (SELECT unnest(ids) FROM runs)
+                   AND o.rate = n.snapshot_rate
+                   AND o.base_rate IS NOT DISTINCT FROM n.base_rate
+                   AND o.availability = n.availability
+                   AND o.min_stay = n.min_stay
+                   AND o.closed_to_arrival = n.closed_to_arrival
+                   AND o.closed_to_departure = n.closed_to_departure
+                RETURNING o.id
+            )
+            SELECT (SELECT count(*) FROM deleted), (SELECT count(*) FROM created)
+            """,
+            {
+                "room_ids": list(room_ids),
+                "since": since,
+                "min_nights": min_nights,
+                "held": Hold.ACTIVE,
+            },
+        )
+        return cursor.fetchone()
+
+
+def update_nights(  # noqa: PLR0913
+    room_ids, start, end, weekdays, rate=None, availability=None
+):
+    """
+    Set the `rate` and/or `availability` of the given rooms on every night between
+    `start` and `end` (both inclusive) falling on one of the ISO `weekdays`, with a
+    single upsert of occurrences.
+
+    Nights without an occurrence get one, keeping what is not being set and the
+    stay rules from their rate period or, without one, from the room's defaults.
+    A rate set here becomes the nights' base rate, so repricing starts from it
+    rather than overwriting it, see `properties.pricing`. The `availability` set is
+    the night's whole allotment: the units booked and held in carts are taken off,
+    as `reserve_room()` did, down to none left. Returns the number of nights
+    created and updated.
+    """
+
+    with connection.cursor() as cursor:
+        # The count runs on the snapshot taken before the upsert, so it finds the
+        # occurrences which were already there.
+        cursor.execute(
+            """
+            WITH sold AS (
+                SELECT s.room_id, d::date AS for_date, sum(s.quantity) AS units
+                  FROM (
+                      SELECT product_id AS room_id, check_in, check_out, quantity
+                        FROM bookings_bookingitem
+                       WHERE product_id = ANY(%(room_ids)s)
+                         AND check_out > %(start)s AND check_in <= %(end)s
+                       UNION ALL
+                      SELECT room_id, check_in, check_out, quantity
+                        FROM cart_hold
+                       WHERE room_id = ANY(%(room_ids)s)
+                         AND check_out > %(start)s AND check_in <= %(end)s
+                         AND status = %(held)s
+                  ) s
+                 CROSS JOIN generate_series(
+                       greatest(s.check_in, %(start)s::date),
+                       least(s.check_out - 1, %(end)s::date),
+                       interval '1 day'
+                 ) d
+                 GROUP BY 1, 2
+            ), nights AS (
+                SELECT r.id AS room_id, d::date AS for_date,
+                       coalesce(
+                           %(rate)s::numeric, p.rate,
+                           CASE WHEN extract(isodow FROM d) IN (5, 6)
+                                THEN r.weekend_price ELSE r.weekday_price END
+                       ) AS rate,
+                       coalesce(
+                           CASE WHEN %(availability)s::integer IS NOT NULL
+                                THEN greatest(
+                                    %(availability)s::integer - coalesce(s.units, 0),
+                                    0
+                                ) END,
+                           p.availability,
+                           CASE WHEN r.room_type = ANY(%(dorms)s)
+                                THEN r.num_of_guests ELSE 1 END
+                       ) AS availability,
+                       coalesce(p.min_stay, 1) AS min_stay,
+                       coalesce(p.closed_to_arrival, false) AS closed_to_arrival,
+                       coalesce(p.closed_to_departure, false) AS closed_to_departure
+                  FROM properties_room r
+                 CROSS JOIN generate_series(
+                       %(start)s::date, %(end)s::date, interval '1 day'
+                 ) d
+                  LEFT JOIN properties_rateperiod p
+                    ON p.room_id = r.id
+                   AND d::date BETWEEN p.start_date AND p.end_date
+                  LEFT JOIN sold s ON s.room_id = r.id AND s.for_date = d::date
+                 WHERE r.id = ANY(%(room_ids)s)
+                   AND extract(isodow FROM d) = ANY(%(weekdays)s)
+            ), upserted AS (
+                INSERT INTO properties_occurrence
+                       (room_id, for_date, rate, base_rate, availability, min_stay,
+                        closed_to_arrival, closed_to_departure)
+                SELECT room_id, for_date, rate, %(rate)s::numeric, availability,
+                       min_stay, closed_to_arrival, closed_to_departure
+                  FROM nights
+                    ON CONFLICT (room_id, for_date) DO UPDATE
+                   SET rate = coalesce(%(rate)s::numeric, properties_occurrence.rate),
+                       base_rate = coalesce(
+                           %(rate)s::numeric, properties_occurrence.base_rate
+                       ),
+                       availability = CASE
+                           WHEN %(availability)s::integer IS NULL
+                           THEN properties_occurrence.availability
+                           ELSE EXCLUDED.availability END
+                RETURNING 1
+            )
+            SELECT (SELECT count(*) FROM upserted),
+                   (SELECT count(*)
+                      FROM properties_occurrence o
+                      JOIN nights n USING (room_id, for_date))
+            """,
+            {
+                "room_ids": list(room_ids),
+                "start": start,
+                "end": end,
+                "weekdays": list(weekdays),
+                "rate": rate,
+                "availability": availability,
+                "dorms": list(Room.DORM_ROOM_TYPES),
+                "held": Hold.ACTIVE,
+            },
+        )
+        touched, existing = cursor.fetchone()
+
+    logger.info(
+        "updated %s nights of %s rooms from:%s till:%s rate:%s availability:%s"
+        % (touched, len(room_ids), start, end, rate, availability)
+    )
+
+    transaction.on_commit(lambda: bump_rooms(room_ids))
+    return touched - existing, existing
+
+
+def reserve_room(room_id, check_in, check_out, quantity=1):
+    """
+    Take `quantity` units of a room off sale for every night from `check_in` up
+    to `check_out` without overselling.
+
+    Period nights of the stay are first copied into occurrences, then all nights
+    are decremented by one conditional UPDATE: a night short of units is left out
+    and, since concurrent bookings wait for each other's row locks and re-check
+    the condition, they can never push availability below zero. Raises
+    `ValidationError` when any night is short, after rolling back the nights
+    taken; run it inside the booking's transaction so the whole booking rolls
+    back with it.
+    """
+
+    nights = (check_out - check_in).days
+    if nights < 1:
+        error_msg = "Check out:%(check_out)s must be after Check in:%(check_in)s"
+        raise ValidationError(
+            error_msg,
+            params={"check_in": check_in, "check_out": check_out},
+            code="invalid",
+        )
+
+    params = {
+        "room_id": room_id,
+        "first": check_in,
+        "last": check_out - timedelta(days=1),
+        "quantity": quantity,
+    }
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # A concurrent booking copying the same nights makes this wait for it
+            # and skip them once it commits.
+            cursor.execute(
+                """
+                INSERT INTO properties_occurrence
+                       (room_id, for_date, rate, availability, min_stay,
+                        closed_to_arrival, closed_to_departure)
+                SELECT room_id, for_date, rate, availability, min_stay,
+                       closed_to_arrival, closed_to_departure
+                  FROM properties_night
+                 WHERE room_id = %(room_id)s
+                   AND for_date BETWEEN %(first)s AND %(last)s
+                   AND span_end >= %(first)s AND span_start <= %(last)s
+                   AND period_id IS NOT NULL
+                    ON CONFLICT DO NOTHING
+                """,
+                params,
+            )
+            cursor.execute(
+                """
+                UPDATE properties_occurrence
+                   SET availability = availability - %(quantity)s
+                 WHERE room_id = %(room_id)s
+                   AND for_date BETWEEN %(first)s AND %(last)s
+                   AND availability >= %(quantity)s
+                """,
+                params,
+            )
+            reserved = cursor.rowcount
+
+        if reserved != nights:
+            error_msg = (
+                "Room:%(room)s has no %(quantity)s units left for every night from "
+                "%(check_in)s to %(check_out)s"
+            )
+            raise ValidationError(
+                error_msg,
+                params={
+                    "room": room_id,
+                    "quantity": quantity,
+                    "check_in": check_in,
+                    "check_out": check_out,
+                },
+                code="unavailable",
+            )
+
+    transaction.on_commit(lambda: bump_rooms([room_id]))
+    logger.info("reserved room:%s nights:%s units:%s" % (room_id, nights, quantity))
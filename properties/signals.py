@@ -0,0 +1,124 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Occurrence, Property, RatePeriod, Room
+from .search import update_search_vectors
+from .versions import bump_catalog, bump_cities, bump_properties, bump_rooms
+
+logger = logging.getLogger(__name__)
+
+
+def inventory_changed(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Invalidate cached inventory for the room once the write is committed.
+    """
+
+    transaction.on_commit(lambda: bump_rooms([instance.room_id]))
+
+
+post_save.connect(
+    inventory_changed,
+    sender=Occurrence,
+    dispatch_uid="occurrence_saved",
+)
+post_delete.connect(
+    inventory_changed,
+    sender=Occurrence,
+    dispatch_uid="occurrence_deleted",
+)
+post_save.connect(
+    inventory_changed,
+    sender=RatePeriod,
+    dispatch_uid="rate_period_saved",
+)
+post_delete.connect(
+    inventory_changed,
+    sender=RatePeriod,
+    dispatch_uid="rate_period_deleted",
+)
+
+
+def property_text_changed(sender, instance, update_fields, **kwargs):  # noqa: ARG001
+    """
+    Rebuild the search vector of a saved property unless only fields outside it
+    were saved.
+    """
+
+    if update_fields and not {"name", "city", "description"} & set(update_fields):
+        return
+
+    update_search_vectors([instance.pk])
+
+
+def room_text_changed(sender, instance, update_fields=None, **kwargs):  # noqa: ARG001
+    """
+    Rebuild the search vector of the property of a saved or deleted room.
+    """
+
+    if update_fields and "description" not in update_fields:
+        return
+
+    update_search_vectors([instance.property_id])
+
+
+post_save.connect(
+    property_text_changed,
+    sender=Property,
+    dispatch_uid="property_saved",
+)
+post_save.connect(
+    room_text_changed,
+    sender=Room,
+    dispatch_uid="room_saved",
+)
+post_delete.connect(
+    room_text_changed,
+    sender=Room,
+    dispatch_uid="room_deleted",
+)
+
+
+def catalog_changed(sender, instance, **kwargs):  # noqa: ARG001
+    """
+    Invalidate cached facets and searches once a property or room write is
+    committed. A room's own token moves too, its prices are part of its quotes,
+    and a property's city, the searches there may now find it.
+    """
+
+    property_id = instance.pk if sender is Property else instance.property_id
+    # a deleted instance loses its pk before the commit
+    room_ids = [instance.pk] if sender is Room else []
+    cities = [instance.city] if sender is Property else []
+
+    def bump():
+        bump_rooms(room_ids)
+        bump_properties([property_id])
+        if cities:
+            bump_cities(cities)
+        bump_catalog()
+
+    transaction.on_commit(bump)
+
+
+post_save.connect(
+    catalog_changed,
+    sender=Property,
+    dispatch_uid="property_catalog_saved",
+)
+post_delete.connect(
+    catalog_changed,
+    sender=Property,
+    dispatch_uid="property_catalog_deleted",
+)
+post_save.connect(
+    catalog_changed,
+    sender=Room,
+    dispatch_uid="room_catalog_saved",
+)
+post_delete.connect(
+    catalog_changed,
+    sender=Room,
+    dispatch_uid="room_catalog_deleted",
+)
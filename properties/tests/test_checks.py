@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase, override_settings
+
+from properties.checks import check_shared_cache
+
+LOCAL_CACHE = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """
+    Test suite for the check that the cache is shared by all workers.
+    """
+
+    @override_settings(CACHES={"default": LOCAL_CACHE})
+    def test_process_local_cache_is_an_error(self):
+        errors = check_shared_cache(None)
+
+        self.assertEqual([error.id for error in errors], ["properties.E001"])
+
+    def test_configured_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
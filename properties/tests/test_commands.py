@@ -0,0 +1,284 @@
+import calendar
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from properties.factories import OccurrenceFactory, PropertyFactory, RoomFactory
+from properties.models import Night, Occurrence, Property, RatePeriod, Room
+from properties.partitions import (
+    add_months,
+    create_partition,
+    list_partitions,
+    month_start,
+)
+
+
+class BenchmarkQuotesCommandTests(TestCase):
+    """
+    Smoke test for the quotes benchmark.
+    """
+
+    def test_benchmark_reports_every_size_and_leaves_no_data_behind(self):
+        out = StringIO()
+        call_command("benchmark_quotes", sizes=[1, 3], repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("1 rooms: with_quote", output)
+        self.assertIn("3 rooms: get_cost + get_availability", output)
+        self.assertEqual(Property.objects.count(), 0)
+
+
+class RollforwardInventoryCommandTests(TestCase):
+    """
+    Test suite for the inventory roll forward command.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        # the window is rounded up to the end of the month
+        last = cls.today.replace(
+            day=calendar.monthrange(cls.today.year, cls.today.month)[1]
+        )
+        cls.window = (last - cls.today).days + 1
+
+        prop = PropertyFactory()
+        cls.dorm = RoomFactory(
+            property=prop,
+            room_type=Room.MIXED_DORM,
+            num_of_guests=6,
+            weekday_price=10,
+            weekend_price=15,
+        )
+        cls.private = RoomFactory(
+            property=prop,
+            room_type=Room.PRIVATE_ROOM,
+            weekday_price=50,
+            weekend_price=70,
+        )
+        cls.inactive = RoomFactory(property=prop, active=False)
+
+    def rollforward(self, **options):
+        out = StringIO()
+        call_command("rollforward_inventory", stdout=out, **options)
+        return out.getvalue()
+
+    def test_opens_every_night_with_the_room_defaults(self):
+        output = self.rollforward(days=1)
+
+        self.assertIn(f"{self.window * 2} nights in 2 periods opened", output)
+        self.assertFalse(Occurrence.objects.exists())
+        for night in Night.objects.filter(room=self.dorm):
+            weekend = night.for_date.isoweekday() in (5, 6)
+            self.assertEqual(night.rate, 15 if weekend else 10)
+            self.assertEqual(night.availability, 6)
+        for night in Night.objects.filter(room=self.private):
+            weekend = night.for_date.isoweekday() in (5, 6)
+            self.assertEqual(night.rate, 70 if weekend else 50)
+            self.assertEqual(night.availability, 1)
+
+    def test_periods_never_cross_a_month(self):
+        self.rollforward(days=62)
+
+        for period in RatePeriod.objects.all():
+            self.assertEqual(period.start_date.month, period.end_date.month)
+        periods = RatePeriod.objects.filter(room=self.private)
+        self.assertEqual(
+            Night.objects.filter(room=self.private).count(),
+            sum(period.nights for period in periods),
+        )
+
+    def test_inactive_rooms_are_skipped(self):
+        self.rollforward(days=7)
+
+        self.assertFalse(Night.objects.filter(room=self.inactive).exists())
+
+    def test_existing_nights_are_left_untouched(self):
+        OccurrenceFactory(
+            room=self.private, for_date=self.today + timedelta(days=1), rate=99
+        )
+        self.rollforward(days=1)
+
+        output = self.rollforward(days=1)
+
+        self.assertIn("0 nights in 0 periods opened", output)
+        self.assertEqual(Night.objects.filter(room=self.private).count(), self.window)
+        night = Night.objects.get(
+            room=self.private, for_date=self.today + timedelta(days=1)
+        )
+        self.assertEqual(night.rate, 99)
+
+    def test_gaps_are_filled(self):
+        self.rollforward(days=1)
+        RatePeriod.objects.filter(room=self.dorm).delete()
+        OccurrenceFactory(room=self.dorm, for_date=self.today, rate=12)
+
+        output = self.rollforward(days=1)
+
+        self.assertIn(f"{self.window - 1} nights in 1 periods opened", output)
+        self.assertEqual(Night.objects.filter(room=self.dorm).count(), self.window)
+
+    def test_dry_run_only_counts(self):
+        output = self.rollforward(days=1, dry_run=True)
+
+        self.assertIn(f"{self.window * 2} nights in 2 periods would be opened", output)
+        self.assertFalse(RatePeriod.objects.exists())
+
+
+class CompactOccurrencesCommandTests(TestCase):
+    """
+    Test suite for folding occurrences into rate periods.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        today = timezone.localdate()
+        # a week which does not cross a month, starting on a monday
+        cls.monday = today + timedelta(days=7 - today.weekday())
+        while (cls.monday + timedelta(days=6)).month != cls.monday.month:
+            cls.monday += timedelta(days=7)
+        cls.room = RoomFactory(
+            room_type=Room.PRIVATE_ROOM, weekday_price=40, weekend_price=60
+        )
+
+        cls.week = [cls.monday + timedelta(days=i) for i in range(7)]
+        for night in cls.week:
+            weekend = night.isoweekday() in (5, 6)
+            OccurrenceFactory(room=cls.room, for_date=night, rate=60 if weekend else 40)
+
+    def compact(self, **options):
+        out = StringIO()
+        call_command("compact_occurrences", stdout=out, **options)
+        return out.getvalue()
+
+    def nights(self):
+        return [
+            (night.for_date, night.rate, night.availability)
+            for night in Night.objects.filter(room=self.room)
+        ]
+
+    def test_default_priced_nights_become_one_period(self):
+        before = self.nights()
+
+        output = self.compact()
+
+        self.assertIn("7 occurrences folded into 1 periods", output)
+        self.assertFalse(Occurrence.objects.exists())
+        period = RatePeriod.objects.get()
+        self.assertEqual(
+            (period.start_date, period.end_date), (self.week[0], self.week[-1])
+        )
+        self.assertIsNone(period.rate)
+        self.assertEqual(self.nights(), before)
+
+    def test_one_off_nights_are_kept_as_occurrences(self):
+        Occurrence.objects.filter(for_date=self.week[3]).update(rate=99)
+        before = self.nights()
+
+        self.compact()
+
+        self.assertEqual(
+            list(Occurrence.objects.values_list("for_date", flat=True)),
+            [self.week[3]],
+        )
+        self.assertEqual(RatePeriod.objects.count(), 2)
+        self.assertEqual(self.nights(), before)
+
+    def test_runs_with_a_custom_rate_keep_it(self):
+        Occurrence.objects.filter(for_date__in=self.week[:3]).update(rate=35)
+        before = self.nights()
+
+        self.compact()
+
+        self.assertEqual(
+            list(RatePeriod.objects.values_list("rate", flat=True)),
+            [Decimal(35), None],
+        )
+        self.assertEqual(self.nights(), before)
+
+    def test_runs_are_split_where_the_stay_rules_change(self):
+        Occurrence.objects.filter(for_date__in=self.week[:4]).update(min_stay=2)
+        Occurrence.objects.filter(for_date=self.week[6]).update(closed_to_arrival=True)
+
+        self.compact()
+
+        self.assertEqual(
+            list(
+                RatePeriod.objects.values_list(
+                    "start_date", "end_date", "min_stay", "closed_to_arrival"
+                )
+            ),
+            [
+                (self.week[0], self.week[3], 2, False),
+                (self.week[4], self.week[5], 1, False),
+            ],
+        )
+        self.assertEqual(
+            list(Occurrence.objects.values_list("for_date", flat=True)),
+            [self.week[6]],
+        )
+
+    def test_overrides_inside_periods_are_kept(self):
+        self.compact()
+        OccurrenceFactory(room=self.room, for_date=self.week[2], rate=99)
+        OccurrenceFactory(room=self.room, for_date=self.week[3], rate=99)
+
+        output = self.compact()
+
+        self.assertIn("0 occurrences folded into 0 periods", output)
+        self.assertEqual(Occurrence.objects.count(), 2)
+
+
+class PartitionCommandsTests(TestCase):
+    """
+    Test suite for the occurrence partition maintenance commands.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.month = month_start(timezone.localdate())
+
+    def test_partition_occurrences_creates_the_missing_months(self):
+        out = StringIO()
+        call_command("partition_occurrences", months=15, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("2 partitions created", output)
+        self.assertIn(
+            f"properties_occurrence_p{add_months(self.month, 14):%Y%m}", output
+        )
+
+    def test_partition_occurrences_warns_about_uncovered_nights(self):
+        OccurrenceFactory(for_date=add_months(self.month, 60))
+
+        out = StringIO()
+        call_command("partition_occurrences", stdout=out)
+
+        self.assertIn("1 nights are in the default partition", out.getvalue())
+
+    def test_archive_occurrences_keeps_recent_months(self):
+        for months in (-3, -2, -1):
+            create_partition(add_months(self.month, months))
+
+        with tempfile.TemporaryDirectory() as directory:
+            out = StringIO()
+            call_command(
+                "archive_occurrences", keep_months=1, directory=directory, stdout=out
+            )
+            archives = sorted(path.name for path in Path(directory).iterdir())
+
+        self.assertIn("2 partitions archived, 0 nights", out.getvalue())
+        self.assertEqual(
+            archives,
+            [
+                f"properties_occurrence_p{add_months(self.month, -3):%Y%m}.csv.gz",
+                f"properties_occurrence_p{add_months(self.month, -2):%Y%m}.csv.gz",
+            ],
+        )
+        self.assertEqual(list_partitions()[0], add_months(self.month, -1))
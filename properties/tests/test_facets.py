@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from properties.facets import facet_counts, filter_properties, get_facets
+from properties.factories import PropertyFactory, RoomFactory
+from properties.models import Property, Room
+
+
+class FacetTests(TestCase):
+    """
+    Test suite for the faceted filter over properties and its counts.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.hostel = PropertyFactory(property_type=Property.HOSTEL, country="AR")
+        RoomFactory(
+            property=cls.hostel,
+            room_type=Room.MIXED_DORM,
+            grade=Room.BASIC,
+            ensuite=False,
+        )
+        RoomFactory(
+            property=cls.hostel,
+            room_type=Room.PRIVATE_ROOM,
+            grade=Room.STANDARD,
+            ensuite=True,
+        )
+        cls.hotel = PropertyFactory(property_type=Property.HOTEL, country="AR")
+        RoomFactory(
+            property=cls.hotel,
+            room_type=Room.PRIVATE_ROOM,
+            grade=Room.DELUXE,
+            ensuite=True,
+        )
+        cls.camping = PropertyFactory(property_type=Property.CAMPSITE, country="CL")
+        RoomFactory(
+            property=cls.camping,
+            room_type=Room.SHARED_TENT,
+            grade=Room.BASIC,
+            ensuite=False,
+        )
+        # neither without rooms nor inactive ones are counted
+        PropertyFactory(property_type=Property.HOSTEL, country="AR")
+        PropertyFactory(property_type=Property.HOSTEL, country="AR", active=False)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def counts(self, facets, name):
+        return {value["value"]: value["count"] for value in facets[name]}
+
+    def test_counts_without_filters(self):
+        count, facets = facet_counts({})
+
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            self.counts(facets, "property_type"), {"HS": 1, "HO": 1, "CS": 1}
+        )
+        self.assertEqual(self.counts(facets, "country"), {"AR": 2, "CL": 1})
+        self.assertEqual(self.counts(facets, "room_type"), {"PR": 2, "XD": 1, "ST": 1})
+        self.assertEqual(self.counts(facets, "ensuite"), {"true": 2, "false": 2})
+        self.assertEqual(facets["country"][0]["label"], "Argentina")
+
+    def test_facet_counts_ignore_their_own_filter(self):
+        count, facets = facet_counts({"property_type": ["HS"], "ensuite": [True]})
+
+        self.assertEqual(count, 1)
+        # other property types with an ensuite room
+        self.assertEqual(self.counts(facets, "property_type"), {"HS": 1, "HO": 1})
+        # hostels with and without ensuite rooms
+        self.assertEqual(self.counts(facets, "ensuite"), {"true": 1, "false": 1})
+        self.assertEqual(self.counts(facets, "room_type"), {"PR": 1})
+
+    def test_room_facets_hold_on_the_same_room(self):
+        filters = {"room_type": ["XD"], "ensuite": [True]}
+
+        count, _ = facet_counts(filters)
+
+        self.assertEqual(count, 0)
+        self.assertFalse(filter_properties(filters).exists())
+
+    def test_filter_matches_the_counts(self):
+        filters = {"country": ["AR"], "grade": ["BA", "DL"]}
+
+        count, _ = facet_counts(filters)
+
+        self.assertEqual(set(filter_properties(filters)), {self.hostel, self.hotel})
+        self.assertEqual(count, 2)
+
+    def test_counts_cost_one_query_whatever_the_filters(self):
+        with self.assertNumQueries(1):
+            facet_counts({name: ["x"] for name in ("country", "grade", "room_type")})
+
+    def test_results_are_cached_until_a_room_changes(self):
+        filters = {"country": ["CL"]}
+
+        # the catalog token, the cached entry, counts, properties, then storing
+        # the entry in the database cache (5)
+        with self.assertNumQueries(9):
+            result = get_facets(filters, limit=10)
+
+        self.assertEqual(result["count"], 1)
+        self.assertEqual(result["results"][0]["name"], self.camping.name)
+
+        # the same selection in another order is the same key
+        # the catalog token, then the cached entry
+        with self.assertNumQueries(2):
+            get_facets({"country": ["CL", "CL"], "grade": []}, limit=10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomFactory(property=self.camping, room_type=Room.PRIVATE_TENT)
+
+        result = get_facets(filters, limit=10)
+
+        self.assertEqual(self.counts(result["facets"], "room_type"), {"ST": 1, "PT": 1})
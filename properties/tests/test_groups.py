@@ -0,0 +1,143 @@
+import itertools
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.groups import Option, cheapest_combinations, combine
+from properties.models import Room
+
+
+def brute_force(options, guests, limit):
+    """
+    `(total, units)` of the cheapest combinations without a unit to spare.
+    """
+
+    found = []
+    for quantities in itertools.product(*[range(o.units + 1) for o in options]):
+        beds = sum(o.capacity * q for o, q in zip(options, quantities))
+        spare = any(
+            q and beds - o.capacity >= guests for o, q in zip(options, quantities)
+        )
+        if beds >= guests and not spare:
+            total = sum(o.price * q for o, q in zip(options, quantities))
+            found.append((total, sum(quantities)))
+
+    return sorted(found)[:limit]
+
+
+class CombineTests(SimpleTestCase):
+    """
+    Test suite for the room combinations of a group.
+    """
+
+    dorm = Option("dorm", capacity=1, units=6, price=Decimal(20))
+    double = Option("double", capacity=2, units=1, price=Decimal(50))
+    quad = Option("quad", capacity=4, units=2, price=Decimal(70))
+
+    def test_cheapest_combinations_first(self):
+        combinations = combine([self.dorm, self.double, self.quad], guests=9)
+
+        self.assertEqual(
+            [(c.total, c.rooms, c.guests) for c in combinations[:2]],
+            [
+                (Decimal(160), [("quad", 2), ("dorm", 1)], 9),
+                (Decimal(170), [("quad", 1), ("dorm", 5)], 9),
+            ],
+        )
+
+    def test_private_rooms_may_have_spare_beds(self):
+        combinations = combine([self.quad], guests=3)
+
+        self.assertEqual(combinations[0].rooms, [("quad", 1)])
+        self.assertEqual(combinations[0].guests, 4)
+
+    def test_combinations_never_exceed_the_units_for_sale(self):
+        self.assertEqual(combine([self.dorm, self.double], guests=9), [])
+
+    def test_combinations_match_brute_force(self):
+        for seed in range(200):
+            rng = random.Random(seed)
+            options = [
+                Option(
+                    i,
+                    rng.choice((1, 1, 2, 3, 4, 6)),
+                    rng.randint(1, 4),
+                    Decimal(rng.randint(10, 100)),
+                )
+                for i in range(rng.randint(1, 6))
+            ]
+            guests = rng.randint(1, 12)
+
+            found = [
+                (c.total, sum(q for _, q in c.rooms))
+                for c in combine(options, guests, limit=5)
+            ]
+
+            with self.subTest(seed=seed):
+                self.assertEqual(found, brute_force(options, guests, limit=5))
+
+
+class CheapestCombinationsTests(TestCase):
+    """
+    Test suite for combining the rooms of a property for a stay.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+
+        cls.hostel = PropertyFactory()
+        cls.dorm = RoomFactory(
+            property=cls.hostel, room_type=Room.MIXED_DORM, num_of_guests=10
+        )
+        RatePeriodFactory(
+            room=cls.dorm, start_date=cls.check_in, rate=15, availability=4
+        )
+        cls.family = RoomFactory(
+            property=cls.hostel, room_type=Room.FAMILY_ROOM, num_of_guests=5
+        )
+        RatePeriodFactory(room=cls.family, start_date=cls.check_in, rate=60)
+        # only the first night on sale
+        cls.double = RoomFactory(
+            property=cls.hostel, room_type=Room.DOUBLE_BED, num_of_guests=2
+        )
+        OccurrenceFactory(room=cls.double, for_date=cls.check_in, rate=20)
+
+    def combinations(self, guests):
+        return cheapest_combinations(self.hostel, self.check_in, self.check_out, guests)
+
+    def test_group_is_split_between_private_rooms_and_beds(self):
+        best, *_ = self.combinations(guests=7)
+
+        self.assertEqual(best.rooms, [(self.family, 1), (self.dorm, 2)])
+        self.assertEqual(best.total, Decimal(180))
+        self.assertEqual(best.guests, 7)
+
+    def test_rooms_without_every_night_are_left_out(self):
+        rooms = {room for c in self.combinations(guests=2) for room, _ in c.rooms}
+
+        self.assertNotIn(self.double, rooms)
+
+    def test_party_bigger_than_the_property_gets_nothing(self):
+        self.assertEqual(self.combinations(guests=10), [])
+
+    def test_combinations_cost_one_query_for_many_rooms(self):
+        for room in RoomFactory.create_batch(
+            size=40, property=self.hostel, room_type=Room.PRIVATE_ROOM
+        ):
+            RatePeriodFactory(room=room, start_date=self.check_in)
+
+        with self.assertNumQueries(1):
+            combinations = self.combinations(guests=20)
+
+        self.assertEqual(len(combinations), 5)
@@ -0,0 +1,256 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from properties import inventory
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.inventory import InventoryMatrix, MatrixNight, Quote, quote_rooms
+from properties.models import Room
+from properties.versions import bump_rooms, get_room_versions
+
+
+class VersionsTests(TestCase):
+    """
+    Test suite for the inventory version tokens.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rooms_without_changes_have_no_version(self):
+        self.assertEqual(get_room_versions([1, 2]), {1: None, 2: None})
+
+    def test_bumping_rooms_only_changes_their_version(self):
+        bump_rooms([1])
+
+        versions = get_room_versions([1, 2])
+        self.assertIsNotNone(versions[1])
+        self.assertIsNone(versions[2])
+
+    def test_saving_an_occurrence_bumps_its_room_on_commit(self):
+        room = RoomFactory()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OccurrenceFactory(room=room)
+
+        self.assertIsNotNone(get_room_versions([room.id])[room.id])
+
+    def test_deleting_an_occurrence_bumps_its_room_on_commit(self):
+        occ = OccurrenceFactory()
+        cache.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            occ.delete()
+
+        self.assertIsNotNone(get_room_versions([occ.room_id])[occ.room_id])
+
+    def test_saving_and_deleting_a_room_bumps_it_on_commit(self):
+        room = RoomFactory()
+        room_id = room.id
+
+        for write in (room.save, room.delete):
+            cache.clear()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+
+            self.assertIsNotNone(get_room_versions([room_id])[room_id])
+
+
+class InventoryMatrixTests(TestCase):
+    """
+    Test suite for the in process numpy inventory matrix.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        cls.tomorrow = cls.today + timedelta(days=1)
+        cls.day_after = cls.today + timedelta(days=2)
+
+        cls.property = PropertyFactory()
+        cls.room, cls.other_room = RoomFactory.create_batch(
+            size=2, property=cls.property
+        )
+        for for_date, rate, availability in [
+            (cls.today, 10, 4),
+            (cls.tomorrow, 15, 3),
+            (cls.day_after, 20, 2),
+        ]:
+            OccurrenceFactory(
+                room=cls.room, for_date=for_date, rate=rate, availability=availability
+            )
+        OccurrenceFactory(room=cls.other_room, for_date=cls.today, rate="12.50")
+
+    def setUp(self):
+        cache.clear()
+        self.matrix = InventoryMatrix(days=30)
+        self.matrix.load()
+
+    def test_matrix_quotes_match_sql_quotes(self):
+        room_ids = [self.room.id, self.other_room.id]
+        ranges = [
+            (self.today, self.day_after),
+            (self.tomorrow, self.tomorrow),
+            (self.today, self.today + timedelta(days=10)),
+        ]
+
+        for start, end in ranges:
+            quotes = self.matrix.quote_many(room_ids, start, end)
+            for room in Room.objects.filter(id__in=room_ids).with_quote(start, end):
+                expected = Quote(
+                    availability=room.quote_availability,
+                    total=room.quote_total,
+                    nights=room.quote_nights,
+                    covered=room.quote_covered,
+                    restricted=room.quote_restricted,
+                )
+                self.assertEqual(quotes[room.id], expected)
+
+    def test_matrix_keeps_cents(self):
+        quote = self.matrix.quote_many([self.other_room.id], self.today, self.today)
+
+        self.assertEqual(quote[self.other_room.id].total, Decimal("12.50"))
+
+    def test_matrix_reports_memory_used(self):
+        # 2 rooms x 30 days: int32 availability, int64 rates, int16 minimum stays
+        # and two boolean closures
+        self.assertGreaterEqual(self.matrix.nbytes, 2 * 30 * (4 + 8 + 2 + 1 + 1))
+
+    def test_refresh_without_changes_reloads_nothing(self):
+        # the inventory token, read from its table
+        with self.assertNumQueries(1):
+            self.assertEqual(self.matrix.refresh(), 0)
+
+    def test_refresh_only_reloads_stale_rooms(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.occurrences.filter(for_date=self.today).update(availability=1)
+            bump_rooms([self.room.id])
+
+        # the inventory token, the room tokens, then the stale room
+        with self.assertNumQueries(3):
+            self.assertEqual(self.matrix.refresh(), 1)
+
+        quote = self.matrix.quote_many([self.room.id], self.today, self.today)
+        self.assertEqual(quote[self.room.id].availability, 1)
+
+    def test_refresh_picks_up_new_nights_from_signals(self):
+        next_week = self.today + timedelta(days=7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OccurrenceFactory(room=self.other_room, for_date=next_week, rate=30)
+
+        self.matrix.refresh()
+        quote = self.matrix.quote_many([self.other_room.id], next_week, next_week)
+
+        self.assertEqual(quote[self.other_room.id].total, Decimal(30))
+        self.assertTrue(quote[self.other_room.id].covered)
+
+    def test_refresh_picks_up_rate_periods(self):
+        next_week = self.today + timedelta(days=7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RatePeriodFactory(
+                room=self.other_room,
+                start_date=next_week,
+                end_date=next_week,
+                rate=25,
+                availability=3,
+            )
+
+        self.matrix.refresh()
+        quote = self.matrix.quote_many([self.other_room.id], next_week, next_week)
+
+        self.assertEqual(
+            quote[self.other_room.id], Quote(3, Decimal(25), 1, True, False)
+        )
+
+    def test_matrix_evaluates_stay_rules_like_sql(self):
+        self.room.occurrences.filter(for_date=self.today).update(min_stay=2)
+        self.room.occurrences.filter(for_date=self.day_after).update(
+            closed_to_departure=True
+        )
+        self.matrix.load()
+
+        ranges = [
+            (self.today, self.today, True),
+            (self.today, self.tomorrow, True),
+            (self.tomorrow, self.tomorrow, True),
+            (self.tomorrow, self.day_after, False),
+        ]
+        for start, end, restricted in ranges:
+            quotes = self.matrix.quote_many([self.room.id], start, end)
+            room = Room.objects.with_quote(start, end).get(id=self.room.id)
+            self.assertEqual(quotes[self.room.id].restricted, restricted)
+            self.assertEqual(room.quote_restricted, restricted)
+
+    def test_stay_nights_are_read_from_the_matrix(self):
+        nights = self.matrix.stay_nights(self.room.id, self.today, self.tomorrow)
+
+        self.assertEqual(
+            nights,
+            [
+                MatrixNight(self.today, Decimal("10.00"), 4),
+                MatrixNight(self.tomorrow, Decimal("15.00"), 3),
+            ],
+        )
+
+    def test_matrix_covers_only_its_window(self):
+        self.assertTrue(self.matrix.covers(self.today, self.day_after))
+        self.assertFalse(self.matrix.covers(self.today, self.today + timedelta(30)))
+        self.assertFalse(self.matrix.covers(self.today - timedelta(1), self.today))
+
+
+class QuoteRoomsTests(TestCase):
+    """
+    Test suite for quoting through the matrix with the SQL fallback.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        cls.room = RoomFactory()
+        OccurrenceFactory(room=cls.room, for_date=cls.today, rate=10, availability=3)
+
+    def setUp(self):
+        cache.clear()
+        inventory._matrix = None
+        self.addCleanup(setattr, inventory, "_matrix", None)
+
+    @override_settings(INVENTORY_MATRIX_ENABLED=False)
+    def test_quote_rooms_falls_back_to_sql_when_disabled(self):
+        quotes = quote_rooms([self.room.id], self.today, self.today)
+
+        self.assertEqual(quotes[self.room.id], Quote(3, Decimal(10), 1, True, False))
+        self.assertIsNone(inventory._matrix)
+
+    @override_settings(INVENTORY_MATRIX_ENABLED=True, INVENTORY_MATRIX_DAYS=30)
+    def test_quote_rooms_uses_the_matrix_when_enabled(self):
+        quote_rooms([self.room.id], self.today, self.today)  # loads the matrix
+
+        # the inventory token only
+        with self.assertNumQueries(1):
+            quotes = quote_rooms([self.room.id], self.today, self.today)
+
+        self.assertEqual(quotes[self.room.id], Quote(3, Decimal(10), 1, True, False))
+
+    @override_settings(INVENTORY_MATRIX_ENABLED=True, INVENTORY_MATRIX_DAYS=30)
+    def test_quote_rooms_falls_back_to_sql_outside_the_window(self):
+        far = self.today + timedelta(days=60)
+
+        quotes = quote_rooms([self.room.id], far, far)
+
+        self.assertEqual(quotes[self.room.id], Quote(0, Decimal(0), 0, False, False))
+
+    def test_quote_rooms_raises_exception_for_invalid_input(self):
+        with self.assertRaises(ValidationError):
+            quote_rooms([self.room.id], self.today, self.today - timedelta(days=1))
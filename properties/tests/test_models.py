@@ -12,9 +12,10 @@ from properties.factories import (
     AddonFactory,
     OccurrenceFactory,
     PropertyFactory,
+    RatePeriodFactory,
     RoomFactory,
 )
-from properties.models import Addon, Occurrence, Property, Room
+from properties.models import Addon, Occurrence, Property, RatePeriod, Room
 
 fake = Faker()
 
@@ -105,7 +106,7 @@ class PropertyModelTests(TestCase):
         self.assertEqual(objs[1], p_2)
         self.assertEqual(objs[2], p_1)
 
-        self.assertEqual(p_1._meta.ordering, ["-created"])
+        self.assertEqual(p_1._meta.ordering, ["-created", "-id"])
 
     def test_property_slug_is_auto_generated_even_if_not_supplied(self):
         latitude, longitude = fake.latitude(), fake.longitude()
@@ -317,6 +318,16 @@ class RoomModelTests(TestCase):
 
         self.assertEqual(actual, expected)
 
+    def test_room_get_availability_is_zero_for_stays_breaking_a_stay_rule(self):
+        Occurrence.objects.filter(room=self.room, for_date=self.today).update(
+            min_stay=3
+        )
+
+        self.assertEqual(self.room.get_availability(self.today, self.tomorrow), 0)
+        self.assertEqual(
+            self.room.get_availability(self.today, self.day_after), self.av_day_after
+        )
+
     def test_room_get_availability_raises_exception_for_invalid_input(self):
         with self.assertRaises(ValidationError):
             # end date < start date
@@ -349,6 +360,289 @@ class RoomModelTests(TestCase):
         self.assertFalse(room_3.is_dorm())
 
 
+class RoomQuerySetTests(TestCase):
+    """
+    Test suite for the batched quotes on the Room queryset.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        cls.tomorrow = cls.today + timedelta(days=1)
+        cls.day_after = cls.today + timedelta(days=2)
+
+        cls.property = PropertyFactory()
+        cls.room, cls.other_room = RoomFactory.create_batch(
+            size=2, property=cls.property
+        )
+
+        for for_date, rate, availability in [
+            (cls.today, 10, 4),
+            (cls.tomorrow, 15, 3),
+            (cls.day_after, 20, 2),
+        ]:
+            OccurrenceFactory(
+                room=cls.room, for_date=for_date, rate=rate, availability=availability
+            )
+
+        # other room has no occurrence for tomorrow
+        OccurrenceFactory(room=cls.other_room, for_date=cls.today, rate=50)
+        OccurrenceFactory(room=cls.other_room, for_date=cls.day_after, rate=50)
+
+    def test_with_quote_annotates_availability_total_and_nights(self):
+        room = Room.objects.with_quote(self.today, self.day_after).get(id=self.room.id)
+
+        self.assertEqual(room.quote_availability, 2)
+        self.assertEqual(room.quote_total, Decimal(45))
+        self.assertEqual(room.quote_nights, 3)
+        self.assertTrue(room.quote_covered)
+
+    def test_with_quote_only_counts_nights_within_range(self):
+        room = Room.objects.with_quote(self.today, self.tomorrow).get(id=self.room.id)
+
+        self.assertEqual(room.quote_availability, 3)
+        self.assertEqual(room.quote_total, Decimal(25))
+        self.assertEqual(room.quote_nights, 2)
+        self.assertTrue(room.quote_covered)
+
+    def test_with_quote_flags_rooms_with_missing_nights(self):
+        room = Room.objects.with_quote(self.today, self.day_after).get(
+            id=self.other_room.id
+        )
+
+        self.assertEqual(room.quote_nights, 2)
+        self.assertEqual(room.quote_total, Decimal(100))
+        self.assertFalse(room.quote_covered)
+
+    def test_with_quote_defaults_to_zero_for_rooms_without_occurrences(self):
+        next_month = self.today + timedelta(days=30)
+        room = Room.objects.with_quote(next_month, next_month).get(id=self.room.id)
+
+        self.assertEqual(room.quote_availability, 0)
+        self.assertEqual(room.quote_total, Decimal(0))
+        self.assertEqual(room.quote_nights, 0)
+        self.assertFalse(room.quote_covered)
+
+    def test_with_quote_runs_a_single_query_for_many_rooms(self):
+        RoomFactory.create_batch(size=10, property=self.property)
+
+        with self.assertNumQueries(1):
+            rooms = list(Room.objects.with_quote(self.today, self.day_after))
+
+        self.assertEqual(len(rooms), 12)
+
+    def test_with_quote_raises_exception_for_invalid_input(self):
+        with self.assertRaises(ValidationError):
+            Room.objects.with_quote(self.tomorrow, self.today)
+
+    def test_with_stay_rules_reads_the_arrival_and_departure_nights(self):
+        Occurrence.objects.filter(room=self.room, for_date=self.today).update(
+            closed_to_arrival=True
+        )
+        Occurrence.objects.filter(room=self.other_room, for_date=self.day_after).update(
+            closed_to_departure=True
+        )
+
+        def restricted(check_in, check_out):
+            qs = Room.objects.with_stay_rules(check_in, check_out).order_by("id")
+            return [room.stay_restricted for room in qs]
+
+        self.assertEqual(restricted(self.today, self.day_after), [True, True])
+        self.assertEqual(restricted(self.today, self.tomorrow), [True, False])
+        self.assertEqual(restricted(self.tomorrow, self.day_after), [False, True])
+        # nights without inventory have no rules
+        self.assertEqual(
+            restricted(self.day_after, self.day_after + timedelta(days=1)),
+            [False, False],
+        )
+
+    def test_with_quote_flags_restricted_stays(self):
+        Occurrence.objects.filter(room=self.room, for_date=self.today).update(
+            min_stay=2
+        )
+
+        quotes = Room.objects.with_quote(self.today, self.today)
+        room = quotes.get(id=self.room.id)
+        self.assertTrue(room.quote_restricted)
+        self.assertEqual(room.quote_availability, 4)
+
+        room = Room.objects.with_quote(self.today, self.tomorrow).get(id=self.room.id)
+        self.assertFalse(room.quote_restricted)
+
+
+class PropertyQuerySetTests(TestCase):
+    """
+    Test suite for the list summary on the Property queryset.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        cls.end = cls.today + timedelta(days=6)
+
+        cls.property = PropertyFactory()
+        cls.room = RoomFactory(
+            property=cls.property, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        cls.dorm = RoomFactory(
+            property=cls.property, room_type=Room.MIXED_DORM, num_of_guests=8
+        )
+        cls.closed = RoomFactory(property=cls.property, num_of_guests=12, active=False)
+
+        RatePeriodFactory(room=cls.room, start_date=cls.today, rate=60)
+        RatePeriodFactory(room=cls.dorm, start_date=cls.today, rate=25, availability=8)
+        RatePeriodFactory(room=cls.closed, start_date=cls.today, rate=5)
+        OccurrenceFactory(room=cls.dorm, for_date=cls.today, rate=15, availability=0)
+
+        cls.empty = PropertyFactory()
+
+    def summary(self, prop, start=None, end=None):
+        qs = Property.objects.with_summary(start or self.today, end or self.end)
+        return qs.get(pk=prop.pk)
+
+    def test_with_summary_annotates_rate_and_active_rooms(self):
+        prop = self.summary(self.property)
+
+        self.assertEqual(prop.from_rate, Decimal(25))
+        self.assertEqual(prop.num_of_rooms, 2)
+        self.assertEqual(prop.max_guests, 8)
+
+    def test_with_summary_only_looks_at_nights_within_range(self):
+        later = self.end + timedelta(days=1)
+        OccurrenceFactory(room=self.room, for_date=later, rate=20)
+
+        self.assertEqual(self.summary(self.property).from_rate, Decimal(25))
+        self.assertEqual(self.summary(self.property, later, later).from_rate, 20)
+
+    def test_with_summary_of_a_property_without_rooms(self):
+        prop = self.summary(self.empty)
+
+        self.assertIsNone(prop.from_rate)
+        self.assertEqual(prop.num_of_rooms, 0)
+        self.assertEqual(prop.max_guests, 0)
+
+    def test_with_summary_runs_a_single_query(self):
+        for prop in PropertyFactory.create_batch(size=5):
+            RoomFactory.create_batch(size=2, property=prop)
+
+        with self.assertNumQueries(1):
+            properties = list(Property.objects.with_summary(self.today, self.end))
+
+        self.assertEqual(len(properties), 7)
+
+
+class RatePeriodModelTests(TestCase):
+    """
+    Test suite for rate periods and the nights they expand to.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        today = timezone.localdate()
+        # monday to sunday of a week which does not cross a month
+        cls.monday = today + timedelta(days=7 - today.weekday())
+        while (cls.monday + timedelta(days=6)).month != cls.monday.month:
+            cls.monday += timedelta(days=7)
+        cls.sunday = cls.monday + timedelta(days=6)
+
+        cls.room = RoomFactory(
+            room_type=Room.MIXED_DORM,
+            num_of_guests=8,
+            weekday_price=10,
+            weekend_price=15,
+        )
+        cls.period = RatePeriodFactory(
+            room=cls.room, start_date=cls.monday, end_date=cls.sunday, availability=6
+        )
+
+    def test_str_representation(self):
+        self.assertEqual(str(self.period), f"Period: {self.monday} - {self.sunday}")
+
+    def test_period_expands_to_nights_at_the_room_prices(self):
+        nights = list(self.room.nights.values_list("for_date", "rate", "availability"))
+
+        self.assertEqual(len(nights), 7)
+        self.assertEqual([rate for _, rate, _ in nights], [10, 10, 10, 10, 15, 15, 10])
+        self.assertEqual({availability for _, _, availability in nights}, {6})
+
+    def test_period_rate_overrides_the_room_prices(self):
+        self.period.rate = 12
+        self.period.save()
+
+        rates = set(self.room.nights.values_list("rate", flat=True))
+
+        self.assertEqual(rates, {Decimal(12)})
+
+    def test_occurrences_override_period_nights(self):
+        wednesday = self.monday + timedelta(days=2)
+        OccurrenceFactory(room=self.room, for_date=wednesday, rate=30, availability=0)
+
+        night = self.room.nights.get(for_date=wednesday)
+
+        self.assertEqual(self.room.nights.count(), 7)
+        self.assertEqual((night.rate, night.availability), (Decimal(30), 0))
+        self.assertIsNotNone(night.occurrence_id)
+        self.assertIsNone(night.period_id)
+
+    def test_quote_mixes_periods_and_occurrences(self):
+        OccurrenceFactory(
+            room=self.room,
+            for_date=self.monday + timedelta(days=1),
+            rate=30,
+            availability=2,
+        )
+
+        self.assertEqual(self.room.get_cost(self.monday, self.sunday), Decimal(100))
+        self.assertEqual(self.room.get_availability(self.monday, self.sunday), 2)
+        room = Room.objects.with_quote(self.sunday, self.sunday + timedelta(days=1))
+        room = room.get(id=self.room.id)
+        self.assertEqual(room.quote_nights, 1)
+        self.assertFalse(room.quote_covered)
+
+    def test_bookable_uses_period_nights(self):
+        check_out = self.sunday + timedelta(days=1)
+
+        rooms = Room.objects.bookable(self.monday, check_out, guests=6)
+        self.assertEqual(rooms.get().stay_total, Decimal(80 * 6))
+
+        rooms = Room.objects.bookable(self.monday, check_out, guests=7)
+        self.assertFalse(rooms.exists())
+
+    def test_period_end_cannot_be_before_its_start(self):
+        period = RatePeriod(
+            room=self.room, start_date=self.sunday, end_date=self.monday
+        )
+
+        with self.assertRaises(ValidationError):
+            period.full_clean()
+
+        with self.assertRaises(IntegrityError):
+            period.save()
+
+    def test_period_cannot_span_more_than_one_month(self):
+        last_day = self.monday.replace(day=28) + timedelta(days=4)
+        last_day -= timedelta(days=last_day.day)
+        period = RatePeriod(
+            room=self.room,
+            start_date=last_day,
+            end_date=last_day + timedelta(days=1),
+        )
+
+        with self.assertRaises(ValidationError):
+            period.full_clean()
+
+    def test_periods_of_a_room_cannot_overlap(self):
+        period = RatePeriod(
+            room=self.room, start_date=self.sunday, end_date=self.sunday
+        )
+
+        with self.assertRaises(ValidationError):
+            period.full_clean()
+
+        period.room = RoomFactory()
+        period.full_clean()
+
+
 class OccurrenceModelTests(TestCase):
     """
     Test suite for the occurrence model.
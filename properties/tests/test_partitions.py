@@ -0,0 +1,112 @@
+import csv
+import gzip
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.test import TestCase
+from django.utils import timezone
+
+from properties.factories import OccurrenceFactory, RoomFactory
+from properties.models import Occurrence
+from properties.partitions import (
+    add_months,
+    archive_partitions,
+    create_partition,
+    create_partitions,
+    default_partition_rows,
+    list_partitions,
+    month_start,
+)
+
+
+class PartitionsTests(TestCase):
+    """
+    Test suite for the monthly partitions of the occurrences.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.month = month_start(timezone.localdate())
+        cls.room = RoomFactory(weekday_price=50, weekend_price=50)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_add_months_rolls_over_years(self):
+        self.assertEqual(
+            add_months(self.month.replace(month=11), 3),
+            self.month.replace(year=self.month.year + 1, month=2),
+        )
+        self.assertEqual(
+            add_months(self.month.replace(month=1), -1),
+            self.month.replace(year=self.month.year - 1, month=12),
+        )
+
+    def test_a_year_ahead_is_partitioned(self):
+        months = list_partitions()
+
+        self.assertIn(self.month, months)
+        self.assertIn(add_months(self.month, 12), months)
+
+    def test_creating_a_month_moves_its_nights_out_of_the_default_partition(self):
+        month = add_months(self.month, 60)
+        occurrence = OccurrenceFactory(room=self.room, for_date=month)
+        self.assertEqual(default_partition_rows(), 1)
+
+        self.assertTrue(create_partition(month))
+
+        self.assertFalse(create_partition(month))
+        self.assertEqual(default_partition_rows(), 0)
+        self.assertIn(month, list_partitions())
+        self.assertEqual(Occurrence.objects.get(for_date=month), occurrence)
+
+    def test_create_partitions_skips_existing_months(self):
+        created = create_partitions(add_months(self.month, 12), 3)
+
+        self.assertEqual(
+            created, [add_months(self.month, 13), add_months(self.month, 14)]
+        )
+
+    def test_quotes_read_across_partitions(self):
+        last_night = add_months(self.month, 1)
+        for night in (last_night - timedelta(days=1), last_night):
+            OccurrenceFactory(room=self.room, for_date=night)
+
+        cost = self.room.get_cost(last_night - timedelta(days=1), last_night)
+
+        self.assertEqual(cost, 100)
+
+    def test_past_months_are_archived_and_dropped(self):
+        month = add_months(self.month, -36)
+        create_partition(month)
+        occurrence = Occurrence.objects.create(
+            room=self.room, for_date=month, rate=50, availability=2
+        )
+
+        archived = archive_partitions(add_months(month, 1), self.directory)
+
+        self.assertEqual(len(archived), 1)
+        archived_month, path, rows = archived[0]
+        self.assertEqual((archived_month, rows), (month, 1))
+        self.assertNotIn(month, list_partitions())
+        self.assertFalse(Occurrence.objects.filter(pk=occurrence.pk).exists())
+        with gzip.open(path, "rt") as archive:
+            self.assertEqual(
+                list(csv.DictReader(archive)),
+                [
+                    {
+                        "id": str(occurrence.pk),
+                        "rate": "50.00",
+                        "availability": "2",
+                        "for_date": month.isoformat(),
+                        "room_id": str(self.room.pk),
+                        "min_stay": "1",
+                        "closed_to_arrival": "f",
+                        "closed_to_departure": "f",
+                        "base_rate": "",
+                    }
+                ],
+            )
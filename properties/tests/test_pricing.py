@@ -0,0 +1,243 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+import numpy as np
+
+from bookings.factories import (
+    BookingConfirmedFactory,
+    BookingFactory,
+    BookingItemFactory,
+)
+from cart.models import Hold
+from properties import pricing
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.models import Night, Occurrence, RatePeriod
+from properties.pricing import MISSING, calendar_multipliers, reprice_properties
+from properties.services import compact_occurrences, update_nights
+from properties.versions import get_room_versions
+
+OCCUPANCY_RULES = {"occupancy": [(0.5, 2.0)], "floor": 0.5, "ceiling": 3.0}
+
+
+class PricingRulesTests(SimpleTestCase):
+    """
+    Test suite for the vectorized pricing rules.
+    """
+
+    def test_steps_apply_the_highest_threshold_reached(self):
+        multipliers = pricing.step_multipliers(
+            np.array([0.0, 0.5, 0.7, 0.95]), [(0.9, 1.5), (0.5, 1.2)]
+        )
+
+        self.assertEqual(multipliers.tolist(), [1.0, 1.2, 1.2, 1.5])
+
+    def test_nights_get_the_tightest_days_to_arrival_bracket(self):
+        today = date(2030, 3, 4)  # a monday
+        rules = {"days_to_arrival": [(14, 0.95), (2, 0.9)]}
+
+        multipliers = calendar_multipliers(today, 20, rules, today=today)
+
+        self.assertEqual(multipliers[:3].tolist(), [0.9] * 3)
+        self.assertEqual(multipliers[3:15].tolist(), [0.95] * 12)
+        self.assertEqual(multipliers[15:].tolist(), [1.0] * 5)
+
+    def test_weekdays_and_seasons_multiply(self):
+        start = date(2030, 12, 30)  # a monday
+        rules = {"weekdays": {1: 2.0}, "seasons": [("12-31", "01-01", 1.5)]}
+
+        multipliers = calendar_multipliers(start, 4, rules, today=start)
+
+        self.assertEqual(multipliers.tolist(), [2.0, 1.5, 1.5, 1.0])
+
+    def test_occupancy_is_per_night_across_rooms(self):
+        base = np.array([[10000, 10000], [5000, 5000]])
+        availability = np.array([[0, 1], [1, MISSING]])
+        booked = np.array([[1, 0], [0, 0]])
+
+        rates = pricing.reprice(base, availability, booked, np.ones(2), OCCUPANCY_RULES)
+
+        # half the units of the first night are sold, none of the second
+        self.assertEqual(rates.tolist(), [[20000, 10000], [10000, 0]])
+
+    def test_multipliers_are_clamped(self):
+        base = np.array([[10000]])
+        availability = np.array([[1]])
+        booked = np.array([[0]])
+
+        high = pricing.reprice(
+            base, availability, booked, np.array([5.0]), {"ceiling": 1.5}
+        )
+        low = pricing.reprice(
+            base, availability, booked, np.array([0.1]), {"floor": 0.8}
+        )
+
+        self.assertEqual(high.tolist(), [[15000]])
+        self.assertEqual(low.tolist(), [[8000]])
+
+
+@override_settings(PRICING_RULES=OCCUPANCY_RULES)
+class RepricePropertiesTests(TestCase):
+    """
+    Test suite for repricing the nights of properties.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.today = timezone.localdate()
+        cls.tomorrow = cls.today + timedelta(days=1)
+
+        cls.property = PropertyFactory()
+        cls.room, cls.full_room = RoomFactory.create_batch(
+            size=2, property=cls.property, weekday_price=100, weekend_price=100
+        )
+        OccurrenceFactory(room=cls.room, for_date=cls.today, rate=90, availability=1)
+        OccurrenceFactory(
+            room=cls.full_room, for_date=cls.today, rate=100, availability=0
+        )
+        RatePeriodFactory(
+            room=cls.room, start_date=cls.tomorrow, end_date=cls.tomorrow, rate=80
+        )
+
+        booking = BookingConfirmedFactory()
+        BookingItemFactory(
+            booking=booking,
+            product=cls.full_room,
+            check_in=cls.today,
+            check_out=cls.tomorrow,
+            quantity=1,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def reprice(self, **options):
+        return list(reprice_properties(days=3, **options))
+
+    def rates(self):
+        return {
+            (night.room_id, night.for_date): night.rate
+            for night in Night.objects.filter(room__property=self.property)
+        }
+
+    def test_only_nights_whose_rate_moves_are_written(self):
+        (repricing,) = self.reprice()
+
+        self.assertEqual(repricing.nights, 2)
+        self.assertEqual((repricing.before, repricing.after), (19000, 40000))
+        self.assertEqual(
+            self.rates(),
+            {
+                (self.room.id, self.today): Decimal("200.00"),
+                (self.full_room.id, self.today): Decimal("200.00"),
+                (self.room.id, self.tomorrow): Decimal("80.00"),
+            },
+        )
+        self.assertFalse(
+            Occurrence.objects.filter(room=self.room, for_date=self.tomorrow).exists()
+        )
+
+    def test_repricing_again_does_not_compound(self):
+        self.reprice()
+
+        (repricing,) = self.reprice()
+
+        self.assertEqual(repricing.nights, 0)
+        self.assertEqual(self.rates()[(self.room.id, self.today)], Decimal("200.00"))
+
+    def test_compacted_nights_keep_their_base_rate(self):
+        self.reprice()
+        compact_occurrences([self.room.id, self.full_room.id], self.today, 1)
+
+        (repricing,) = self.reprice()
+
+        period = RatePeriod.objects.get(room=self.room, start_date=self.today)
+        self.assertEqual((period.rate, period.base_rate), (200, 100))
+        self.assertEqual(repricing.nights, 0)
+        self.assertEqual(self.rates()[(self.room.id, self.today)], Decimal("200.00"))
+
+    def test_rates_set_in_the_bulk_editor_become_the_base(self):
+        self.reprice()
+        update_nights([self.room.id], self.today, self.today, range(1, 8), rate=150)
+
+        (repricing,) = self.reprice()
+
+        occurrence = Occurrence.objects.get(room=self.room, for_date=self.today)
+        self.assertEqual((occurrence.rate, occurrence.base_rate), (300, 150))
+        self.assertEqual(repricing.nights, 1)
+
+    def test_period_nights_get_occurrences_with_their_availability(self):
+        rules = {"days_to_arrival": [(30, 1.5)]}
+
+        with override_settings(PRICING_RULES=rules):
+            self.reprice()
+
+        occ = Occurrence.objects.get(room=self.room, for_date=self.tomorrow)
+        self.assertEqual((occ.rate, occ.availability), (Decimal("120.00"), 1))
+        self.assertEqual(
+            Occurrence.objects.get(room=self.room, for_date=self.today).availability, 1
+        )
+
+    def test_unpaid_bookings_and_holds_are_sold(self):
+        after = self.tomorrow + timedelta(days=1)
+        BookingItemFactory(
+            booking=BookingFactory(),
+            product=self.room,
+            check_in=self.tomorrow,
+            check_out=after,
+            quantity=1,
+        )
+        Hold.objects.create(
+            cart="a" * 32, room=self.room, check_in=self.tomorrow, check_out=after
+        )
+
+        self.reprice()
+
+        # two units sold against the one left on sale
+        self.assertEqual(self.rates()[(self.room.id, self.tomorrow)], Decimal("160.00"))
+
+    def test_dry_run_writes_nothing(self):
+        (repricing,) = self.reprice(dry_run=True)
+
+        self.assertEqual(repricing.nights, 2)
+        self.assertEqual(self.rates()[(self.room.id, self.today)], Decimal("90.00"))
+
+    def test_repriced_rooms_are_bumped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reprice()
+
+        versions = get_room_versions([self.room.id, self.full_room.id])
+        self.assertTrue(all(versions.values()))
+
+    def test_other_properties_are_left_alone(self):
+        other = PropertyFactory()
+
+        (repricing,) = self.reprice(property_ids=[other.id])
+
+        self.assertEqual(repricing.nights, 0)
+        self.assertEqual(self.rates()[(self.room.id, self.today)], Decimal("90.00"))
+
+    def test_command_reports_the_diff(self):
+        out = StringIO()
+
+        call_command(
+            "reprice_nights",
+            days=3,
+            dry_run=True,
+            slugs=[self.property.slug],
+            stdout=out,
+        )
+
+        self.assertIn("2 nights of 1 properties would be repriced", out.getvalue())
+        self.assertIn("$190.00 -> $400.00", out.getvalue())
+        self.assertEqual(self.rates()[(self.room.id, self.today)], Decimal("90.00"))
@@ -0,0 +1,65 @@
+from django.test import TestCase
+
+from properties.factories import PropertyFactory, RoomFactory
+from properties.models import Property
+from properties.search import search_text
+
+
+class SearchTextTests(TestCase):
+    """
+    Test suite for the full text search over properties.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.cordoba = PropertyFactory(
+            name="Hostel Córdoba Centro",
+            city="Córdoba",
+            description="A minutos de la plaza.",
+        )
+        cls.sao_paulo = PropertyFactory(
+            name="Pousada do Sol",
+            city="São Paulo",
+            description="Café da manhã incluído.",
+        )
+        cls.mendoza = PropertyFactory(
+            name="Casa Andes",
+            city="Mendoza",
+            description="Wine tours from Córdoba street.",
+        )
+
+    def search(self, text):
+        return list(search_text(Property.objects.all(), text))
+
+    def test_search_ignores_accents_and_case(self):
+        self.assertEqual(self.search("SAO paulo"), [self.sao_paulo])
+        self.assertEqual(self.search("cafe incluido"), [self.sao_paulo])
+
+    def test_name_matches_rank_above_description_matches(self):
+        results = self.search("cordoba")
+
+        self.assertEqual(results, [self.cordoba, self.mendoza])
+        self.assertGreater(results[0].rank, results[1].rank)
+
+    def test_last_word_matches_as_prefix(self):
+        self.assertEqual(self.search("pousada s"), [self.sao_paulo])
+        self.assertEqual(self.search("s pousada"), [])
+
+    def test_room_descriptions_are_searchable(self):
+        room = RoomFactory(property=self.mendoza, description="Dormi con balcón")
+
+        self.assertEqual(self.search("balcon"), [self.mendoza])
+
+        room.description = "Dormi con vista"
+        room.save()
+
+        self.assertEqual(self.search("balcon"), [])
+
+    def test_vector_follows_property_changes(self):
+        self.cordoba.name = "Hostel Güemes"
+        self.cordoba.save()
+
+        self.assertEqual(self.search("guemes"), [self.cordoba])
+
+    def test_text_without_words_matches_nothing(self):
+        self.assertEqual(self.search(" ?! "), [])
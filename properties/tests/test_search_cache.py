@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.models import Occurrence, Room
+from properties.search_cache import (
+    FIELDS,
+    STATS_KEY,
+    cached_search,
+    get_stats,
+    reset_stats,
+    search_results,
+)
+from properties.versions import bump_rooms
+
+
+class SearchCacheTests(TestCase):
+    """
+    Test suite for the versioned cache of availability searches.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=1)
+
+        cls.cheap = PropertyFactory(city="Mendoza")
+        cls.cheap_room = RoomFactory(
+            property=cls.cheap, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        OccurrenceFactory(room=cls.cheap_room, for_date=cls.check_in, rate=40)
+
+        cls.dear = PropertyFactory(city="Mendoza")
+        room = RoomFactory(
+            property=cls.dear, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        OccurrenceFactory(room=room, for_date=cls.check_in, rate=90)
+
+        cls.elsewhere = PropertyFactory(city="Salta")
+        cls.elsewhere_room = RoomFactory(
+            property=cls.elsewhere, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        reset_stats()
+
+    def search(self, city="Mendoza"):
+        rows = search_results(self.check_in, self.check_out, 2, city)
+        return [(row[0], row[len(FIELDS)]) for row in rows]
+
+    def test_results_are_ranked_with_their_price(self):
+        self.assertEqual(self.search(), [(self.cheap.id, 40), (self.dear.id, 90)])
+
+    def test_page_is_built_from_the_entry_alone(self):
+        results = cached_search(self.check_in, self.check_out, 2, "Mendoza")
+
+        # the city token, the entry, then the tokens of its properties
+        with self.assertNumQueries(3):
+            results = cached_search(self.check_in, self.check_out, 2, "Mendoza")
+            cheap, dear = results[:2]
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual([cheap, dear], [self.cheap, self.dear])
+        self.assertEqual((dear.name, dear.cheapest), (self.dear.name, 90))
+        self.assertEqual((cheap.num_of_rooms, cheap.max_guests), (1, 2))
+        self.assertEqual(cheap.get_absolute_url(), self.cheap.get_absolute_url())
+
+    def test_repeated_search_is_served_from_the_cache(self):
+        self.search()
+
+        # the city token, the entry, then the tokens of its properties
+        with self.assertNumQueries(3):
+            results = self.search(city="MENDOZA")
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(get_stats()["hits"], 1)
+        self.assertEqual(get_stats()["misses"], 1)
+        self.assertEqual(get_stats()["hit_ratio"], 0.5)
+
+    @override_settings(SEARCH_STATS_EVERY=3)
+    def test_lookups_are_counted_in_batches(self):
+        self.search()
+        self.search()
+
+        self.assertIsNone(cache.get(STATS_KEY % "hits"))
+
+        self.search()
+
+        self.assertEqual(cache.get(STATS_KEY % "hits"), 2)
+        self.assertEqual(cache.get(STATS_KEY % "misses"), 1)
+
+    def test_inventory_write_to_a_property_searched_makes_the_entry_stale(self):
+        self.search()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Occurrence.objects.filter(room=self.cheap_room).update(rate=100)
+            bump_rooms([self.cheap_room.id])
+
+        self.assertEqual(self.search(), [(self.dear.id, 90), (self.cheap.id, 100)])
+        self.assertEqual(get_stats()["stale"], 1)
+
+    def test_property_not_in_the_results_opening_makes_the_entry_stale(self):
+        self.search(city="Salta")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RatePeriodFactory(room=self.elsewhere_room, start_date=self.check_in)
+
+        self.assertEqual(
+            [pk for pk, _ in self.search(city="Salta")], [self.elsewhere.id]
+        )
+
+    def test_writes_elsewhere_keep_the_entry(self):
+        self.search()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RatePeriodFactory(room=self.elsewhere_room, start_date=self.check_in)
+
+        # served from the entry, see above
+        with self.assertNumQueries(3):
+            self.search()
+
+    def test_property_joining_the_city_makes_the_entry_stale(self):
+        self.search()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.elsewhere.city = "Mendoza"
+            self.elsewhere.save()
+
+        self.search()
+        self.assertEqual(get_stats()["misses"], 2)
+
+    def test_room_changes_make_the_entry_stale(self):
+        self.search()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap_room.num_of_guests = 1
+            self.cheap_room.save()
+
+        self.assertEqual(self.search(), [(self.dear.id, 90)])
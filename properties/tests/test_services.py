@@ -0,0 +1,578 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from bookings.factories import BookingFactory, BookingItemFactory
+from cart.models import Hold
+from properties import inventory
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.models import Night, Occurrence, Property, Room
+from properties.services import (
+    bounding_box,
+    nearby_properties,
+    quote_rooms,
+    reserve_room,
+    search_properties,
+    update_nights,
+)
+
+
+class SearchPropertiesTests(TestCase):
+    """
+    Test suite for the cross property availability search.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+        cls.nights = [cls.check_in, cls.check_in + timedelta(days=1)]
+
+        cls.hostel = PropertyFactory(city="Mendoza")
+        cls.dorm = RoomFactory(
+            property=cls.hostel, room_type=Room.MIXED_DORM, num_of_guests=8
+        )
+        cls.private = RoomFactory(
+            property=cls.hostel, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        for night in cls.nights:
+            OccurrenceFactory(room=cls.dorm, for_date=night, rate=10, availability=3)
+            OccurrenceFactory(room=cls.private, for_date=night, rate=50)
+
+        cls.hotel = PropertyFactory(city="Mendoza")
+        cls.suite = RoomFactory(
+            property=cls.hotel, room_type=Room.FAMILY_ROOM, num_of_guests=4
+        )
+        for night in cls.nights:
+            OccurrenceFactory(room=cls.suite, for_date=night, rate=30)
+
+    def search(self, guests, city="Mendoza", **kwargs):
+        kwargs.setdefault("check_in", self.check_in)
+        kwargs.setdefault("check_out", self.check_out)
+        return list(search_properties(guests=guests, city=city, **kwargs))
+
+    def test_search_returns_properties_ordered_by_cheapest_stay(self):
+        results = self.search(guests=1)
+
+        self.assertEqual(results, [self.hostel, self.hotel])
+        # one dorm bed for two nights
+        self.assertEqual(results[0].cheapest, Decimal(20))
+        self.assertEqual(results[1].cheapest, Decimal(60))
+
+    def test_dorms_are_charged_per_guest(self):
+        results = self.search(guests=2)
+
+        self.assertEqual(results[0], self.hostel)
+        self.assertEqual(results[0].cheapest, Decimal(40))
+
+    def test_dorm_without_enough_beds_falls_back_to_private_rooms(self):
+        results = self.search(guests=4)
+
+        # dorm only has 3 beds and the private room fits 2 so only the suite works
+        self.assertEqual(results, [self.hotel])
+
+    def test_rooms_with_missing_nights_are_excluded(self):
+        check_out = self.check_out + timedelta(days=1)
+
+        self.assertEqual(self.search(guests=1, check_out=check_out), [])
+
+    def test_sold_out_rooms_are_excluded(self):
+        self.suite.occurrences.filter(for_date=self.check_in).update(availability=0)
+
+        self.assertEqual(self.search(guests=4), [])
+
+    def test_search_filters_by_city_case_insensitively(self):
+        self.assertEqual(len(self.search(guests=1, city="mendoza")), 2)
+        self.assertEqual(self.search(guests=1, city="Salta"), [])
+
+    def test_inactive_properties_and_rooms_are_excluded(self):
+        self.hotel.active = False
+        self.hotel.save()
+        self.dorm.active = False
+        self.dorm.save()
+
+        results = self.search(guests=1)
+
+        self.assertEqual(results, [self.hostel])
+        self.assertEqual(results[0].cheapest, Decimal(100))
+
+    def test_search_runs_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.search(guests=1)
+
+    def test_stays_shorter_than_the_arrival_minimum_stay_are_excluded(self):
+        self.suite.occurrences.filter(for_date=self.check_in).update(min_stay=3)
+        # only the arrival night's minimum counts
+        self.dorm.occurrences.filter(for_date=self.nights[1]).update(min_stay=3)
+
+        self.assertEqual(self.search(guests=4), [])
+        results = self.search(guests=1)
+        self.assertEqual(results, [self.hostel])
+        self.assertEqual(results[0].cheapest, Decimal(20))
+
+    def test_closed_arrivals_and_departures_are_excluded(self):
+        self.dorm.occurrences.filter(for_date=self.check_in).update(
+            closed_to_arrival=True
+        )
+        OccurrenceFactory(
+            room=self.suite, for_date=self.check_out, closed_to_departure=True
+        )
+
+        results = self.search(guests=1)
+
+        self.assertEqual(results, [self.hostel])
+        self.assertEqual(results[0].cheapest, Decimal(100))
+
+    def test_stay_rules_can_be_skipped(self):
+        self.suite.occurrences.filter(for_date=self.check_in).update(min_stay=3)
+
+        self.assertEqual(self.search(guests=4, stay_rules=False), [self.hotel])
+
+
+class QuoteRoomsTests(TestCase):
+    """
+    Test suite for the stay quotes of the rooms of a property.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+
+        cls.hostel = PropertyFactory()
+        cls.dorm = RoomFactory(
+            property=cls.hostel, room_type=Room.MIXED_DORM, num_of_guests=8
+        )
+        cls.private = RoomFactory(
+            property=cls.hostel, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        RatePeriodFactory(
+            room=cls.dorm, start_date=cls.check_in, rate=10, availability=4
+        )
+        OccurrenceFactory(room=cls.dorm, for_date=cls.check_in, rate=12, availability=3)
+        OccurrenceFactory(room=cls.private, for_date=cls.check_in, rate=50)
+
+    def quote(self, guests):
+        rooms = Room.objects.filter(property=self.hostel).order_by("id")
+        return quote_rooms(rooms, self.check_in, self.check_out, guests)
+
+    def test_quote_attaches_nights_total_and_availability(self):
+        dorm, private = self.quote(guests=2)
+
+        self.assertEqual(
+            [(night.for_date, night.rate) for night in dorm.stay_nights],
+            [(self.check_in, 12), (self.check_in + timedelta(days=1), 10)],
+        )
+        # two beds for two nights
+        self.assertEqual(dorm.stay_total, Decimal(44))
+        self.assertEqual(dorm.stay_unit_total, Decimal(22))
+        self.assertEqual(dorm.stay_availability, 3)
+        self.assertTrue(dorm.stay_bookable)
+
+        # the second night has no inventory
+        self.assertEqual(len(private.stay_nights), 1)
+        self.assertFalse(private.stay_bookable)
+
+    def test_quote_flags_rooms_short_of_beds_or_space(self):
+        dorm, private = self.quote(guests=4)
+
+        self.assertFalse(dorm.stay_bookable)
+        self.assertFalse(private.stay_bookable)
+
+    def test_quote_flags_inactive_rooms(self):
+        Room.objects.filter(id=self.dorm.id).update(active=False)
+
+        dorm, _ = self.quote(guests=1)
+
+        self.assertFalse(dorm.stay_bookable)
+
+    def test_quote_flags_stays_breaking_a_stay_rule(self):
+        RatePeriodFactory(
+            room=self.private,
+            start_date=self.check_in + timedelta(days=1),
+            end_date=self.check_out,
+            closed_to_departure=True,
+        )
+
+        dorm, private = self.quote(guests=1)
+
+        self.assertFalse(dorm.stay_restricted)
+        self.assertTrue(private.stay_restricted)
+        self.assertFalse(private.stay_bookable)
+        self.assertEqual(private.stay_availability, 1)
+
+    def test_quote_runs_two_queries_for_many_rooms(self):
+        for room in RoomFactory.create_batch(size=10, property=self.hostel):
+            RatePeriodFactory(room=room, start_date=self.check_in)
+
+        with self.assertNumQueries(2):
+            rooms = self.quote(guests=1)
+
+        self.assertEqual(len(rooms), 12)
+        self.assertEqual(sum(room.stay_bookable for room in rooms), 11)
+
+
+@override_settings(INVENTORY_MATRIX_ENABLED=True, INVENTORY_MATRIX_DAYS=30)
+class MatrixQuoteRoomsTests(QuoteRoomsTests):
+    """
+    Same quotes read from the worker's inventory matrix, with the SQL fallback for
+    rooms it does not hold.
+    """
+
+    def setUp(self):
+        cache.clear()
+        inventory._matrix = None
+        self.addCleanup(setattr, inventory, "_matrix", None)
+
+    def test_quote_runs_two_queries_for_many_rooms(self):
+        for room in RoomFactory.create_batch(size=10, property=self.hostel):
+            RatePeriodFactory(room=room, start_date=self.check_in)
+        self.quote(guests=1)  # loads the matrix
+
+        # the inventory token, then the rooms
+        with self.assertNumQueries(2):
+            rooms = self.quote(guests=1)
+
+        self.assertEqual(len(rooms), 12)
+        self.assertEqual(sum(room.stay_bookable for room in rooms), 11)
+
+
+class ReserveRoomTests(TestCase):
+    """
+    Test suite for the oversell proof inventory decrement.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=3)
+
+        cls.dorm = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=8)
+        for i in range(3):
+            OccurrenceFactory(
+                room=cls.dorm,
+                for_date=cls.check_in + timedelta(days=i),
+                rate=10,
+                availability=4,
+            )
+
+    def availability(self, room):
+        nights = room.nights.filter(for_date__range=(self.check_in, self.check_out))
+        return list(nights.values_list("availability", flat=True))
+
+    def test_every_night_is_decremented(self):
+        reserve_room(self.dorm.id, self.check_in, self.check_out, quantity=3)
+
+        self.assertEqual(self.availability(self.dorm), [1, 1, 1])
+
+    def test_short_night_reserves_nothing(self):
+        Occurrence.objects.filter(room=self.dorm, for_date=self.check_in).update(
+            availability=2
+        )
+
+        with self.assertRaises(ValidationError) as cm:
+            reserve_room(self.dorm.id, self.check_in, self.check_out, quantity=3)
+
+        self.assertEqual(cm.exception.code, "unavailable")
+        self.assertEqual(self.availability(self.dorm), [2, 4, 4])
+
+    def test_missing_night_reserves_nothing(self):
+        with self.assertRaises(ValidationError):
+            reserve_room(
+                self.dorm.id, self.check_in, self.check_out + timedelta(days=1)
+            )
+
+        self.assertEqual(self.availability(self.dorm), [4, 4, 4])
+
+    def test_period_nights_become_overrides(self):
+        room = RoomFactory(weekday_price=80, weekend_price=80)
+        RatePeriodFactory(
+            room=room,
+            start_date=self.check_in,
+            end_date=self.check_out,
+            availability=2,
+        )
+
+        reserve_room(room.id, self.check_in, self.check_out)
+
+        nights = Night.objects.filter(room=room).values_list(
+            "for_date", "availability", "rate", "occurrence"
+        )
+        self.assertEqual(
+            [(night, availability, rate) for night, availability, rate, _ in nights],
+            [(self.check_in + timedelta(days=i), 1, Decimal(80)) for i in range(3)]
+            + [(self.check_out, 2, Decimal(80))],
+        )
+        self.assertEqual(Occurrence.objects.filter(room=room).count(), 3)
+
+    def test_overrides_keep_the_period_stay_rules(self):
+        room = RoomFactory()
+        RatePeriodFactory(
+            room=room,
+            start_date=self.check_in,
+            end_date=self.check_out,
+            min_stay=2,
+            closed_to_departure=True,
+        )
+
+        reserve_room(room.id, self.check_in, self.check_out)
+
+        self.assertEqual(
+            set(
+                Occurrence.objects.filter(room=room).values_list(
+                    "min_stay", "closed_to_arrival", "closed_to_departure"
+                )
+            ),
+            {(2, False, True)},
+        )
+
+    def test_check_out_must_be_after_check_in(self):
+        with self.assertRaises(ValidationError):
+            reserve_room(self.dorm.id, self.check_in, self.check_in)
+
+
+class UpdateNightsTests(TestCase):
+    """
+    Test suite for the bulk rate and availability upsert.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        # Monday to Sunday next week
+        today = timezone.localdate()
+        cls.monday = today + timedelta(days=7 - today.weekday())
+        cls.sunday = cls.monday + timedelta(days=6)
+
+        cls.room = RoomFactory(
+            room_type=Room.PRIVATE_ROOM, weekday_price=40, weekend_price=60
+        )
+        cls.dorm = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=6)
+        OccurrenceFactory(room=cls.room, for_date=cls.monday, rate=45, availability=3)
+
+    def nights(self, room):
+        return list(
+            Occurrence.objects.filter(room=room)
+            .order_by("for_date")
+            .values_list("for_date", "rate", "availability")
+        )
+
+    def test_missing_nights_are_created_and_existing_ones_updated(self):
+        created, updated = update_nights(
+            [self.room.id, self.dorm.id], self.monday, self.sunday, range(1, 8), rate=70
+        )
+
+        self.assertEqual((created, updated), (13, 1))
+        self.assertEqual(
+            self.nights(self.room),
+            [(self.monday, Decimal(70), 3)]
+            + [(self.monday + timedelta(days=i), Decimal(70), 1) for i in range(1, 7)],
+        )
+        self.assertEqual(
+            {availability for _, _, availability in self.nights(self.dorm)}, {6}
+        )
+
+    def test_only_the_chosen_weekdays_are_changed(self):
+        created, updated = update_nights(
+            [self.room.id], self.monday, self.sunday, [5, 6], availability=2
+        )
+
+        self.assertEqual((created, updated), (2, 0))
+        self.assertEqual(
+            self.nights(self.room),
+            [
+                (self.monday, Decimal(45), 3),
+                (self.monday + timedelta(days=4), Decimal(60), 2),
+                (self.monday + timedelta(days=5), Decimal(60), 2),
+            ],
+        )
+
+    def test_new_nights_keep_their_period_values(self):
+        room = RoomFactory(
+            room_type=Room.PRIVATE_ROOM, weekday_price=40, weekend_price=40
+        )
+        RatePeriodFactory(
+            room=room,
+            start_date=self.monday,
+            end_date=self.monday + timedelta(days=1),
+            rate=35,
+            availability=4,
+        )
+
+        update_nights(
+            [room.id], self.monday, self.monday + timedelta(days=2), [1, 2, 3], rate=50
+        )
+
+        self.assertEqual(
+            self.nights(room),
+            [
+                (self.monday, Decimal(50), 4),
+                (self.monday + timedelta(days=1), Decimal(50), 4),
+                (self.monday + timedelta(days=2), Decimal(50), 1),
+            ],
+        )
+
+    def test_existing_nights_keep_what_is_not_set(self):
+        update_nights([self.room.id], self.monday, self.monday, [1], availability=0)
+
+        self.assertEqual(self.nights(self.room), [(self.monday, Decimal(45), 0)])
+
+    def test_availability_set_is_the_allotment_before_sales(self):
+        tuesday = self.monday + timedelta(days=1)
+        BookingItemFactory(
+            booking=BookingFactory(),
+            product=self.room,
+            check_in=self.monday,
+            check_out=tuesday + timedelta(days=1),
+            quantity=2,
+        )
+        Hold.objects.create(
+            cart="cart",
+            room=self.room,
+            check_in=tuesday,
+            check_out=tuesday + timedelta(days=1),
+            quantity=1,
+        )
+
+        update_nights([self.room.id], self.monday, tuesday, [1, 2], availability=4)
+        update_nights([self.room.id], self.monday, tuesday, [2], availability=2)
+
+        self.assertEqual(
+            self.nights(self.room),
+            [(self.monday, Decimal(45), 2), (tuesday, Decimal(40), 0)],
+        )
+
+    def test_rates_set_become_the_base_rate(self):
+        Occurrence.objects.filter(room=self.room).update(rate=90, base_rate=45)
+
+        update_nights([self.room.id], self.monday, self.monday, [1], availability=2)
+        self.assertEqual(Occurrence.objects.get(room=self.room).base_rate, 45)
+
+        update_nights([self.room.id], self.monday, self.monday, [1], rate=50)
+        self.assertEqual(Occurrence.objects.get(room=self.room).base_rate, 50)
+
+
+class ReserveRoomConcurrencyTests(TransactionTestCase):
+    """
+    Parallel checkouts racing for the last bed, each in its own connection.
+    """
+
+    workers = 50
+
+    def checkout(self, room_id, check_in, check_out):
+        try:
+            with transaction.atomic():
+                reserve_room(room_id, check_in, check_out)
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+        return True
+
+    def race(self, room, check_in, check_out):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(self.checkout, room.id, check_in, check_out)
+                for _ in range(self.workers)
+            ]
+            return [future.result() for future in futures]
+
+    def test_only_one_checkout_gets_the_last_bed(self):
+        check_in = timezone.localdate() + timedelta(days=1)
+        room = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=8)
+        for i in range(3):
+            OccurrenceFactory(
+                room=room, for_date=check_in + timedelta(days=i), availability=1
+            )
+
+        results = self.race(room, check_in, check_in + timedelta(days=3))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(
+            list(room.occurrences.values_list("availability", flat=True)), [0, 0, 0]
+        )
+
+    def test_only_one_checkout_gets_the_last_period_bed(self):
+        check_in = timezone.localdate() + timedelta(days=1)
+        room = RoomFactory(room_type=Room.MIXED_DORM, num_of_guests=8)
+        RatePeriodFactory(
+            room=room,
+            start_date=check_in,
+            end_date=check_in + timedelta(days=2),
+            availability=1,
+        )
+
+        results = self.race(room, check_in, check_in + timedelta(days=3))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(
+            list(room.nights.values_list("availability", flat=True)), [0, 0, 0]
+        )
+
+
+class NearbyPropertiesTests(TestCase):
+    """
+    Test suite for the nearest properties search.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=1)
+
+        # Mendoza city centre and places due north of it, a degree is ~111 km
+        cls.origin = (-32.889458, -68.845839)
+        cls.centre = PropertyFactory(latitude=-32.889458, longitude=-68.845839)
+        cls.near = PropertyFactory(latitude=-32.8, longitude=-68.845839)
+        cls.far = PropertyFactory(latitude=-32.5, longitude=-68.845839)
+        cls.closed = PropertyFactory(
+            latitude=-32.88, longitude=-68.845839, active=False
+        )
+
+        room = RoomFactory(property=cls.near)
+        OccurrenceFactory(room=room, for_date=cls.check_in, rate=40)
+
+    def test_properties_within_radius_are_ordered_by_distance(self):
+        results = list(nearby_properties(*self.origin, radius_km=15))
+
+        self.assertEqual(results, [self.centre, self.near])
+        self.assertAlmostEqual(results[0].distance, 0, places=3)
+        self.assertAlmostEqual(results[1].distance, 9.95, places=2)
+
+    def test_limit_keeps_the_nearest(self):
+        results = list(nearby_properties(*self.origin, radius_km=100, limit=2))
+
+        self.assertEqual(results, [self.centre, self.near])
+
+    def test_stay_keeps_only_available_properties(self):
+        results = list(
+            nearby_properties(
+                *self.origin,
+                radius_km=100,
+                check_in=self.check_in,
+                check_out=self.check_out,
+            )
+        )
+
+        self.assertEqual(results, [self.near])
+        self.assertEqual(results[0].cheapest, Decimal(40))
+
+    def test_bounding_box_wraps_around_the_antimeridian(self):
+        fiji = PropertyFactory(latitude=-17.8, longitude=179.9)
+        samoa = PropertyFactory(latitude=-17.8, longitude=-179.9)
+
+        box = Property.objects.filter(bounding_box(-17.8, 179.95, 50))
+        results = list(nearby_properties(-17.8, 179.95, radius_km=50))
+
+        self.assertQuerySetEqual(box, [fiji, samoa], ordered=False)
+        self.assertEqual({prop.pk for prop in results}, {fiji.pk, samoa.pk})
@@ -0,0 +1,65 @@
+from django.test import TestCase
+
+from properties.factories import RoomFactory
+from properties.versions import (
+    bump_cities,
+    bump_rooms,
+    city_key,
+    get_city_version,
+    get_inventory_version,
+    get_property_versions,
+    get_room_versions,
+)
+
+
+class VersionsTests(TestCase):
+    """
+    Test suite for the inventory version tokens.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.rooms = RoomFactory.create_batch(size=20)
+
+    def test_unbumped_tokens_are_none(self):
+        room = self.rooms[0]
+
+        self.assertIsNone(get_inventory_version())
+        self.assertEqual(get_room_versions([room.id]), {room.id: None})
+
+    def test_bump_moves_the_rooms_their_properties_and_the_inventory(self):
+        room, other, *_ = self.rooms
+
+        bump_rooms([room.id])
+
+        token = get_inventory_version()
+        self.assertIsNotNone(token)
+        self.assertEqual(
+            get_room_versions([room.id, other.id]), {room.id: token, other.id: None}
+        )
+        self.assertEqual(
+            get_property_versions([room.property_id]), {room.property_id: token}
+        )
+
+    def test_bump_costs_two_queries_however_many_rooms(self):
+        bump_rooms([room.id for room in self.rooms[:1]])
+
+        # the properties of the rooms, then one upsert of every token
+        with self.assertNumQueries(2):
+            bump_rooms([room.id for room in self.rooms])
+
+        versions = get_room_versions([room.id for room in self.rooms])
+        self.assertEqual(set(versions.values()), {get_inventory_version()})
+
+    def test_bumping_a_city_moves_all_cities(self):
+        bump_cities(["Mendoza"])
+
+        self.assertEqual(get_city_version("mendoza"), get_city_version())
+        self.assertIsNone(get_city_version("Salta"))
+
+    def test_city_keys_are_valid_cache_keys(self):
+        key = city_key("São Paulo")
+
+        self.assertRegex(key, r"^catalog:city:[0-9a-f]{32}$")
+        self.assertEqual(city_key("SÃO PAULO"), key)
+        self.assertNotEqual(city_key(None), key)
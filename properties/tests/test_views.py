@@ -0,0 +1,398 @@
+import itertools
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from properties.factories import (
+    OccurrenceFactory,
+    PropertyFactory,
+    RatePeriodFactory,
+    RoomFactory,
+)
+from properties.forms import KeysetForm
+from properties.models import Property, Room
+from properties.views import (
+    PropertyDetailView,
+    PropertyFacetView,
+    PropertyListView,
+    PropertyNearbyView,
+)
+
+
+class PropertyListViewTests(TestCase):
+    """
+    Test suite for the property list and search page.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse("properties:property-list")
+        cls.template_name = "properties/property_list.html"
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=1)
+
+        cls.available = PropertyFactory(city="Mendoza")
+        room = RoomFactory(
+            property=cls.available, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        OccurrenceFactory(room=room, for_date=cls.check_in, rate=40)
+
+        cls.sold_out = PropertyFactory(city="Mendoza")
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_property_list_url_resolves_correct_view(self):
+        view = resolve(self.url)
+        self.assertEqual(view.func.__name__, PropertyListView.as_view().__name__)
+
+    def test_property_list_shows_all_properties_without_search(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTemplateUsed(response, self.template_name)
+        self.assertContains(response, self.available.name)
+        self.assertContains(response, self.sold_out.name)
+
+    def test_property_list_filters_available_properties_on_search(self):
+        params = {
+            "city": "Mendoza",
+            "check_in": self.check_in.isoformat(),
+            "check_out": self.check_out.isoformat(),
+            "guests": 2,
+        }
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, self.available.name)
+        self.assertContains(response, "From $40")
+        self.assertNotContains(response, self.sold_out.name)
+        self.assertEqual(self.client.session["q"]["guests"], 2)
+
+    def test_property_list_narrows_a_search_by_text(self):
+        params = {
+            "city": "Mendoza",
+            "check_in": self.check_in.isoformat(),
+            "check_out": self.check_out.isoformat(),
+            "guests": 2,
+        }
+        response = self.client.get(self.url, params | {"q": self.available.name})
+
+        self.assertEqual(list(response.context["properties"]), [self.available])
+        self.assertContains(response, "From $40")
+
+        response = self.client.get(self.url, params | {"q": "nowhere"})
+
+        self.assertEqual(list(response.context["properties"]), [])
+
+    def test_property_list_ignores_invalid_search(self):
+        params = {
+            "check_in": self.check_out.isoformat(),
+            "check_out": self.check_in.isoformat(),
+            "guests": 2,
+        }
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, self.sold_out.name)
+        self.assertNotIn("q", self.client.session)
+
+
+class PropertyListKeysetTests(TestCase):
+    """
+    Test suite for the keyset pages of the whole property list.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse("properties:property-list")
+        cls.properties = PropertyFactory.create_batch(size=45)
+        for prop in cls.properties[-3:]:
+            room = RoomFactory(
+                property=prop, room_type=Room.PRIVATE_ROOM, num_of_guests=3
+            )
+            RatePeriodFactory(room=room, rate=70)
+
+        # created together so only the id tells them apart
+        Property.objects.filter(
+            id__in=[prop.id for prop in cls.properties[10:30]]
+        ).update(created=cls.properties[10].created)
+        cls.ordered = list(Property.objects.all())
+
+    def test_first_page_in_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(list(response.context["properties"]), self.ordered[:20])
+        self.assertIsNone(response.context["previous_page"])
+        self.assertEqual(
+            response.context["next_page"], KeysetForm.cursor(self.ordered[19])
+        )
+
+    def test_cards_show_rate_and_rooms(self):
+        response = self.client.get(self.url)
+
+        self.assertContains(response, "From $70.00 a night", count=3)
+        self.assertContains(response, "1 room, up to 3 guests per room", count=3)
+        self.assertContains(response, "0 rooms, up to 0 guests per room")
+
+    def test_next_and_previous_pages_cover_the_list(self):
+        pages = []
+        cursor = None
+        while True:
+            params = {"after": cursor} if cursor else {}
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, params)
+            pages.append(list(response.context["properties"]))
+            cursor = response.context["next_page"]
+            if cursor is None:
+                break
+
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual(list(itertools.chain.from_iterable(pages)), self.ordered)
+
+        response = self.client.get(
+            self.url, {"before": response.context["previous_page"]}
+        )
+
+        self.assertEqual(list(response.context["properties"]), pages[1])
+        self.assertIsNotNone(response.context["previous_page"])
+        self.assertContains(response, "&after=")
+
+        response = self.client.get(
+            self.url, {"before": response.context["previous_page"]}
+        )
+
+        self.assertEqual(list(response.context["properties"]), pages[0])
+        self.assertIsNone(response.context["previous_page"])
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        for cursor in ("nope", "2026-01-01T00:00:00~123", "2026-01-01T00:00:00~"):
+            response = self.client.get(self.url, {"after": cursor})
+
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(list(response.context["properties"]), self.ordered[:20])
+
+
+class PropertyListTextSearchTests(TestCase):
+    """
+    Test suite for the `?q=` text search on the property list.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse("properties:property-list")
+        for i in range(25):
+            PropertyFactory(name=f"Hostel Andes {i:02}")
+        cls.other = PropertyFactory(name="Pousada do Sol")
+
+    def test_text_search_filters_and_paginates(self):
+        response = self.client.get(self.url, {"q": "andes"})
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context["paginator"].count, 25)
+        self.assertEqual(len(response.context["properties"]), 20)
+        self.assertNotContains(response, self.other.name)
+        self.assertContains(response, "?q=andes&page=2")
+
+        response = self.client.get(self.url, {"q": "andes", "page": 2})
+
+        self.assertEqual(len(response.context["properties"]), 5)
+        self.assertContains(response, "Hostel Andes 24")
+
+
+class PropertyDetailViewTests(TestCase):
+    """
+    Test suite for the property page and the quotes of its rooms.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.property = PropertyFactory()
+        cls.url = cls.property.get_absolute_url()
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+        cls.check_out = cls.check_in + timedelta(days=2)
+        cls.stay = {
+            "check_in": cls.check_in.isoformat(),
+            "check_out": cls.check_out.isoformat(),
+            "guests": 2,
+        }
+
+        cls.dorm = RoomFactory(
+            property=cls.property, room_type=Room.MIXED_DORM, num_of_guests=6
+        )
+        RatePeriodFactory(
+            room=cls.dorm, start_date=cls.check_in, rate=15, availability=5
+        )
+        cls.sold_out = RoomFactory(
+            property=cls.property, room_type=Room.PRIVATE_ROOM, num_of_guests=2
+        )
+        RatePeriodFactory(room=cls.sold_out, start_date=cls.check_in, availability=0)
+
+    def test_detail_url_resolves_correct_view(self):
+        view = resolve(self.url)
+        self.assertEqual(view.func.__name__, PropertyDetailView.as_view().__name__)
+
+    def test_detail_without_stay_shows_room_prices(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIsNone(response.context["stay"])
+        self.assertContains(response, f"From {self.dorm.weekday_price:.2f} / Night")
+        self.assertNotContains(response, "Sold out")
+
+    def test_detail_with_stay_quotes_every_room(self):
+        response = self.client.get(self.url, self.stay)
+
+        rooms = {room.id: room for room in response.context["rooms"]}
+        self.assertEqual(rooms[self.dorm.id].stay_total, 60)
+        self.assertContains(response, "$30.00 per bed for 2 nights")
+        self.assertContains(response, "5 beds left")
+        self.assertFalse(rooms[self.sold_out.id].stay_bookable)
+        self.assertContains(response, "Sold out for your dates", count=1)
+        self.assertEqual(self.client.session["q"], self.stay)
+
+    def test_detail_suggests_rooms_for_groups(self):
+        response = self.client.get(self.url, {**self.stay, "guests": 3})
+
+        best, *_ = response.context["combinations"]
+        self.assertEqual(best.rooms, [(self.dorm, 3)])
+        self.assertContains(response, "Rooms for your group of 3")
+        self.assertContains(response, f'value="{self.dorm.id}:3"')
+        self.assertContains(response, "Book all for $90.00")
+
+    def test_detail_quotes_the_stay_of_the_last_search(self):
+        session = self.client.session
+        session["q"] = {"city": "Mendoza", **self.stay}
+        session.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.context["stay"]["guests"], 2)
+        self.assertContains(response, "$30.00 per bed for 2 nights")
+
+    def test_detail_queries_do_not_grow_with_rooms(self):
+        # the first stay creates the session, later ones only update it
+        self.client.get(self.url, self.stay)
+
+        with self.assertNumQueries(7):
+            self.client.get(self.url, self.stay)
+
+        for room in RoomFactory.create_batch(size=10, property=self.property):
+            RatePeriodFactory(room=room, start_date=self.check_in)
+
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url, self.stay)
+
+        self.assertEqual(len(response.context["rooms"]), 12)
+
+
+class PropertyNearbyViewTests(TestCase):
+    """
+    Test suite for the nearby search endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse("properties:property-nearby")
+        cls.check_in = timezone.localdate() + timedelta(days=1)
+
+        cls.near = PropertyFactory(latitude=-32.89, longitude=-68.84)
+        room = RoomFactory(property=cls.near)
+        OccurrenceFactory(room=room, for_date=cls.check_in, rate=40)
+        cls.sold_out = PropertyFactory(latitude=-32.9, longitude=-68.84)
+
+    def test_nearby_url_resolves_correct_view(self):
+        view = resolve(self.url)
+        self.assertEqual(view.func.__name__, PropertyNearbyView.as_view().__name__)
+
+    def test_nearby_returns_properties_with_distance(self):
+        response = self.client.get(self.url, {"latitude": -32.89, "longitude": -68.84})
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["name"] for result in results],
+            [self.near.name, self.sold_out.name],
+        )
+        self.assertEqual(results[0]["distance_km"], 0)
+        self.assertEqual(results[0]["url"], self.near.get_absolute_url())
+
+    def test_nearby_with_stay_returns_available_properties_with_price(self):
+        params = {
+            "latitude": -32.89,
+            "longitude": -68.84,
+            "check_in": self.check_in.isoformat(),
+            "check_out": (self.check_in + timedelta(days=1)).isoformat(),
+        }
+        response = self.client.get(self.url, params)
+
+        results = response.json()["results"]
+        self.assertEqual([result["name"] for result in results], [self.near.name])
+        self.assertEqual(results[0]["cheapest"], "40.00")
+
+    def test_nearby_rejects_invalid_point(self):
+        response = self.client.get(self.url, {"latitude": 91, "longitude": 0})
+
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("latitude", response.json()["errors"])
+
+
+class PropertyFacetViewTests(TestCase):
+    """
+    Test suite for the faceted filter endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.url = reverse("properties:property-facets")
+        cls.hostel = PropertyFactory(property_type=Property.HOSTEL, country="AR")
+        RoomFactory(property=cls.hostel, room_type=Room.MIXED_DORM, ensuite=False)
+        RoomFactory(property=cls.hostel, room_type=Room.PRIVATE_ROOM, ensuite=True)
+        cls.hotel = PropertyFactory(property_type=Property.HOTEL, country="BR")
+        RoomFactory(property=cls.hotel, room_type=Room.DOUBLE_BED, ensuite=True)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_facets_url_resolves_correct_view(self):
+        view = resolve(self.url)
+        self.assertEqual(view.func.__name__, PropertyFacetView.as_view().__name__)
+
+    def test_facets_returns_properties_and_counts(self):
+        response = self.client.get(
+            self.url, {"property_type": "HS", "ensuite": "false"}
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        data = response.json()
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(
+            [result["name"] for result in data["results"]], [self.hostel.name]
+        )
+        self.assertEqual(
+            data["facets"]["property_type"],
+            [{"value": "HS", "label": "Hostel", "count": 1}],
+        )
+        # the ensuite facet ignores its own filter, the hostel's ensuite room counts
+        self.assertEqual(
+            {value["value"] for value in data["facets"]["ensuite"]}, {"true", "false"}
+        )
+
+    def test_facets_limits_the_results(self):
+        response = self.client.get(self.url, {"limit": 1})
+
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(len(data["results"]), 1)
+
+    def test_facets_rejects_unknown_values(self):
+        response = self.client.get(self.url, {"room_type": "XX"})
+
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("room_type", response.json()["errors"])
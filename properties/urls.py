@@ -7,5 +7,7 @@ app_name = "properties"
 
 urlpatterns = [
     path("", views.PropertyListView.as_view(), name="property-list"),
+    path("facets/", views.PropertyFacetView.as_view(), name="property-facets"),
+    path("nearby/", views.PropertyNearbyView.as_view(), name="property-nearby"),
     path("<slug:slug>/", views.PropertyDetailView.as_view(), name="property-detail"),
 ]
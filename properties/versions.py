@@ -0,0 +1,177 @@
+"""
+Inventory version tokens shared by all workers.
+
+Every write to a room's occurrences stores a fresh token for that room, for its
+property and for the whole inventory. Readers holding inventory in memory compare
+the global token on each read and, only when it moved, fetch the tokens of their
+rooms in one round trip to find out which ones went stale.
+
+Writes to properties and rooms themselves move the token of the property and a
+separate catalog token, which keys what is cached about their static fields, see
+`properties.facets`. Property writes move the token of their city as well, see
+`properties.search_cache`.
+
+The tokens live in their own table, `Version`, shared by all workers and never
+culled: a token evicted would read as "never bumped", so entries keyed by an older
+token would be served again. Reading any number of tokens is one query, and so is
+a bump, one upsert of all its keys.
+"""
+
+import hashlib
+import logging
+import uuid
+
+from django.db import connection
+
+from .models import Room, Version
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_KEY = "inventory:version"
+ROOM_KEY = "inventory:room:%s"
+PROPERTY_KEY = "inventory:property:%s"
+CATALOG_KEY = "catalog:version"
+CITY_KEY = "catalog:city:%s"
+
+# Keys are locked in order, so concurrent bumps sharing keys never deadlock.
+UPSERT_SQL = """
+    INSERT INTO properties_version (key, token)
+    SELECT key, %(token)s
+      FROM unnest(%(keys)s::varchar[]) AS key
+     ORDER BY key
+        ON CONFLICT (key) DO UPDATE SET token = excluded.token
+"""
+
+
+def get_many(keys):
+    """
+    Map each of `keys` found to its token.
+    """
+
+    return dict(Version.objects.filter(key__in=keys).values_list("key", "token"))
+
+
+def get(key):
+    return get_many([key]).get(key)
+
+
+def set_many(keys, token):
+    """
+    Store `token` under every one of `keys` with one upsert.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL, {"keys": sorted(set(keys)), "token": token})
+
+
+def get_inventory_version():
+    return get(INVENTORY_KEY)
+
+
+def get_room_versions(room_ids):
+    """
+    Map each room id to its current token, `None` when it never changed.
+    """
+
+    keys = {ROOM_KEY % room_id: room_id for room_id in room_ids}
+    found = get_many(keys)
+    return {room_id: found.get(key) for key, room_id in keys.items()}
+
+
+def get_property_versions(property_ids):
+    """
+    Map each property id to its current token, `None` when it never changed.
+    """
+
+    keys = {PROPERTY_KEY % property_id: property_id for property_id in property_ids}
+    found = get_many(keys)
+    return {property_id: found.get(key) for key, property_id in keys.items()}
+
+
+def bump_rooms(room_ids):
+    """
+    Mark the inventory of the given rooms, and so of their properties, as changed.
+
+    Call this after bulk writes (`update()`, `bulk_create()`, raw SQL) which do not
+    send model signals.
+    """
+
+    room_ids = set(room_ids)
+    if not room_ids:
+        return
+
+    token = uuid.uuid4().hex
+    logger.info("bumping inventory version for %s rooms" % len(room_ids))
+
+    property_ids = Room.objects.filter(pk__in=room_ids).values_list(
+        "property_id", flat=True
+    )
+
+    keys = [ROOM_KEY % room_id for room_id in room_ids]
+    keys += [PROPERTY_KEY % pk for pk in property_ids.distinct()]
+    keys.append(INVENTORY_KEY)
+    set_many(keys, token)
+
+
+def bump_properties(property_ids):
+    """
+    Mark the given properties as changed, for writes to the properties or their
+    rooms rather than to the inventory.
+    """
+
+    property_ids = set(property_ids)
+    if not property_ids:
+        return
+
+    token = uuid.uuid4().hex
+    logger.info("bumping version for %s properties" % len(property_ids))
+
+    set_many([PROPERTY_KEY % property_id for property_id in property_ids], token)
+
+
+def get_catalog_version():
+    return get(CATALOG_KEY)
+
+
+def bump_catalog():
+    """
+    Mark properties or rooms as changed.
+
+    Call this after bulk writes (`update()`, `bulk_create()`, raw SQL) which do not
+    send model signals.
+    """
+
+    logger.info("bumping catalog version")
+    set_many([CATALOG_KEY], uuid.uuid4().hex)
+
+
+def city_key(city):
+    """
+    Key of the token of a city, compared case insensitively as searches do. The
+    name is hashed, any name makes a valid cache key.
+    """
+
+    digest = hashlib.md5((city or "").upper().encode()).hexdigest()
+    return CITY_KEY % digest
+
+
+def get_city_version(city=None):
+    """
+    Token of the properties of a city, of all of them when `city` is empty.
+    """
+
+    return get(city_key(city))
+
+
+def bump_cities(cities):
+    """
+    Mark the properties of the given cities, and so all properties, as changed:
+    one was added, removed or moved there.
+    """
+
+    token = uuid.uuid4().hex
+    logger.info("bumping version for %s cities" % len(cities))
+
+    keys = [city_key(city) for city in cities]
+    keys.append(city_key(None))
+    set_many(keys, token)
@@ -1,27 +1,226 @@
 import logging
+from datetime import timedelta
 from typing import Any
 
-from django.views.generic import DetailView, ListView
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.generic import DetailView, ListView, View
 
 from cart.forms import CartAddProductForm
 
+from .facets import get_facets
+from .forms import FacetForm, KeysetForm, NearbyForm, SearchForm, StayForm
+from .groups import combine, stay_options
 from .models import Property
+from .search import search_text
+from .search_cache import cached_search
+from .services import nearby_properties, quote_rooms, search_properties
 
 logger = logging.getLogger(__name__)
 
 
 class PropertyListView(ListView):
+    """
+    List all properties or, when the search form is filled, only the ones with
+    availability for the requested dates and guests, see `cached_search()`. A
+    search narrowed by text as well runs uncached.
+
+    Every property comes with its lowest rate over the next `rate_days` nights and
+    its room count, see `PropertyQuerySet.with_summary()`. The whole list is paged
+    by keyset on `Property.Meta.ordering` so a page costs one query however deep
+    it is, searches are paged by number.
+    """
+
     model = Property
     context_object_name = "properties"
     template_name = "properties/property_list.html"
+    paginate_by = 20
+    rate_days = 30
+
+    def get_queryset(self):
+        self.form = SearchForm(self.request.GET or None)
+        self.text = self.request.GET.get("q", "").strip()
+        self.keyset = not (self.form.is_valid() or self.text)
+
+        if self.form.is_valid():
+            cd = self.form.cleaned_data
+            self.request.session["q"] = {
+                "city": cd["city"],
+                "check_in": cd["check_in"].isoformat(),
+                "check_out": cd["check_out"].isoformat(),
+                "guests": cd["guests"],
+            }
+
+            if not self.text:
+                return cached_search(
+                    check_in=cd["check_in"],
+                    check_out=cd["check_out"],
+                    guests=cd["guests"],
+                    city=cd["city"],
+                )
+
+            qs = search_properties(
+                check_in=cd["check_in"],
+                check_out=cd["check_out"],
+                guests=cd["guests"],
+                city=cd["city"],
+            )
+        else:
+            qs = super().get_queryset()
+
+        today = timezone.localdate()
+        qs = qs.with_summary(today, today + timedelta(days=self.rate_days - 1))
+
+        return search_text(qs, self.text) if self.text else qs
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset:
+            return super().paginate_queryset(queryset, page_size)
+
+        form = KeysetForm(self.request.GET)
+        after = before = None
+        if form.is_valid():
+            after, before = form.cleaned_data["after"], form.cleaned_data["before"]
+
+        # the redundant bound on created is the part the index can seek to
+        if before:
+            created, pk = before
+            queryset = queryset.filter(
+                Q(created__gte=created), Q(created__gt=created) | Q(id__gt=pk)
+            ).reverse()
+        elif after:
+            created, pk = after
+            queryset = queryset.filter(
+                Q(created__lte=created), Q(created__lt=created) | Q(id__lt=pk)
+            )
+
+        # one more row than the page tells whether there is another one
+        properties = list(queryset[: page_size + 1])
+        has_more = len(properties) > page_size
+        properties = properties[:page_size]
+
+        if before:
+            properties.reverse()
+        has_next, has_previous = (True, has_more) if before else (has_more, bool(after))
+        if not properties:
+            has_next = has_previous = False
+
+        self.next_page = KeysetForm.cursor(properties[-1]) if has_next else None
+        self.previous_page = KeysetForm.cursor(properties[0]) if has_previous else None
+
+        return None, None, properties, has_next or has_previous
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["form"] = self.form
+        context["q"] = self.text
+
+        if self.keyset:
+            context["next_page"] = self.next_page
+            context["previous_page"] = self.previous_page
+
+        # keep the search when moving between pages
+        params = self.request.GET.copy()
+        for param in ("page", "after", "before"):
+            params.pop(param, None)
+        context["params"] = params.urlencode()
+
+        return context
 
 
 class PropertyDetailView(DetailView):
+    """
+    A property and its rooms. Given a stay, in the query string or else from the
+    last search, every room comes with its price and availability for it, see
+    `quote_rooms()`, and the ones which cannot host the party are flagged. Groups
+    also get the cheapest ways to split across rooms, see `properties.groups`.
+    """
+
     model = Property
     context_object_name = "property"
     template_name = "properties/property_detail.html"
+    combinations = 3
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context["cart_add_form"] = CartAddProductForm()
+
+        q = self.request.session.get("q") or {}
+        form = StayForm(self.request.GET or q or None)
+        rooms = self.object.rooms.all()
+        stay = None
+
+        if form.is_valid():
+            stay = form.cleaned_data
+            rooms = quote_rooms(
+                rooms, stay["check_in"], stay["check_out"], stay["guests"]
+            )
+            if stay["guests"] > 1:
+                options = stay_options(rooms, stay["check_in"], stay["check_out"])
+                context["combinations"] = combine(
+                    options, stay["guests"], self.combinations
+                )
+
+            # the cart holds the rooms for the stay of the last search
+            if self.request.GET:
+                self.request.session["q"] = {
+                    **q,
+                    "check_in": stay["check_in"].isoformat(),
+                    "check_out": stay["check_out"].isoformat(),
+                    "guests": stay["guests"],
+                }
+
+        context["form"] = form
+        context["stay"] = stay
+        context["rooms"] = rooms
         return context
+
+
+class PropertyNearbyView(View):
+    """
+    JSON list of the active properties closest to a point, nearest first. With
+    check in and check out only the ones available for the stay, with its price.
+    """
+
+    def get(self, request):
+        form = NearbyForm(request.GET)
+
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+
+        properties = nearby_properties(**form.cleaned_data)
+
+        results = []
+        for prop in properties:
+            result = {
+                "name": prop.name,
+                "url": str(prop.get_absolute_url()),
+                "city": prop.city,
+                "latitude": float(prop.latitude),
+                "longitude": float(prop.longitude),
+                "distance_km": round(prop.distance, 2),
+            }
+            if hasattr(prop, "cheapest"):
+                result["cheapest"] = str(prop.cheapest)
+            results.append(result)
+
+        return JsonResponse({"results": results})
+
+
+class PropertyFacetView(View):
+    """
+    JSON list of the active properties matching the picked facet values, with the
+    count of every facet value, see `properties.facets`.
+    """
+
+    limit = 20
+
+    def get(self, request):
+        form = FacetForm(request.GET)
+
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+
+        filters = form.cleaned_data
+        return JsonResponse(get_facets(filters, filters.pop("limit") or self.limit))